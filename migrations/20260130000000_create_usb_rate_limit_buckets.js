@@ -0,0 +1,37 @@
+/**
+ * Migration: Create usb_rate_limit_buckets table
+ * Shared token buckets for the USB Integration API rate limiter
+ * (one row per API key hash + station ID), used when USB_RATE_LIMIT_STORE=mysql
+ */
+
+/**
+ * @param {import('knex').Knex} knex
+ */
+async function up(knex) {
+    const tableExists = await knex.schema.hasTable('usb_rate_limit_buckets');
+    if (tableExists) {
+        console.log('✓ usb_rate_limit_buckets table already exists');
+        return;
+    }
+
+    await knex.schema.createTable('usb_rate_limit_buckets', (table) => {
+        table.string('bucket_key', 150).primary();
+        table.double('tokens').notNullable();
+        table.bigInteger('updated_at').notNullable().comment('Last refill, epoch milliseconds');
+
+        // Index for cleanup of idle buckets
+        table.index(['updated_at'], 'idx_usb_rate_limit_buckets_updated_at');
+    });
+
+    console.log('✅ Created usb_rate_limit_buckets table');
+}
+
+/**
+ * @param {import('knex').Knex} knex
+ */
+async function down(knex) {
+    await knex.schema.dropTableIfExists('usb_rate_limit_buckets');
+    console.log('✅ Dropped usb_rate_limit_buckets table');
+}
+
+module.exports = { up, down };
@@ -0,0 +1,47 @@
+/**
+ * Migration: Create usb_burn_history table
+ * Append-only log of USB burn outcomes (completed and failed) for the
+ * streaming history export; the auto-increment id is the export cursor
+ */
+
+/**
+ * @param {import('knex').Knex} knex
+ */
+async function up(knex) {
+    const tableExists = await knex.schema.hasTable('usb_burn_history');
+    if (tableExists) {
+        console.log('✓ usb_burn_history table already exists');
+        return;
+    }
+
+    await knex.schema.createTable('usb_burn_history', (table) => {
+        table.bigIncrements('id').primary();
+        table.string('order_id', 100).notNullable();
+        table.string('order_number', 50).nullable();
+        table.string('outcome', 20).notNullable().comment('completed or failed');
+        table.boolean('retryable').nullable();
+        table.string('error_code', 100).nullable();
+        table.text('error_message').nullable();
+        table.text('notes').nullable();
+        table.string('station_id', 100).nullable();
+        table.string('content_type', 50).nullable();
+        table.string('capacity', 20).nullable();
+        table.timestamp('created_at').defaultTo(knex.fn.now());
+
+        // Indexes for per-order lookups and filtered exports
+        table.index(['order_id'], 'idx_usb_burn_history_order');
+        table.index(['outcome', 'id'], 'idx_usb_burn_history_outcome');
+    });
+
+    console.log('✅ Created usb_burn_history table');
+}
+
+/**
+ * @param {import('knex').Knex} knex
+ */
+async function down(knex) {
+    await knex.schema.dropTableIfExists('usb_burn_history');
+    console.log('✅ Dropped usb_burn_history table');
+}
+
+module.exports = { up, down };
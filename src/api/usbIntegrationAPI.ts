@@ -6,7 +6,7 @@
  * 
  * Features:
  * - Input validation and sanitization
- * - Rate limiting (100 requests/minute per IP)
+ * - Rate limiting (token bucket per API key + station, see stationRateLimiter)
  * - Database query timeouts
  * - Detailed error logging
  */
@@ -14,6 +14,10 @@
 import type { Request, Response, NextFunction } from 'express';
 import { orderRepository } from '../repositories/OrderRepository';
 import { customerRepository } from '../repositories/CustomerRepository';
+import { burnHistoryRepository, type BurnHistoryRecord, type BurnOutcome } from '../repositories/BurnHistoryRepository';
+import { burningQueueService, type BurningQueueItem } from '../services/burningQueueService';
+import { reportingSystem, type BurnTelemetryEntry } from '../services/reportingSystem';
+import { stationRateLimiter } from '../services/stationRateLimiter';
 import { unifiedLogger } from '../utils/unifiedLogger';
 import { 
   USB_INTEGRATION, 
@@ -26,13 +30,6 @@ import {
 // Rate Limiting
 // =============================================================================
 
-interface RateLimitEntry {
-  count: number;
-  resetTime: number;
-}
-
-const rateLimitMap = new Map<string, RateLimitEntry>();
-
 /**
  * Get client IP address from request
  */
@@ -45,18 +42,37 @@ function getClientIP(req: Request): string {
 }
 
 /**
- * Clean up expired rate limit entries periodically
+ * Get the API key from the X-API-Key header or Bearer token
  */
-setInterval(() => {
-  const now = Date.now();
-  const keysToDelete: string[] = [];
-  rateLimitMap.forEach((entry, ip) => {
-    if (now > entry.resetTime) {
-      keysToDelete.push(ip);
-    }
-  });
-  keysToDelete.forEach(ip => rateLimitMap.delete(ip));
-}, 60000); // Clean up every minute
+function getAPIKey(req: Request): string | undefined {
+  const apiKey = req.headers['x-api-key'];
+  if (typeof apiKey === 'string' && apiKey) {
+    return apiKey;
+  }
+  const authHeader = req.headers['authorization'];
+  if (typeof authHeader === 'string' && authHeader.startsWith('Bearer ')) {
+    return authHeader.slice(7);
+  }
+  return undefined;
+}
+
+/**
+ * Get the station identity sent in X-Station-Id, if any
+ */
+function getStationHeader(req: Request): string | undefined {
+  const stationId = req.headers['x-station-id'];
+  if (typeof stationId === 'string' && stationId.trim()) {
+    return sanitizeInput(stationId).slice(0, 100);
+  }
+  return undefined;
+}
+
+/**
+ * Get the station identity for rate limiting; clients without it are keyed by IP
+ */
+function getStationId(req: Request): string {
+  return getStationHeader(req) || `ip:${getClientIP(req)}`;
+}
 
 // =============================================================================
 // Interfaces
@@ -80,6 +96,8 @@ export interface USBBurningOrder {
   };
   createdAt: Date;
   status: string;
+  priority: 'high' | 'normal' | 'low';
+  deliveryDate: Date | null;
 }
 
 /**
@@ -114,37 +132,30 @@ if (!USB_INTEGRATION_API_KEY) {
 // =============================================================================
 
 /**
- * Rate limiting middleware - limits to MAX_REQUESTS_PER_MINUTE per IP
+ * Rate limiting middleware - one token bucket per validated API key +
+ * station; requests without a valid key are limited per client IP
  */
-function rateLimitMiddleware(req: Request, res: Response, next: NextFunction): void {
-  const clientIP = getClientIP(req);
-  const now = Date.now();
-  const windowMs = 60000; // 1 minute
-  
-  let entry = rateLimitMap.get(clientIP);
-  
-  if (!entry || now > entry.resetTime) {
-    // Create new entry or reset expired one
-    entry = { count: 1, resetTime: now + windowMs };
-    rateLimitMap.set(clientIP, entry);
-  } else {
-    entry.count++;
-  }
-  
-  const remaining = USB_INTEGRATION.MAX_REQUESTS_PER_MINUTE - entry.count;
-  
+async function rateLimitMiddleware(req: Request, res: Response, next: NextFunction): Promise<void> {
+  const apiKey = getAPIKey(req);
+  const authenticated = !!USB_INTEGRATION_API_KEY && apiKey === USB_INTEGRATION_API_KEY;
+  const stationId = authenticated ? getStationId(req) : `ip:${getClientIP(req)}`;
+  const decision = authenticated
+    ? await stationRateLimiter.check(apiKey as string, stationId)
+    : stationRateLimiter.checkAnonymous(getClientIP(req));
+
   // Set rate limit headers
-  res.setHeader('X-RateLimit-Limit', USB_INTEGRATION.MAX_REQUESTS_PER_MINUTE.toString());
-  res.setHeader('X-RateLimit-Remaining', Math.max(0, remaining).toString());
-  res.setHeader('X-RateLimit-Reset', Math.ceil(entry.resetTime / 1000).toString());
-  
-  if (entry.count > USB_INTEGRATION.MAX_REQUESTS_PER_MINUTE) {
+  res.setHeader('X-RateLimit-Limit', decision.limit.toString());
+  res.setHeader('X-RateLimit-Remaining', decision.remaining.toString());
+  res.setHeader('X-RateLimit-Reset', Math.ceil((Date.now() + decision.resetMs) / 1000).toString());
+
+  if (!decision.allowed) {
     unifiedLogger.warn('api', 'Rate limit exceeded', {
-      ip: clientIP,
-      count: entry.count,
-      limit: USB_INTEGRATION.MAX_REQUESTS_PER_MINUTE
+      stationId,
+      limit: decision.limit,
+      retryAfterMs: decision.retryAfterMs
     });
-    
+
+    res.setHeader('Retry-After', Math.ceil(decision.retryAfterMs / 1000).toString());
     res.status(429).json({
       success: false,
       error: 'Rate limit exceeded. Please try again later.',
@@ -152,7 +163,7 @@ function rateLimitMiddleware(req: Request, res: Response, next: NextFunction): v
     } as APIResponse);
     return;
   }
-  
+
   next();
 }
 
@@ -375,10 +386,217 @@ async function transformToUSBBurningOrder(order: any): Promise<USBBurningOrder>
     capacity: order.capacity || '8GB',
     customization: parseCustomization(order),
     createdAt: order.created_at || new Date(),
-    status: order.processing_status || order.status || 'pending'
+    status: order.processing_status || order.status || 'pending',
+    // Set on the burning queue item when the order is queued (keyed by order number)
+    priority: burningQueueService.getItemPriority(order.order_number || order.id) || 'normal',
+    deliveryDate: order.delivery_date || null
   };
 }
 
+/**
+ * A burning status transition submitted in a batch
+ */
+interface BurningTransition {
+  orderId: string;
+  action: 'start-burning' | 'complete-burning' | 'burning-failed';
+  notes?: string;
+  errorMessage?: string;
+  errorCode?: string;
+  retryable?: boolean | string | number;
+}
+
+/**
+ * Outcome of one transition of a batch, carrying the status code the
+ * single-order endpoint would have answered with
+ */
+interface TransitionResult {
+  orderId: string;
+  success: boolean;
+  statusCode: number;
+  message?: string;
+  error?: string;
+  data?: Record<string, unknown>;
+}
+
+/**
+ * Apply one burning status transition (used by the single-order endpoints
+ * and by the batch endpoint)
+ */
+async function applyTransition(transition: BurningTransition, stationId?: string): Promise<TransitionResult> {
+  const orderId = sanitizeInput(String(transition?.orderId ?? ''));
+  if (!isValidUUID(orderId) && !isValidOrderNumber(orderId)) {
+    return { orderId, success: false, statusCode: 400, error: 'Invalid order ID format. Must be a valid UUID or alphanumeric order number.' };
+  }
+
+  const order = await withTimeout(
+    () => orderRepository.findById(orderId),
+    USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
+  );
+  if (!order) {
+    return { orderId, success: false, statusCode: 404, error: 'Orden no encontrada' };
+  }
+  const currentStatus = order.processing_status || order.status || 'unknown';
+
+  let newStatus: string;
+  let queueStatus: BurningQueueItem['status'];
+  let note: string;
+  let message: string;
+  let retryable: boolean | undefined;
+  switch (transition.action) {
+    case 'start-burning':
+      if (!VALID_START_BURNING_STATUSES.includes(currentStatus)) {
+        return {
+          orderId,
+          success: false,
+          statusCode: 400,
+          error: `No se puede iniciar grabación. Estado actual '${currentStatus}' no es válido. Estados permitidos: ${VALID_START_BURNING_STATUSES.join(', ')}`
+        };
+      }
+      newStatus = 'burning';
+      queueStatus = 'burning';
+      note = 'Proceso de grabación USB iniciado';
+      message = 'Proceso de grabación iniciado';
+      break;
+
+    case 'complete-burning': {
+      if (!VALID_COMPLETE_BURNING_STATUSES.includes(currentStatus)) {
+        return {
+          orderId,
+          success: false,
+          statusCode: 400,
+          error: `No se puede completar grabación. Estado actual '${currentStatus}' no es válido. Estados permitidos: ${VALID_COMPLETE_BURNING_STATUSES.join(', ')}`
+        };
+      }
+      const notes = transition.notes ? sanitizeInput(String(transition.notes)) : '';
+      newStatus = 'ready_for_shipping';
+      queueStatus = 'completed';
+      note = notes
+        ? `Grabación USB completada exitosamente. ${notes}`
+        : 'Grabación USB completada exitosamente. Listo para envío.';
+      message = 'Grabación completada exitosamente';
+      break;
+    }
+
+    case 'burning-failed': {
+      const errorMessage = transition.errorMessage ? sanitizeInput(String(transition.errorMessage)) : '';
+      const errorCode = transition.errorCode ? sanitizeInput(String(transition.errorCode)) : '';
+      retryable = transition.retryable === true || transition.retryable === 'true' || transition.retryable === 1;
+      newStatus = retryable ? 'confirmed' : 'burning_failed';
+      queueStatus = retryable ? 'queued' : 'failed';
+      note = [
+        'Error en grabación USB',
+        errorCode ? `Código: ${errorCode}` : null,
+        errorMessage ? `Mensaje: ${errorMessage}` : null,
+        retryable ? 'Estado: Pendiente de reintento' : 'Estado: Requiere atención manual'
+      ].filter(Boolean).join('. ');
+      message = retryable ? 'Error registrado, orden disponible para reintento' : 'Error registrado, requiere atención manual';
+      break;
+    }
+
+    default:
+      return { orderId, success: false, statusCode: 400, error: `Acción no válida: ${sanitizeInput(String(transition.action))}` };
+  }
+
+  const success = await withTimeout(
+    () => orderRepository.updateStatus(orderId, newStatus),
+    USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
+  );
+  if (!success) {
+    return { orderId, success: false, statusCode: 500, error: 'No se pudo actualizar el estado de la orden' };
+  }
+  await orderRepository.addNote(orderId, note);
+  await updateQueueItem(order, queueStatus);
+  if (transition.action !== 'start-burning') {
+    await recordBurnOutcome(order, {
+      outcome: transition.action === 'complete-burning' ? 'completed' : 'failed',
+      retryable,
+      error_code: transition.errorCode ? sanitizeInput(String(transition.errorCode)) : null,
+      error_message: transition.errorMessage ? sanitizeInput(String(transition.errorMessage)) : null,
+      notes: transition.notes ? sanitizeInput(String(transition.notes)) : null,
+      station_id: stationId
+    });
+  }
+
+  const data: Record<string, unknown> = { orderId, orderNumber: order.order_number, newStatus };
+  if (retryable !== undefined) {
+    data.retryable = retryable;
+  }
+  return { orderId, success: true, statusCode: 200, message, data };
+}
+
+/**
+ * Answer a single-order endpoint with the outcome of its transition
+ */
+function sendTransitionResult(res: Response, result: TransitionResult): void {
+  res.status(result.statusCode).json((result.success
+    ? { success: true, message: result.message, data: result.data, timestamp: new Date().toISOString() }
+    : { success: false, error: result.error, timestamp: new Date().toISOString() }) as APIResponse);
+}
+
+/**
+ * Mirror a transition on the order's burning queue item, so stations
+ * syncing /orders/changes see it. Queue items are keyed by order number;
+ * orders that were never queued are skipped.
+ */
+async function updateQueueItem(
+  order: { id: string; order_number?: string },
+  status: BurningQueueItem['status']
+): Promise<void> {
+  const result = await burningQueueService.updateStatusByOrderNumber(order.order_number || order.id, status);
+  if (!result.success) {
+    unifiedLogger.debug('api', 'Burning queue item not updated', {
+      orderId: order.id,
+      orderNumber: order.order_number,
+      status,
+      error: result.error
+    });
+  }
+}
+
+/**
+ * Append a burn outcome to the history export. History is best effort: a
+ * failed insert is logged and never fails the status transition itself.
+ */
+async function recordBurnOutcome(
+  order: { id: string; order_number?: string; content_type?: string; capacity?: string },
+  entry: Omit<BurnHistoryRecord, 'order_id' | 'order_number' | 'content_type' | 'capacity'>
+): Promise<void> {
+  try {
+    await burnHistoryRepository.record({
+      ...entry,
+      order_id: order.id,
+      order_number: order.order_number ?? null,
+      content_type: order.content_type ?? null,
+      capacity: order.capacity ?? null
+    });
+  } catch (error) {
+    unifiedLogger.warn('api', 'Failed to record burn history', {
+      orderId: order.id,
+      outcome: entry.outcome,
+      error: error instanceof Error ? error.message : String(error)
+    });
+  }
+}
+
+/**
+ * Wait until a streamed response can take more data or the client is gone
+ */
+function waitForDrain(res: Response): Promise<void> {
+  return new Promise(resolve => {
+    const done = () => {
+      res.off('drain', done);
+      res.off('close', done);
+      resolve();
+    };
+    res.on('drain', done);
+    res.on('close', done);
+  });
+}
+
+// Burn history exports currently streaming (bounded so bulk exports cannot
+// take every database connection from live traffic)
+let activeHistoryExports = 0;
+
 // =============================================================================
 // Route Registration
 // =============================================================================
@@ -459,69 +677,14 @@ export function registerUSBIntegrationRoutes(server: any): void {
 
       unifiedLogger.info('api', 'Starting USB burning process', { orderId });
 
-      // Find the order with timeout
-      const order = await withTimeout(
-        () => orderRepository.findById(orderId),
-        USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
-      );
-      
-      if (!order) {
-        unifiedLogger.warn('api', 'Order not found for burning', { orderId });
-        res.status(404).json({
-          success: false,
-          error: 'Orden no encontrada',
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
+      const result = await applyTransition({ orderId, action: 'start-burning' }, getStationHeader(req));
+      if (result.success) {
+        unifiedLogger.info('api', 'USB burning started successfully', { orderId, orderNumber: result.data?.orderNumber });
+      } else {
+        unifiedLogger.warn('api', 'Could not start USB burning', { orderId, statusCode: result.statusCode, error: result.error });
       }
 
-      // Validate current status allows starting burning
-      const currentStatus = order.processing_status || order.status || 'unknown';
-      if (!VALID_START_BURNING_STATUSES.includes(currentStatus)) {
-        unifiedLogger.warn('api', 'Invalid status for burning start', { 
-          orderId, 
-          currentStatus, 
-          allowedStatuses: VALID_START_BURNING_STATUSES 
-        });
-        res.status(400).json({
-          success: false,
-          error: `No se puede iniciar grabación. Estado actual '${currentStatus}' no es válido. Estados permitidos: ${VALID_START_BURNING_STATUSES.join(', ')}`,
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
-      }
-
-      // Update status to 'burning' with timeout
-      const success = await withTimeout(
-        () => orderRepository.updateStatus(orderId, 'burning'),
-        USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
-      );
-      
-      if (!success) {
-        unifiedLogger.error('api', 'Failed to update order status to burning', { orderId });
-        res.status(500).json({
-          success: false,
-          error: 'No se pudo actualizar el estado de la orden',
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
-      }
-
-      // Add note to order
-      await orderRepository.addNote(orderId, 'Proceso de grabación USB iniciado');
-
-      unifiedLogger.info('api', 'USB burning started successfully', { orderId, orderNumber: order.order_number });
-
-      res.json({
-        success: true,
-        message: 'Proceso de grabación iniciado',
-        data: {
-          orderId,
-          orderNumber: order.order_number,
-          newStatus: 'burning'
-        },
-        timestamp: new Date().toISOString()
-      } as APIResponse);
+      sendTransitionResult(res, result);
 
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : 'Error interno del servidor';
@@ -550,78 +713,17 @@ export function registerUSBIntegrationRoutes(server: any): void {
     try {
       const { orderId } = req.params;
       const { notes } = req.body || {};
-      
-      // Sanitize notes input
-      const sanitizedNotes = notes ? sanitizeInput(String(notes)) : '';
 
       unifiedLogger.info('api', 'Completing USB burning process', { orderId });
 
-      // Find the order with timeout
-      const order = await withTimeout(
-        () => orderRepository.findById(orderId),
-        USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
-      );
-      
-      if (!order) {
-        unifiedLogger.warn('api', 'Order not found for burning completion', { orderId });
-        res.status(404).json({
-          success: false,
-          error: 'Orden no encontrada',
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
-      }
-
-      // Validate current status allows completing burning
-      const currentStatus = order.processing_status || order.status || 'unknown';
-      if (!VALID_COMPLETE_BURNING_STATUSES.includes(currentStatus)) {
-        unifiedLogger.warn('api', 'Invalid status for burning completion', { 
-          orderId, 
-          currentStatus, 
-          allowedStatuses: VALID_COMPLETE_BURNING_STATUSES 
-        });
-        res.status(400).json({
-          success: false,
-          error: `No se puede completar grabación. Estado actual '${currentStatus}' no es válido. Estados permitidos: ${VALID_COMPLETE_BURNING_STATUSES.join(', ')}`,
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
-      }
-
-      // Update status to 'ready_for_shipping' with timeout
-      const success = await withTimeout(
-        () => orderRepository.updateStatus(orderId, 'ready_for_shipping'),
-        USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
-      );
-      
-      if (!success) {
-        unifiedLogger.error('api', 'Failed to update order status to ready_for_shipping', { orderId });
-        res.status(500).json({
-          success: false,
-          error: 'No se pudo actualizar el estado de la orden',
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
+      const result = await applyTransition({ orderId, action: 'complete-burning', notes }, getStationHeader(req));
+      if (result.success) {
+        unifiedLogger.info('api', 'USB burning completed successfully', { orderId, orderNumber: result.data?.orderNumber });
+      } else {
+        unifiedLogger.warn('api', 'Could not complete USB burning', { orderId, statusCode: result.statusCode, error: result.error });
       }
 
-      // Add note to order
-      const noteMessage = sanitizedNotes 
-        ? `Grabación USB completada exitosamente. ${sanitizedNotes}`
-        : 'Grabación USB completada exitosamente. Listo para envío.';
-      await orderRepository.addNote(orderId, noteMessage);
-
-      unifiedLogger.info('api', 'USB burning completed successfully', { orderId, orderNumber: order.order_number });
-
-      res.json({
-        success: true,
-        message: 'Grabación completada exitosamente',
-        data: {
-          orderId,
-          orderNumber: order.order_number,
-          newStatus: 'ready_for_shipping'
-        },
-        timestamp: new Date().toISOString()
-      } as APIResponse);
+      sendTransitionResult(res, result);
 
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : 'Error interno del servidor';
@@ -650,79 +752,27 @@ export function registerUSBIntegrationRoutes(server: any): void {
     try {
       const { orderId } = req.params;
       const { errorMessage, errorCode, retryable } = req.body || {};
-      
-      // Sanitize inputs
-      const sanitizedErrorMessage = errorMessage ? sanitizeInput(String(errorMessage)) : '';
-      const sanitizedErrorCode = errorCode ? sanitizeInput(String(errorCode)) : '';
 
-      unifiedLogger.info('api', 'Recording burning failure', { orderId, errorCode: sanitizedErrorCode });
+      unifiedLogger.info('api', 'Recording burning failure', { orderId, errorCode });
 
-      // Find the order with timeout
-      const order = await withTimeout(
-        () => orderRepository.findById(orderId),
-        USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
+      const result = await applyTransition(
+        { orderId, action: 'burning-failed', errorMessage, errorCode, retryable },
+        getStationHeader(req)
       );
-      
-      if (!order) {
-        unifiedLogger.warn('api', 'Order not found for burning failure', { orderId });
-        res.status(404).json({
-          success: false,
-          error: 'Orden no encontrada',
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
-      }
-
-      // Normalize retryable to boolean (accepts true, 'true', 1)
-      const isRetryable = retryable === true || retryable === 'true' || retryable === 1;
-
-      // Update status to 'burning_failed' or back to 'confirmed' if retryable
-      const newStatus = isRetryable ? 'confirmed' : 'burning_failed';
-      const success = await withTimeout(
-        () => orderRepository.updateStatus(orderId, newStatus),
-        USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
-      );
-      
-      if (!success) {
-        unifiedLogger.error('api', 'Failed to update order status for burning failure', { orderId, newStatus });
-        res.status(500).json({
-          success: false,
-          error: 'No se pudo actualizar el estado de la orden',
-          timestamp: new Date().toISOString()
-        } as APIResponse);
-        return;
+      if (result.success) {
+        unifiedLogger.error('api', 'USB burning failed', {
+          orderId,
+          orderNumber: result.data?.orderNumber,
+          errorCode,
+          errorMessage,
+          retryable: result.data?.retryable,
+          newStatus: result.data?.newStatus
+        });
+      } else {
+        unifiedLogger.warn('api', 'Could not record burning failure', { orderId, statusCode: result.statusCode, error: result.error });
       }
 
-      // Add error note to order
-      const errorNote = [
-        'Error en grabación USB',
-        sanitizedErrorCode ? `Código: ${sanitizedErrorCode}` : null,
-        sanitizedErrorMessage ? `Mensaje: ${sanitizedErrorMessage}` : null,
-        isRetryable ? 'Estado: Pendiente de reintento' : 'Estado: Requiere atención manual'
-      ].filter(Boolean).join('. ');
-      
-      await orderRepository.addNote(orderId, errorNote);
-
-      unifiedLogger.error('api', 'USB burning failed', { 
-        orderId, 
-        orderNumber: order.order_number,
-        errorCode: sanitizedErrorCode,
-        errorMessage: sanitizedErrorMessage,
-        retryable: isRetryable,
-        newStatus
-      });
-
-      res.json({
-        success: true,
-        message: isRetryable ? 'Error registrado, orden disponible para reintento' : 'Error registrado, requiere atención manual',
-        data: {
-          orderId,
-          orderNumber: order.order_number,
-          newStatus,
-          retryable: isRetryable
-        },
-        timestamp: new Date().toISOString()
-      } as APIResponse);
+      sendTransitionResult(res, result);
 
     } catch (error) {
       const errorMsg = error instanceof Error ? error.message : 'Error interno del servidor';
@@ -743,9 +793,235 @@ export function registerUSBIntegrationRoutes(server: any): void {
     }
   });
 
+  /**
+   * POST /api/usb-integration/orders/transitions
+   * Apply several burning status transitions in one request.
+   * Body: { transitions: [{ orderId, action: 'start-burning' | 'complete-burning' | 'burning-failed', notes?, errorMessage?, errorCode?, retryable? }] }
+   * Transitions are applied in order; each gets its own result, so one
+   * failing transition does not affect the others.
+   */
+  server.post('/api/usb-integration/orders/transitions', authenticateAPIKey, async (req: Request, res: Response) => {
+    const { transitions } = req.body || {};
+
+    if (!Array.isArray(transitions) || transitions.length === 0) {
+      res.status(400).json({
+        success: false,
+        error: 'transitions must be a non-empty array',
+        timestamp: new Date().toISOString()
+      } as APIResponse);
+      return;
+    }
+    if (transitions.length > USB_INTEGRATION.MAX_TRANSITIONS_PER_BATCH) {
+      res.status(400).json({
+        success: false,
+        error: `Too many transitions (max ${USB_INTEGRATION.MAX_TRANSITIONS_PER_BATCH})`,
+        timestamp: new Date().toISOString()
+      } as APIResponse);
+      return;
+    }
+
+    unifiedLogger.info('api', 'Applying burning transitions batch', { count: transitions.length });
+
+    const results: TransitionResult[] = [];
+    for (const transition of transitions) {
+      try {
+        results.push(await applyTransition(transition, getStationHeader(req)));
+      } catch (error) {
+        const errorMessage = error instanceof Error ? error.message : 'Error interno del servidor';
+        const isTimeout = errorMessage.includes('timeout');
+        unifiedLogger.error('api', 'Error applying burning transition', {
+          orderId: transition?.orderId,
+          action: transition?.action,
+          error: errorMessage,
+          isTimeout
+        });
+        results.push({
+          orderId: String(transition?.orderId ?? ''),
+          success: false,
+          statusCode: isTimeout ? 504 : 500,
+          error: isTimeout ? 'Database query timeout' : errorMessage
+        });
+      }
+    }
+
+    res.json({
+      success: true,
+      data: {
+        results,
+        applied: results.filter(result => result.success).length
+      },
+      timestamp: new Date().toISOString()
+    } as APIResponse);
+  });
+
+  /**
+   * GET /api/usb-integration/burns/history?since=N&limit=M&outcome=completed|failed
+   * Stream burn records (completed and failed, including retried failures)
+   * with cursor > N as NDJSON, oldest first. Each line is one record with
+   * its `cursor`; the last line is a trailer
+   * { end: true, cursor, count, more } and `more` means another page
+   * starting at `cursor` is available. A stream without the trailer was cut
+   * short. Rows are read from the database as the client consumes them.
+   */
+  server.get('/api/usb-integration/burns/history', authenticateAPIKey, async (req: Request, res: Response) => {
+    const since = Math.max(0, parseInt(req.query.since as string) || 0);
+    const limit = Math.min(
+      USB_INTEGRATION.MAX_BURN_HISTORY_PAGE,
+      Math.max(1, parseInt(req.query.limit as string) || USB_INTEGRATION.MAX_BURN_HISTORY_PAGE)
+    );
+    const outcome = req.query.outcome as string | undefined;
+
+    if (outcome !== undefined && outcome !== 'completed' && outcome !== 'failed') {
+      res.status(400).json({
+        success: false,
+        error: "outcome debe ser 'completed' o 'failed'",
+        timestamp: new Date().toISOString()
+      } as APIResponse);
+      return;
+    }
+    if (activeHistoryExports >= USB_INTEGRATION.MAX_CONCURRENT_HISTORY_EXPORTS) {
+      res.setHeader('Retry-After', '30');
+      res.status(503).json({
+        success: false,
+        error: 'Hay demasiadas exportaciones de historial en curso, intente más tarde',
+        timestamp: new Date().toISOString()
+      } as APIResponse);
+      return;
+    }
+
+    activeHistoryExports++;
+    const rows = burnHistoryRepository.streamSince(since, limit, outcome as BurnOutcome | undefined);
+    res.on('close', () => rows.destroy());
+    let cursor = since;
+    let count = 0;
+
+    try {
+      res.status(200);
+      res.setHeader('Content-Type', 'application/x-ndjson; charset=utf-8');
+      res.setHeader('Cache-Control', 'no-store');
+
+      for await (const row of rows) {
+        cursor = Number(row.id);
+        count++;
+        const line = JSON.stringify({
+          cursor,
+          orderId: row.order_id,
+          orderNumber: row.order_number,
+          outcome: row.outcome,
+          retryable: row.retryable === null ? null : Boolean(row.retryable),
+          errorCode: row.error_code,
+          errorMessage: row.error_message,
+          notes: row.notes,
+          stationId: row.station_id,
+          contentType: row.content_type,
+          capacity: row.capacity,
+          recordedAt: row.created_at
+        }) + '\n';
+        // Respect backpressure so a slow client never buffers the export in memory
+        if (!res.write(line)) {
+          await waitForDrain(res);
+        }
+        if (res.destroyed) {
+          unifiedLogger.info('api', 'Burn history export closed by client', { since, cursor, count });
+          return;
+        }
+      }
+
+      res.end(JSON.stringify({ end: true, cursor, count, more: count === limit }) + '\n');
+      unifiedLogger.info('api', 'Burn history exported', { since, cursor, count });
+    } catch (error) {
+      const errorMessage = error instanceof Error ? error.message : 'Error interno del servidor';
+      unifiedLogger.error('api', 'Error streaming burn history', { since, cursor, count, error: errorMessage });
+      if (!res.headersSent) {
+        res.removeHeader('Content-Type');
+        res.status(500).json({
+          success: false,
+          error: errorMessage,
+          timestamp: new Date().toISOString()
+        } as APIResponse);
+      } else {
+        // No trailer: the client sees a truncated export and resumes from its last cursor
+        res.destroy();
+      }
+    } finally {
+      activeHistoryExports--;
+    }
+  });
+
+  /**
+   * POST /api/usb-integration/telemetry/burns
+   * Receive a batch of per-order stage timelines from a burning station.
+   * Body: { stationId, entries: [{ o: orderId, d?: device, c?: contentType, m?: mode, t?: startedAt, b?: bytes, ok?: boolean, s?: { stage: ms } }] }
+   * Entries are aggregated into the reporting system by station, device
+   * and content type.
+   */
+  server.post('/api/usb-integration/telemetry/burns', authenticateAPIKey, (req: Request, res: Response) => {
+    const { stationId, entries } = req.body || {};
+    const station = sanitizeInput(String(stationId ?? '')).slice(0, 100);
+
+    if (!station) {
+      res.status(400).json({
+        success: false,
+        error: 'stationId is required',
+        timestamp: new Date().toISOString()
+      } as APIResponse);
+      return;
+    }
+    if (!Array.isArray(entries) || entries.length > USB_INTEGRATION.MAX_TELEMETRY_ENTRIES_PER_BATCH) {
+      res.status(400).json({
+        success: false,
+        error: `entries must be an array of at most ${USB_INTEGRATION.MAX_TELEMETRY_ENTRIES_PER_BATCH} items`,
+        timestamp: new Date().toISOString()
+      } as APIResponse);
+      return;
+    }
+
+    const accepted = reportingSystem.recordBurnTelemetry(station, entries as BurnTelemetryEntry[]);
+    unifiedLogger.debug('api', 'Burn telemetry received', { stationId: station, received: entries.length, accepted });
+
+    res.json({
+      success: true,
+      data: { accepted },
+      timestamp: new Date().toISOString()
+    } as APIResponse);
+  });
+
+  /**
+   * GET /api/usb-integration/telemetry/burns
+   * Aggregated burn performance by station, device and content type,
+   * slowest first
+   */
+  server.get('/api/usb-integration/telemetry/burns', authenticateAPIKey, (req: Request, res: Response) => {
+    res.json({
+      success: true,
+      data: reportingSystem.getBurnPerformance(),
+      timestamp: new Date().toISOString()
+    } as APIResponse);
+  });
+
+  /**
+   * GET /api/usb-integration/orders/changes?since=N
+   * Burning queue changes after change version N (delta sync for station
+   * mirrors). Returns the changed items, the removed order IDs and the latest
+   * version to pass as `since` next time; `full` is true when `items` is a
+   * complete snapshot (N = 0, or N too old to compute a delta).
+   * Registered before /orders/:orderId so 'changes' is not taken as an ID.
+   */
+  server.get('/api/usb-integration/orders/changes', authenticateAPIKey, (req: Request, res: Response) => {
+    const since = Math.max(0, parseInt(req.query.since as string) || 0);
+    const changes = burningQueueService.getChangesSince(since);
+
+    res.json({
+      success: true,
+      data: changes,
+      timestamp: new Date().toISOString()
+    } as APIResponse);
+  });
+
   /**
    * GET /api/usb-integration/orders/:orderId
-   * Get a specific order details for burning
+   * Get a specific order details for burning. The ID may also be the order
+   * number, the key stations mirror the burning queue by.
    */
   server.get('/api/usb-integration/orders/:orderId', authenticateAPIKey, validateOrderIdMiddleware, async (req: Request, res: Response) => {
     try {
@@ -754,7 +1030,7 @@ export function registerUSBIntegrationRoutes(server: any): void {
       unifiedLogger.info('api', 'Fetching order for USB burning', { orderId });
 
       const order = await withTimeout(
-        () => orderRepository.findById(orderId),
+        async () => (await orderRepository.findById(orderId)) ?? orderRepository.findByOrderNumber(orderId),
         USB_INTEGRATION.DB_QUERY_TIMEOUT_MS
       );
       
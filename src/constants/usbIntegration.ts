@@ -10,9 +10,15 @@ export const USB_INTEGRATION = {
   
   // Queue management
   QUEUE_CLEANUP_HOURS: 24,
+  MAX_TRANSITIONS_PER_BATCH: 100,
+  MAX_TELEMETRY_ENTRIES_PER_BATCH: 500,
+  MAX_BURN_HISTORY_PAGE: 50000,
+  MAX_CONCURRENT_HISTORY_EXPORTS: 2,
   
-  // Rate limiting
+  // Rate limiting (token bucket per API key + station)
   MAX_REQUESTS_PER_MINUTE: 100,
+  RATE_LIMIT_BURST: 100,
+  RATE_LIMIT_MAX_STATIONS_PER_KEY: 50,
   
   // Timeouts
   DB_QUERY_TIMEOUT_MS: 5000,
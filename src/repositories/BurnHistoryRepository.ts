@@ -0,0 +1,72 @@
+/**
+ * Burn History Repository
+ * Database access layer for usb_burn_history table
+ *
+ * Append-only log of burn outcomes (completed and failed, including failures
+ * that were retried). The auto-increment id is the export cursor, so exports
+ * read by primary key and never page with OFFSET.
+ */
+
+import type { Readable } from 'stream';
+import { db } from '../database/knex';
+
+export type BurnOutcome = 'completed' | 'failed';
+
+export interface BurnHistoryRecord {
+    id?: number;
+    order_id: string;
+    order_number?: string | null;
+    outcome: BurnOutcome;
+    retryable?: boolean | null;
+    error_code?: string | null;
+    error_message?: string | null;
+    notes?: string | null;
+    station_id?: string | null;
+    content_type?: string | null;
+    capacity?: string | null;
+    created_at?: Date;
+}
+
+export class BurnHistoryRepository {
+    private static instance: BurnHistoryRepository;
+    private readonly tableName = 'usb_burn_history';
+
+    private constructor() {}
+
+    public static getInstance(): BurnHistoryRepository {
+        if (!BurnHistoryRepository.instance) {
+            BurnHistoryRepository.instance = new BurnHistoryRepository();
+        }
+        return BurnHistoryRepository.instance;
+    }
+
+    /**
+     * Record a burn outcome
+     */
+    async record(entry: BurnHistoryRecord): Promise<number> {
+        const [id] = await db(this.tableName).insert({
+            ...entry,
+            created_at: new Date()
+        });
+        return id;
+    }
+
+    /**
+     * Stream records after a cursor, oldest first.
+     * Rows are read from the database as the stream is consumed; the caller
+     * must destroy the stream if it stops early.
+     */
+    streamSince(cursor: number, limit: number, outcome?: BurnOutcome): Readable {
+        let query = db(this.tableName)
+            .where('id', '>', cursor)
+            .orderBy('id', 'asc')
+            .limit(limit);
+        if (outcome) {
+            query = query.where('outcome', outcome);
+        }
+        return query.stream();
+    }
+}
+
+// Export singleton instance
+export const burnHistoryRepository = BurnHistoryRepository.getInstance();
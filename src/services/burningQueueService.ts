@@ -5,6 +5,8 @@
  * Features:
  * - Thread-safe operations with locking mechanism
  * - Optimistic locking for updates with version control
+ * - Delta sync: every change gets a queue-wide change version, so clients can
+ *   fetch only what changed since the last version they saw
  * - Orphan order cleanup (24h inactive)
  * - Duplicate order prevention
  */
@@ -34,6 +36,17 @@ export interface BurningQueueItem {
     status: 'pending' | 'queued' | 'burning' | 'completed' | 'failed';
     lastActivityAt: Date;
     version: number; // For optimistic locking
+    changeVersion: number; // Queue-wide sequence number of the last change (delta sync)
+}
+
+/**
+ * Changes to the queue since a given change version
+ */
+export interface QueueChanges {
+    version: number; // Latest change version; pass it as `since` next time
+    full: boolean; // true when `items` is a full snapshot (since was too old)
+    items: BurningQueueItem[];
+    removed: string[];
 }
 
 /**
@@ -62,6 +75,11 @@ class BurningQueueService {
     private queue: Map<string, BurningQueueItem> = new Map();
     private locks: Map<string, Promise<void>> = new Map();
     private cleanupInterval: ReturnType<typeof setInterval> | null = null;
+    private changeVersion = 0;
+    // Removed order IDs -> change version of the removal (bounded, oldest first)
+    private removals: Map<string, number> = new Map();
+    private removalsPrunedThrough = 0; // Removals up to this version were forgotten
+    private static readonly MAX_REMOVALS = 10000;
 
     constructor() {
         // Start cleanup interval for orphan orders
@@ -120,6 +138,55 @@ class BurningQueueService {
         };
     }
 
+    /**
+     * Stamp an item with the next change version
+     */
+    private markChanged(item: BurningQueueItem): void {
+        item.changeVersion = ++this.changeVersion;
+        this.removals.delete(item.orderId);
+    }
+
+    /**
+     * Record the removal of an order for delta sync
+     */
+    private markRemoved(orderId: string): void {
+        this.removals.delete(orderId);
+        this.removals.set(orderId, ++this.changeVersion);
+        if (this.removals.size > BurningQueueService.MAX_REMOVALS) {
+            const [oldestId, oldestVersion] = this.removals.entries().next().value as [string, number];
+            this.removals.delete(oldestId);
+            this.removalsPrunedThrough = oldestVersion;
+        }
+    }
+
+    /**
+     * Get the changes made after a change version
+     * @param sinceVersion - Last change version the caller has applied (0 for everything)
+     * @returns Changed items and removed order IDs; a full snapshot when
+     *          removals that old are no longer retained
+     */
+    getChangesSince(sinceVersion: number): QueueChanges {
+        // A snapshot is needed for a new client, a client ahead of us (server
+        // restarted) or one that may have missed removals we no longer remember
+        const full = sinceVersion <= 0 || sinceVersion > this.changeVersion ||
+            sinceVersion < this.removalsPrunedThrough;
+
+        const items = Array.from(this.queue.values())
+            .filter(item => full || item.changeVersion > sinceVersion)
+            .sort((a, b) => a.changeVersion - b.changeVersion);
+
+        const removed: string[] = [];
+        if (!full) {
+            this.removals.forEach((version, orderId) => {
+                if (version > sinceVersion) {
+                    removed.push(orderId);
+                }
+            });
+        }
+
+        return { version: this.changeVersion, full, items, removed };
+    }
+
     /**
      * Add an order to the burning queue
      * @param order - Order data to add to the queue
@@ -163,6 +230,7 @@ class BurningQueueService {
                 }
                 // If completed/failed, allow re-adding by removing old entry
                 this.queue.delete(orderId);
+                this.markRemoved(orderId);
                 unifiedLogger.info('api', 'Removing completed/failed order to allow re-queue', { orderId });
             }
             
@@ -179,10 +247,12 @@ class BurningQueueService {
                 confirmedAt: null,
                 status: 'pending',
                 lastActivityAt: now,
-                version: 1
+                version: 1,
+                changeVersion: 0
             };
 
             // Store in memory cache
+            this.markChanged(queueItem);
             this.queue.set(orderId, queueItem);
 
             // Try to update database burning status
@@ -233,6 +303,7 @@ class BurningQueueService {
             const item = this.queue.get(orderId);
             if (item) {
                 this.queue.delete(orderId);
+                this.markRemoved(orderId);
                 unifiedLogger.info('api', 'Order removed from burning queue', { orderId });
                 return true;
             }
@@ -309,6 +380,7 @@ class BurningQueueService {
                 item.confirmedAt = new Date();
             }
 
+            this.markChanged(item);
             this.queue.set(orderId, item);
 
             // Try to update database
@@ -346,6 +418,7 @@ class BurningQueueService {
             const item = this.queue.get(orderId);
             if (item) {
                 item.confirmedAt = new Date();
+                this.markChanged(item);
                 this.queue.set(orderId, item);
             }
             unifiedLogger.info('api', 'Order confirmed and ready for burning', { orderId });
@@ -415,6 +488,7 @@ class BurningQueueService {
                 const item = this.queue.get(orderId);
                 if (item && item.lastActivityAt < orphanThreshold) {
                     this.queue.delete(orderId);
+                    this.markRemoved(orderId);
                     cleanedCount++;
                     
                     unifiedLogger.info('api', 'Orphan order cleaned up', { 
@@ -476,6 +550,25 @@ class BurningQueueService {
         return null;
     }
 
+    /**
+     * Update the status of the queue item for an order number
+     * Orders queued by the order flow are keyed by their order number, but
+     * the item is also found when it was queued under another ID.
+     * @param orderNumber - The order number of the item
+     * @param status - The new status
+     * @returns Result object with success status
+     */
+    async updateStatusByOrderNumber(
+        orderNumber: string,
+        status: BurningQueueItem['status']
+    ): Promise<UpdateResult> {
+        const item = this.queue.get(orderNumber) || await this.getByOrderNumber(orderNumber);
+        if (!item) {
+            return { success: false, error: 'Order not found in queue' };
+        }
+        return this.updateItemStatus(item.orderId, status);
+    }
+
     /**
      * Get the current version of an item (for optimistic locking)
      * @param orderId - The order ID
@@ -485,6 +578,16 @@ class BurningQueueService {
         const item = this.queue.get(orderId);
         return item ? item.version : null;
     }
+
+    /**
+     * Get the priority of a queued item without touching its activity time
+     * @param orderId - The order ID
+     * @returns The priority or null if not found
+     */
+    getItemPriority(orderId: string): BurningQueueItem['priority'] | null {
+        const item = this.queue.get(orderId);
+        return item ? item.priority : null;
+    }
 }
 
 // Export singleton instance
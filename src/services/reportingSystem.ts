@@ -63,8 +63,53 @@ export interface MarketingMetrics {
     };
 }
 
+/**
+ * Stage timeline of one burned order, as uploaded by a station.
+ * Keys are short because stations send them in batches.
+ */
+export interface BurnTelemetryEntry {
+    o: string;                  // Order ID
+    d?: string;                 // Device (USB port) name
+    c?: string;                 // Content type: music, videos, movies
+    m?: string;                 // Burn mode: files, image, fanout
+    t?: number;                 // Start (epoch seconds)
+    b?: number;                 // Bytes written
+    ok?: boolean;               // Burn succeeded
+    s?: Record<string, number>; // Milliseconds per stage (claim, resolve, copy, verify, report...)
+}
+
+export interface BurnGroupStats {
+    key: string;
+    orders: number;
+    failures: number;
+    bytes: number;
+    averageSeconds: number;
+    mbPerSecond: number;
+    slowestStage: string | null;
+    stageShare: Record<string, number>; // Percentage of the burn time per stage
+}
+
+export interface BurnPerformanceMetrics {
+    stations: BurnGroupStats[];
+    devices: BurnGroupStats[];
+    contentTypes: BurnGroupStats[];
+}
+
+interface BurnAggregate {
+    orders: number;
+    failures: number;
+    bytes: number;
+    stageMs: Record<string, number>;
+}
+
 export class ReportingSystem {
     private reportsDir: string;
+    // Burn telemetry aggregated by dimension ('station' | 'device' | 'content') and key
+    private burnStats: Map<string, Map<string, BurnAggregate>> = new Map([
+        ['station', new Map()],
+        ['device', new Map()],
+        ['content', new Map()]
+    ]);
 
     constructor() {
         this.reportsDir = join(process.cwd(), 'reports');
@@ -545,6 +590,116 @@ export class ReportingSystem {
         return translations[stage] || stage;
     }
 
+    /**
+     * ✅ REGISTRAR TELEMETRÍA DE GRABACIÓN
+     * Aggregates a batch of stage timelines from a station; raw entries are not kept.
+     */
+    public recordBurnTelemetry(stationId: string, entries: BurnTelemetryEntry[]): number {
+        let accepted = 0;
+        entries.forEach(entry => {
+            if (!entry || typeof entry.o !== 'string') return;
+            const stages: Record<string, number> = {};
+            Object.entries(entry.s || {}).forEach(([stage, ms]) => {
+                if (typeof ms === 'number' && isFinite(ms) && ms >= 0) {
+                    stages[stage] = ms;
+                }
+            });
+            const bytes = typeof entry.b === 'number' && entry.b > 0 ? entry.b : 0;
+            const failed = entry.ok === false;
+            const keys: [string, string][] = [
+                ['station', stationId],
+                ['device', `${stationId}/${entry.d || 'desconocido'}`],
+                ['content', entry.c || 'desconocido']
+            ];
+            keys.forEach(([dimension, key]) => {
+                const groups = this.burnStats.get(dimension)!;
+                const aggregate = groups.get(key) || { orders: 0, failures: 0, bytes: 0, stageMs: {} };
+                aggregate.orders++;
+                if (failed) aggregate.failures++;
+                aggregate.bytes += bytes;
+                Object.entries(stages).forEach(([stage, ms]) => {
+                    aggregate.stageMs[stage] = (aggregate.stageMs[stage] || 0) + ms;
+                });
+                groups.set(key, aggregate);
+            });
+            accepted++;
+        });
+        return accepted;
+    }
+
+    /**
+     * ✅ CALCULAR RENDIMIENTO DE GRABACIÓN
+     * Groups are sorted slowest first (lowest MB/s), so bottlenecks lead.
+     */
+    public getBurnPerformance(): BurnPerformanceMetrics {
+        const summarize = (dimension: string): BurnGroupStats[] =>
+            Array.from(this.burnStats.get(dimension)!.entries())
+                .map(([key, aggregate]) => {
+                    const totalMs = Object.values(aggregate.stageMs).reduce((sum, ms) => sum + ms, 0);
+                    const stageShare: Record<string, number> = {};
+                    let slowestStage: string | null = null;
+                    Object.entries(aggregate.stageMs).forEach(([stage, ms]) => {
+                        stageShare[stage] = totalMs > 0 ? (ms / totalMs) * 100 : 0;
+                        if (slowestStage === null || ms > aggregate.stageMs[slowestStage]) {
+                            slowestStage = stage;
+                        }
+                    });
+                    return {
+                        key,
+                        orders: aggregate.orders,
+                        failures: aggregate.failures,
+                        bytes: aggregate.bytes,
+                        averageSeconds: aggregate.orders > 0 ? totalMs / 1000 / aggregate.orders : 0,
+                        mbPerSecond: totalMs > 0 ? (aggregate.bytes / 1e6) / (totalMs / 1000) : 0,
+                        slowestStage,
+                        stageShare
+                    };
+                })
+                .sort((a, b) => a.mbPerSecond - b.mbPerSecond);
+
+        return {
+            stations: summarize('station'),
+            devices: summarize('device'),
+            contentTypes: summarize('content')
+        };
+    }
+
+    /**
+     * ✅ GENERAR REPORTE DE RENDIMIENTO DE GRABACIÓN
+     */
+    public generateBurnPerformanceReport(): string {
+        const performance = this.getBurnPerformance();
+
+        let report = '🔥 *RENDIMIENTO DE GRABACIÓN USB*\n';
+        report += `📅 ${new Date().toLocaleString('es-CO')}\n`;
+        report += '━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n';
+
+        const sections: [string, BurnGroupStats[]][] = [
+            ['🏭 *ESTACIONES*', performance.stations],
+            ['🔌 *DISPOSITIVOS*', performance.devices],
+            ['🎵 *TIPOS DE CONTENIDO*', performance.contentTypes]
+        ];
+        sections.forEach(([title, groups]) => {
+            if (groups.length === 0) return;
+            report += `${title}\n`;
+            groups.slice(0, 5).forEach(group => {
+                report += `├─ ${group.key}: ${group.mbPerSecond.toFixed(1)} MB/s • ${group.orders} pedidos`;
+                report += group.failures > 0 ? ` • ${group.failures} fallidos\n` : '\n';
+                if (group.slowestStage) {
+                    report += `│  └─ Etapa más lenta: ${group.slowestStage} (${group.stageShare[group.slowestStage].toFixed(0)}%)\n`;
+                }
+            });
+            report += '\n';
+        });
+
+        if (performance.stations.length === 0) {
+            report += 'ℹ️ Sin telemetría de grabación todavía\n';
+        }
+
+        report += '━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━';
+        return report;
+    }
+
     /**
      * ✅ GENERAR REPORTE DE PEDIDOS PENDIENTES
      */
@@ -0,0 +1,334 @@
+/**
+ * Station Rate Limiter - Token buckets for the USB Integration API
+ *
+ * Each burning station gets its own token bucket, keyed by API key plus
+ * station ID (the X-Station-Id header sent by TechAuraClient). Stations
+ * behind one NAT no longer share a budget, and a noisy station only drains
+ * its own bucket. Only requests with a valid API key get station buckets;
+ * each key gets at most USB_RATE_LIMIT_MAX_STATIONS of them, and stations
+ * past the cap share one overflow bucket. Requests without a valid key are
+ * limited per client IP in process memory and never touch the shared store.
+ *
+ * Buckets refill continuously at `ratePerMinute` and hold at most `burst`
+ * tokens. Per-station quotas override the default:
+ *
+ *   USB_RATE_LIMIT_PER_MINUTE=100
+ *   USB_RATE_LIMIT_BURST=100
+ *   USB_RATE_LIMIT_STATION_QUOTAS='{"bodega-1": {"ratePerMinute": 300, "burst": 60}}'
+ *   USB_RATE_LIMIT_MAX_STATIONS=50
+ *
+ * With USB_RATE_LIMIT_STORE=mysql the buckets live in the
+ * `usb_rate_limit_buckets` table, so every Node instance enforces one budget
+ * and limits survive restarts. If the shared store fails, the limiter falls
+ * back to in-process buckets instead of rejecting requests.
+ */
+
+import { createHash } from 'crypto';
+import { db } from '../database/knex';
+import { USB_INTEGRATION } from '../constants/usbIntegration';
+import { unifiedLogger } from '../utils/unifiedLogger';
+
+// =============================================================================
+// Types
+// =============================================================================
+
+export interface RateLimitQuota {
+  /** Sustained requests per minute (refill rate) */
+  ratePerMinute: number;
+  /** Maximum requests in a burst (bucket capacity) */
+  burst: number;
+}
+
+export interface RateLimitDecision {
+  allowed: boolean;
+  limit: number;
+  remaining: number;
+  /** Milliseconds until the bucket is full again */
+  resetMs: number;
+  /** Milliseconds until the next request is allowed (0 if allowed) */
+  retryAfterMs: number;
+}
+
+interface BucketState {
+  tokens: number;
+  updatedAt: number;
+}
+
+/**
+ * Backing store for token buckets. `take` must refill, consume and persist
+ * a bucket atomically with respect to other callers of the same store.
+ */
+export interface RateLimitStore {
+  take(key: string, quota: RateLimitQuota, now: number): Promise<{ allowed: boolean; tokens: number }>;
+}
+
+const TABLE_NAME = 'usb_rate_limit_buckets';
+// Buckets idle this long are full again and can be forgotten
+const IDLE_BUCKET_MS = 60 * 60 * 1000;
+// In-process buckets kept at most (least recently used are evicted first)
+const MAX_MEMORY_BUCKETS = 10000;
+const OVERFLOW_STATION = '~overflow';
+
+/**
+ * Refill a bucket up to now and try to consume one token
+ */
+function refillAndTake(state: BucketState | undefined, quota: RateLimitQuota, now: number): { allowed: boolean; tokens: number } {
+  let tokens = quota.burst;
+  if (state) {
+    const elapsed = Math.max(0, now - state.updatedAt);
+    tokens = Math.min(quota.burst, state.tokens + (elapsed * quota.ratePerMinute) / 60000);
+  }
+  if (tokens >= 1) {
+    return { allowed: true, tokens: tokens - 1 };
+  }
+  return { allowed: false, tokens };
+}
+
+// =============================================================================
+// Stores
+// =============================================================================
+
+/**
+ * Buckets in process memory (one budget per Node instance)
+ */
+export class MemoryRateLimitStore implements RateLimitStore {
+  private buckets = new Map<string, BucketState>();
+
+  constructor(private maxBuckets: number = MAX_MEMORY_BUCKETS) {}
+
+  async take(key: string, quota: RateLimitQuota, now: number): Promise<{ allowed: boolean; tokens: number }> {
+    return this.takeSync(key, quota, now);
+  }
+
+  takeSync(key: string, quota: RateLimitQuota, now: number): { allowed: boolean; tokens: number } {
+    const result = refillAndTake(this.buckets.get(key), quota, now);
+    // Re-insert so the Map stays in least recently used order
+    this.buckets.delete(key);
+    this.buckets.set(key, { tokens: result.tokens, updatedAt: now });
+    if (this.buckets.size > this.maxBuckets) {
+      const oldest = this.buckets.keys().next().value;
+      if (oldest !== undefined) {
+        this.buckets.delete(oldest);
+      }
+    }
+    return result;
+  }
+
+  /**
+   * Forget buckets that have been idle long enough to be full again
+   */
+  cleanup(now: number = Date.now()): void {
+    const keysToDelete: string[] = [];
+    this.buckets.forEach((state, key) => {
+      if (now - state.updatedAt > IDLE_BUCKET_MS) {
+        keysToDelete.push(key);
+      }
+    });
+    keysToDelete.forEach(key => this.buckets.delete(key));
+  }
+
+  get size(): number {
+    return this.buckets.size;
+  }
+}
+
+/**
+ * Buckets in MySQL, shared by every Node instance
+ */
+export class MySQLRateLimitStore implements RateLimitStore {
+  async take(key: string, quota: RateLimitQuota, now: number): Promise<{ allowed: boolean; tokens: number }> {
+    return db.transaction(async (trx) => {
+      // Create the bucket if needed, then lock its row for the refill
+      await trx.raw(
+        `INSERT INTO ${TABLE_NAME} (bucket_key, tokens, updated_at) VALUES (?, ?, ?)
+         ON DUPLICATE KEY UPDATE bucket_key = bucket_key`,
+        [key, quota.burst, now]
+      );
+      const row = await trx(TABLE_NAME).where('bucket_key', key).forUpdate().first('tokens', 'updated_at');
+      const state = row ? { tokens: Number(row.tokens), updatedAt: Number(row.updated_at) } : undefined;
+      const result = refillAndTake(state, quota, now);
+      await trx(TABLE_NAME).where('bucket_key', key).update({ tokens: result.tokens, updated_at: now });
+      return result;
+    });
+  }
+
+  /**
+   * Delete buckets that have been idle long enough to be full again
+   */
+  async cleanup(now: number = Date.now()): Promise<number> {
+    return db(TABLE_NAME).where('updated_at', '<', now - IDLE_BUCKET_MS).delete();
+  }
+}
+
+// =============================================================================
+// Limiter
+// =============================================================================
+
+/**
+ * Parse per-station quotas from JSON, ignoring invalid entries
+ */
+export function parseStationQuotas(raw: string | undefined): Record<string, RateLimitQuota> {
+  const quotas: Record<string, RateLimitQuota> = {};
+  if (!raw) {
+    return quotas;
+  }
+  try {
+    const parsed = JSON.parse(raw);
+    for (const [stationId, quota] of Object.entries(parsed || {})) {
+      const ratePerMinute = Number((quota as any)?.ratePerMinute);
+      const burst = Number((quota as any)?.burst ?? ratePerMinute);
+      if (ratePerMinute > 0 && burst >= 1) {
+        quotas[stationId] = { ratePerMinute, burst };
+      } else {
+        unifiedLogger.warn('api', 'Ignoring invalid station rate limit quota', { stationId });
+      }
+    }
+  } catch (error) {
+    unifiedLogger.warn('api', 'USB_RATE_LIMIT_STATION_QUOTAS is not valid JSON', {
+      error: error instanceof Error ? error.message : String(error)
+    });
+  }
+  return quotas;
+}
+
+export class StationRateLimiter {
+  private fallback = new MemoryRateLimitStore();
+  // Buckets of requests without a valid API key, per client IP
+  private anonymous = new MemoryRateLimitStore();
+  // Station IDs seen per API key hash, with the time they were last seen
+  private stationsByKey = new Map<string, Map<string, number>>();
+  private cleanupInterval: NodeJS.Timeout;
+
+  constructor(
+    private store: RateLimitStore,
+    private defaultQuota: RateLimitQuota,
+    private stationQuotas: Record<string, RateLimitQuota> = {},
+    private maxStationsPerKey: number = USB_INTEGRATION.RATE_LIMIT_MAX_STATIONS_PER_KEY
+  ) {
+    this.cleanupInterval = setInterval(() => this.cleanup(), 60000); // Clean up every minute
+    this.cleanupInterval.unref();
+  }
+
+  /**
+   * Quota of a station (its own if configured, the default otherwise)
+   */
+  getQuota(stationId: string): RateLimitQuota {
+    return this.stationQuotas[stationId] || this.defaultQuota;
+  }
+
+  /**
+   * Bucket key: a hash of the API key (never stored in clear) plus the station
+   */
+  static bucketKey(apiKey: string, stationId: string): string {
+    return `${StationRateLimiter.keyHash(apiKey)}:${stationId}`;
+  }
+
+  private static keyHash(apiKey: string): string {
+    return createHash('sha256').update(apiKey).digest('hex').slice(0, 16);
+  }
+
+  /**
+   * Station a request is counted against: its own, or the shared overflow
+   * station once the key already has maxStationsPerKey active stations
+   */
+  private admitStation(apiKey: string, stationId: string, now: number): string {
+    const keyHash = StationRateLimiter.keyHash(apiKey);
+    let stations = this.stationsByKey.get(keyHash);
+    if (!stations) {
+      stations = new Map();
+      this.stationsByKey.set(keyHash, stations);
+    }
+    if (!stations.has(stationId) && stations.size >= this.maxStationsPerKey) {
+      unifiedLogger.warn('api', 'Too many stations for one API key, sharing the overflow bucket', {
+        stationId,
+        maxStations: this.maxStationsPerKey
+      });
+      return OVERFLOW_STATION;
+    }
+    stations.set(stationId, now);
+    return stationId;
+  }
+
+  /**
+   * Consume one request of a client without a valid API key (per IP, in
+   * process memory only)
+   */
+  checkAnonymous(clientIP: string, now: number = Date.now()): RateLimitDecision {
+    const result = this.anonymous.takeSync(`ip:${clientIP}`, this.defaultQuota, now);
+    return this.decision(result, this.defaultQuota);
+  }
+
+  /**
+   * Consume one request from a station's bucket. `apiKey` must already be
+   * validated: buckets are only created for authenticated callers.
+   */
+  async check(apiKey: string, stationId: string, now: number = Date.now()): Promise<RateLimitDecision> {
+    const station = this.admitStation(apiKey, stationId, now);
+    const quota = this.getQuota(station);
+    const key = StationRateLimiter.bucketKey(apiKey, station);
+    let result: { allowed: boolean; tokens: number };
+    try {
+      result = await this.store.take(key, quota, now);
+    } catch (error) {
+      unifiedLogger.warn('api', 'Rate limit store unavailable, using in-process buckets', {
+        error: error instanceof Error ? error.message : String(error)
+      });
+      result = this.fallback.takeSync(key, quota, now);
+    }
+    return this.decision(result, quota);
+  }
+
+  private decision(result: { allowed: boolean; tokens: number }, quota: RateLimitQuota): RateLimitDecision {
+    const msPerToken = 60000 / quota.ratePerMinute;
+    return {
+      allowed: result.allowed,
+      limit: quota.ratePerMinute,
+      remaining: Math.floor(result.tokens),
+      resetMs: Math.ceil((quota.burst - result.tokens) * msPerToken),
+      retryAfterMs: result.allowed ? 0 : Math.ceil((1 - result.tokens) * msPerToken)
+    };
+  }
+
+  private cleanup(now: number = Date.now()): void {
+    this.fallback.cleanup(now);
+    this.anonymous.cleanup(now);
+    this.stationsByKey.forEach((stations, keyHash) => {
+      stations.forEach((lastSeen, stationId) => {
+        if (now - lastSeen > IDLE_BUCKET_MS) {
+          stations.delete(stationId);
+        }
+      });
+      if (stations.size === 0) {
+        this.stationsByKey.delete(keyHash);
+      }
+    });
+    if (this.store instanceof MemoryRateLimitStore) {
+      this.store.cleanup();
+    } else if (this.store instanceof MySQLRateLimitStore) {
+      this.store.cleanup().catch((error) => {
+        unifiedLogger.debug('api', 'Rate limit bucket cleanup failed', {
+          error: error instanceof Error ? error.message : String(error)
+        });
+      });
+    }
+  }
+}
+
+/**
+ * Limiter configured from the environment
+ */
+function createStationRateLimiter(): StationRateLimiter {
+  const ratePerMinute = Number(process.env.USB_RATE_LIMIT_PER_MINUTE) || USB_INTEGRATION.MAX_REQUESTS_PER_MINUTE;
+  const burst = Number(process.env.USB_RATE_LIMIT_BURST) || USB_INTEGRATION.RATE_LIMIT_BURST;
+  const store = process.env.USB_RATE_LIMIT_STORE === 'mysql'
+    ? new MySQLRateLimitStore()
+    : new MemoryRateLimitStore();
+  return new StationRateLimiter(
+    store,
+    { ratePerMinute, burst },
+    parseStationQuotas(process.env.USB_RATE_LIMIT_STATION_QUOTAS),
+    Number(process.env.USB_RATE_LIMIT_MAX_STATIONS) || USB_INTEGRATION.RATE_LIMIT_MAX_STATIONS_PER_KEY
+  );
+}
+
+export const stationRateLimiter = createStationRateLimiter();
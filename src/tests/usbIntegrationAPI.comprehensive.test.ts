@@ -27,6 +27,7 @@ interface USBBurningOrder {
   };
   createdAt: Date;
   status: string;
+  priority?: 'high' | 'normal' | 'low';
 }
 
 /**
@@ -290,6 +291,54 @@ const createMockOrderRepository = (): MockOrderRepository => {
   };
 };
 
+// =============================================================================
+// Mock burningQueueService
+// =============================================================================
+
+interface MockQueueItem {
+  orderId: string;
+  orderNumber: string;
+  priority: 'high' | 'normal' | 'low';
+}
+
+interface MockBurningQueue {
+  items: Map<string, MockQueueItem>;
+  addToQueue: (order: { orderId?: string; orderNumber: string; priority?: MockQueueItem['priority'] }) => MockQueueItem;
+  getItemPriority: (orderId: string) => MockQueueItem['priority'] | null;
+  reset: () => void;
+}
+
+/**
+ * Same keying as BurningQueueService: items are stored under orderId, which
+ * the order flow sets to the order number (not the database ID)
+ */
+const createMockBurningQueue = (): MockBurningQueue => {
+  const items = new Map<string, MockQueueItem>();
+
+  return {
+    items,
+
+    addToQueue: (order): MockQueueItem => {
+      const item: MockQueueItem = {
+        orderId: order.orderId || order.orderNumber,
+        orderNumber: order.orderNumber,
+        priority: order.priority || 'normal'
+      };
+      items.set(item.orderId, item);
+      return item;
+    },
+
+    getItemPriority: (orderId: string): MockQueueItem['priority'] | null => {
+      const item = items.get(orderId);
+      return item ? item.priority : null;
+    },
+
+    reset: () => {
+      items.clear();
+    }
+  };
+};
+
 // =============================================================================
 // Mock whatsappNotifications
 // =============================================================================
@@ -477,7 +526,8 @@ async function simulateGetPendingOrders(
   req: MockRequest,
   res: MockResponse,
   orderRepo: MockOrderRepository,
-  configuredApiKey: string | undefined
+  configuredApiKey: string | undefined,
+  queue: MockBurningQueue = createMockBurningQueue()
 ): Promise<void> {
   const auth = simulateAuthenticateAPIKey(req, res, configuredApiKey);
   if (!auth.passed) return;
@@ -502,7 +552,8 @@ async function simulateGetPendingOrders(
           ? JSON.parse(order.customization)
           : { genres: [], artists: [] },
         createdAt: order.created_at || new Date(),
-        status: order.processing_status || order.status || 'pending'
+        status: order.processing_status || order.status || 'pending',
+        priority: queue.getItemPriority(order.order_number || order.id) || 'normal'
       };
       orders.push(transformedOrder);
     }
@@ -920,6 +971,29 @@ test('2.5 Each order has required fields: orderId, orderNumber, customerPhone, p
   }
 });
 
+test('2.6 Priority comes from the queue item stored under the order number', async () => {
+  setupMocks();
+  const queue = createMockBurningQueue();
+  queue.addToQueue({
+    orderId: mockConfirmedOrder.order_number,
+    orderNumber: mockConfirmedOrder.order_number!,
+    priority: 'high'
+  });
+  const req = createMockRequest({
+    headers: { 'x-api-key': VALID_API_KEY }
+  });
+  const res = createMockResponse();
+
+  await simulateGetPendingOrders(req, res, mockOrderRepo, VALID_API_KEY, queue);
+
+  const orders: USBBurningOrder[] = res.jsonBody.data.orders;
+  const queued = orders.find(order => order.orderId === mockConfirmedOrder.id);
+  const unqueued = orders.find(order => order.orderId === mockProcessingOrder.id);
+  assertTrue(mockConfirmedOrder.id !== mockConfirmedOrder.order_number, 'Order ID and number should differ');
+  assertEquals(queued?.priority, 'high', 'Queued order should carry its queue priority');
+  assertEquals(unqueued?.priority, 'normal', 'Orders not in the queue should default to normal');
+});
+
 // =============================================================================
 // TESTS - 3. POST /api/usb-integration/orders/:orderId/start-burning
 // =============================================================================
@@ -0,0 +1,88 @@
+"""
+TechAura burn station.
+
+Python side of the USB burning pipeline: resolves the content requested by
+each order against the local media library and writes it to USB devices,
+reporting progress back to the TechAura USB Integration API.
+
+Submodules are imported on first attribute access, so ``import
+techaura_station`` (and the ``techaura-station`` CLI) starts without paying
+for sqlite3, process pools or ``requests`` until they are used.
+"""
+
+import importlib
+from typing import List
+
+__version__ = '0.1.0'
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    'AudioMetadata': 'metadata',
+    'BurnScheduler': 'scheduler',
+    'BurnWorker': 'worker',
+    'ContentIndex': 'matching',
+    'CopyItem': 'plan',
+    'CopyJournal': 'journal',
+    'CopyPlan': 'plan',
+    'DeviceMonitor': 'devices',
+    'FanoutResult': 'fanout',
+    'ImageError': 'image',
+    'LibraryManifest': 'library_sync',
+    'LibraryReplica': 'library_sync',
+    'LibraryServer': 'library_sync',
+    'MatchResult': 'matching',
+    'MetadataCache': 'metadata',
+    'OrderMirror': 'mirror',
+    'OrderQueue': 'priority',
+    'OrderSizer': 'simulator',
+    'OrderTimeline': 'telemetry',
+    'PROFILER': 'profiling',
+    'PROFILES': 'transcode',
+    'Profiler': 'profiling',
+    'Sidecar': 'sidecar',
+    'SidecarTransport': 'sidecar',
+    'SimPort': 'simulator',
+    'Simulation': 'simulator',
+    'SimulationReport': 'simulator',
+    'StationDaemon': 'daemon',
+    'Stager': 'staging',
+    'TechAuraAuthenticationError': 'client',
+    'TechAuraClient': 'client',
+    'TechAuraClientError': 'client',
+    'TechAuraConnectionError': 'client',
+    'TelemetryUploader': 'telemetry',
+    'TranscodePipeline': 'transcode',
+    'TranscodeProfile': 'transcode',
+    'USBDevice': 'devices',
+    'build_copy_plan': 'plan',
+    'build_fat32_image': 'image',
+    'build_manifest': 'library_sync',
+    'choose_burn_mode': 'image',
+    'fanout_copy': 'fanout',
+    'fit_plan_to_capacity': 'transcode',
+    'fold_text': 'matching',
+    'make_session': 'client',
+    'parse_capacity': 'plan',
+    'probe_write_speed': 'scheduler',
+    'read_metadata': 'metadata',
+    'scan_usb_devices': 'devices',
+    'stage': 'profiling',
+    'stream_image': 'image',
+    'sync_library': 'library_sync',
+    'synthetic_orders': 'simulator',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,5 @@
+import sys
+
+from techaura_station.cli import main
+
+sys.exit(main())
@@ -0,0 +1,479 @@
+"""
+``techaura-station`` command line.
+
+Commands:
+
+- ``run``: start the station daemon (or a single pass with ``--once``)
+- ``check``: verify the API URL and key
+- ``history``: export burn records since a cursor as JSON lines
+- ``library``: build, serve or sync the media library manifest
+- ``sidecar``: serve the local multiplexing sidecar for the host's workers
+- ``simulate``: estimate station capacity with the discrete-event simulator
+- ``startup-time``: measure the CLI import time against ``IMPORT_BUDGET_MS``
+
+This module only imports the standard library pieces it needs to parse
+arguments; everything else is imported inside the command that uses it, so
+``--help`` and ``check`` start fast and the import-time budget stays honest.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+# Cumulative import time allowed for ``techaura_station.cli``
+IMPORT_BUDGET_MS = 50.0
+
+DEFAULT_STATE_DIR = os.path.expanduser('~/.local/state/techaura-station')
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Commands
+# =============================================================================
+
+def _make_client(args: argparse.Namespace):
+    import socket
+
+    from techaura_station.client import TechAuraClient, make_session
+
+    if args.sidecar:
+        from techaura_station.sidecar import SidecarTransport
+        session = SidecarTransport(args.sidecar)
+    else:
+        session = make_session()
+    return TechAuraClient(args.api_url, args.api_key, timeout=args.timeout, session=session,
+                          station_id=args.station_id or socket.gethostname())
+
+
+def cmd_check(args: argparse.Namespace) -> int:
+    """Check that the API is reachable and accepts the key."""
+    from techaura_station.client import TechAuraClientError
+
+    client = _make_client(args)
+    try:
+        ok = client.connect()
+    except TechAuraClientError as e:
+        print(f'API check failed: {e}', file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    print('API reachable' if ok else 'API answered without success')
+    return 0 if ok else 1
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    """Run the station daemon until SIGTERM/SIGINT (or one pass with --once)."""
+    from techaura_station.daemon import StationDaemon
+    from techaura_station.devices import DeviceMonitor
+    from techaura_station.matching import ContentIndex
+    from techaura_station.metadata import MetadataCache
+    from techaura_station.mirror import OrderMirror
+    from techaura_station.profiling import PROFILER
+    from techaura_station.staging import Stager
+    from techaura_station.telemetry import TelemetryUploader
+    from techaura_station.transcode import TranscodePipeline
+    from techaura_station.worker import BurnWorker
+
+    roots = {kind: paths for kind, paths in
+             (('music', args.music), ('videos', args.videos), ('movies', args.movies)) if paths}
+    if not roots:
+        print('At least one of --music, --videos or --movies is required', file=sys.stderr)
+        return 2
+    state_dir = args.state_dir
+    os.makedirs(state_dir, exist_ok=True)
+
+    replica = None
+    if args.library_source:
+        from techaura_station.library_sync import LibraryReplica, LibrarySyncError, open_source
+
+        # Sync against the first root of each kind before indexing
+        replica = LibraryReplica({kind: paths[0] for kind, paths in roots.items()},
+                                 open_source(args.library_source, token=args.library_token),
+                                 manifest_path=os.path.join(state_dir, 'library-manifest.json'),
+                                 interval=args.library_sync_interval)
+        try:
+            replica.sync()
+        except (LibrarySyncError, OSError) as e:
+            # An unreachable reference must not keep the station from burning
+            logger.warning('Library sync failed, using the current library: %s', e)
+    index = ContentIndex.build(roots)
+    metadata = MetadataCache(os.path.join(state_dir, 'metadata.db'))
+    if args.music:
+        metadata.refresh(args.music)
+        metadata.apply_to_index(index)
+    logger.info('Indexed %d files', len(index))
+
+    stager = Stager(args.stage_budget * 1024 * 1024, args.stage_dir) if args.stage_budget else None
+    client = _make_client(args)
+    telemetry = None
+    if args.telemetry_interval:
+        telemetry = TelemetryUploader(client, client.station_id,
+                                      flush_interval=args.telemetry_interval)
+    worker = BurnWorker(
+        client, index,
+        limit_per_term=args.limit_per_term,
+        metadata=metadata,
+        transcoder=TranscodePipeline(os.path.join(state_dir, 'transcode')),
+        journal_dir=os.path.join(state_dir, 'journals'),
+        stager=stager,
+        image_dir=os.path.join(state_dir, 'images') if args.image_mode else None,
+        telemetry=telemetry,
+    )
+    mirror = OrderMirror(client, sync_interval=args.mirror_interval) if args.mirror_interval else None
+    daemon = StationDaemon(client, worker, poll_interval=args.poll_interval,
+                           max_orders=args.max_orders, mirror=mirror)
+    daemon.install_signal_handlers()
+    PROFILER.install_signal_handler()
+    if args.profile_socket:
+        PROFILER.output_dir = os.path.join(state_dir, 'profiles')
+        PROFILER.serve(args.profile_socket)
+
+    monitor = DeviceMonitor(on_added=daemon.device_ready, on_changed=daemon.device_ready,
+                            on_removed=daemon.device_removed)
+    monitor.start()
+    if mirror is not None:
+        mirror.start()
+    if telemetry is not None:
+        telemetry.start()
+    if replica is not None and args.library_sync_interval and not args.once:
+        replica.index = index
+        replica.start()
+    try:
+        daemon.run(once=args.once)
+    finally:
+        if replica is not None:
+            replica.stop()
+        if telemetry is not None:
+            telemetry.stop()
+        if mirror is not None:
+            mirror.stop()
+        monitor.stop()
+        PROFILER.close()
+        if stager is not None:
+            stager.close()
+        metadata.close()
+        client.close()
+    return 0
+
+
+def cmd_history(args: argparse.Namespace) -> int:
+    """Export burn records since a cursor as JSON lines (resumable with --cursor-file)."""
+    import json
+
+    from techaura_station.client import TechAuraClientError
+
+    since = args.since
+    if args.cursor_file and os.path.exists(args.cursor_file):
+        with open(args.cursor_file) as f:
+            since = int(f.read().strip() or 0)
+    client = _make_client(args)
+    out = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    count = 0
+    try:
+        for record in client.iter_burn_history(since=since, outcome=args.outcome):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            since = record['cursor']
+            count += 1
+    except TechAuraClientError as e:
+        print(f'History export stopped at cursor {since}: {e}', file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if args.cursor_file:
+            with open(args.cursor_file, 'w') as f:
+                f.write(str(since))
+        client.close()
+    logger.info('Exported %d burn records up to cursor %d', count, since)
+    return 0
+
+
+def cmd_library(args: argparse.Namespace) -> int:
+    """Write a library manifest, serve the library, or sync it from a reference."""
+    from techaura_station.library_sync import (
+        LibraryServer, LibrarySyncError, build_manifest, open_source, sync_library)
+
+    roots = {kind: path for kind, path in
+             (('music', args.music), ('videos', args.videos), ('movies', args.movies)) if path}
+    if not roots:
+        print('At least one of --music, --videos or --movies is required', file=sys.stderr)
+        return 2
+
+    if args.library_command == 'manifest':
+        manifest = build_manifest(roots, args.chunk_size * 1024, workers=args.workers)
+        manifest.save(args.output)
+        print(f'{len(manifest.files)} files, {manifest.total_bytes / 1e9:.1f} GB')
+        return 0
+
+    if args.library_command == 'serve':
+        if args.host not in ('127.0.0.1', 'localhost', '::1') and not args.token:
+            logger.warning('Serving the library on %s without --token: any host can read it', args.host)
+        server = LibraryServer(roots, args.host, args.port, args.chunk_size * 1024, args.workers,
+                               token=args.token)
+        logger.info('Serving the library on %s:%d', *server.address)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        result = sync_library(roots, open_source(args.source, args.workers, args.token), args.workers,
+                              manifest_path=args.manifest, delete=not args.keep_extra)
+    except LibrarySyncError as e:
+        print(f'Library sync failed: {e}', file=sys.stderr)
+        return 1
+    print(f'{result.added} added, {result.changed} changed, {result.removed} removed, '
+          f'{result.bytes_fetched / 1e6:.1f} MB fetched, {result.bytes_reused / 1e6:.1f} MB reused')
+    for key in result.failed:
+        print(f'failed: {key}', file=sys.stderr)
+    return 1 if result.failed else 0
+
+
+def cmd_sidecar(args: argparse.Namespace) -> int:
+    """Serve the sidecar until SIGTERM/SIGINT."""
+    import signal
+    import threading
+
+    from techaura_station.sidecar import Sidecar
+
+    sidecar = Sidecar(args.socket, pool_size=args.pool_size, feed_ttl=args.feed_ttl,
+                      lease_seconds=args.lease_seconds, batch_window=args.batch_window)
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda _signum, _frame: stop.set())
+    sidecar.start()
+    try:
+        stop.wait()
+    finally:
+        sidecar.close()
+    logger.info('Sidecar stopped: %s', sidecar.stats())
+    return 0
+
+
+def cmd_simulate(args: argparse.Namespace) -> int:
+    """Simulate an order mix against modeled ports and print the report."""
+    import random
+
+    from techaura_station.simulator import (
+        OrderSizer, SimPort, Simulation, load_orders, replay_orders, synthetic_orders)
+
+    rng = random.Random(args.seed)
+    index = None
+    roots = {kind: paths for kind, paths in
+             (('music', args.music), ('videos', args.videos), ('movies', args.movies)) if paths}
+    if roots:
+        from techaura_station.matching import ContentIndex
+        index = ContentIndex.build(roots)
+    sizer = OrderSizer(index, rng)
+    if args.replay:
+        orders = replay_orders(load_orders(args.replay), sizer)
+    else:
+        orders = synthetic_orders(args.orders, rng, arrival_rate=args.arrival_rate, sizer=sizer)
+    speeds = args.write_speed or [20.0]
+    ports = [SimPort(f'port{i}', speeds[i % len(speeds)] * 1e6, args.failure_rate,
+                     swap_seconds=args.swap_seconds)
+             for i in range(args.ports)]
+    simulation = Simulation(orders, ports, latency=args.latency, rate_limit=args.rate_limit,
+                            poll_interval=args.poll_interval, seed=args.seed)
+    horizon = args.hours * 3600 if args.hours else None
+    print(simulation.run(horizon).format())
+    return 0
+
+
+def measure_import_time(module: str = 'techaura_station.cli') -> float:
+    """
+    Measure the cumulative import time of a module in a fresh interpreter.
+
+    Returns:
+        Milliseconds reported by ``python -X importtime`` for ``module``
+    """
+    import re
+    import subprocess
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    # Lines look like: "import time:   self [us] | cumulative | name"
+    pattern = re.compile(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+(.*)$')
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if match and match.group(2).strip() == module:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f'No import time reported for {module}')
+
+
+def cmd_startup_time(args: argparse.Namespace) -> int:
+    """Fail if the CLI import time exceeds the budget."""
+    elapsed = measure_import_time()
+    print(f'techaura_station.cli imported in {elapsed:.1f} ms (budget {args.budget:.0f} ms)')
+    return 0 if elapsed <= args.budget else 1
+
+
+# =============================================================================
+# Entry Point
+# =============================================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='techaura-station',
+                                     description='TechAura USB burn station.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Debug logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_api_arguments(command: argparse.ArgumentParser) -> None:
+        command.add_argument('--api-url', default=os.environ.get('TECHAURA_API_URL'),
+                             required='TECHAURA_API_URL' not in os.environ,
+                             help='USB Integration API base URL (env TECHAURA_API_URL)')
+        command.add_argument('--api-key', default=os.environ.get('TECHAURA_API_KEY'),
+                             help='API key (env TECHAURA_API_KEY)')
+        command.add_argument('--timeout', type=int, default=30, help='Request timeout in seconds')
+        command.add_argument('--sidecar', default=os.environ.get('TECHAURA_SIDECAR'),
+                             help='Send requests through the sidecar at this socket (env TECHAURA_SIDECAR)')
+        command.add_argument('--station-id', default=os.environ.get('TECHAURA_STATION_ID'),
+                             help='Station identity for rate limits and telemetry '
+                                  '(env TECHAURA_STATION_ID, default: host name)')
+
+    run = commands.add_parser('run', help='Run the station daemon')
+    add_api_arguments(run)
+    run.add_argument('--music', action='append', default=[], help='Music root (repeatable)')
+    run.add_argument('--videos', action='append', default=[], help='Videos root (repeatable)')
+    run.add_argument('--movies', action='append', default=[], help='Movies root (repeatable)')
+    run.add_argument('--state-dir', default=DEFAULT_STATE_DIR,
+                     help='Journals, caches and images (default: %(default)s)')
+    run.add_argument('--poll-interval', type=float, default=10.0,
+                     help='Seconds between pending-order polls')
+    run.add_argument('--mirror-interval', type=float, default=0,
+                     help='Seconds between order-state delta syncs (0 disables the mirror)')
+    run.add_argument('--telemetry-interval', type=float, default=30.0,
+                     help='Seconds between burn telemetry uploads (0 disables telemetry)')
+    run.add_argument('--max-orders', type=int, default=20, help='Orders fetched per poll')
+    run.add_argument('--limit-per-term', type=int, default=None,
+                     help='Maximum files per requested genre/artist')
+    run.add_argument('--image-mode', action='store_true',
+                     help='Burn orders of many small files as filesystem images')
+    run.add_argument('--stage-budget', type=int, default=0,
+                     help='MB of upcoming orders to stage ahead (0 disables)')
+    run.add_argument('--stage-dir', default=None,
+                     help='Directory for staged copies (default: page cache readahead)')
+    run.add_argument('--library-source', default=None,
+                     help='Reference station URL or mirror directory to sync the library from')
+    run.add_argument('--library-sync-interval', type=float, default=3600.0,
+                     help='Seconds between library syncs (0: only at startup)')
+    run.add_argument('--library-token', default=os.environ.get('TECHAURA_LIBRARY_TOKEN'),
+                     help='Token of the reference library server (env: TECHAURA_LIBRARY_TOKEN)')
+    run.add_argument('--profile-socket', default=None, help='Profiler admin socket path')
+    run.add_argument('--once', action='store_true',
+                     help='Poll once, burn what fits on the connected sticks, then exit')
+    run.set_defaults(handler=cmd_run)
+
+    check = commands.add_parser('check', help='Check API connectivity and credentials')
+    add_api_arguments(check)
+    check.set_defaults(handler=cmd_check)
+
+    history = commands.add_parser('history', help='Export burn records as JSON lines')
+    add_api_arguments(history)
+    history.add_argument('--since', type=int, default=0, help='Export records after this cursor')
+    history.add_argument('--cursor-file', default=None,
+                         help='Read the starting cursor from, and save the last one to, this file')
+    history.add_argument('--outcome', choices=('completed', 'failed'), default=None,
+                         help='Only completed or only failed burns')
+    history.add_argument('--output', default=None, help='Append to this file (default: stdout)')
+    history.set_defaults(handler=cmd_history)
+
+    library = commands.add_parser('library', help='Build, serve or sync the media library')
+    library_commands = library.add_subparsers(dest='library_command', required=True)
+
+    def add_library_arguments(command: argparse.ArgumentParser) -> None:
+        command.add_argument('--music', default=None, help='Music root')
+        command.add_argument('--videos', default=None, help='Videos root')
+        command.add_argument('--movies', default=None, help='Movies root')
+        command.add_argument('--workers', type=int, default=4,
+                             help='Files hashed or transferred in parallel')
+        command.set_defaults(handler=cmd_library)
+
+    manifest = library_commands.add_parser('manifest', help='Write the library manifest')
+    add_library_arguments(manifest)
+    manifest.add_argument('--chunk-size', type=int, default=4096,
+                          help='KB per hashed chunk (default: %(default)s)')
+    manifest.add_argument('--output', default='manifest.json',
+                          help='Manifest file (default: %(default)s)')
+
+    serve = library_commands.add_parser('serve', help='Serve the library to other stations')
+    add_library_arguments(serve)
+    serve.add_argument('--chunk-size', type=int, default=4096,
+                       help='KB per hashed chunk (default: %(default)s)')
+    serve.add_argument('--host', default='127.0.0.1',
+                       help='Listen address (default: %(default)s; use 0.0.0.0 with --token '
+                            'to serve other stations)')
+    serve.add_argument('--port', type=int, default=8765, help='Listen port')
+    serve.add_argument('--token', default=os.environ.get('TECHAURA_LIBRARY_TOKEN'),
+                       help='Token clients must send (env: TECHAURA_LIBRARY_TOKEN)')
+
+    library_sync = library_commands.add_parser('sync', help='Sync the library from a reference')
+    add_library_arguments(library_sync)
+    library_sync.add_argument('source', help='Reference station URL or mirror directory')
+    library_sync.add_argument('--manifest', default=None,
+                              help='Local manifest cache (skips re-hashing unchanged files)')
+    library_sync.add_argument('--keep-extra', action='store_true',
+                              help='Keep local files the reference does not have')
+    library_sync.add_argument('--token', default=os.environ.get('TECHAURA_LIBRARY_TOKEN'),
+                              help='Token of the reference library server (env: TECHAURA_LIBRARY_TOKEN)')
+
+    sidecar = commands.add_parser('sidecar', help='Serve the local API sidecar')
+    sidecar.add_argument('--socket', default='/run/techaura/sidecar.sock', help='Unix socket path')
+    sidecar.add_argument('--pool-size', type=int, default=8, help='Upstream connections')
+    sidecar.add_argument('--feed-ttl', type=float, default=2.0,
+                         help='Seconds a pending-order page is shared between workers')
+    sidecar.add_argument('--lease-seconds', type=float, default=300.0,
+                         help='Seconds an order handed to a worker is hidden from the others')
+    sidecar.add_argument('--batch-window', type=float, default=0.05,
+                         help='Seconds status transitions are collected per batch')
+    sidecar.set_defaults(handler=cmd_sidecar)
+
+    simulate = commands.add_parser('simulate', help='Estimate station capacity by simulation')
+    simulate.add_argument('--orders', type=int, default=200, help='Synthetic orders to generate')
+    simulate.add_argument('--arrival-rate', type=float, default=0.0,
+                          help='Synthetic orders per hour (0: all queued at the start)')
+    simulate.add_argument('--replay', default=None,
+                          help='Replay orders from a JSON / JSON lines file instead')
+    simulate.add_argument('--music', action='append', default=[],
+                          help='Music root used to size orders (repeatable)')
+    simulate.add_argument('--videos', action='append', default=[],
+                          help='Videos root used to size orders (repeatable)')
+    simulate.add_argument('--movies', action='append', default=[],
+                          help='Movies root used to size orders (repeatable)')
+    simulate.add_argument('--ports', type=int, default=4, help='USB ports')
+    simulate.add_argument('--write-speed', type=float, action='append', default=[],
+                          help='Port write speed in MB/s (repeatable, cycled over the ports)')
+    simulate.add_argument('--failure-rate', type=float, default=0.02, help='Share of burns that fail')
+    simulate.add_argument('--swap-seconds', type=float, default=30.0,
+                          help='Seconds to replace a finished stick')
+    simulate.add_argument('--latency', type=float, default=0.2, help='Seconds per API request')
+    simulate.add_argument('--rate-limit', type=int, default=100, help='API requests per minute')
+    simulate.add_argument('--poll-interval', type=float, default=10.0,
+                          help='Seconds between pending-order polls')
+    simulate.add_argument('--hours', type=float, default=0, help='Stop after this many simulated hours')
+    simulate.add_argument('--seed', type=int, default=0, help='Random seed')
+    simulate.set_defaults(handler=cmd_simulate)
+
+    startup = commands.add_parser('startup-time', help='Check the CLI import-time budget')
+    startup.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS,
+                         help='Budget in milliseconds (default: %(default)s)')
+    startup.set_defaults(handler=cmd_startup_time)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if getattr(args, 'api_url', None) is not None and not args.api_key:
+        print('An API key is required (--api-key or TECHAURA_API_KEY)', file=sys.stderr)
+        return 2
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,652 @@
+"""
+Client for the TechAura USB Integration API.
+
+``requests`` is imported on first use, so importing the client (and the CLI)
+stays cheap. Pass a ``requests.Session`` (see ``make_session``) to keep
+connections alive across calls; without one, every call goes through
+``requests.request``.
+
+Large order pages can be streamed with ``iter_pending_orders``, which
+decodes the body incrementally instead of materializing it; the burn
+history export is streamed the same way by ``iter_burn_history``.
+"""
+
+import codecs
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from techaura_station.profiling import stage
+
+
+class TechAuraClientError(Exception):
+    """Base exception for TechAura client errors."""
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 error_code: Optional[str] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_code = error_code
+        self.retryable = retryable
+
+
+class TechAuraAuthenticationError(TechAuraClientError):
+    """Raised when authentication fails."""
+    pass
+
+
+class TechAuraConnectionError(TechAuraClientError):
+    """Raised when connection fails."""
+    pass
+
+
+_requests = None
+
+
+def _load_requests():
+    """Import ``requests`` on first use."""
+    global _requests
+    if _requests is None:
+        import requests
+        _requests = requests
+    return _requests
+
+
+def make_session(pool_size: int = 8) -> Any:
+    """
+    Create a keep-alive session for a long-running station.
+
+    Args:
+        pool_size: Maximum pooled connections per host
+
+    Returns:
+        A ``requests.Session``
+    """
+    requests = _load_requests()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class _IncrementalJSON:
+    """
+    Walks a JSON document arriving in chunks, decoding one value at a time.
+
+    Only the structure leading to the wanted array is scanned by hand; each
+    value is decoded with ``json.JSONDecoder.raw_decode`` as soon as its
+    bytes are complete, so memory stays bounded by the largest single value
+    rather than the whole document.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._exhausted = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; False at the end of the body."""
+        if self._exhausted:
+            return False
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += self._text.decode(chunk)
+                return True
+        self._buffer += self._text.decode(b'', final=True)
+        self._exhausted = True
+        return False
+
+    def peek(self) -> str:
+        """Get the next non-whitespace character without consuming it ('' at the end)."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f'Expecting {char!r}, found {found!r}', self._buffer, self._pos)
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number or literal may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Iterate the keys of an object; the caller consumes each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def items(self) -> Iterator[Any]:
+        """Decode the items of an array one by one."""
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def iter_json_array(chunks: Iterable[bytes], path: Sequence[str]) -> Iterator[Any]:
+    """
+    Yield the items of the array at ``path`` of a streamed JSON object.
+
+    Items are yielded as soon as their bytes have arrived. A top-level
+    ``success: false`` seen before the array ends the iteration, and a
+    missing or null array yields nothing.
+
+    Args:
+        chunks: Body chunks (e.g. ``response.iter_content()``)
+        path: Keys leading to the array, e.g. ``('data', 'orders')``
+
+    Raises:
+        json.JSONDecodeError: If the body is not valid JSON
+    """
+    document = _IncrementalJSON(chunks)
+
+    def walk(depth: int) -> Iterator[Any]:
+        if document.peek() != '{':
+            document.value()
+            return
+        for key in document.members():
+            last = depth == len(path) - 1
+            if key == path[depth] and document.peek() == ('[' if last else '{'):
+                if last:
+                    yield from document.items()
+                else:
+                    yield from walk(depth + 1)
+            elif depth == 0 and key == 'success':
+                if document.value() is False:
+                    return
+            else:
+                document.value()
+
+    yield from walk(0)
+
+
+def iter_ndjson(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Yield the values of a streamed NDJSON body, one line at a time.
+
+    Args:
+        chunks: Body chunks (e.g. ``response.iter_content()``)
+
+    Raises:
+        json.JSONDecodeError: If a line is not valid JSON
+    """
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+class TechAuraClient:
+    """
+    Client for interacting with the TechAura USB burning service API.
+
+    This client provides methods for:
+    - Retrieving pending USB orders
+    - Starting/completing burning processes
+    - Reporting errors
+    """
+
+    def __init__(self, base_url: str, api_key: str, timeout: int = 30,
+                 max_retries: int = 3, retry_delay: float = 1.0,
+                 session: Optional[Any] = None, station_id: Optional[str] = None):
+        """
+        Initialize the TechAura client.
+
+        Args:
+            base_url: The base URL of the TechAura API
+            api_key: API key for authentication
+            timeout: Request timeout in seconds
+            max_retries: Maximum number of retry attempts
+            retry_delay: Base delay between retries in seconds
+            session: ``requests.Session`` reused across requests
+            station_id: Station identity sent as ``X-Station-Id``; the
+                server rate-limits each station of an API key separately
+        """
+        if not api_key:
+            raise TechAuraAuthenticationError("API key is required",
+                                              error_code="MISSING_API_KEY")
+
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._session = session
+        self.station_id = station_id
+
+    def close(self) -> None:
+        """Close the pooled connections, if any."""
+        if self._session is not None:
+            self._session.close()
+
+    def _get_headers(self) -> Dict[str, str]:
+        """Get headers for API requests."""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        if self.station_id:
+            headers['X-Station-Id'] = self.station_id
+        return headers
+
+    def _make_request(self, method: str, endpoint: str,
+                      data: Optional[Dict] = None,
+                      params: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Make an HTTP request with retry logic.
+
+        This method is designed to be mocked in tests.
+        """
+        response = self._send(method, endpoint, data, params)
+        with stage('json'):
+            return response.json()
+
+    def _send(self, method: str, endpoint: str,
+              data: Optional[Dict] = None,
+              params: Optional[Dict] = None,
+              stream: bool = False) -> Any:
+        """
+        Send a request with retry logic and map error statuses to exceptions.
+
+        Args:
+            stream: Return before the body is read (``requests`` streaming);
+                the caller must close the response
+
+        Returns:
+            The successful response
+        """
+        requests = _load_requests()
+        send = self._session.request if self._session is not None else requests.request
+
+        url = f"{self.base_url}{endpoint}"
+        last_error = None
+
+        for attempt in range(self.max_retries):
+            try:
+                with stage('http'):
+                    kwargs = {'stream': True} if stream else {}
+                    response = send(
+                        method=method,
+                        url=url,
+                        headers=self._get_headers(),
+                        json=data,
+                        params=params,
+                        timeout=self.timeout,
+                        **kwargs
+                    )
+
+                # Handle different status codes
+                if response.status_code == 401:
+                    raise TechAuraAuthenticationError(
+                        "Invalid API key",
+                        status_code=401,
+                        error_code="INVALID_API_KEY"
+                    )
+                elif response.status_code == 429:
+                    raise TechAuraClientError(
+                        "Rate limit exceeded",
+                        status_code=429,
+                        error_code="RATE_LIMITED",
+                        retryable=True
+                    )
+                elif response.status_code == 500:
+                    raise TechAuraClientError(
+                        "Internal server error",
+                        status_code=500,
+                        error_code="SERVER_ERROR",
+                        retryable=True
+                    )
+                elif response.status_code == 503:
+                    raise TechAuraClientError(
+                        "Service unavailable",
+                        status_code=503,
+                        error_code="SERVICE_UNAVAILABLE",
+                        retryable=True
+                    )
+                elif response.status_code >= 400:
+                    error_data = response.json() if response.content else {}
+                    raise TechAuraClientError(
+                        error_data.get('error', f'HTTP {response.status_code}'),
+                        status_code=response.status_code,
+                        error_code=error_data.get('code')
+                    )
+
+                return response
+
+            except requests.exceptions.Timeout:
+                last_error = TechAuraConnectionError(
+                    "Connection timed out",
+                    error_code="TIMEOUT",
+                    retryable=True
+                )
+            except requests.exceptions.ConnectionError:
+                last_error = TechAuraConnectionError(
+                    "Could not connect to server",
+                    error_code="CONNECTION_ERROR",
+                    retryable=True
+                )
+            except TechAuraClientError as e:
+                if not e.retryable or attempt >= self.max_retries - 1:
+                    raise
+                last_error = e
+
+            # Exponential backoff for retries
+            if attempt < self.max_retries - 1:
+                time.sleep(self.retry_delay * (2 ** attempt))
+
+        if last_error:
+            raise last_error
+        raise TechAuraClientError("Request failed after all retries")
+
+    def connect(self) -> bool:
+        """
+        Test connection to the API.
+
+        Returns:
+            True if connection is successful
+
+        Raises:
+            TechAuraConnectionError: If connection fails
+            TechAuraAuthenticationError: If authentication fails
+        """
+        response = self._make_request('GET', '/health')
+        return response.get('success', False)
+
+    def get_pending_orders(self, page: int = 1,
+                           per_page: int = 20) -> List[Dict[str, Any]]:
+        """
+        Get list of pending USB orders.
+
+        Args:
+            page: Page number for pagination
+            per_page: Number of results per page
+
+        Returns:
+            List of pending order dictionaries
+        """
+        response = self._make_request(
+            'GET',
+            '/orders/pending',
+            params={'page': page, 'per_page': per_page}
+        )
+
+        if not response.get('success'):
+            return []
+
+        data = response.get('data')
+        if data is None:
+            return []
+
+        return data.get('orders', [])
+
+    def iter_pending_orders(self, page: int = 1,
+                            per_page: int = 20,
+                            chunk_size: int = 16 * 1024) -> Iterator[Dict[str, Any]]:
+        """
+        Stream pending USB orders as the response body arrives.
+
+        Same request and error handling as ``get_pending_orders``, but the
+        body is decoded incrementally: the first order is yielded before the
+        page has finished downloading and the page is never held in memory
+        as a whole.
+
+        Args:
+            page: Page number for pagination
+            per_page: Number of results per page
+            chunk_size: Bytes read from the socket at a time
+
+        Yields:
+            Pending order dictionaries
+
+        Raises:
+            TechAuraConnectionError: If the connection breaks mid-body
+        """
+        response = self._send(
+            'GET',
+            '/orders/pending',
+            params={'page': page, 'per_page': per_page},
+            stream=True
+        )
+        requests = _load_requests()
+        try:
+            yield from iter_json_array(response.iter_content(chunk_size), ('data', 'orders'))
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            raise TechAuraConnectionError(
+                f"Connection lost while reading orders: {e}",
+                error_code="CONNECTION_ERROR",
+                retryable=True
+            ) from e
+        finally:
+            response.close()
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get one order.
+
+        Args:
+            order_id: The ID or the order number of the order
+
+        Returns:
+            The order dictionary, or None if the response has no data
+        """
+        response = self._make_request('GET', f'/orders/{order_id}')
+        if not response.get('success'):
+            return None
+        return response.get('data')
+
+    def get_order_changes(self, since: int = 0) -> Dict[str, Any]:
+        """
+        Get burning queue changes after a change version.
+
+        Args:
+            since: Last change version applied by the caller (0 for a
+                full snapshot)
+
+        Returns:
+            Dictionary with ``version``, ``full``, ``items`` and ``removed``
+        """
+        response = self._make_request('GET', '/orders/changes', params={'since': since})
+        data = response.get('data') if response.get('success') else None
+        if data is None:
+            return {'version': since, 'full': False, 'items': [], 'removed': []}
+        return data
+
+    def iter_burn_history(self, since: int = 0, outcome: Optional[str] = None,
+                          page_size: int = 10000,
+                          chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+        """
+        Stream completed and failed burn records after a cursor.
+
+        Records are decoded one line at a time from the NDJSON export, and
+        pages of ``page_size`` records are requested until the server reports
+        no more, so memory stays constant however many records there are.
+        Each record carries its ``cursor``; store the last one processed and
+        pass it as ``since`` to resume.
+
+        Args:
+            since: Cursor of the last record already processed (0 for all)
+            outcome: Only ``'completed'`` or ``'failed'`` records
+            page_size: Records per request
+            chunk_size: Bytes read from the socket at a time
+
+        Yields:
+            Burn record dictionaries, oldest first
+
+        Raises:
+            TechAuraConnectionError: If the connection breaks or the export
+                ends without its trailer
+        """
+        requests = _load_requests()
+        cursor = since
+        while True:
+            params: Dict[str, Any] = {'since': cursor, 'limit': page_size}
+            if outcome:
+                params['outcome'] = outcome
+            response = self._send('GET', '/burns/history', params=params, stream=True)
+            trailer = None
+            try:
+                for record in iter_ndjson(response.iter_content(chunk_size)):
+                    if record.get('end'):
+                        trailer = record
+                        break
+                    cursor = record['cursor']
+                    yield record
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout, json.JSONDecodeError) as e:
+                raise TechAuraConnectionError(
+                    f"Connection lost while reading burn history: {e}",
+                    error_code="CONNECTION_ERROR",
+                    retryable=True
+                ) from e
+            finally:
+                response.close()
+            if trailer is None:
+                raise TechAuraConnectionError(
+                    f"Burn history export ended early after cursor {cursor}",
+                    error_code="TRUNCATED",
+                    retryable=True
+                )
+            if not trailer.get('more'):
+                return
+            cursor = trailer['cursor']
+
+    def start_burning(self, order_id: str) -> bool:
+        """
+        Mark an order as burning started.
+
+        Args:
+            order_id: The ID of the order to start burning
+
+        Returns:
+            True if successfully started
+        """
+        response = self._make_request(
+            'POST',
+            f'/orders/{order_id}/start-burning'
+        )
+        return response.get('success', False)
+
+    def complete_burning(self, order_id: str,
+                         notes: Optional[str] = None) -> bool:
+        """
+        Mark an order as burning completed.
+
+        Args:
+            order_id: The ID of the order to complete
+            notes: Optional notes about the completed order
+
+        Returns:
+            True if successfully completed
+        """
+        data = None
+        if notes:
+            data = {'notes': notes}
+
+        response = self._make_request(
+            'POST',
+            f'/orders/{order_id}/complete-burning',
+            data=data
+        )
+        return response.get('success', False)
+
+    def report_error(self, order_id: str, error_message: str,
+                     error_code: Optional[str] = None,
+                     retryable: bool = False) -> bool:
+        """
+        Report an error for an order.
+
+        Args:
+            order_id: The ID of the order
+            error_message: Description of the error
+            error_code: Optional error code
+            retryable: Whether the operation can be retried
+
+        Returns:
+            True if error was reported successfully
+        """
+        # Truncate very long error messages
+        max_length = 10000
+        if len(error_message) > max_length:
+            error_message = error_message[:max_length] + '...[truncated]'
+
+        data = {
+            'error_message': error_message,
+            'retryable': retryable
+        }
+        if error_code:
+            data['error_code'] = error_code
+
+        response = self._make_request(
+            'POST',
+            f'/orders/{order_id}/report-error',
+            data=data
+        )
+        return response.get('success', False)
+
+    def send_burn_telemetry(self, station_id: str,
+                            entries: List[Dict[str, Any]]) -> bool:
+        """
+        Upload a batch of per-order burn timelines.
+
+        Args:
+            station_id: Identifier of the sending station
+            entries: Compact timelines (``OrderTimeline.to_entry``)
+
+        Returns:
+            True if the batch was accepted
+        """
+        response = self._make_request(
+            'POST',
+            '/telemetry/burns',
+            data={'stationId': station_id, 'entries': entries}
+        )
+        return response.get('success', False)
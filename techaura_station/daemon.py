@@ -0,0 +1,289 @@
+"""
+Long-running station daemon.
+
+Keeps one client (with its connection pool), one content index, one
+metadata cache and one worker alive across orders instead of rebuilding
+them for every cron run. The loop polls pending orders, resolves and stages
+them as soon as they are seen, and hands them to USB sticks through the
+``BurnScheduler`` as sticks are plugged in.
+
+On SIGTERM/SIGINT the daemon drains: it stops claiming orders, lets the
+burns in progress finish and report to the API, and releases the orders
+still queued locally so another station (or the next run) can take them.
+
+Polled orders first wait in an ``OrderQueue`` ranked by deadline and
+priority; only a few more than the free sticks are handed to the
+scheduler at a time, so an express order overtakes a backlog instead of
+queuing behind it.
+
+With an ``OrderMirror``, orders waiting in the local queue are dropped as
+soon as the mirror shows them burning or finished elsewhere, without a
+status request per order.
+"""
+
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from techaura_station.devices import USBDevice
+from techaura_station.mirror import OrderMirror, queue_key
+from techaura_station.plan import parse_capacity
+from techaura_station.priority import OrderQueue, order_deadline, order_priority
+from techaura_station.scheduler import BurnScheduler, probe_write_speed
+
+logger = logging.getLogger(__name__)
+
+# Burning-queue statuses of orders that must no longer be burned here
+STALE_STATUSES = ('burning', 'completed', 'failed')
+
+
+class StationDaemon:
+    """Polls orders and burns them on the connected sticks until drained."""
+
+    def __init__(self, client: Any, worker: Any,
+                 scheduler: Optional[BurnScheduler] = None,
+                 poll_interval: float = 10.0, max_orders: int = 20,
+                 mirror: Optional[OrderMirror] = None,
+                 queue: Optional[OrderQueue] = None,
+                 probe: Optional[Callable[[str], float]] = probe_write_speed):
+        """
+        Initialize the daemon.
+
+        Args:
+            client: TechAura API client
+            worker: ``BurnWorker`` sharing the station's index and caches
+            scheduler: Order-to-device scheduler (a default one if None)
+            poll_interval: Seconds between pending-order polls
+            max_orders: Pending orders fetched per poll
+            mirror: Order-state mirror used to drop stale queued orders
+            queue: Priority queue of polled orders (a default one if None)
+            probe: Measures the write speed (bytes/s) of a stick from its
+                mount point when it is offered; None skips probing
+        """
+        self.client = client
+        self.worker = worker
+        self.scheduler = scheduler or BurnScheduler()
+        self.poll_interval = poll_interval
+        self.max_orders = max_orders
+        self.mirror = mirror
+        self.queue = queue or OrderQueue()
+        self.probe = probe
+        self._orders: Dict[str, Dict[str, Any]] = {}  # Queued or burning
+        self._devices: Dict[str, USBDevice] = {}  # Free sticks
+        self._burning: Dict[Future, Tuple[str, str]] = {}  # -> (device, order id)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._draining = threading.Event()
+        self._executor = ThreadPoolExecutor(thread_name_prefix='burn')
+
+    @property
+    def draining(self) -> bool:
+        return self._draining.is_set()
+
+    # -- Devices -----------------------------------------------------------------
+
+    def device_ready(self, device: USBDevice) -> None:
+        """
+        Offer a stick for burning (``DeviceMonitor`` added/changed callback).
+
+        Only mounted, empty sticks that are not already burning are used.
+        The write speed of each stick is probed first, so the scheduler can
+        weigh it against the speed it learned for the port.
+        """
+        if not device.is_ready or not device.is_empty:
+            return
+        with self._lock:
+            if device.name in self._devices or self._is_burning(device.name):
+                return
+            self._devices[device.name] = device
+        throughput = None
+        if self.probe is not None:
+            try:
+                throughput = self.probe(device.mount_point)
+            except OSError as e:
+                logger.warning('Could not probe the write speed of %s: %s', device.name, e)
+        self.scheduler.add_device(device.name, device.free_space or device.size, throughput)
+        logger.info('Device %s ready (%d bytes free, probed at %.1f MB/s)', device.name,
+                    device.free_space, (throughput or 0) / 1e6)
+        self._wake.set()
+
+    def device_removed(self, device: USBDevice) -> None:
+        """Forget a stick (``DeviceMonitor`` removed callback)."""
+        with self._lock:
+            self._devices.pop(device.name, None)
+        order_id = self.scheduler.remove_device(device.name)
+        if order_id is not None:
+            # The burn fails on its own and reports the error
+            logger.warning('Device %s removed while burning order %s', device.name, order_id)
+
+    def _is_burning(self, device_name: str) -> bool:
+        return any(name == device_name for name, _order_id in self._burning.values())
+
+    # -- Orders ------------------------------------------------------------------
+
+    def poll(self) -> int:
+        """
+        Fetch pending orders and queue the ones not seen yet.
+
+        Each new order is resolved (and its sources staged) right away, so
+        its size is known to the queue and its burn starts warm. Orders
+        already queued are re-ranked if their priority or deadline changed.
+
+        Returns:
+            Number of orders queued
+        """
+        if self.draining:
+            return 0
+        if self.mirror is not None:
+            self._drop_stale()
+        queued = 0
+        # Streamed: the first orders are prepared while the rest of the page downloads
+        for order in self.client.iter_pending_orders(per_page=self.max_orders):
+            order_id = str(order['order_id'])
+            with self._lock:
+                known = order_id in self._orders
+                if not known:
+                    self._orders[order_id] = order
+            if known:
+                self.queue.reprioritize(order_id, order_priority(order), order_deadline(order))
+                continue
+            try:
+                plan = self.worker.prepare(order)
+            except Exception:
+                logger.exception('Could not prepare order %s', order_id)
+                with self._lock:
+                    del self._orders[order_id]
+                continue
+            self.queue.push(order_id, order, plan.total_bytes)
+            queued += 1
+        return queued
+
+    def _feed(self) -> None:
+        """Move the most urgent orders to the scheduler, two per idle stick."""
+        idle = sum(1 for device in self.scheduler.devices.values() if device.is_idle)
+        while len(self.scheduler) < 2 * idle:
+            queued = self.queue.pop()
+            if queued is None:
+                return
+            required = parse_capacity(queued.order.get('capacity')) or 0
+            self.scheduler.submit(queued.order_id, queued.size, required, queued.order)
+
+    def _drop_stale(self) -> None:
+        """Release queued orders the mirror shows as taken or finished."""
+        with self._lock:
+            burning = {order_id for _name, order_id in self._burning.values()}
+            queued = [(order_id, order) for order_id, order in self._orders.items()
+                      if order_id not in burning]
+        for order_id, order in queued:
+            status = self.mirror.status(queue_key(order))
+            if status in STALE_STATUSES and (self.queue.cancel(order_id) or self.scheduler.cancel(order_id)):
+                logger.info('Order %s is %s elsewhere; dropped from the local queue', order_id, status)
+                self.worker.cancel(order_id)
+                with self._lock:
+                    self._orders.pop(order_id, None)
+
+    def dispatch(self) -> int:
+        """
+        Start burns on the free sticks.
+
+        Returns:
+            Number of burns started
+        """
+        started = 0
+        self._feed()
+        for assignment in self.scheduler.schedule():
+            with self._lock:
+                device = self._devices.pop(assignment.device, None)
+                if device is None:
+                    # Unplugged since it was offered
+                    self._orders.pop(assignment.order_id, None)
+                    continue
+                future = self._executor.submit(self._burn, assignment.order, device)
+                self._burning[future] = (device.name, assignment.order_id)
+            logger.info('Order %s -> %s (expected %.0fs)', assignment.order_id,
+                        device.name, assignment.expected_seconds)
+            started += 1
+        return started
+
+    def _burn(self, order: Dict[str, Any], device: USBDevice) -> None:
+        order_id = str(order['order_id'])
+        started = time.monotonic()
+        written = 0
+        ok = False
+        try:
+            written = self.worker.burn_device(order, device).total_bytes
+            ok = True
+        except Exception:
+            # The worker reports copy failures to the API itself
+            logger.exception('Order %s failed on %s', order_id, device.name)
+        finally:
+            state = self.scheduler.devices.get(device.name)
+            if state is not None and state.current_order == order_id:
+                self.scheduler.complete(device.name, written, time.monotonic() - started, ok=ok)
+                # The stick now holds the order; it is offered again once replaced
+                # (the port keeps its learned throughput)
+                self.scheduler.remove_device(device.name)
+            # Otherwise device_removed already dropped it mid-burn
+            with self._lock:
+                self._orders.pop(order_id, None)
+                for future, (_name, burning_id) in list(self._burning.items()):
+                    if burning_id == order_id:
+                        del self._burning[future]
+            self._wake.set()
+
+    # -- Lifecycle ---------------------------------------------------------------
+
+    def run(self, once: bool = False) -> None:
+        """
+        Poll and dispatch until drained.
+
+        Args:
+            once: Poll a single time, burn what can be placed, then drain
+        """
+        next_poll = 0.0
+        while not self.draining:
+            now = time.monotonic()
+            if now >= next_poll:
+                try:
+                    self.poll()
+                except Exception as e:
+                    logger.error('Polling pending orders failed: %s', e)
+                next_poll = now + self.poll_interval
+            self.dispatch()
+            if once:
+                break
+            self._wake.wait(max(0.0, next_poll - time.monotonic()))
+            self._wake.clear()
+        self._shutdown()
+
+    def drain(self) -> None:
+        """Stop taking orders; ``run`` returns once in-flight burns finish."""
+        if not self.draining:
+            logger.info('Draining: waiting for %d burn(s) in progress', len(self._burning))
+        self._draining.set()
+        self._wake.set()
+
+    def install_signal_handlers(self) -> None:
+        """Drain on SIGTERM and SIGINT."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda _signum, _frame: self.drain())
+
+    def _shutdown(self) -> None:
+        self._draining.set()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            released = list(self._orders)
+            self._orders.clear()
+        for order_id in released:
+            self.queue.cancel(order_id)
+            self.scheduler.cancel(order_id)
+            self.worker.cancel(order_id)
+        if released:
+            logger.info('Released %d queued order(s)', len(released))
+        waits = self.queue.wait_percentiles()
+        if waits:
+            logger.info('Queue waits: %s', ', '.join(
+                f"{priority} p50 {w['p50']:.0f}s p95 {w['p95']:.0f}s" for priority, w in waits.items()))
@@ -0,0 +1,413 @@
+"""
+Event-driven USB device detection for Linux stations.
+
+Replaces interval polling (PowerShell/WMIC in ``USBManager``) with kernel
+notifications:
+
+- Block device hotplug arrives as netlink uevents (``NETLINK_KOBJECT_UEVENT``).
+- Mount table changes are signalled by ``/proc/mounts`` becoming readable
+  with ``POLLPRI``.
+- When the monitor is pointed at a fake sysfs/mounts tree (tests, containers
+  without netlink), inotify watches on those paths are used instead.
+
+Every notification triggers a cheap rescan of ``<sys>/block`` and the mount
+table; capacity and free space come from ``statvfs`` instead of walking the
+device recursively. A slow fallback rescan guards against missed events.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import select
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass(frozen=True)
+class USBDevice:
+    """A removable USB block device (mirrors ``USBDevice`` in usbManager.ts)."""
+    name: str  # Kernel name of the disk, e.g. 'sdb'
+    device_path: str  # Mountable node, e.g. '/dev/sdb1'
+    label: str
+    size: int
+    free_space: int
+    used_space: int
+    file_system: Optional[str]
+    mount_point: Optional[str]
+    is_empty: bool
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the device is mounted and can be written."""
+        return self.mount_point is not None
+
+
+# =============================================================================
+# sysfs / mounts Readers
+# =============================================================================
+
+_MOUNT_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+
+def _read_attr(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _unescape_mount_field(value: str) -> str:
+    """Decode the octal escapes used in /proc/mounts (e.g. '\\040' for space)."""
+    return _MOUNT_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), value)
+
+
+def read_mounts(mounts_path: str = '/proc/mounts') -> Dict[str, Tuple[str, str]]:
+    """
+    Read the mount table.
+
+    Returns:
+        Mapping of device node to (mount point, filesystem type)
+    """
+    mounts: Dict[str, Tuple[str, str]] = {}
+    try:
+        with open(mounts_path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[0].startswith('/dev/'):
+                    mounts[parts[0]] = (_unescape_mount_field(parts[1]), parts[2])
+    except OSError as e:
+        logger.warning('Could not read mount table %s: %s', mounts_path, e)
+    return mounts
+
+
+def _is_usb_disk(sys_root: str, name: str) -> bool:
+    """Check whether a block device sits on the USB bus."""
+    block = os.path.join(sys_root, 'block', name)
+    if '/usb' in os.path.realpath(block):
+        return True
+    return _read_attr(os.path.join(block, 'removable')) == '1' and not name.startswith(('loop', 'sr', 'ram', 'zram'))
+
+
+def _partitions(sys_root: str, name: str) -> List[str]:
+    block = os.path.join(sys_root, 'block', name)
+    try:
+        return sorted(entry for entry in os.listdir(block)
+                      if entry.startswith(name) and os.path.exists(os.path.join(block, entry, 'partition')))
+    except OSError:
+        return []
+
+
+def _is_empty(mount_point: str) -> bool:
+    """Check whether a mounted volume has no user content (top level only)."""
+    try:
+        with os.scandir(mount_point) as entries:
+            return not any(not entry.name.startswith('.') and entry.name != 'System Volume Information'
+                           for entry in entries)
+    except OSError:
+        return False
+
+
+def scan_usb_devices(sys_root: str = '/sys', mounts_path: str = '/proc/mounts',
+                     dev_root: str = '/dev') -> Dict[str, USBDevice]:
+    """
+    Take a snapshot of the USB block devices.
+
+    Args:
+        sys_root: sysfs root
+        mounts_path: Mount table to read
+        dev_root: Directory holding the device nodes
+
+    Returns:
+        Mapping of disk name to device
+    """
+    devices: Dict[str, USBDevice] = {}
+    mounts = read_mounts(mounts_path)
+    try:
+        names = os.listdir(os.path.join(sys_root, 'block'))
+    except OSError:
+        return devices
+
+    for name in names:
+        if not _is_usb_disk(sys_root, name):
+            continue
+        sectors = _read_attr(os.path.join(sys_root, 'block', name, 'size'))
+        disk_size = int(sectors) * 512 if sectors and sectors.isdigit() else 0
+        if disk_size == 0:
+            continue  # Card reader slot without media
+
+        # Prefer the first mounted partition, else the first partition, else the disk
+        candidates = [os.path.join(dev_root, part) for part in _partitions(sys_root, name)]
+        candidates.append(os.path.join(dev_root, name))
+        node = next((c for c in candidates if c in mounts), candidates[0])
+        mount_point, file_system = mounts.get(node, (None, None))
+
+        size, free = disk_size, 0
+        if mount_point is not None:
+            try:
+                st = os.statvfs(mount_point)
+                size, free = st.f_blocks * st.f_frsize, st.f_bavail * st.f_frsize
+            except OSError:
+                mount_point = None
+
+        label = os.path.basename(mount_point) if mount_point else name
+        devices[name] = USBDevice(
+            name=name,
+            device_path=node,
+            label=label,
+            size=size,
+            free_space=free,
+            used_space=max(0, size - free) if mount_point else 0,
+            file_system=file_system,
+            mount_point=mount_point,
+            is_empty=_is_empty(mount_point) if mount_point else False,
+        )
+    return devices
+
+
+# =============================================================================
+# Event Sources
+# =============================================================================
+
+NETLINK_KOBJECT_UEVENT = 15
+
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_INOTIFY_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+                 | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+
+
+def _open_uevent_socket() -> Optional[socket.socket]:
+    """Subscribe to kernel uevents; None when netlink is unavailable."""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        sock.bind((0, 1))
+        sock.setblocking(False)
+        return sock
+    except (AttributeError, OSError) as e:
+        logger.info('Netlink uevents unavailable (%s), relying on other sources', e)
+        return None
+
+
+def _is_block_uevent(message: bytes) -> bool:
+    """Check whether a raw uevent concerns a block device."""
+    return b'\x00SUBSYSTEM=block\x00' in message + b'\x00'
+
+
+class _Inotify:
+    """Minimal ctypes binding of inotify, used for non-procfs paths."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def watch(self, path: str) -> None:
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(path), _INOTIFY_MASK) < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+
+    def drain(self) -> None:
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+# =============================================================================
+# Device Monitor
+# =============================================================================
+
+DeviceCallback = Callable[[USBDevice], None]
+
+
+class DeviceMonitor:
+    """
+    Watches USB sticks being plugged, mounted, unmounted and removed.
+
+    Callbacks run on the monitor thread:
+
+    - ``on_added(device)``: a new USB disk appeared
+    - ``on_changed(device)``: mount state, label or free space changed
+    - ``on_removed(device)``: the disk disappeared (last known state)
+    """
+
+    def __init__(self, on_added: Optional[DeviceCallback] = None,
+                 on_removed: Optional[DeviceCallback] = None,
+                 on_changed: Optional[DeviceCallback] = None,
+                 sys_root: str = '/sys', mounts_path: str = '/proc/mounts',
+                 dev_root: str = '/dev', fallback_interval: float = 30.0):
+        """
+        Initialize the monitor.
+
+        Args:
+            on_added: Called when a device appears
+            on_removed: Called when a device disappears
+            on_changed: Called when a known device changes
+            sys_root: sysfs root (point at a fake tree for tests)
+            mounts_path: Mount table path
+            dev_root: Device node directory
+            fallback_interval: Seconds between safety rescans when no event
+                arrives
+        """
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self.on_changed = on_changed
+        self.sys_root = sys_root
+        self.mounts_path = mounts_path
+        self.dev_root = dev_root
+        self.fallback_interval = fallback_interval
+        self._devices: Dict[str, USBDevice] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._wake_r, self._wake_w = os.pipe()
+        self._stopping = False
+        self._watching = threading.Event()
+
+    @property
+    def devices(self) -> Dict[str, USBDevice]:
+        """Snapshot of the currently known devices."""
+        with self._lock:
+            return dict(self._devices)
+
+    def rescan(self) -> None:
+        """Diff the current devices against the last scan and fire callbacks."""
+        current = scan_usb_devices(self.sys_root, self.mounts_path, self.dev_root)
+        with self._lock:
+            previous, self._devices = self._devices, current
+
+        for name, device in current.items():
+            old = previous.get(name)
+            if old is None:
+                logger.info('USB device added: %s (%s)', name, device.device_path)
+                self._notify(self.on_added, device)
+            elif old != device:
+                self._notify(self.on_changed, device)
+        for name, device in previous.items():
+            if name not in current:
+                logger.info('USB device removed: %s', name)
+                self._notify(self.on_removed, device)
+
+    @staticmethod
+    def _notify(callback: Optional[DeviceCallback], device: USBDevice) -> None:
+        if callback is None:
+            return
+        try:
+            callback(device)
+        except Exception:
+            logger.exception('Device callback failed for %s', device.name)
+
+    def start(self) -> None:
+        """Start watching in a background thread, then scan once."""
+        self._thread = threading.Thread(target=self._run, name='usb-device-monitor', daemon=True)
+        self._thread.start()
+        # Scan only once the event sources are registered, so nothing
+        # plugged in between is missed
+        self._watching.wait()
+        self.rescan()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the monitor thread."""
+        self._stopping = True
+        os.write(self._wake_w, b'x')
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _run(self) -> None:
+        poller = select.poll()
+        poller.register(self._wake_r, select.POLLIN)
+        handlers: Dict[int, Callable[[], bool]] = {}
+        closers: List[Callable[[], None]] = []
+        try:
+            self._register_sources(poller, handlers, closers)
+        except OSError as e:
+            logger.warning('Could not register device event sources (%s), using fallback rescans', e)
+        finally:
+            self._watching.set()
+
+        try:
+            while not self._stopping:
+                events = poller.poll(self.fallback_interval * 1000)
+                if self._stopping:
+                    break
+                changed = not events  # Fallback timeout: rescan anyway
+                for fd, _mask in events:
+                    handler = handlers.get(fd)
+                    if handler is not None:
+                        changed |= handler()
+                if changed:
+                    self.rescan()
+        finally:
+            for close in closers:
+                close()
+
+    def _register_sources(self, poller: 'select.poll',
+                          handlers: Dict[int, Callable[[], bool]],
+                          closers: List[Callable[[], None]]) -> None:
+        """Register netlink, procfs and inotify event sources with the poller."""
+        if os.path.realpath(self.sys_root) == '/sys':
+            sock = _open_uevent_socket()
+            if sock is not None:
+                def read_uevents() -> bool:
+                    relevant = False
+                    try:
+                        while True:
+                            relevant |= _is_block_uevent(sock.recv(65536))
+                    except BlockingIOError:
+                        pass
+                    return relevant
+                poller.register(sock.fileno(), select.POLLIN)
+                handlers[sock.fileno()] = read_uevents
+                closers.append(sock.close)
+
+        if self.mounts_path.startswith('/proc/'):
+            # procfs signals mount table changes with POLLPRI/POLLERR
+            mounts_file = open(self.mounts_path)
+            poller.register(mounts_file.fileno(), select.POLLPRI | select.POLLERR)
+
+            def reread_mounts() -> bool:
+                mounts_file.seek(0)
+                mounts_file.read()
+                return True
+            handlers[mounts_file.fileno()] = reread_mounts
+            closers.append(mounts_file.close)
+
+        inotify_paths = []
+        if os.path.realpath(self.sys_root) != '/sys':
+            inotify_paths.append(os.path.join(self.sys_root, 'block'))
+        if not self.mounts_path.startswith('/proc/'):
+            inotify_paths.append(self.mounts_path)
+        if inotify_paths:
+            inotify = _Inotify()
+            closers.append(inotify.close)
+            for path in inotify_paths:
+                inotify.watch(path)
+            poller.register(inotify.fd, select.POLLIN)
+
+            def drain_inotify() -> bool:
+                inotify.drain()
+                return True
+            handlers[inotify.fd] = drain_inotify
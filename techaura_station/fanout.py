@@ -0,0 +1,232 @@
+"""
+Read-once fan-out copying to several devices.
+
+Customers often order several identical sticks, and concurrent orders
+overlap heavily on popular genres. Burning them one by one reads every
+shared source file once per stick. The fan-out copier reads each source
+chunk once and hands it to a writer thread per device.
+
+Each writer holds at most ``max_pending`` bytes of chunks. When a stick
+falls that far behind and does not catch up within ``max_stall`` seconds,
+the reader stops waiting for it. The slow stick is marked as lagging and
+reads the rest of its files itself, usually from the page cache because the
+reader has just read them. Once its backlog is empty it rejoins the shared
+reads at the next file. A slow stick therefore never holds the fast ones
+back for more than ``max_stall`` at a time.
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from techaura_station.plan import CopyItem, CopyPlan
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FanoutResult:
+    """Outcome of a fan-out copy."""
+    source_bytes_read: int = 0  # Bytes read by the shared reader and lagging writers
+    written: Dict[str, int] = field(default_factory=dict)  # mount point -> bytes
+    errors: Dict[str, OSError] = field(default_factory=dict)  # mount point -> first error
+
+
+class _DeviceWriter:
+    """Writer thread of one destination device."""
+
+    def __init__(self, mount_point: str, max_pending: int, chunk_size: int):
+        self.mount_point = mount_point
+        self.max_pending = max(max_pending, chunk_size)
+        self.chunk_size = chunk_size
+        self.pending = 0
+        self.lagging = False
+        self.error: Optional[OSError] = None
+        self.written = 0
+        self.self_read = 0
+        self._messages: Deque[Tuple] = deque()
+        self._files: Dict[str, object] = {}
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name=f'fanout-{os.path.basename(mount_point)}')
+
+    # -- Reader side -------------------------------------------------------------
+
+    def post(self, *message) -> None:
+        with self.cond:
+            if message[0] == 'chunk':
+                self.pending += len(message[2])
+            self._messages.append(message)
+            self.cond.notify_all()
+
+    def detach(self, item: CopyItem, offset: int) -> None:
+        """Mark the device as lagging and let it finish ``item`` on its own."""
+        with self.cond:
+            self.lagging = True
+            self._messages.append(('finish', item, offset))
+            self.cond.notify_all()
+
+    def wait_for_room(self, size: int, timeout: float) -> bool:
+        """Wait until a chunk of ``size`` bytes fits; False if it timed out."""
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: self.error is not None or self.pending + size <= self.max_pending,
+                timeout)
+
+    # -- Writer thread -----------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self._messages)
+                message = self._messages.popleft()
+            kind = message[0]
+            if kind == 'stop':
+                self._close_all()
+                return
+            try:
+                if self.error is None:
+                    self._handle(kind, message)
+            except OSError as e:
+                logger.error('Fan-out write to %s failed: %s', self.mount_point, e)
+                self.error = e
+                self._close_all()
+            finally:
+                with self.cond:
+                    if kind == 'chunk':
+                        self.pending -= len(message[2])
+                    if self.lagging and not self._messages:
+                        self.lagging = False
+                    self.cond.notify_all()
+
+    def _handle(self, kind: str, message: Tuple) -> None:
+        item: CopyItem = message[1]
+        if kind == 'open':
+            destination = os.path.join(self.mount_point, item.destination)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            self._files[item.destination] = open(destination, 'wb')
+        elif kind == 'chunk':
+            self._files[item.destination].write(message[2])
+            self.written += len(message[2])
+        elif kind == 'close':
+            self._files.pop(item.destination).close()
+        elif kind == 'finish':
+            # Detached mid-file: read the rest of the source ourselves
+            f = self._files.pop(item.destination, None)
+            if f is None:
+                destination = os.path.join(self.mount_point, item.destination)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                f = open(destination, 'wb')
+            with f, open(item.source, 'rb') as src:
+                src.seek(message[2])
+                while chunk := src.read(self.chunk_size):
+                    self.self_read += len(chunk)
+                    f.write(chunk)
+                    self.written += len(chunk)
+        elif kind == 'abort':
+            f = self._files.pop(item.destination, None)
+            if f is not None:
+                f.close()
+            self.error = message[2]
+
+    def _close_all(self) -> None:
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._files.clear()
+
+
+def fanout_copy(jobs: Sequence[Tuple[CopyPlan, str]],
+                chunk_size: int = 1024 * 1024,
+                max_pending: int = 16 * 1024 * 1024,
+                max_stall: float = 2.0) -> FanoutResult:
+    """
+    Copy several plans to their devices, reading shared sources once.
+
+    Args:
+        jobs: (copy plan, mount point) pairs; the same plan may appear for
+            several mount points (identical sticks)
+        chunk_size: Read size of the shared reader
+        max_pending: Bytes each device may have queued before it is
+            considered behind
+        max_stall: Seconds the reader waits for a device that is behind
+            before letting it fall back to its own reads
+
+    Returns:
+        Bytes read from the sources, bytes written and the first error per
+        device (a failed device does not stop the others)
+    """
+    writers = [_DeviceWriter(mount_point, max_pending, chunk_size) for _plan, mount_point in jobs]
+
+    # Sources in first-needed order, with every (writer, item) that needs them
+    recipients: Dict[str, List[Tuple[_DeviceWriter, CopyItem]]] = {}
+    for writer, (plan, _mount_point) in zip(writers, jobs):
+        for item in plan:
+            recipients.setdefault(item.source, []).append((writer, item))
+
+    result = FanoutResult()
+    for writer in writers:
+        writer.thread.start()
+    try:
+        for source, targets in recipients.items():
+            result.source_bytes_read += _fan_out_source(source, targets, chunk_size, max_stall)
+    finally:
+        for writer in writers:
+            writer.post('stop')
+        for writer in writers:
+            writer.thread.join()
+
+    for writer in writers:
+        result.source_bytes_read += writer.self_read
+        result.written[writer.mount_point] = writer.written
+        if writer.error is not None:
+            result.errors[writer.mount_point] = writer.error
+    return result
+
+
+def _fan_out_source(source: str, targets: List[Tuple[_DeviceWriter, CopyItem]],
+                    chunk_size: int, max_stall: float) -> int:
+    """Read one source once and distribute it; returns the bytes read."""
+    attached = []
+    for writer, item in targets:
+        if writer.error is not None:
+            continue
+        if writer.lagging:
+            writer.post('finish', item, 0)
+        else:
+            writer.post('open', item)
+            attached.append((writer, item))
+    if not attached:
+        return 0
+
+    read = 0
+    try:
+        with open(source, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                still_attached = []
+                for writer, item in attached:
+                    if writer.error is not None:
+                        continue
+                    if not writer.wait_for_room(len(chunk), max_stall):
+                        writer.detach(item, read)
+                        continue
+                    writer.post('chunk', item, chunk)
+                    still_attached.append((writer, item))
+                attached = still_attached
+                read += len(chunk)
+                if not attached:
+                    break
+    except OSError as e:
+        logger.error('Could not read %s: %s', source, e)
+        for writer, item in attached:
+            writer.post('abort', item, e)
+        return read
+
+    for writer, item in attached:
+        writer.post('close', item)
+    return read
@@ -0,0 +1,486 @@
+"""
+Image-mode burning.
+
+Copying thousands of small MP3s through a mounted FAT filesystem costs a
+directory and FAT update per file, as small random writes that cheap flash
+handles very badly. Image mode builds the whole FAT32 filesystem for an
+order on local disk instead, with every file and directory stored
+contiguously. It then streams the image to the raw device in large
+sequential writes and verifies it by reading it back.
+
+The builder is pure Python and only needs the copy plan, so it works on any
+station without dosfstools or mtools installed. Only the used part of the
+image is written. Free clusters are marked free in the FAT and their old
+content on the stick does not matter.
+
+FAT32 matches what ``formatUSB`` in ``src/usbManager.ts`` produces.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+from techaura_station.plan import CopyPlan
+
+logger = logging.getLogger(__name__)
+
+
+SECTOR_SIZE = 512
+RESERVED_SECTORS = 32
+NUM_FATS = 2
+ROOT_CLUSTER = 2
+MIN_FAT32_CLUSTERS = 65525
+END_OF_CHAIN = 0x0FFFFFFF
+
+ATTR_READ_ONLY = 0x01
+ATTR_HIDDEN = 0x02
+ATTR_SYSTEM = 0x04
+ATTR_VOLUME_ID = 0x08
+ATTR_DIRECTORY = 0x10
+ATTR_ARCHIVE = 0x20
+ATTR_LONG_NAME = ATTR_READ_ONLY | ATTR_HIDDEN | ATTR_SYSTEM | ATTR_VOLUME_ID
+
+# (max volume bytes, sectors per cluster), as recommended for FAT32
+_CLUSTER_SIZES = (
+    (260 * 1024 * 1024, 1),
+    (8 * 1024 ** 3, 8),
+    (16 * 1024 ** 3, 16),
+    (32 * 1024 ** 3, 32),
+)
+_LARGE_VOLUME_CLUSTER = 64
+
+_SHORT_NAME_CHARS = set('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!#$%&\'()-@^_`{}~')
+
+
+class ImageError(Exception):
+    """Raised when an image cannot be built or does not verify."""
+    pass
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass
+class ImageFile:
+    """A file to place in the image."""
+    destination: str  # Relative path, '/' or os.sep separated
+    size: int
+    source: Optional[str] = None  # Read from disk...
+    data: Optional[bytes] = None  # ...or written from memory
+    mtime: Optional[float] = None
+
+
+@dataclass
+class _Directory:
+    name: str
+    children: Dict[str, Union['_Directory', ImageFile]] = field(default_factory=dict)
+    entries: List[Tuple[bytes, Union['_Directory', ImageFile, None]]] = field(default_factory=list)
+    cluster: int = 0
+    clusters: int = 0
+    parent_cluster: int = 0  # 0 when the parent is the root directory
+
+
+@dataclass
+class ImageLayout:
+    """Geometry of a built image."""
+    total_sectors: int
+    sectors_per_cluster: int
+    fat_sectors: int
+    cluster_count: int
+    used_clusters: int = 0
+
+    @property
+    def cluster_size(self) -> int:
+        return self.sectors_per_cluster * SECTOR_SIZE
+
+    @property
+    def data_offset(self) -> int:
+        return (RESERVED_SECTORS + NUM_FATS * self.fat_sectors) * SECTOR_SIZE
+
+    @property
+    def used_bytes(self) -> int:
+        """Bytes from the start of the image to the end of the last used cluster."""
+        return self.data_offset + self.used_clusters * self.cluster_size
+
+
+# =============================================================================
+# Geometry and Names
+# =============================================================================
+
+def compute_layout(size: int) -> ImageLayout:
+    """
+    Compute the FAT32 geometry of a volume.
+
+    Args:
+        size: Volume size in bytes
+
+    Returns:
+        The layout
+
+    Raises:
+        ImageError: If the volume is too small for FAT32
+    """
+    total_sectors = size // SECTOR_SIZE
+    spc = next((s for limit, s in _CLUSTER_SIZES if size <= limit), _LARGE_VOLUME_CLUSTER)
+    # FAT size formula from the Microsoft FAT32 specification
+    tmp1 = total_sectors - RESERVED_SECTORS
+    tmp2 = (256 * spc + NUM_FATS) // 2
+    fat_sectors = (tmp1 + tmp2 - 1) // tmp2
+    cluster_count = (total_sectors - RESERVED_SECTORS - NUM_FATS * fat_sectors) // spc
+    if cluster_count < MIN_FAT32_CLUSTERS:
+        raise ImageError(f'Volume of {size} bytes is too small for FAT32')
+    return ImageLayout(total_sectors, spc, fat_sectors, cluster_count)
+
+
+def _short_name(name: str, taken: set) -> Tuple[bytes, bool]:
+    """
+    Get the 8.3 name of an entry.
+
+    Returns:
+        (11-byte short name, whether a long name entry is needed)
+    """
+    base, dot, ext = name.rpartition('.')
+    if not dot:
+        base, ext = name, ''
+    if (name == name.upper() and 0 < len(base) <= 8 and len(ext) <= 3
+            and all(c in _SHORT_NAME_CHARS for c in base + ext)):
+        short = f'{base:<8}{ext:<3}'.encode('ascii')
+        if short not in taken:
+            taken.add(short)
+            return short, False
+
+    def clean(text: str) -> str:
+        return ''.join(c if c in _SHORT_NAME_CHARS else '_'
+                       for c in text.upper().replace(' ', '').replace('.', ''))
+
+    basis, ext = clean(base)[:6] or '_', clean(ext)[:3]
+    n = 1
+    while True:
+        tail = f'~{n}'
+        short = f'{basis[:8 - len(tail)] + tail:<8}{ext:<3}'.encode('ascii')
+        if short not in taken:
+            taken.add(short)
+            return short, True
+        n += 1
+
+
+def _lfn_checksum(short: bytes) -> int:
+    total = 0
+    for byte in short:
+        total = (((total & 1) << 7) + (total >> 1) + byte) & 0xFF
+    return total
+
+
+def _lfn_entries(name: str, short: bytes) -> List[bytes]:
+    """Build the long name entries of a name, in on-disk order."""
+    units = list(struct.unpack(f'<{len(name.encode("utf-16-le")) // 2}H', name.encode('utf-16-le')))
+    if len(units) > 255:
+        raise ImageError(f'Name too long for FAT: {name}')
+    if len(units) % 13:
+        units.append(0)
+    units += [0xFFFF] * (-len(units) % 13)
+    checksum = _lfn_checksum(short)
+    entries = []
+    count = len(units) // 13
+    for i in range(count):
+        chunk = units[i * 13:(i + 1) * 13]
+        order = i + 1 | (0x40 if i == count - 1 else 0)
+        entries.append(struct.pack('<B5HBBB6HH2H', order, *chunk[:5], ATTR_LONG_NAME, 0,
+                                   checksum, *chunk[5:11], 0, *chunk[11:]))
+    return entries[::-1]
+
+
+def _fat_datetime(timestamp: float) -> Tuple[int, int]:
+    t = time.localtime(timestamp)
+    year = min(max(t.tm_year, 1980), 2107)
+    date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    clock = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return date, clock
+
+
+def _dir_entry(short: bytes, attr: int, cluster: int, size: int, timestamp: float) -> bytes:
+    date, clock = _fat_datetime(timestamp)
+    return struct.pack('<11sBBBHHHHHHHI', short, attr, 0, 0, clock, date, date,
+                       cluster >> 16, clock, date, cluster & 0xFFFF, size)
+
+
+# =============================================================================
+# Image Builder
+# =============================================================================
+
+def _build_tree(files: Sequence[ImageFile]) -> _Directory:
+    root = _Directory('')
+    for f in files:
+        parts = [p for p in f.destination.replace(os.sep, '/').split('/') if p]
+        if not parts:
+            raise ImageError(f'Invalid destination: {f.destination!r}')
+        node = root
+        for part in parts[:-1]:
+            child = node.children.setdefault(part, _Directory(part))
+            if not isinstance(child, _Directory):
+                raise ImageError(f'{f.destination} is inside a file')
+            node = child
+        if parts[-1] in node.children:
+            raise ImageError(f'Duplicate destination: {f.destination}')
+        node.children[parts[-1]] = f
+    return root
+
+
+def _walk(directory: _Directory):
+    yield directory
+    for child in directory.children.values():
+        if isinstance(child, _Directory):
+            yield from _walk(child)
+
+
+def build_fat32_image(files: Sequence[ImageFile], size: int, output: BinaryIO,
+                      label: str = 'TECHAURA', volume_id: Optional[int] = None) -> ImageLayout:
+    """
+    Write a FAT32 image holding ``files``.
+
+    The image is written front to back in one pass; space after the last
+    used cluster is not written (``output`` should be a sparse file or
+    preallocated).
+
+    Args:
+        files: Files to include
+        size: Volume size in bytes (the target partition size)
+        output: Binary file positioned at the start of the image
+        label: Volume label (up to 11 characters)
+        volume_id: Volume serial number (random when omitted)
+
+    Returns:
+        The image layout; ``used_bytes`` is the prefix to write to a device
+
+    Raises:
+        ImageError: If the content does not fit or cannot be represented
+    """
+    layout = compute_layout(size)
+    root = _build_tree(files)
+    now = time.time()
+    label_bytes = ''.join(c if c in _SHORT_NAME_CHARS or c == ' ' else '_'
+                          for c in label.upper())[:11].encode('ascii')
+    label_bytes = label_bytes.ljust(11)
+
+    # Name every entry so that directory sizes are known before allocation
+    directories = list(_walk(root))
+    for directory in directories:
+        taken: set = set()
+        if directory is root:
+            directory.entries.append((label_bytes, None))
+        else:
+            directory.entries += [(b'.          ', directory), (b'..         ', None)]
+        for name, child in directory.children.items():
+            short, needs_long = _short_name(name, taken)
+            if needs_long:
+                directory.entries += [(entry, 'lfn') for entry in _lfn_entries(name, short)]
+            directory.entries.append((short, child))
+        directory.clusters = max(1, -(-len(directory.entries) * 32 // layout.cluster_size))
+
+    # Allocate directories first, then files in plan order, all contiguous
+    next_cluster = ROOT_CLUSTER
+    for directory in directories:
+        directory.cluster = next_cluster
+        next_cluster += directory.clusters
+    for directory in directories:
+        for child in directory.children.values():
+            if isinstance(child, _Directory) and directory is not root:
+                child.parent_cluster = directory.cluster
+    allocation: List[Tuple[ImageFile, int, int]] = []
+    for f in files:
+        clusters = -(-f.size // layout.cluster_size)
+        allocation.append((f, next_cluster if clusters else 0, clusters))
+        next_cluster += clusters
+    layout.used_clusters = next_cluster - ROOT_CLUSTER
+    if layout.used_clusters > layout.cluster_count:
+        raise ImageError(f'Content needs {layout.used_clusters} clusters, '
+                         f'volume has {layout.cluster_count}')
+    file_clusters = {id(f): cluster for f, cluster, _n in allocation}
+
+    # FAT: every chain is contiguous
+    fat = array('I', bytes(layout.fat_sectors * SECTOR_SIZE))
+    fat[0], fat[1] = 0x0FFFFFF8, END_OF_CHAIN
+    chains = [(d.cluster, d.clusters) for d in directories] + [(c, n) for _f, c, n in allocation if n]
+    for start, count in chains:
+        fat[start:start + count - 1] = array('I', range(start + 1, start + count))
+        fat[start + count - 1] = END_OF_CHAIN
+
+    # Reserved region: boot sector, FSInfo and their backups
+    volume_id = volume_id if volume_id is not None else int.from_bytes(os.urandom(4), 'little')
+    boot = bytearray(SECTOR_SIZE)
+    struct.pack_into('<3s8sHBHBHHBHHHIIIHHIHH12sBBBI11s8s', boot, 0,
+                     b'\xEB\x58\x90', b'MSWIN4.1', SECTOR_SIZE, layout.sectors_per_cluster,
+                     RESERVED_SECTORS, NUM_FATS, 0, 0, 0xF8, 0, 32, 64, 0,
+                     layout.total_sectors, layout.fat_sectors, 0, 0, ROOT_CLUSTER, 1, 6,
+                     bytes(12), 0x80, 0, 0x29, volume_id, label_bytes, b'FAT32   ')
+    boot[510:512] = b'\x55\xAA'
+    fsinfo = bytearray(SECTOR_SIZE)
+    struct.pack_into('<I', fsinfo, 0, 0x41615252)
+    struct.pack_into('<III', fsinfo, 484, 0x61417272,
+                     layout.cluster_count - layout.used_clusters, next_cluster)
+    struct.pack_into('<I', fsinfo, 508, 0xAA550000)
+    reserved = bytearray(RESERVED_SECTORS * SECTOR_SIZE)
+    for sector, data in ((0, boot), (1, fsinfo), (6, boot), (7, fsinfo)):
+        reserved[sector * SECTOR_SIZE:(sector + 1) * SECTOR_SIZE] = data
+    output.write(reserved)
+    if sys.byteorder != 'little':
+        fat.byteswap()
+    fat_bytes = fat.tobytes()
+    for _ in range(NUM_FATS):
+        output.write(fat_bytes)
+
+    # Data region, in allocation order
+    for directory in directories:
+        data = bytearray()
+        for short, child in directory.entries:
+            if child == 'lfn':
+                data += short
+            elif child is None and directory is root:
+                data += _dir_entry(short, ATTR_VOLUME_ID, 0, 0, now)
+            elif child is None:
+                data += _dir_entry(short, ATTR_DIRECTORY, directory.parent_cluster, 0, now)
+            elif child is directory:
+                data += _dir_entry(short, ATTR_DIRECTORY, directory.cluster, 0, now)
+            elif isinstance(child, _Directory):
+                data += _dir_entry(short, ATTR_DIRECTORY, child.cluster, 0, now)
+            else:
+                data += _dir_entry(short, ATTR_ARCHIVE, file_clusters[id(child)], child.size,
+                                   child.mtime or now)
+        output.write(bytes(data).ljust(directory.clusters * layout.cluster_size, b'\0'))
+
+    for f, _cluster, clusters in allocation:
+        written = _write_file(f, output)
+        if written != f.size:
+            raise ImageError(f'{f.source or f.destination} changed size while building the image')
+        output.write(bytes(clusters * layout.cluster_size - written))
+    return layout
+
+
+def _write_file(f: ImageFile, output: BinaryIO, chunk_size: int = 1024 * 1024) -> int:
+    if f.data is not None:
+        output.write(f.data)
+        return len(f.data)
+    written = 0
+    with open(f.source, 'rb') as src:
+        while chunk := src.read(chunk_size):
+            output.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def plan_image_files(plan: CopyPlan, extra: Optional[Dict[str, bytes]] = None) -> List[ImageFile]:
+    """
+    Turn a copy plan into image files.
+
+    Args:
+        plan: The order's copy plan
+        extra: In-memory files to add (e.g. ``playlist.json``), by destination
+
+    Returns:
+        Files to pass to ``build_fat32_image``
+    """
+    files = []
+    for item in plan:
+        try:
+            mtime = os.path.getmtime(item.source)
+        except OSError:
+            mtime = None
+        files.append(ImageFile(item.destination, item.size, source=item.source, mtime=mtime))
+    for destination, data in (extra or {}).items():
+        files.append(ImageFile(destination, len(data), data=data))
+    return files
+
+
+# =============================================================================
+# Device Streaming
+# =============================================================================
+
+def stream_image(image_path: str, device_path: str, length: int,
+                 block_size: int = 4 * 1024 * 1024, verify: bool = True) -> str:
+    """
+    Write the first ``length`` bytes of an image to a raw device.
+
+    Writes are sequential and ``block_size`` large. With ``verify``, the
+    device's cached pages are dropped after fsync and the written range is
+    read back and compared by hash.
+
+    Args:
+        image_path: Image file
+        device_path: Raw partition (e.g. ``/dev/sdb1``), loop device or file
+        length: Bytes to write (``ImageLayout.used_bytes``)
+        block_size: Write size
+        verify: Read the data back after writing
+
+    Returns:
+        Content hash of the written range
+
+    Raises:
+        ImageError: If the read-back data does not match
+        OSError: If the device cannot be written
+    """
+    expected = hashlib.blake2b(digest_size=16)
+    fd = os.open(device_path, os.O_WRONLY)
+    try:
+        with open(image_path, 'rb') as image:
+            remaining = length
+            while remaining > 0:
+                block = image.read(min(block_size, remaining))
+                if not block:
+                    raise ImageError(f'Image {image_path} is shorter than {length} bytes')
+                expected.update(block)
+                view = memoryview(block)
+                while view:
+                    view = view[os.write(fd, view):]
+                remaining -= len(block)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    if verify:
+        actual = hashlib.blake2b(digest_size=16)
+        fd = os.open(device_path, os.O_RDONLY)
+        try:
+            if hasattr(os, 'posix_fadvise'):
+                # Read the media, not what we just wrote to the page cache
+                os.posix_fadvise(fd, 0, length, os.POSIX_FADV_DONTNEED)
+            remaining = length
+            while remaining > 0:
+                block = os.read(fd, min(block_size, remaining))
+                if not block:
+                    break
+                actual.update(block)
+                remaining -= len(block)
+        finally:
+            os.close(fd)
+        if remaining or actual.digest() != expected.digest():
+            raise ImageError(f'Verification of {device_path} failed')
+    return expected.hexdigest()
+
+
+def choose_burn_mode(plan: CopyPlan, min_files: int = 300,
+                     max_average_size: int = 16 * 1024 * 1024) -> str:
+    """
+    Pick the burn mode of an order.
+
+    Image mode pays off for many small files (music orders). A few large
+    movies write just as fast through the filesystem, and file mode can
+    resume from the copy journal.
+
+    Args:
+        plan: The order's copy plan
+        min_files: Minimum file count for image mode
+        max_average_size: Maximum average file size for image mode
+
+    Returns:
+        ``'image'`` or ``'files'``
+    """
+    if len(plan) >= min_files and plan.total_bytes / len(plan) <= max_average_size:
+        return 'image'
+    return 'files'
@@ -0,0 +1,243 @@
+"""
+Per-order copy journal for resumable burns.
+
+A burn that fails halfway (stick unplugged, I/O error) used to start again
+from zero. The journal is a small append-only JSON-lines file kept on the
+station disk, one per order::
+
+    {"plan": {"order_id": ..., "items": [[source, destination, size], ...], ...}}
+    {"done": destination, "size": ..., "hash": ...}
+    ...
+
+The plan record is written once when the burn starts; a ``done`` record is
+appended after each file has been copied, checksummed and fsynced on the
+device, together with the volume ID of that device. When the order is
+burned again, the journaled plan is reused (so the content does not change
+between attempts) and journaled files still on the device are skipped. A
+file is trusted on its size alone only when it was journaled on the same
+volume and is not the last one journaled; otherwise (another stick, unknown
+volume, or a copy the device may not have fully written back) it is
+re-hashed and compared with its journaled digest.
+
+A torn last line (crash while appending) is ignored; a journal with records
+that cannot be understood is treated as absent.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from techaura_station.devices import read_mounts
+from techaura_station.plan import CopyItem, CopyPlan
+from techaura_station.transcode import hash_file
+
+logger = logging.getLogger(__name__)
+
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def copy_with_checksum(source: str, destination: str,
+                       chunk_size: int = 1024 * 1024) -> str:
+    """
+    Copy a file, hashing it on the way, and fsync the destination.
+
+    Args:
+        source: Source file
+        destination: Destination file (overwritten)
+        chunk_size: Read/write block size
+
+    Returns:
+        Content hash of the copied data
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        while chunk := src.read(chunk_size):
+            digest.update(chunk)
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return digest.hexdigest()
+
+
+def volume_id(mount_point: str, mounts_path: str = '/proc/mounts',
+              by_uuid_dir: str = '/dev/disk/by-uuid') -> Optional[str]:
+    """
+    Get the filesystem UUID (the FAT volume serial) of a mounted device.
+
+    Args:
+        mount_point: Mount point of the device
+        mounts_path: Mount table to read
+        by_uuid_dir: Directory of UUID symlinks maintained by udev
+
+    Returns:
+        The volume ID, or None if it cannot be determined
+    """
+    target = os.path.realpath(mount_point)
+    node = next((node for node, (point, _fs) in read_mounts(mounts_path).items()
+                 if os.path.realpath(point) == target), None)
+    if node is None:
+        return None
+    node = os.path.realpath(node)
+    try:
+        names = os.listdir(by_uuid_dir)
+    except OSError:
+        return None
+    for name in names:
+        if os.path.realpath(os.path.join(by_uuid_dir, name)) == node:
+            return name
+    return None
+
+
+@dataclass
+class JournalState:
+    """Replayed content of a journal."""
+    plan: CopyPlan
+    done: Dict[str, Tuple[int, str]] = field(default_factory=dict)  # destination -> (size, hash)
+    volumes: Dict[str, Optional[str]] = field(default_factory=dict)  # destination -> volume ID
+    last: Optional[str] = None  # Destination of the last done record
+
+
+class CopyJournal:
+    """Append-only copy journal of one order."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the journal.
+
+        Args:
+            path: Journal file path
+        """
+        self.path = path
+        # Volume ID of the device being written, stored with each done record
+        self.volume: Optional[str] = None
+        self._file = None
+
+    @classmethod
+    def for_order(cls, journal_dir: str, order_id: str) -> 'CopyJournal':
+        """Get the journal of an order inside ``journal_dir``."""
+        os.makedirs(journal_dir, exist_ok=True)
+        name = _UNSAFE_CHARS.sub('_', str(order_id)) or '_'
+        return cls(os.path.join(journal_dir, f'{name}.journal'))
+
+    def load(self) -> Optional[JournalState]:
+        """
+        Replay the journal.
+
+        Returns:
+            The journaled plan and completed files, or None if there is no
+            usable journal
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+
+        state: Optional[JournalState] = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn write at the end of the file
+                break
+            try:
+                if 'plan' in record:
+                    raw = record['plan']
+                    state = JournalState(CopyPlan(
+                        order_id=raw['order_id'],
+                        items=[CopyItem(*item) for item in raw['items']],
+                        unmatched=raw.get('unmatched', []),
+                        dropped=raw.get('dropped', []),
+                    ))
+                elif 'done' in record and state is not None:
+                    destination = record['done']
+                    state.done[destination] = (record['size'], record['hash'])
+                    state.volumes[destination] = record.get('volume')
+                    state.last = destination
+            except (KeyError, TypeError, AttributeError) as e:
+                logger.warning('Ignoring unreadable journal %s: %r', self.path, e)
+                return None
+        return state
+
+    def begin(self, plan: CopyPlan) -> None:
+        """Start a new journal for a plan, replacing any previous one."""
+        self.close()
+        record = {'plan': {
+            'order_id': plan.order_id,
+            'items': [[item.source, item.destination, item.size] for item in plan],
+            'unmatched': plan.unmatched,
+            'dropped': plan.dropped,
+        }}
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._append(record)
+
+    def record(self, item: CopyItem, digest: str) -> None:
+        """Record a file as copied and verified."""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        record = {'done': item.destination, 'size': item.size, 'hash': digest}
+        if self.volume is not None:
+            record['volume'] = self.volume
+        self._append(record)
+
+    def _append(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self) -> None:
+        """Delete the journal once the order is complete."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def verified_items(state: JournalState, mount_point: str,
+                   volume: Optional[str] = None) -> Dict[str, str]:
+    """
+    Check which journaled files are still intact on a device.
+
+    Every journaled file was fsynced before its record was written, so a
+    file journaled on this same volume with the journaled size is trusted
+    without re-reading it. Files journaled on another or an unknown volume,
+    and the last journaled file, are re-hashed against their digest.
+
+    Args:
+        state: Replayed journal
+        mount_point: Mount point of the device
+        volume: Volume ID of the device (see ``volume_id``), None if unknown
+
+    Returns:
+        Mapping of destination to content hash for files that can be skipped
+    """
+    verified: Dict[str, str] = {}
+    rehashed = 0
+    for destination, (size, digest) in state.done.items():
+        path = os.path.join(mount_point, destination)
+        try:
+            if os.path.getsize(path) != size:
+                continue
+            if volume is None or state.volumes.get(destination) != volume or destination == state.last:
+                rehashed += 1
+                if hash_file(path) != digest:
+                    continue
+        except OSError:
+            continue
+        verified[destination] = digest
+    if state.done and len(verified) < len(state.done):
+        logger.info('Order %s: %d of %d journaled files are on this device (%d re-hashed)',
+                    state.plan.order_id, len(verified), len(state.done), rehashed)
+    return verified
@@ -0,0 +1,672 @@
+"""
+Manifest-based delta sync of the media library between stations.
+
+Every station needs the same library (the music genre tree plus the video
+and movie roots). A ``LibraryManifest`` lists each file of the library by
+kind and relative path with its size, mtime and the hashes of its
+fixed-size chunks. ``sync_library`` compares the local manifest with the
+one of a reference (another station serving its library with
+``LibraryServer``, or a mirror directory) and rebuilds only the files that
+differ. Chunks whose hash is unchanged are copied from the local file and
+only the others are fetched from the reference, with one worker thread per
+file in flight.
+
+Hashing is the expensive part of a manifest, so files whose size and mtime
+match the previous manifest keep their hashes. Patched files are written
+next to the target as ``.<name>.partial`` and renamed into place only once
+every chunk matched its hash, so an interrupted sync never leaves a
+half-written song in the library. The search index is updated file by file
+(``ContentIndex.add_file`` / ``remove``), so a new genre becomes searchable
+without re-scanning the library.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from techaura_station.matching import ContentIndex
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 4 * 1024 * 1024
+MANIFEST_VERSION = 1
+_PARTIAL_SUFFIX = '.partial'
+
+
+class LibrarySyncError(Exception):
+    """Raised when the reference cannot be read or sends corrupt data."""
+
+
+# =============================================================================
+# Manifests
+# =============================================================================
+
+@dataclass
+class FileEntry:
+    """One library file as listed in a manifest."""
+    kind: str
+    path: str  # Relative to the kind's root, '/'-separated
+    size: int
+    mtime: float
+    chunks: List[str] = field(default_factory=list)  # Hex digests, in order
+
+    @property
+    def key(self) -> str:
+        return f'{self.kind}/{self.path}'
+
+
+@dataclass
+class LibraryManifest:
+    """Files of a library, keyed by ``kind/path``."""
+    chunk_size: int = CHUNK_SIZE
+    files: Dict[str, FileEntry] = field(default_factory=dict)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self.files.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'version': MANIFEST_VERSION, 'chunk_size': self.chunk_size,
+                'files': [asdict(entry) for entry in self.files.values()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LibraryManifest':
+        if data.get('version') != MANIFEST_VERSION:
+            raise ValueError(f'Unsupported manifest version {data.get("version")!r}')
+        entries = (FileEntry(**entry) for entry in data['files'])
+        return cls(data['chunk_size'], {entry.key: entry for entry in entries})
+
+    def save(self, path: str) -> None:
+        """Write the manifest as JSON (atomically)."""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LibraryManifest']:
+        """Read a saved manifest (None if missing or unreadable)."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning('Ignoring unreadable manifest %s: %s', path, e)
+            return None
+
+
+def hash_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> List[str]:
+    """Hash a file in ``chunk_size`` chunks."""
+    chunks = []
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                return chunks
+            chunks.append(hashlib.blake2b(block, digest_size=16).hexdigest())
+
+
+def _walk(kind: str, root: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield ``(relative path, stat)`` of every library file under a root."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.startswith('.') and filename.endswith(_PARTIAL_SUFFIX):
+                continue  # A sync in progress
+            full_path = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(full_path)
+            except OSError as e:
+                logger.warning('Skipping unreadable %s file %s: %s', kind, full_path, e)
+                continue
+            yield os.path.relpath(full_path, root).replace(os.sep, '/'), st
+
+
+def build_manifest(roots: Dict[str, str], chunk_size: int = CHUNK_SIZE,
+                   previous: Optional[LibraryManifest] = None,
+                   workers: int = 4) -> LibraryManifest:
+    """
+    List a library and hash its files.
+
+    Files whose size and mtime match ``previous`` keep their hashes, so
+    rebuilding the manifest of an unchanged library only costs a walk.
+
+    Args:
+        roots: Library root per content kind
+        chunk_size: Bytes per hashed chunk
+        previous: Earlier manifest of the same library
+        workers: Threads hashing files in parallel
+
+    Returns:
+        The manifest
+    """
+    if previous is not None and previous.chunk_size != chunk_size:
+        previous = None
+    manifest = LibraryManifest(chunk_size)
+    to_hash: List[Tuple[FileEntry, str]] = []
+    for kind, root in roots.items():
+        for relative, st in _walk(kind, root):
+            entry = FileEntry(kind, relative, st.st_size, st.st_mtime)
+            known = previous.files.get(entry.key) if previous is not None else None
+            if known is not None and (known.size, known.mtime) == (entry.size, entry.mtime):
+                entry.chunks = known.chunks
+            else:
+                to_hash.append((entry, os.path.join(root, relative)))
+            manifest.files[entry.key] = entry
+
+    if to_hash:
+        logger.info('Hashing %d library files', len(to_hash))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(hash_chunks, full_path, chunk_size): entry
+                       for entry, full_path in to_hash}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    entry.chunks = future.result()
+                except OSError as e:
+                    logger.warning('Dropping unreadable file %s from the manifest: %s', entry.key, e)
+                    del manifest.files[entry.key]
+    return manifest
+
+
+@dataclass
+class FileChange:
+    """A file present on both sides with different content."""
+    entry: FileEntry  # Reference entry
+    chunks: List[int]  # Indices of the chunks that differ
+
+
+@dataclass
+class LibraryDelta:
+    """Differences between a local library and its reference."""
+    added: List[FileEntry] = field(default_factory=list)
+    changed: List[FileChange] = field(default_factory=list)
+    removed: List[FileEntry] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    @property
+    def chunks_to_fetch(self) -> int:
+        return (sum(len(entry.chunks) for entry in self.added)
+                + sum(len(change.chunks) for change in self.changed))
+
+
+def diff_manifests(local: LibraryManifest, reference: LibraryManifest) -> LibraryDelta:
+    """
+    Compare a local manifest with the reference one.
+
+    Files are compared by content (size and chunk hashes); an mtime that
+    differs on its own is not a change.
+
+    Raises:
+        ValueError: If the manifests use different chunk sizes
+    """
+    if local.chunk_size != reference.chunk_size:
+        raise ValueError(f'Chunk sizes differ: {local.chunk_size} != {reference.chunk_size}')
+    delta = LibraryDelta()
+    for key, entry in reference.files.items():
+        mine = local.files.get(key)
+        if mine is None:
+            delta.added.append(entry)
+        elif mine.size != entry.size or mine.chunks != entry.chunks:
+            differing = [i for i, digest in enumerate(entry.chunks)
+                         if i >= len(mine.chunks) or mine.chunks[i] != digest]
+            delta.changed.append(FileChange(entry, differing))
+    delta.removed = [entry for key, entry in local.files.items() if key not in reference.files]
+    return delta
+
+
+# =============================================================================
+# Sources
+# =============================================================================
+
+def _safe_join(root: str, relative: str) -> str:
+    """Resolve a manifest path under its root, refusing paths that escape it."""
+    parts = relative.split('/')
+    if not relative or relative.startswith('/') or '..' in parts or '' in parts:
+        raise LibrarySyncError(f'Refusing library path {relative!r}')
+    return os.path.join(root, *parts)
+
+
+class DirectorySource:
+    """Reference library on a local or mounted filesystem."""
+
+    def __init__(self, roots: Dict[str, str], workers: int = 4):
+        """
+        Initialize the source.
+
+        Args:
+            roots: Library root per content kind
+            workers: Threads hashing files when building the manifest
+        """
+        self.roots = roots
+        self.workers = workers
+        self._manifest: Optional[LibraryManifest] = None
+
+    @classmethod
+    def mirror(cls, path: str, workers: int = 4) -> 'DirectorySource':
+        """Source for a mirror directory holding one subdirectory per kind."""
+        roots = {name: os.path.join(path, name) for name in sorted(os.listdir(path))
+                 if os.path.isdir(os.path.join(path, name)) and not name.startswith('.')}
+        return cls(roots, workers)
+
+    def manifest(self, chunk_size: int = CHUNK_SIZE) -> LibraryManifest:
+        self._manifest = build_manifest(self.roots, chunk_size, self._manifest, self.workers)
+        return self._manifest
+
+    def read(self, kind: str, path: str, offset: int, length: int) -> bytes:
+        root = self.roots.get(kind)
+        if root is None:
+            raise LibrarySyncError(f'Unknown content kind {kind!r}')
+        with open(_safe_join(root, path), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+class HTTPSource:
+    """Reference station serving its library with ``LibraryServer``."""
+
+    def __init__(self, base_url: str, session: Any = None, timeout: float = 60.0,
+                 token: Optional[str] = None):
+        """
+        Initialize the source.
+
+        Args:
+            base_url: URL of the reference station's library server
+            session: HTTP session (a pooled ``requests.Session`` if None)
+            timeout: Request timeout in seconds
+            token: Shared token the library server requires, if any
+        """
+        if session is None:
+            from techaura_station.client import make_session
+            session = make_session()
+        self.base_url = base_url.rstrip('/')
+        self.session = session
+        self.timeout = timeout
+        self.token = token
+
+    def _get(self, path: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        headers = dict(headers or {})
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        try:
+            response = self.session.get(f'{self.base_url}{path}', headers=headers,
+                                        timeout=self.timeout)
+        except Exception as e:
+            raise LibrarySyncError(f'Library request {path} failed: {e}') from e
+        if response.status_code not in (200, 206):
+            raise LibrarySyncError(f'Library request {path} returned {response.status_code}')
+        return response
+
+    def manifest(self, chunk_size: int = CHUNK_SIZE) -> LibraryManifest:
+        try:
+            return LibraryManifest.from_dict(self._get('/manifest.json').json())
+        except (ValueError, KeyError, TypeError) as e:
+            raise LibrarySyncError(f'Invalid manifest from {self.base_url}: {e}') from e
+
+    def read(self, kind: str, path: str, offset: int, length: int) -> bytes:
+        response = self._get(f'/files/{quote(kind)}/{quote(path)}',
+                             headers={'Range': f'bytes={offset}-{offset + length - 1}'})
+        data = response.content
+        if response.status_code == 200:
+            # Server ignored the range
+            data = data[offset:offset + length]
+        return data
+
+
+def open_source(spec: str, workers: int = 4, token: Optional[str] = None) -> Any:
+    """Source for a reference station URL or a mirror directory path."""
+    if spec.startswith(('http://', 'https://')):
+        return HTTPSource(spec, token=token)
+    return DirectorySource.mirror(spec, workers)
+
+
+class LibraryServer:
+    """
+    Serves a station's library to other stations.
+
+    ``GET /manifest.json`` returns the manifest and
+    ``GET /files/<kind>/<path>`` returns file contents, honouring single
+    ``Range: bytes=a-b`` requests. The manifest is cached for
+    ``manifest_ttl`` seconds; a rebuild only hashes files changed since the
+    previous one, but still walks the whole library.
+
+    The server listens on the loopback interface by default. When exposed
+    to other stations, set ``token`` so every request must carry
+    ``Authorization: Bearer <token>``.
+    """
+
+    def __init__(self, roots: Dict[str, str], host: str = '127.0.0.1', port: int = 8765,
+                 chunk_size: int = CHUNK_SIZE, workers: int = 4, token: Optional[str] = None,
+                 manifest_ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.source = DirectorySource(roots, workers)
+        self.chunk_size = chunk_size
+        self.token = token
+        self.manifest_ttl = manifest_ttl
+        self.clock = clock
+        self._manifest_lock = threading.Lock()
+        self._manifest: Optional[Tuple[float, bytes]] = None  # (built at, body)
+        self._thread: Optional[threading.Thread] = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def _manifest_bytes(self) -> bytes:
+        with self._manifest_lock:
+            now = self.clock()
+            if self._manifest is None or now - self._manifest[0] >= self.manifest_ttl:
+                manifest = self.source.manifest(self.chunk_size)
+                body = json.dumps(manifest.to_dict(), ensure_ascii=False, separators=(',', ':')).encode()
+                self._manifest = (now, body)
+            return self._manifest[1]
+
+    def _authorized(self, header: Optional[str]) -> bool:
+        if not self.token:
+            return True
+        return hmac.compare_digest((header or '').encode(), f'Bearer {self.token}'.encode())
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug('Library server: ' + format, *args)
+
+            def do_GET(self) -> None:
+                if not server._authorized(self.headers.get('Authorization')):
+                    self._reply(401, b'Unauthorized')
+                    return
+                if self.path == '/manifest.json':
+                    self._reply(200, server._manifest_bytes(), 'application/json')
+                    return
+                prefix, _, rest = self.path.partition('/files/')
+                kind, _, relative = rest.partition('/')
+                root = server.source.roots.get(unquote(kind))
+                if prefix or root is None:
+                    self._reply(404, b'Not found')
+                    return
+                try:
+                    full_path = _safe_join(root, unquote(relative))
+                    size = os.path.getsize(full_path)
+                except (LibrarySyncError, OSError):
+                    self._reply(404, b'Not found')
+                    return
+                start, end = 0, size - 1
+                status = 200
+                spec = self.headers.get('Range', '')
+                if spec.startswith('bytes='):
+                    first, _, last = spec[6:].partition('-')
+                    try:
+                        start = int(first)
+                        end = min(int(last), size - 1) if last else size - 1
+                    except ValueError:
+                        self._reply(416, b'Bad range')
+                        return
+                    status = 206
+                with open(full_path, 'rb') as f:
+                    f.seek(start)
+                    data = f.read(max(0, end - start + 1))
+                headers = {'Content-Range': f'bytes {start}-{end}/{size}'} if status == 206 else {}
+                self._reply(status, data, 'application/octet-stream', headers)
+
+            def _reply(self, status: int, body: bytes, content_type: str = 'text/plain',
+                       headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> None:
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name='library-server')
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# =============================================================================
+# Sync
+# =============================================================================
+
+@dataclass
+class SyncResult:
+    """Outcome of one library sync."""
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    bytes_fetched: int = 0
+    bytes_reused: int = 0
+    failed: List[str] = field(default_factory=list)  # Manifest keys
+
+
+def _patch_file(source: Any, entry: FileEntry, target: str, local: Optional[FileEntry],
+                chunk_size: int) -> Tuple[int, int]:
+    """
+    Rebuild one file from local and fetched chunks, then move it into place.
+
+    Returns:
+        Bytes fetched and bytes reused
+
+    Raises:
+        LibrarySyncError: If a fetched chunk does not match its hash
+    """
+    directory, name = os.path.split(target)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f'.{name}{_PARTIAL_SUFFIX}')
+    fetched = reused = 0
+    old = open(target, 'rb') if local is not None else None
+    try:
+        with open(tmp_path, 'wb') as out:
+            for i, digest in enumerate(entry.chunks):
+                offset = i * chunk_size
+                length = min(chunk_size, entry.size - offset)
+                if local is not None and i < len(local.chunks) and local.chunks[i] == digest:
+                    old.seek(offset)
+                    data = old.read(length)
+                    reused += len(data)
+                else:
+                    data = source.read(entry.kind, entry.path, offset, length)
+                    fetched += len(data)
+                if hashlib.blake2b(data, digest_size=16).hexdigest() != digest:
+                    raise LibrarySyncError(f'Chunk {i} of {entry.key} does not match the manifest')
+                out.write(data)
+        os.replace(tmp_path, target)
+        os.utime(target, (entry.mtime, entry.mtime))
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        if old is not None:
+            old.close()
+    return fetched, reused
+
+
+def _prune_empty_dirs(path: str, root: str) -> None:
+    """Remove the now-empty directories between a removed file and its root."""
+    directory = os.path.dirname(path)
+    while os.path.abspath(directory) != os.path.abspath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def sync_library(roots: Dict[str, str], source: Any, workers: int = 4,
+                 manifest_path: Optional[str] = None, delete: bool = True,
+                 index: Optional[ContentIndex] = None) -> SyncResult:
+    """
+    Bring a local library up to date with a reference.
+
+    Args:
+        roots: Local library root per content kind (kinds without a local
+            root are skipped)
+        source: Reference (``DirectorySource``, ``HTTPSource``)
+        workers: Files patched in parallel
+        manifest_path: Where the local manifest is cached between syncs
+        delete: Remove local files the reference does not have (only for
+            kinds the reference has files of)
+        index: Search index updated with added and removed files
+
+    Returns:
+        What was transferred; files that failed stay as they were and are
+        retried by the next sync
+    """
+    reference = source.manifest()
+    previous = LibraryManifest.load(manifest_path) if manifest_path else None
+    local = build_manifest(roots, reference.chunk_size, previous, workers)
+    delta = diff_manifests(local, reference)
+    result = SyncResult()
+
+    tasks: List[Tuple[FileEntry, Optional[FileEntry]]] = []
+    for entry in delta.added:
+        tasks.append((entry, None))
+    for change in delta.changed:
+        tasks.append((change.entry, local.files[change.entry.key]))
+    skipped = {entry.kind for entry, _ in tasks if entry.kind not in roots}
+    if skipped:
+        logger.warning('No local root for %s; not syncing those files', ', '.join(sorted(skipped)))
+    tasks = [(entry, mine) for entry, mine in tasks if entry.kind in roots]
+    if tasks:
+        logger.info('Syncing %d library files (%d chunks to fetch)', len(tasks), delta.chunks_to_fetch)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for entry, mine in tasks:
+            try:
+                target = _safe_join(roots[entry.kind], entry.path)
+            except LibrarySyncError as e:
+                logger.warning('%s', e)
+                result.failed.append(entry.key)
+                continue
+            futures[pool.submit(_patch_file, source, entry, target, mine,
+                                reference.chunk_size)] = (entry, mine, target)
+        for future in as_completed(futures):
+            entry, mine, target = futures[future]
+            try:
+                fetched, reused = future.result()
+            except (LibrarySyncError, OSError) as e:
+                logger.warning('Library sync of %s failed: %s', entry.key, e)
+                result.failed.append(entry.key)
+                local.files.pop(entry.key, None)  # Re-hash next time
+                continue
+            result.bytes_fetched += fetched
+            result.bytes_reused += reused
+            local.files[entry.key] = FileEntry(entry.kind, entry.path, entry.size,
+                                               os.stat(target).st_mtime, entry.chunks)
+            if mine is None:
+                result.added += 1
+                if index is not None:
+                    index.add_file(target, entry.kind, roots[entry.kind])
+            else:
+                result.changed += 1
+
+    if delete:
+        # A reference without any file of a kind (e.g. a mirror lacking a
+        # movies directory) says nothing about that kind: keep local files
+        synced_kinds = {entry.kind for entry in reference.files.values()}
+        for entry in delta.removed:
+            if entry.kind not in synced_kinds:
+                continue
+            target = os.path.join(roots[entry.kind], *entry.path.split('/'))
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning('Could not remove %s: %s', target, e)
+                continue
+            _prune_empty_dirs(target, roots[entry.kind])
+            del local.files[entry.key]
+            result.removed += 1
+            if index is not None:
+                index.remove(target)
+
+    if manifest_path:
+        local.save(manifest_path)
+    logger.info('Library sync: %d added, %d changed, %d removed, %d MB fetched, %d MB reused',
+                result.added, result.changed, result.removed,
+                result.bytes_fetched // 2 ** 20, result.bytes_reused // 2 ** 20)
+    return result
+
+
+class LibraryReplica:
+    """Keeps a station's library in sync with a reference in the background."""
+
+    def __init__(self, roots: Dict[str, str], source: Any, index: Optional[ContentIndex] = None,
+                 manifest_path: Optional[str] = None, interval: float = 3600.0,
+                 workers: int = 4):
+        """
+        Initialize the replica.
+
+        Args:
+            roots: Local library root per content kind
+            source: Reference (``DirectorySource``, ``HTTPSource``)
+            index: Search index kept current with the synced files
+            manifest_path: Where the local manifest is cached between syncs
+            interval: Seconds between background syncs
+            workers: Files patched in parallel
+        """
+        self.roots = roots
+        self.source = source
+        self.index = index
+        self.manifest_path = manifest_path
+        self.interval = interval
+        self.workers = workers
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync(self) -> SyncResult:
+        return sync_library(self.roots, self.source, self.workers, self.manifest_path,
+                            index=self.index)
+
+    def start(self) -> None:
+        """Sync in a background thread every ``interval`` seconds."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='library-sync')
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background sync (an in-progress sync finishes first)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning('Library sync failed: %s', e)
@@ -0,0 +1,344 @@
+"""
+Content matching for USB orders.
+
+Resolves the genres, artists, videos and movies requested by an order
+against the local media library. Instead of scanning every file name with a
+case-sensitive substring test for every term, the library is indexed once
+into an inverted token index plus a trigram index over the token vocabulary:
+
+- Text is folded (accents, case and punctuation removed) so that
+  "Joe Arroyo" matches ``joe_arroyo.mp3`` and "Norteñas" matches "Nortenas".
+- Exact tokens hit the inverted index directly; near-miss spellings are
+  expanded through the trigram index and ranked by similarity.
+- Results are memoized per folded term, so the index is meant to be built
+  once and shared by every order the burn worker processes.
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+
+# =============================================================================
+# Constants
+# =============================================================================
+
+VALID_EXTENSIONS: Dict[str, Tuple[str, ...]] = {
+    'music': ('.mp3', '.wav', '.flac', '.ogg', '.aac', '.m4a'),
+    'videos': ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.webm'),
+    'movies': ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.webm'),
+}
+
+# Letters that NFKD does not decompose into a base letter + combining mark
+_LIGATURES = str.maketrans({
+    'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ß': 'ss', 'đ': 'd', 'ł': 'l', 'ı': 'i',
+})
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Tokens shorter than this only match exactly (trigrams are meaningless)
+_MIN_FUZZY_LENGTH = 3
+
+
+# =============================================================================
+# Text Folding
+# =============================================================================
+
+def fold_text(text: str) -> str:
+    """
+    Normalize text for matching.
+
+    Lowercases, strips accents and replaces every run of punctuation,
+    underscores or whitespace with a single space.
+
+    Args:
+        text: Arbitrary text (file name, genre, artist...)
+
+    Returns:
+        The folded text, e.g. ``"Norteñas - Los Tigres"`` -> ``"nortenas los tigres"``
+    """
+    lowered = text.lower().translate(_LIGATURES)
+    decomposed = unicodedata.normalize('NFKD', lowered)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', stripped).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Fold text and split it into tokens."""
+    folded = fold_text(text)
+    return folded.split() if folded else []
+
+
+def _trigrams(token: str) -> Set[str]:
+    """Get the padded trigrams of a token."""
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# =============================================================================
+# Inverted Index
+# =============================================================================
+
+class MatchResult(NamedTuple):
+    """A library file matched by a search term."""
+    path: str
+    kind: str
+    score: float
+
+
+class ContentIndex:
+    """
+    Inverted token/trigram index over the media library.
+
+    Each indexed file is a document whose text is its path relative to the
+    library root (so genre folders such as ``Salsa/`` contribute tokens) plus
+    any extra text supplied by the caller, e.g. audio tags.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.5,
+                 cache_size: int = 4096):
+        """
+        Initialize an empty index.
+
+        Args:
+            similarity_threshold: Minimum trigram similarity (0-1) for a
+                vocabulary token to count as a fuzzy match of a query token
+            cache_size: Maximum number of memoized search results
+        """
+        self.similarity_threshold = similarity_threshold
+        self.cache_size = cache_size
+        self._paths: List[str] = []
+        self._kinds: List[str] = []
+        self._path_ids: Dict[str, int] = {}
+        self._removed: Set[int] = set()  # Tombstoned doc ids
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._trigram_vocab: Dict[str, Set[str]] = defaultdict(set)
+        self._expansions: Dict[str, List[Tuple[str, float]]] = {}
+        self._results: 'OrderedDict[Tuple, List[MatchResult]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, roots: Dict[str, Union[str, Sequence[str]]],
+              extensions: Optional[Dict[str, Tuple[str, ...]]] = None,
+              **kwargs) -> 'ContentIndex':
+        """
+        Build an index by walking the library roots.
+
+        Args:
+            roots: Mapping of content kind ('music', 'videos', 'movies') to
+                one or more root directories
+            extensions: Valid file extensions per kind (defaults to
+                VALID_EXTENSIONS)
+            **kwargs: Passed through to the constructor
+
+        Returns:
+            The populated index
+        """
+        extensions = extensions or VALID_EXTENSIONS
+        index = cls(**kwargs)
+        for kind, kind_roots in roots.items():
+            if isinstance(kind_roots, str):
+                kind_roots = [kind_roots]
+            for root in kind_roots:
+                for dirpath, _dirnames, filenames in os.walk(root):
+                    for filename in filenames:
+                        index.add_file(os.path.join(dirpath, filename), kind, root, extensions)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._paths) - len(self._removed)
+
+    def __contains__(self, path: str) -> bool:
+        doc_id = self._path_ids.get(path)
+        return doc_id is not None and doc_id not in self._removed
+
+    def add_file(self, path: str, kind: str, root: str,
+                 extensions: Optional[Dict[str, Tuple[str, ...]]] = None) -> Optional[int]:
+        """
+        Add a library file, indexed by its path relative to its root.
+
+        Args:
+            path: Absolute path of the file
+            kind: Content kind of the file
+            root: Library root the file belongs to
+            extensions: Valid file extensions per kind (defaults to
+                VALID_EXTENSIONS)
+
+        Returns:
+            The internal document id, or None if the extension is not valid
+            for the kind
+        """
+        stem, ext = os.path.splitext(path)
+        if ext.lower() not in (extensions or VALID_EXTENSIONS).get(kind, ()):
+            return None
+        return self.add(path, kind, os.path.relpath(stem, root))
+
+    def remove(self, path: str) -> bool:
+        """
+        Remove a file from search results.
+
+        The document is tombstoned rather than unlinked from the postings,
+        so removal is O(1); adding the path again revives it.
+
+        Returns:
+            False if the path was not indexed
+        """
+        with self._lock:
+            doc_id = self._path_ids.get(path)
+            if doc_id is None or doc_id in self._removed:
+                return False
+            self._removed.add(doc_id)
+            self._results.clear()
+        return True
+
+    def add(self, path: str, kind: str, text: str,
+            extra: Iterable[str] = ()) -> int:
+        """
+        Add a file to the index.
+
+        Adding a path that is already indexed only merges the new tokens.
+
+        Args:
+            path: Absolute path of the file
+            kind: Content kind of the file
+            text: Primary text to index (usually the relative path)
+            extra: Additional text fields (e.g. artist/title tags)
+
+        Returns:
+            The internal document id
+        """
+        with self._lock:
+            doc_id = self._path_ids.get(path)
+            if doc_id is None:
+                doc_id = len(self._paths)
+                self._paths.append(path)
+                self._kinds.append(kind)
+                self._path_ids[path] = doc_id
+            self._removed.discard(doc_id)
+
+            for field in (text, *extra):
+                for token in tokenize(field):
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        postings = self._postings[token]
+                        for trigram in _trigrams(token):
+                            self._trigram_vocab[trigram].add(token)
+                        # A new vocabulary token can change any expansion
+                        self._expansions.clear()
+                    postings.add(doc_id)
+
+            self._results.clear()
+        return doc_id
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """
+        Get vocabulary tokens matching a query token.
+
+        Returns:
+            (vocabulary token, similarity) pairs sorted by ascending
+            similarity, so that later entries override earlier ones
+        """
+        cached = self._expansions.get(token)
+        if cached is not None:
+            return cached
+
+        if len(token) < _MIN_FUZZY_LENGTH:
+            expansion = [(token, 1.0)] if token in self._postings else []
+        else:
+            query_trigrams = _trigrams(token)
+            shared: Dict[str, int] = defaultdict(int)
+            for trigram in query_trigrams:
+                for candidate in self._trigram_vocab.get(trigram, ()):
+                    shared[candidate] += 1
+
+            expansion = []
+            for candidate, count in shared.items():
+                union = len(query_trigrams) + len(_trigrams(candidate)) - count
+                similarity = 1.0 if candidate == token else count / union
+                if similarity >= self.similarity_threshold:
+                    expansion.append((candidate, similarity))
+            expansion.sort(key=lambda pair: pair[1])
+
+        self._expansions[token] = expansion
+        return expansion
+
+    def search(self, term: str, kind: Optional[str] = None,
+               limit: Optional[int] = None) -> List[MatchResult]:
+        """
+        Find library files matching a term.
+
+        Every token of the term must match (exactly or fuzzily) a token of
+        the file. Files are ranked by mean token similarity, best first.
+
+        Args:
+            term: Genre, artist or title to look up
+            kind: Restrict results to one content kind
+            limit: Maximum number of results
+
+        Returns:
+            Ranked list of matches (empty if nothing matches)
+        """
+        query_tokens = list(dict.fromkeys(tokenize(term)))
+        if not query_tokens:
+            return []
+
+        key = (tuple(query_tokens), kind, limit)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+
+            scores: Optional[Dict[int, float]] = None
+            for token in query_tokens:
+                token_scores: Dict[int, float] = {}
+                for candidate, similarity in self._expand(token):
+                    token_scores.update(dict.fromkeys(self._postings[candidate], similarity))
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    if len(token_scores) < len(scores):
+                        scores, token_scores = token_scores, scores
+                    scores = {doc_id: score + token_scores[doc_id]
+                              for doc_id, score in scores.items()
+                              if doc_id in token_scores}
+                if not scores:
+                    break
+
+            # Stable sort: equal scores keep library (insertion) order
+            ranked = sorted((scores or {}).items(), key=itemgetter(1), reverse=True)
+            paths, kinds = self._paths, self._kinds
+            count = len(query_tokens)
+            if self._removed:
+                ranked = [pair for pair in ranked if pair[0] not in self._removed]
+            if kind is not None:
+                ranked = [pair for pair in ranked if kinds[pair[0]] == kind]
+            if limit is not None:
+                ranked = ranked[:limit]
+            results = [MatchResult(paths[doc_id], kinds[doc_id], score / count)
+                       for doc_id, score in ranked]
+
+            self._results[key] = results
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return results
+
+    def resolve(self, terms: Iterable[str], kind: Optional[str] = None,
+                limit: Optional[int] = None) -> Dict[str, List[MatchResult]]:
+        """
+        Resolve every term of an order.
+
+        Args:
+            terms: Genres, artists or titles requested by the order
+            kind: Restrict results to one content kind
+            limit: Maximum number of results per term
+
+        Returns:
+            Mapping of each term to its ranked matches
+        """
+        return {term: self.search(term, kind=kind, limit=limit) for term in terms}
@@ -0,0 +1,466 @@
+"""
+Audio metadata extraction and cache.
+
+Reads artist/title/album/genre tags plus duration and bitrate from the
+library's audio files so that artist matching and playlists no longer depend
+on how a file happens to be named.
+
+Tags are read with ``mutagen`` when it is installed. Without it, a built-in
+reader handles the formats that make up the bulk of the library: MP3 (ID3v2,
+ID3v1 and the MPEG frame header) and FLAC (Vorbis comments + STREAMINFO).
+
+Extraction runs in a process pool and results are stored in a SQLite cache
+keyed by (path, mtime, size), so a rescan only parses new or modified files.
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from techaura_station.matching import VALID_EXTENSIONS, ContentIndex
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass
+class AudioMetadata:
+    """Tags and stream properties of an audio file."""
+    path: str
+    artist: Optional[str] = None
+    title: Optional[str] = None
+    album: Optional[str] = None
+    genre: Optional[str] = None
+    duration: Optional[float] = None  # seconds
+    bitrate: Optional[int] = None  # kbps
+
+    def to_dict(self) -> Dict[str, object]:
+        """Convert metadata to dictionary format, skipping unknown fields."""
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+@dataclass
+class ScanResult:
+    """Summary of a cache refresh."""
+    total: int = 0
+    parsed: int = 0
+    removed: int = 0
+    failed: int = 0
+
+
+# =============================================================================
+# Built-in Tag Readers
+# =============================================================================
+
+_ID3_TEXT_FRAMES = {
+    'TPE1': 'artist', 'TIT2': 'title', 'TALB': 'album', 'TCON': 'genre',
+    'TP1': 'artist', 'TT2': 'title', 'TAL': 'album', 'TCO': 'genre',
+}
+
+_ID3_ENCODINGS = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}
+
+# MPEG-1 Layer III bitrates (kbps) by header index; MPEG-2/2.5 use the second row
+_MP3_BITRATES = (
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+)
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+_VORBIS_FIELDS = {'ARTIST': 'artist', 'TITLE': 'title', 'ALBUM': 'album', 'GENRE': 'genre'}
+
+
+def _syncsafe(data: bytes) -> int:
+    """Decode a 4-byte ID3v2 syncsafe integer."""
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_id3_text(payload: bytes) -> Optional[str]:
+    """Decode an ID3v2 text frame payload."""
+    if not payload:
+        return None
+    encoding = _ID3_ENCODINGS.get(payload[0], 'latin-1')
+    text = payload[1:].decode(encoding, errors='replace')
+    # Multiple values are NUL separated; keep the first
+    text = text.split('\x00')[0].strip()
+    return text or None
+
+
+def _read_id3v2(data: bytes, meta: AudioMetadata) -> int:
+    """
+    Parse an ID3v2 tag at the start of the file.
+
+    Returns:
+        Size of the tag in bytes (0 if there is none)
+    """
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    version = data[3]
+    tag_size = _syncsafe(data[6:10]) + 10
+    pos = 10
+    header_size = 6 if version == 2 else 10
+
+    while pos + header_size <= min(tag_size, len(data)):
+        if version == 2:
+            frame_id = data[pos:pos + 3].decode('latin-1')
+            frame_size = int.from_bytes(data[pos + 3:pos + 6], 'big')
+        else:
+            frame_id = data[pos:pos + 4].decode('latin-1')
+            size_bytes = data[pos + 4:pos + 8]
+            frame_size = _syncsafe(size_bytes) if version >= 4 else int.from_bytes(size_bytes, 'big')
+        if not frame_id.strip('\x00') or frame_size <= 0:
+            break  # Padding
+        pos += header_size
+        attr = _ID3_TEXT_FRAMES.get(frame_id)
+        if attr and getattr(meta, attr) is None:
+            setattr(meta, attr, _decode_id3_text(data[pos:pos + frame_size]))
+        pos += frame_size
+    return tag_size
+
+
+def _read_id3v1(tail: bytes, meta: AudioMetadata) -> None:
+    """Fill missing fields from a trailing ID3v1 tag."""
+    if len(tail) < 128 or tail[-128:-125] != b'TAG':
+        return
+    tag = tail[-128:]
+    for attr, start, end in (('title', 3, 33), ('artist', 33, 63), ('album', 63, 93)):
+        if getattr(meta, attr) is None:
+            value = tag[start:end].split(b'\x00')[0].decode('latin-1').strip()
+            setattr(meta, attr, value or None)
+
+
+def _read_mpeg_stream(data: bytes, offset: int, file_size: int,
+                      meta: AudioMetadata) -> None:
+    """Read bitrate and duration from the first MPEG audio frame."""
+    pos = offset
+    while pos + 4 <= len(data):
+        if data[pos] == 0xFF and data[pos + 1] & 0xE0 == 0xE0:
+            header = struct.unpack('>I', data[pos:pos + 4])[0]
+            version = (header >> 19) & 0x3
+            layer = (header >> 17) & 0x3
+            bitrate_index = (header >> 12) & 0xF
+            rate_index = (header >> 10) & 0x3
+            if version != 1 and layer == 1 and 0 < bitrate_index < 15 and rate_index < 3:
+                break
+        pos += 1
+    else:
+        return
+
+    mono = (header >> 6) & 0x3 == 3
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+
+    # A Xing/Info header gives the exact frame count of VBR files
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info') and len(data) >= xing + 12 \
+            and data[xing + 7] & 0x1:
+        frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+        meta.duration = frames * samples_per_frame / sample_rate
+        if meta.duration:
+            meta.bitrate = int((file_size - pos) * 8 / meta.duration / 1000)
+        return
+
+    meta.bitrate = _MP3_BITRATES[0 if version == 3 else 1][bitrate_index]
+    meta.duration = (file_size - pos) * 8 / (meta.bitrate * 1000)
+
+
+def _read_mp3(path: str, meta: AudioMetadata) -> None:
+    """Read tags and stream properties of an MP3 file."""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        tag_size = _syncsafe(head[6:10]) + 10 if head[:3] == b'ID3' else 0
+        data = head + f.read(tag_size + 4096)
+        if file_size > 128:
+            f.seek(-128, os.SEEK_END)
+            tail = f.read(128)
+        else:
+            tail = b''
+    _read_id3v2(data, meta)
+    _read_id3v1(tail, meta)
+    _read_mpeg_stream(data, tag_size, file_size, meta)
+
+
+def _read_flac(path: str, meta: AudioMetadata) -> None:
+    """Read Vorbis comments and STREAMINFO of a FLAC file."""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if f.read(4) != b'fLaC':
+            return
+        last = False
+        while not last:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            last = bool(header[0] & 0x80)
+            block_type = header[0] & 0x7F
+            length = int.from_bytes(header[1:4], 'big')
+            block = f.read(length)
+            if block_type == 0 and len(block) >= 18:
+                bits = int.from_bytes(block[10:18], 'big')
+                sample_rate = bits >> 44
+                total_samples = bits & 0xFFFFFFFFF
+                if sample_rate and total_samples:
+                    meta.duration = total_samples / sample_rate
+                    meta.bitrate = int(file_size * 8 / meta.duration / 1000)
+            elif block_type == 4:
+                _read_vorbis_comment(block, meta)
+
+
+def _read_vorbis_comment(block: bytes, meta: AudioMetadata) -> None:
+    """Parse a Vorbis comment block."""
+    vendor_length = struct.unpack('<I', block[:4])[0]
+    pos = 4 + vendor_length
+    count = struct.unpack('<I', block[pos:pos + 4])[0]
+    pos += 4
+    for _ in range(count):
+        length = struct.unpack('<I', block[pos:pos + 4])[0]
+        pos += 4
+        entry = block[pos:pos + length].decode('utf-8', errors='replace')
+        pos += length
+        key, _, value = entry.partition('=')
+        attr = _VORBIS_FIELDS.get(key.upper())
+        if attr and getattr(meta, attr) is None and value.strip():
+            setattr(meta, attr, value.strip())
+
+
+def _read_with_mutagen(path: str, meta: AudioMetadata) -> bool:
+    """
+    Read metadata with mutagen if it is installed.
+
+    Returns:
+        True if mutagen handled the file
+    """
+    try:
+        import mutagen
+    except ImportError:
+        return False
+
+    audio = mutagen.File(path, easy=True)
+    if audio is None:
+        return False
+    for attr in ('artist', 'title', 'album', 'genre'):
+        values = audio.get(attr) if audio.tags is not None else None
+        if values:
+            setattr(meta, attr, str(values[0]).strip() or None)
+    info = getattr(audio, 'info', None)
+    if info is not None:
+        meta.duration = getattr(info, 'length', None)
+        bitrate = getattr(info, 'bitrate', None)
+        meta.bitrate = int(bitrate / 1000) if bitrate else None
+    return True
+
+
+def read_metadata(path: str) -> AudioMetadata:
+    """
+    Read the metadata of an audio file.
+
+    Args:
+        path: Path of the audio file
+
+    Returns:
+        The extracted metadata; fields that could not be read are None
+    """
+    meta = AudioMetadata(path=path)
+    if _read_with_mutagen(path, meta):
+        return meta
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.mp3':
+        _read_mp3(path, meta)
+    elif ext == '.flac':
+        _read_flac(path, meta)
+    return meta
+
+
+def _safe_read_metadata(path: str) -> Tuple[str, Optional[AudioMetadata], Optional[str]]:
+    """Process pool entry point: never raises, returns (path, meta, error)."""
+    try:
+        return path, read_metadata(path), None
+    except Exception as e:  # Corrupt files must not abort the whole scan
+        return path, None, f'{type(e).__name__}: {e}'
+
+
+# =============================================================================
+# Metadata Cache
+# =============================================================================
+
+_META_COLUMNS = [f.name for f in fields(AudioMetadata) if f.name != 'path']
+
+
+class MetadataCache:
+    """
+    Incrementally updated metadata cache backed by SQLite.
+
+    An entry is valid as long as the file's mtime and size are unchanged.
+    """
+
+    def __init__(self, db_path: str = ':memory:'):
+        """
+        Open (or create) the cache.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS audio_metadata ('
+                ' path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL,'
+                ' size INTEGER NOT NULL, artist TEXT, title TEXT, album TEXT,'
+                ' genre TEXT, duration REAL, bitrate INTEGER)'
+            )
+
+    def close(self) -> None:
+        """Close the underlying database."""
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM audio_metadata').fetchone()[0]
+
+    def get(self, path: str) -> Optional[AudioMetadata]:
+        """Get the cached metadata of a file (without checking staleness)."""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(_META_COLUMNS)} FROM audio_metadata WHERE path = ?',
+                (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return AudioMetadata(path, *row)
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, AudioMetadata]:
+        """Get cached metadata for several files at once."""
+        return {path: meta for path in paths
+                if (meta := self.get(path)) is not None}
+
+    def iter_all(self) -> Iterator[AudioMetadata]:
+        """Iterate over every cached entry."""
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT path, {", ".join(_META_COLUMNS)} FROM audio_metadata'
+            ).fetchall()
+        for row in rows:
+            yield AudioMetadata(*row)
+
+    def _stamps(self) -> Dict[str, Tuple[int, int]]:
+        with self._lock:
+            return {path: (mtime_ns, size) for path, mtime_ns, size in
+                    self._conn.execute('SELECT path, mtime_ns, size FROM audio_metadata')}
+
+    def refresh(self, roots: Union[str, Sequence[str]],
+                extensions: Sequence[str] = VALID_EXTENSIONS['music'],
+                workers: Optional[int] = None,
+                chunksize: int = 64) -> ScanResult:
+        """
+        Bring the cache up to date with the library.
+
+        Only files that are new or whose (mtime, size) changed are parsed;
+        entries for files that no longer exist are removed.
+
+        Args:
+            roots: One or more library root directories
+            extensions: Audio file extensions to scan
+            workers: Size of the process pool (defaults to the CPU count);
+                use 1 to parse in the calling process
+            chunksize: Number of files handed to a pool worker at a time
+
+        Returns:
+            Summary of the refresh
+        """
+        if isinstance(roots, str):
+            roots = [roots]
+        known = self._stamps()
+        result = ScanResult()
+        seen = set()
+        stale: List[str] = []
+        stamps: Dict[str, Tuple[int, int]] = {}
+
+        for root in roots:
+            for dirpath, _dirnames, filenames in os.walk(root):
+                for filename in filenames:
+                    if os.path.splitext(filename)[1].lower() not in extensions:
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    stamp = (st.st_mtime_ns, st.st_size)
+                    if known.get(path) != stamp:
+                        stale.append(path)
+                        stamps[path] = stamp
+        result.total = len(seen)
+
+        if stale:
+            if workers == 1 or len(stale) < chunksize:
+                parsed = map(_safe_read_metadata, stale)
+                self._store(parsed, stamps, result)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    parsed = pool.map(_safe_read_metadata, stale, chunksize=chunksize)
+                    self._store(parsed, stamps, result)
+
+        vanished = [path for path in known if path not in seen
+                    and any(path.startswith(os.path.join(root, '')) for root in roots)]
+        if vanished:
+            with self._lock, self._conn:
+                self._conn.executemany('DELETE FROM audio_metadata WHERE path = ?',
+                                       [(path,) for path in vanished])
+            result.removed = len(vanished)
+        return result
+
+    def _store(self, parsed: Iterable[Tuple[str, Optional[AudioMetadata], Optional[str]]],
+               stamps: Dict[str, Tuple[int, int]], result: ScanResult) -> None:
+        """Upsert parsed metadata in batches."""
+        placeholders = ', '.join('?' * (len(_META_COLUMNS) + 3))
+        sql = (f'INSERT OR REPLACE INTO audio_metadata '
+               f'(path, mtime_ns, size, {", ".join(_META_COLUMNS)}) VALUES ({placeholders})')
+        batch = []
+        for path, meta, error in parsed:
+            if meta is None:
+                logger.warning('Could not read metadata of %s: %s', path, error)
+                result.failed += 1
+                # Cache the failure too, so the file is not re-parsed every scan
+                meta = AudioMetadata(path)
+            else:
+                result.parsed += 1
+            batch.append((path, *stamps[path], *(getattr(meta, c) for c in _META_COLUMNS)))
+            if len(batch) >= 500:
+                with self._lock, self._conn:
+                    self._conn.executemany(sql, batch)
+                batch = []
+        if batch:
+            with self._lock, self._conn:
+                self._conn.executemany(sql, batch)
+
+    def apply_to_index(self, index: ContentIndex, kind: str = 'music') -> int:
+        """
+        Add cached artist/title/album text to the content index.
+
+        Args:
+            index: Content index to enrich
+            kind: Content kind of the cached files
+
+        Returns:
+            Number of files enriched
+        """
+        count = 0
+        for meta in self.iter_all():
+            extra = [v for v in (meta.artist, meta.title, meta.album) if v]
+            if extra:
+                index.add(meta.path, kind, '', extra=extra)
+                count += 1
+        return count
@@ -0,0 +1,274 @@
+"""
+In-process mirror of order state.
+
+Workers check an order's status before and after each burn. Fetching
+``GET /orders/:orderId`` every time costs one request per check per worker.
+The mirror keeps order state in memory instead and keeps it current from the
+server's delta endpoint (``GET /orders/changes?since=N``). That endpoint
+returns the burning-queue items changed after change version ``N``, plus the
+orders removed since then. One delta request per sync interval keeps every
+mirrored order current, so status checks become memory reads. Every entry
+is keyed like the queue, by order number (see ``queue_key``), and carries a
+burning-queue status: orders fetched one by one (``GET /orders/:orderNumber``)
+have their order status translated (see ``queue_status``).
+
+Entries are bounded by an LRU limit. Entries not covered by a recent sync
+(orders fetched one by one, or a mirror whose sync has stalled) expire after
+``ttl`` seconds. Concurrent misses for the same order share one request
+(single-flight).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Order status -> burning-queue status, for orders fetched one by one
+_QUEUE_STATUSES = {
+    'draft': 'pending',
+    'pending': 'pending',
+    'confirmed': 'queued',
+    'processing': 'queued',
+    'burning': 'burning',
+    'ready_for_shipping': 'completed',
+    'completed': 'completed',
+    'shipped': 'completed',
+    'delivered': 'completed',
+    'burning_failed': 'failed',
+    'failed': 'failed',
+    'error': 'failed',
+    'cancelled': 'failed',
+}
+
+
+@dataclass
+class _Entry:
+    order: Dict[str, Any]
+    stored_at: float
+    synced: bool  # Kept current by delta syncs
+
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    order: Optional[Dict[str, Any]] = None
+    error: Optional[Exception] = None
+
+
+def _order_id(order: Dict[str, Any]) -> str:
+    return str(order.get('orderId', order.get('order_id')))
+
+
+def queue_key(order: Dict[str, Any]) -> str:
+    """
+    Key under which a station order appears in the delta feed.
+
+    Burning-queue items are keyed by order number, while stations address
+    orders by their ``order_id``; orders without a number fall back to it.
+    """
+    return str(order.get('order_number', order.get('orderNumber', order.get('order_id'))))
+
+
+def queue_status(status: Optional[str]) -> Optional[str]:
+    """Translate an order status into the burning-queue status the feed uses."""
+    return _QUEUE_STATUSES.get(status, status) if status is not None else None
+
+
+class OrderMirror:
+    """Order state kept current from delta syncs."""
+
+    def __init__(self, client: Any, ttl: float = 300.0, max_entries: int = 10000,
+                 sync_interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the mirror.
+
+        Args:
+            client: TechAura API client (``get_order_changes`` and ``get_order``)
+            ttl: Seconds an entry stays valid without a successful sync
+            max_entries: Maximum mirrored orders (least recently used are
+                evicted first)
+            sync_interval: Seconds between background delta syncs
+            clock: Time source (seconds)
+        """
+        self.client = client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self.version = 0
+        self.last_sync: Optional[float] = None
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    # -- Sync ------------------------------------------------------------------
+
+    def sync(self) -> int:
+        """
+        Apply the changes made since the last sync.
+
+        Concurrent callers wait for the sync in progress instead of starting
+        another one.
+
+        Returns:
+            Number of orders updated or removed
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            # Another thread is syncing: its result is as fresh as ours
+            with self._sync_lock:
+                return 0
+        try:
+            changes = self.client.get_order_changes(since=self.version)
+            now = self.clock()
+            with self._lock:
+                if changes.get('full'):
+                    # Snapshot: anything mirrored from the feed but absent is gone
+                    for order_id in [k for k, e in self._entries.items() if e.synced]:
+                        del self._entries[order_id]
+                for order in changes.get('items', []):
+                    self._store(_order_id(order), order, now, synced=True)
+                for order_id in changes.get('removed', []):
+                    self._entries.pop(str(order_id), None)
+                self.version = changes.get('version', self.version)
+                self.last_sync = now
+            return len(changes.get('items', [])) + len(changes.get('removed', []))
+        finally:
+            self._sync_lock.release()
+
+    def start(self) -> None:
+        """Sync in a background thread every ``sync_interval`` seconds."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='order-mirror')
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background sync."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning('Order mirror sync failed: %s', e)
+            self._stop.wait(self.sync_interval)
+
+    # -- Reads -----------------------------------------------------------------
+
+    def _store(self, order_id: str, order: Dict[str, Any], now: float, synced: bool) -> None:
+        self._entries[order_id] = _Entry(order, now, synced)
+        self._entries.move_to_end(order_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _fresh(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """Get a valid entry and mark it recently used (lock held)."""
+        entry = self._entries.get(order_id)
+        if entry is None:
+            return None
+        now = self.clock()
+        validated = entry.stored_at
+        if entry.synced and self.last_sync is not None:
+            validated = max(validated, self.last_sync)
+        if now - validated > self.ttl:
+            del self._entries[order_id]
+            return None
+        self._entries.move_to_end(order_id)
+        return entry.order
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get an order, from memory when mirrored.
+
+        Args:
+            order_id: Queue key of the order (its order number)
+
+        Returns:
+            The order dictionary with a burning-queue ``status``, or None if
+            the server does not know it
+        """
+        order_id = str(order_id)
+        with self._lock:
+            order = self._fresh(order_id)
+            if order is not None:
+                return order
+            flight = self._flights.get(order_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[order_id] = _Flight()
+        if leader:
+            try:
+                order = self.client.get_order(order_id)
+                if order is not None:
+                    flight.order = dict(order, status=queue_status(order.get('status')))
+                    with self._lock:
+                        self._store(order_id, flight.order, self.clock(), synced=False)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[order_id]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.order
+
+    def get_orders(self, order_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get several orders.
+
+        Misses first trigger one delta sync, which usually covers them;
+        only orders still missing are fetched one by one.
+
+        Args:
+            order_ids: Queue keys of the orders (their order numbers)
+
+        Returns:
+            Mapping of queue key to order for the orders the server knows
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        with self._lock:
+            found = {order_id: order for order_id in order_ids
+                     if (order := self._fresh(order_id)) is not None}
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        if missing:
+            self.sync()
+            with self._lock:
+                for order_id in missing:
+                    order = self._fresh(order_id)
+                    if order is not None:
+                        found[order_id] = order
+            for order_id in missing:
+                if order_id not in found:
+                    order = self.get_order(order_id)
+                    if order is not None:
+                        found[order_id] = order
+        return found
+
+    def status(self, order_id: str) -> Optional[str]:
+        """Get the queue status of a mirrored order without any request (None if not mirrored)."""
+        with self._lock:
+            order = self._fresh(str(order_id))
+        return None if order is None else order.get('status')
+
+    def invalidate(self, order_id: str) -> None:
+        """Drop an order, e.g. after this station changed its status."""
+        with self._lock:
+            self._entries.pop(str(order_id), None)
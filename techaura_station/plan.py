@@ -0,0 +1,137 @@
+"""
+Copy plans for USB orders.
+
+A copy plan is the resolved list of (source file, destination path) pairs for
+one order. The destination layout mirrors the Node.js burner
+(``prepararYCopiarPedido`` in ``src/usbManager.ts``)::
+
+    MUSICA/<GENRE>/<file>
+    MUSICA/ARTISTAS/<ARTIST>/<file>
+    VIDEOS/<TOPIC>/<file>
+    PELICULAS/<file>
+
+Files are never copied twice within the same section, even when they match
+several genres or artists.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from techaura_station.matching import ContentIndex
+
+
+@dataclass(frozen=True)
+class CopyItem:
+    """A single file to write to the USB device."""
+    source: str
+    destination: str  # Relative to the device mount point
+    size: int
+
+
+@dataclass
+class CopyPlan:
+    """Resolved content of an order."""
+    order_id: str
+    items: List[CopyItem] = field(default_factory=list)
+    unmatched: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)  # Destinations that did not fit
+
+    @property
+    def total_bytes(self) -> int:
+        """Total number of bytes the plan writes."""
+        return sum(item.size for item in self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+_CAPACITY_PATTERN = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*(KB|MB|GB|TB)?\s*$', re.IGNORECASE)
+_CAPACITY_UNITS = {'KB': 10 ** 3, 'MB': 10 ** 6, 'GB': 10 ** 9, 'TB': 10 ** 12}
+
+# Share of the advertised capacity usable for content (filesystem overhead,
+# vendor rounding)
+USABLE_CAPACITY_RATIO = 0.92
+
+
+def parse_capacity(capacity: str) -> Optional[int]:
+    """
+    Parse an order capacity such as ``'16GB'`` into usable bytes.
+
+    Args:
+        capacity: Advertised capacity (decimal units, GB when omitted)
+
+    Returns:
+        Usable bytes, or None if the capacity cannot be parsed
+    """
+    match = _CAPACITY_PATTERN.match(str(capacity or ''))
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', '.'))
+    unit = (match.group(2) or 'GB').upper()
+    return int(value * _CAPACITY_UNITS[unit] * USABLE_CAPACITY_RATIO)
+
+
+def _add_matches(plan: CopyPlan, index: ContentIndex, term: str, kind: str,
+                 dest_dir: str, registry: Set[str],
+                 limit: Optional[int]) -> None:
+    """Resolve a term and append its files to the plan."""
+    matches = index.search(term, kind=kind, limit=limit)
+    if not matches:
+        plan.unmatched.append(term)
+        return
+
+    for match in matches:
+        base = os.path.basename(match.path)
+        if base in registry:
+            continue
+        try:
+            size = os.path.getsize(match.path)
+        except OSError:
+            # File removed since the index was built
+            continue
+        registry.add(base)
+        plan.items.append(CopyItem(match.path, os.path.join(dest_dir, base), size))
+
+
+def build_copy_plan(order: Dict[str, Any], index: ContentIndex,
+                    limit_per_term: Optional[int] = None) -> CopyPlan:
+    """
+    Build the copy plan of an order.
+
+    Args:
+        order: Order dictionary as returned by ``get_pending_orders``
+        index: Content index of the station library
+        limit_per_term: Maximum number of files per requested term
+
+    Returns:
+        The copy plan; terms without any match are listed in ``unmatched``
+    """
+    plan = CopyPlan(order_id=str(order.get('order_id', '')))
+
+    music_registry: Set[str] = set()
+    for genre in order.get('genres') or []:
+        _add_matches(plan, index, genre, 'music',
+                     os.path.join('MUSICA', genre.upper()),
+                     music_registry, limit_per_term)
+    for artist in order.get('artists') or []:
+        _add_matches(plan, index, artist, 'music',
+                     os.path.join('MUSICA', 'ARTISTAS', artist.upper()),
+                     music_registry, limit_per_term)
+
+    video_registry: Set[str] = set()
+    for topic in order.get('videos') or []:
+        _add_matches(plan, index, topic, 'videos',
+                     os.path.join('VIDEOS', topic.upper()),
+                     video_registry, limit_per_term)
+
+    movie_registry: Set[str] = set()
+    for movie in order.get('movies') or []:
+        _add_matches(plan, index, movie, 'movies', 'PELICULAS',
+                     movie_registry, limit_per_term)
+
+    return plan
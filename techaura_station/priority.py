@@ -0,0 +1,214 @@
+"""
+Priority and SLA-aware local order queue.
+
+The server lists pending orders oldest first, so an express order can wait
+behind a backlog of large movie sticks. ``OrderQueue`` sits between polling
+and the ``BurnScheduler`` and hands orders out by latest start time: the
+time an order must start burning to meet its deadline, i.e. its deadline
+(or arrival plus the SLA of its priority class, whichever is earlier)
+minus its estimated burn time. The key is fixed once an order is queued,
+so ordering by it also ages orders fairly; urgent and large orders simply
+start out further ahead.
+
+The queue is a binary heap with lazy deletion: cancelling or
+reprioritizing an order marks its heap entry dead instead of searching
+for it, and dead entries are skipped on pop (the heap is rebuilt when
+they outnumber live ones). Waits from arrival to hand-out are kept per
+priority class for percentile reporting.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from techaura_station.scheduler import DEFAULT_THROUGHPUT
+
+logger = logging.getLogger(__name__)
+
+# Seconds from arrival to burned, per priority class
+DEFAULT_SLA = {'high': 2 * 3600.0, 'normal': 24 * 3600.0, 'low': 72 * 3600.0}
+_CLASS_RANK = {'high': 0, 'normal': 1, 'low': 2}
+
+
+def order_priority(order: Dict[str, Any]) -> str:
+    """Priority class of an order: ``high``, ``normal`` or ``low``."""
+    priority = str(order.get('priority') or '').lower()
+    if priority in _CLASS_RANK:
+        return priority
+    if order.get('express') or priority in ('express', 'urgent', 'paid'):
+        return 'high'
+    return 'normal'
+
+
+def order_deadline(order: Dict[str, Any]) -> Optional[float]:
+    """Deadline of an order as a timestamp (``deadline`` or delivery date), if any."""
+    for key in ('deadline', 'delivery_date', 'deliveryDate'):
+        value = order.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+        if value:
+            try:
+                return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                logger.debug('Ignoring unparseable %s %r', key, value)
+    return None
+
+
+@dataclass
+class QueuedOrder:
+    """An order waiting in the local queue."""
+    order_id: str
+    order: Any
+    size: int
+    priority: str
+    deadline: Optional[float]
+    enqueued_at: float
+    start_by: float  # Latest start time (the heap key)
+
+
+class OrderQueue:
+    """Heap of pending orders ranked by latest start time."""
+
+    def __init__(self, sla: Optional[Dict[str, float]] = None,
+                 throughput: float = DEFAULT_THROUGHPUT, window: int = 1000,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the queue.
+
+        Args:
+            sla: Seconds from arrival to burned per priority class
+            throughput: Bytes/s used to estimate burn times
+            window: Recent waits kept per priority class for percentiles
+            clock: Time source (seconds; compared with order deadlines)
+        """
+        self.sla = dict(DEFAULT_SLA, **(sla or {}))
+        self.throughput = throughput
+        self.clock = clock
+        self._heap: List[list] = []  # [start_by, class rank, seq, order_id or None]
+        self._live: Dict[str, list] = {}
+        self._orders: Dict[str, QueuedOrder] = {}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=window) for p in _CLASS_RANK}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: str) -> bool:
+        return str(order_id) in self._orders
+
+    def push(self, order_id: str, order: Any = None, size: int = 0,
+             priority: Optional[str] = None, deadline: Optional[float] = None) -> QueuedOrder:
+        """
+        Queue an order (or re-rank it if already queued, keeping its arrival).
+
+        Args:
+            order_id: Order id
+            order: Payload returned by ``pop``
+            size: Bytes the order writes
+            priority: Priority class (read from the order if None)
+            deadline: Deadline timestamp (read from the order if None)
+
+        Returns:
+            The queued order
+        """
+        order_id = str(order_id)
+        if isinstance(order, dict):
+            priority = priority or order_priority(order)
+            deadline = deadline if deadline is not None else order_deadline(order)
+        priority = priority if priority in _CLASS_RANK else 'normal'
+        with self._lock:
+            previous = self._orders.get(order_id)
+            enqueued_at = previous.enqueued_at if previous else self.clock()
+            due = enqueued_at + self.sla[priority]
+            if deadline is not None:
+                due = min(due, deadline)
+            queued = QueuedOrder(order_id, order, size, priority, deadline, enqueued_at,
+                                 due - size / self.throughput)
+            self._kill(order_id)
+            entry = [queued.start_by, _CLASS_RANK[priority], next(self._seq), order_id]
+            heapq.heappush(self._heap, entry)
+            self._live[order_id] = entry
+            self._orders[order_id] = queued
+            return queued
+
+    def reprioritize(self, order_id: str, priority: Optional[str] = None,
+                     deadline: Optional[float] = None) -> bool:
+        """
+        Change the priority class or deadline of a queued order.
+
+        Returns:
+            False if the order is not queued
+        """
+        queued = self._orders.get(str(order_id))
+        if queued is None:
+            return False
+        priority = priority or queued.priority
+        deadline = deadline if deadline is not None else queued.deadline
+        if (priority, deadline) != (queued.priority, queued.deadline):
+            self.push(queued.order_id, queued.order, queued.size, priority, deadline)
+        return True
+
+    def cancel(self, order_id: str) -> bool:
+        """Remove a queued order; returns False if it was not queued."""
+        with self._lock:
+            return self._kill(str(order_id)) is not None
+
+    def _kill(self, order_id: str) -> Optional[QueuedOrder]:
+        """Mark the heap entry of an order dead (lock held)."""
+        entry = self._live.pop(order_id, None)
+        if entry is None:
+            return None
+        entry[-1] = None
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [e for e in self._heap if e[-1] is not None]
+            heapq.heapify(self._heap)
+        return self._orders.pop(order_id)
+
+    def peek(self) -> Optional[QueuedOrder]:
+        """Get the most urgent order without removing it."""
+        with self._lock:
+            while self._heap and self._heap[0][-1] is None:
+                heapq.heappop(self._heap)
+            return self._orders[self._heap[0][-1]] if self._heap else None
+
+    def pop(self) -> Optional[QueuedOrder]:
+        """Remove and return the most urgent order (None if empty)."""
+        with self._lock:
+            while self._heap:
+                order_id = heapq.heappop(self._heap)[-1]
+                if order_id is None:
+                    continue
+                del self._live[order_id]
+                queued = self._orders.pop(order_id)
+                self._waits[queued.priority].append(self.clock() - queued.enqueued_at)
+                return queued
+            return None
+
+    def wait_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """
+        Report recent waits from arrival to hand-out per priority class.
+
+        Returns:
+            Mapping of priority class to count, p50, p95, p99 and max seconds
+        """
+        report = {}
+        with self._lock:
+            for priority, waits in self._waits.items():
+                if not waits:
+                    continue
+                values = sorted(waits)
+
+                def percentile(share: float) -> float:
+                    return values[min(len(values) - 1, int(share * len(values)))]
+
+                report[priority] = {'count': len(values), 'p50': percentile(0.5),
+                                    'p95': percentile(0.95), 'p99': percentile(0.99),
+                                    'max': values[-1]}
+        return report
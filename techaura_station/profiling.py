@@ -0,0 +1,370 @@
+"""
+Opt-in profiling for a running station.
+
+Three tools that can all be switched on and off without restarting a
+station in the middle of a burn:
+
+- Stage timings: ``with stage('copy'):`` blocks in the hot paths record wall
+  and CPU time per stage (HTTP, JSON decoding, content resolution, disk
+  I/O...). When disabled, ``stage`` returns a shared no-op context manager,
+  so a stage costs a function call and an attribute check. ``observe``
+  reports the stages of the calling thread to a callback either way; the
+  burn telemetry builds its per-order timelines from it.
+- Sampling profiler: a background thread samples every thread's stack every
+  few milliseconds and aggregates them as collapsed stacks, the input format
+  of ``flamegraph.pl`` and speedscope.
+- Per-order cProfile: each order runs under ``cProfile`` and its stats are
+  written to ``<output_dir>/<order_id>.pstats``.
+
+Control is through ``SIGUSR2`` (toggles the sampler, dumping on stop) or a
+local admin socket taking one command per connection::
+
+    echo start | nc -U /run/techaura/profile.sock
+"""
+
+import cProfile
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Returned by disabled stages; stateless, so one instance serves every block
+_NO_STAGE = nullcontext()
+
+
+@dataclass
+class StageStats:
+    """Accumulated timings of one stage."""
+    count: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    max_wall: float = 0.0
+
+
+# =============================================================================
+# Sampling Profiler
+# =============================================================================
+
+class SamplingProfiler:
+    """Periodically samples the stacks of all threads."""
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start sampling (no-op if already running)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name='profiler-sampler')
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling; collected samples are kept."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            tick = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                tick.append(';'.join(reversed(stack)))
+            with self._lock:
+                self.samples.update(tick)
+
+    def collapsed(self) -> str:
+        """Render the samples as collapsed stacks (``frame;frame count`` lines)."""
+        with self._lock:
+            items = sorted(self.samples.items())
+        return ''.join(f'{stack} {count}\n' for stack, count in items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.samples = Counter()
+
+
+# =============================================================================
+# Profiler
+# =============================================================================
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+class Profiler:
+    """Stage timings, sampling and per-order cProfile behind runtime switches."""
+
+    def __init__(self, output_dir: Optional[str] = None, interval: float = 0.005):
+        """
+        Initialize the profiler (everything starts disabled).
+
+        Args:
+            output_dir: Directory receiving dumps; the working directory if None
+            interval: Sampling interval in seconds
+        """
+        self.output_dir = output_dir
+        self.stages_enabled = False
+        self.cprofile_orders = False
+        self.sampler = SamplingProfiler(interval)
+        self._stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+        self._observed = threading.local()
+        self._server: Optional[socket.socket] = None
+
+    # -- Stage timings -----------------------------------------------------------
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Time a block as stage ``name`` when stage timings are enabled or observed."""
+        observer = getattr(self._observed, 'callback', None)
+        if not self.stages_enabled and observer is None:
+            return _NO_STAGE
+        return self._timed_stage(name, observer)
+
+    @contextmanager
+    def _timed_stage(self, name: str,
+                     observer: Optional[Callable[[str, float], None]]) -> Iterator[None]:
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            if self.stages_enabled:
+                with self._lock:
+                    stats = self._stages.setdefault(name, StageStats())
+                    stats.count += 1
+                    stats.wall += wall
+                    stats.cpu += cpu
+                    stats.max_wall = max(stats.max_wall, wall)
+            if observer is not None:
+                observer(name, wall)
+
+    @contextmanager
+    def observe(self, callback: Callable[[str, float], None]) -> Iterator[None]:
+        """
+        Report the stages run by this thread inside the block to ``callback``.
+
+        ``callback(name, wall_seconds)`` is called as each stage ends, whether
+        or not stage timings are enabled. An inner ``observe`` replaces the
+        outer one until it exits.
+        """
+        previous = getattr(self._observed, 'callback', None)
+        self._observed.callback = callback
+        try:
+            yield
+        finally:
+            self._observed.callback = previous
+
+    def stage_report(self) -> Dict[str, Dict[str, float]]:
+        """Get the accumulated stage timings, slowest total first."""
+        with self._lock:
+            items = sorted(self._stages.items(), key=lambda kv: kv[1].wall, reverse=True)
+            return {name: asdict(stats) for name, stats in items}
+
+    # -- Per-order cProfile ------------------------------------------------------
+
+    @contextmanager
+    def order(self, order_id: str) -> Iterator[None]:
+        """Run a block under cProfile when per-order profiling is enabled."""
+        if not self.cprofile_orders:
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active (e.g. a concurrent order on 3.12+)
+            logger.warning('Order %s not profiled: another profiler is active', order_id)
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            path = self._path(_UNSAFE_CHARS.sub('_', str(order_id)) + '.pstats')
+            try:
+                profile.dump_stats(path)
+            except OSError as e:
+                logger.warning('Could not write %s: %s', path, e)
+
+    # -- Dumps and control -------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        directory = self.output_dir or os.getcwd()
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def dump(self) -> List[str]:
+        """
+        Write the collapsed stacks and stage timings.
+
+        Returns:
+            Paths of the written files
+        """
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        paths = []
+        if self.sampler.samples:
+            path = self._path(f'stacks-{stamp}.collapsed')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.sampler.collapsed())
+            paths.append(path)
+        report = self.stage_report()
+        if report:
+            path = self._path(f'stages-{stamp}.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            paths.append(path)
+        return paths
+
+    def handle_command(self, command: str) -> str:
+        """
+        Execute an admin command.
+
+        Commands: ``start`` / ``stop`` (sampler; ``stop`` dumps), ``dump``,
+        ``stats``, ``stages on|off``, ``cprofile on|off``, ``reset``.
+
+        Returns:
+            Reply text
+        """
+        words = command.strip().lower().split()
+        if words == ['start']:
+            self.sampler.start()
+            return 'sampling'
+        if words == ['stop']:
+            self.sampler.stop()
+            return '\n'.join(self.dump()) or 'no samples'
+        if words == ['dump']:
+            return '\n'.join(self.dump()) or 'nothing to dump'
+        if words == ['stats']:
+            return json.dumps({'sampling': self.sampler.running,
+                               'stages': self.stages_enabled,
+                               'cprofile': self.cprofile_orders,
+                               'timings': self.stage_report()})
+        if words == ['reset']:
+            self.sampler.clear()
+            with self._lock:
+                self._stages.clear()
+            return 'reset'
+        if len(words) == 2 and words[0] in ('stages', 'cprofile') and words[1] in ('on', 'off'):
+            setattr(self, 'stages_enabled' if words[0] == 'stages' else 'cprofile_orders',
+                    words[1] == 'on')
+            return f'{words[0]} {words[1]}'
+        return f'unknown command: {command.strip()}'
+
+    def toggle_sampling(self) -> None:
+        """Start the sampler, or stop it and dump."""
+        if self.sampler.running:
+            self.sampler.stop()
+            for path in self.dump():
+                logger.info('Profile written to %s', path)
+        else:
+            self.sampler.start()
+            logger.info('Sampling profiler started')
+
+    def install_signal_handler(self, signum: int = signal.SIGUSR2) -> None:
+        """Toggle the sampler (and stage timings) on ``signum``."""
+        def handler(_signum, _frame):
+            self.stages_enabled = not self.sampler.running
+            # Stopping joins the sampler thread; keep the handler short
+            threading.Thread(target=self.toggle_sampling, daemon=True).start()
+
+        signal.signal(signum, handler)
+
+    def serve(self, socket_path: str) -> None:
+        """
+        Accept admin commands on a Unix socket in a background thread.
+
+        Args:
+            socket_path: Socket path (replaced if it exists)
+        """
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server.listen(4)
+        self._server = server
+        threading.Thread(target=self._accept, args=(server,), daemon=True,
+                         name='profiler-admin').start()
+
+    def _accept(self, server: socket.socket) -> None:
+        while True:
+            try:
+                conn, _addr = server.accept()
+            except OSError:
+                return  # Closed
+            with conn:
+                try:
+                    conn.settimeout(5)
+                    command = conn.makefile('r', encoding='utf-8').readline()
+                    conn.sendall((self.handle_command(command) + '\n').encode('utf-8'))
+                except OSError as e:
+                    logger.debug('Admin connection failed: %s', e)
+                except Exception:
+                    # A bad command (e.g. not UTF-8) must not stop the admin socket
+                    logger.exception('Admin command failed')
+
+    def close(self) -> None:
+        """Stop the sampler and the admin socket."""
+        self.sampler.stop()
+        if self._server is not None:
+            path = self._server.getsockname()
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)  # Wakes up accept()
+            except OSError:
+                pass
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+# Process-wide profiler used by the station's hot paths
+PROFILER = Profiler()
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Time a block as a stage of the process-wide profiler."""
+    return PROFILER.stage(name)
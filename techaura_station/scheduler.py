@@ -0,0 +1,370 @@
+"""
+Throughput-aware order-to-device scheduling.
+
+USB sticks differ by an order of magnitude in sustained write speed, and
+orders range from a few GB of MP3s to 128GB of movies. Handing orders out
+FIFO to whichever port frees up first leaves fast ports idle while a slow
+stick grinds through a giant order.
+
+The scheduler keeps a running write throughput per device (seeded by a short
+write probe, then an exponentially weighted average of real burns, kept per
+port across stick swaps) and, when
+a device becomes free, gives it the queued order with the shortest expected
+burn time on that device, with two adjustments:
+
+- Aging: every second an order waits lowers its score, so large orders are
+  not starved by a steady stream of small ones.
+- Deferral: an order is left for another device when that device (even if
+  still busy) would finish it clearly earlier.
+
+The clock is injectable so the simulator can drive the same code in virtual
+time.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Seed throughput for devices that were never probed (bytes/s)
+DEFAULT_THROUGHPUT = 10 * 1024 * 1024
+
+
+def probe_write_speed(mount_point: str, size: int = 16 * 1024 * 1024,
+                      block_size: int = 1024 * 1024) -> float:
+    """
+    Measure the sustained write speed of a mounted device.
+
+    Writes ``size`` bytes to a temporary file, fsyncs it and removes it.
+
+    Args:
+        mount_point: Mount point of the device
+        size: Number of bytes to write
+        block_size: Size of each write
+
+    Returns:
+        Write throughput in bytes per second
+    """
+    path = os.path.join(mount_point, '.techaura_probe')
+    block = os.urandom(block_size)
+    start = time.perf_counter()
+    try:
+        with open(path, 'wb', buffering=0) as f:
+            written = 0
+            while written < size:
+                written += f.write(block[:min(block_size, size - written)])
+            os.fsync(f.fileno())
+        elapsed = time.perf_counter() - start
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return size / max(elapsed, 1e-6)
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass
+class DeviceState:
+    """Scheduling state of one USB port/device."""
+    name: str
+    capacity: int  # Usable bytes
+    throughput: float = DEFAULT_THROUGHPUT  # bytes/s, running average
+    busy_until: Optional[float] = None  # Expected finish of the current order
+    current_order: Optional[str] = None
+    orders_done: int = 0
+    orders_failed: int = 0
+    bytes_written: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def is_idle(self) -> bool:
+        return self.current_order is None
+
+
+@dataclass
+class QueuedOrder:
+    """An order waiting for a device."""
+    order_id: str
+    size: int  # Bytes to write
+    required_capacity: int  # Minimum usable device capacity
+    enqueued_at: float
+    order: Any = None  # Opaque payload returned on assignment
+
+
+@dataclass
+class Assignment:
+    """An order handed to a device."""
+    order_id: str
+    device: str
+    expected_seconds: float
+    waited_seconds: float
+    order: Any = None
+
+
+@dataclass
+class FleetStats:
+    """Fleet throughput report."""
+    orders_per_hour: float  # Successful burns only
+    bytes_per_second: float
+    queued: int
+    failures_per_hour: float = 0.0
+    devices: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
+# =============================================================================
+# Scheduler
+# =============================================================================
+
+class BurnScheduler:
+    """Matches queued orders to devices by capacity and expected completion time."""
+
+    def __init__(self, aging_factor: float = 0.5, defer_margin: float = 1.25,
+                 max_deferral: float = 600.0, smoothing: float = 0.3,
+                 stats_window: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the scheduler.
+
+        Args:
+            aging_factor: Seconds of expected burn time forgiven per second
+                of waiting
+            defer_margin: Leave an order for another device only if this
+                device would take more than ``defer_margin`` times longer
+            smoothing: Weight of the newest measurement in the throughput
+                running average (0-1)
+            stats_window: Window in seconds for the orders- and
+                failures-per-hour rates
+            clock: Time source (seconds)
+        """
+        self.aging_factor = aging_factor
+        self.defer_margin = defer_margin
+        self.max_deferral = max_deferral
+        self.smoothing = smoothing
+        self.stats_window = stats_window
+        self.clock = clock
+        self._devices: Dict[str, DeviceState] = {}
+        self._throughputs: Dict[str, float] = {}  # Learned throughput of removed devices
+        self._queue: Dict[str, QueuedOrder] = {}
+        self._completions: Deque[Tuple[float, int]] = deque()  # Successful burns
+        self._failures: Deque[float] = deque()
+        self._started_at = clock()
+        self._lock = threading.Lock()
+
+    # -- Devices ---------------------------------------------------------------
+
+    def add_device(self, name: str, capacity: int,
+                   throughput: Optional[float] = None) -> None:
+        """
+        Register a device (or update a known one after re-insertion).
+
+        A device name seen before (e.g. the same port with a new stick)
+        starts from the throughput it had when removed, and a probe is
+        folded into that running average instead of replacing it.
+
+        Args:
+            name: Device name
+            capacity: Usable capacity in bytes
+            throughput: Probed write speed in bytes/s
+        """
+        with self._lock:
+            device = self._devices.get(name)
+            known = device is not None or name in self._throughputs
+            if device is None:
+                device = self._devices[name] = DeviceState(
+                    name, capacity, self._throughputs.pop(name, DEFAULT_THROUGHPUT))
+            device.capacity = capacity
+            if throughput:
+                if known:
+                    device.throughput += self.smoothing * (throughput - device.throughput)
+                else:
+                    device.throughput = throughput
+
+    def remove_device(self, name: str) -> Optional[str]:
+        """
+        Forget a device (its throughput is kept for a later ``add_device``).
+
+        Returns:
+            The id of the order it was burning, if any, so it can be requeued
+        """
+        with self._lock:
+            device = self._devices.pop(name, None)
+            if device is not None:
+                self._throughputs[name] = device.throughput
+        return device.current_order if device else None
+
+    @property
+    def devices(self) -> Dict[str, DeviceState]:
+        with self._lock:
+            return dict(self._devices)
+
+    # -- Queue -----------------------------------------------------------------
+
+    def submit(self, order_id: str, size: int, required_capacity: int = 0,
+               order: Any = None) -> None:
+        """
+        Queue an order.
+
+        Args:
+            order_id: Order id
+            size: Bytes the order writes (e.g. ``CopyPlan.total_bytes``)
+            required_capacity: Minimum usable capacity of the target stick
+            order: Payload returned with the assignment
+        """
+        with self._lock:
+            self._queue[order_id] = QueuedOrder(order_id, size, required_capacity,
+                                                self.clock(), order)
+
+    def cancel(self, order_id: str) -> bool:
+        """Remove a queued order; returns False if it was not queued."""
+        with self._lock:
+            return self._queue.pop(order_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    # -- Assignment --------------------------------------------------------------
+
+    def _expected_finish(self, device: DeviceState, size: int, now: float) -> float:
+        start = now if device.is_idle else max(now, device.busy_until or now)
+        return start + size / device.throughput
+
+    def assign(self, device_name: str) -> Optional[Assignment]:
+        """
+        Pick the next order for a free device.
+
+        Args:
+            device_name: Device that just became idle
+
+        Returns:
+            The assignment, or None if no queued order should go to it
+        """
+        with self._lock:
+            device = self._devices.get(device_name)
+            if device is None or not device.is_idle or not self._queue:
+                return None
+            now = self.clock()
+
+            candidates = []
+            for queued in self._queue.values():
+                if queued.required_capacity > device.capacity:
+                    continue
+                expected = queued.size / device.throughput
+                score = expected - self.aging_factor * (now - queued.enqueued_at)
+                candidates.append((score, queued.enqueued_at, queued, expected))
+            candidates.sort(key=lambda c: (c[0], c[1]))
+
+            for _score, _enqueued, queued, expected in candidates:
+                waited = now - queued.enqueued_at
+                if waited < self.max_deferral and self._better_device_exists(device, queued, expected, now):
+                    continue
+                del self._queue[queued.order_id]
+                device.current_order = queued.order_id
+                device.busy_until = now + expected
+                return Assignment(queued.order_id, device.name, expected,
+                                  now - queued.enqueued_at, queued.order)
+            return None
+
+    def _better_device_exists(self, device: DeviceState, queued: QueuedOrder,
+                              duration_here: float, now: float) -> bool:
+        """Check whether another device would finish the order clearly earlier."""
+        for other in self._devices.values():
+            if other is device or queued.required_capacity > other.capacity:
+                continue
+            if self._expected_finish(other, queued.size, now) - now < duration_here / self.defer_margin:
+                return True
+        return False
+
+    def schedule(self) -> List[Assignment]:
+        """
+        Fill every idle device, fastest first.
+
+        Returns:
+            The assignments made
+        """
+        assignments = []
+        with self._lock:
+            idle = sorted((d for d in self._devices.values() if d.is_idle),
+                          key=lambda d: d.throughput, reverse=True)
+        for device in idle:
+            assignment = self.assign(device.name)
+            if assignment is not None:
+                assignments.append(assignment)
+        return assignments
+
+    def complete(self, device_name: str, bytes_written: int,
+                 seconds: float, ok: bool = True) -> None:
+        """
+        Record the end of a burn and free the device.
+
+        Only successful burns update the device throughput and count as
+        completed orders; failed ones are counted separately.
+
+        Args:
+            device_name: Device that finished
+            bytes_written: Bytes written for the order
+            seconds: Wall-clock duration of the write
+            ok: Whether the burn succeeded
+        """
+        with self._lock:
+            now = self.clock()
+            device = self._devices.get(device_name)
+            if device is None:
+                return
+            device.busy_seconds += seconds
+            device.current_order = None
+            device.busy_until = None
+            if ok:
+                if bytes_written > 0 and seconds > 0:
+                    measured = bytes_written / seconds
+                    device.throughput += self.smoothing * (measured - device.throughput)
+                device.orders_done += 1
+                device.bytes_written += bytes_written
+                self._completions.append((now, bytes_written))
+            else:
+                device.orders_failed += 1
+                self._failures.append(now)
+            self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        """Drop completions and failures older than ``stats_window``."""
+        while self._completions and self._completions[0][0] < now - self.stats_window:
+            self._completions.popleft()
+        while self._failures and self._failures[0] < now - self.stats_window:
+            self._failures.popleft()
+
+    def stats(self) -> FleetStats:
+        """
+        Report fleet throughput.
+
+        Orders and failures per hour are computed over the last
+        ``stats_window`` seconds (or the scheduler lifetime, if shorter).
+        """
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            window = max(min(self.stats_window, now - self._started_at), 1e-9)
+            orders = len(self._completions)
+            written = sum(b for _t, b in self._completions)
+            lifetime = max(now - self._started_at, 1e-9)
+            return FleetStats(
+                orders_per_hour=orders * 3600.0 / window,
+                bytes_per_second=written / window,
+                queued=len(self._queue),
+                failures_per_hour=len(self._failures) * 3600.0 / window,
+                devices={
+                    d.name: {
+                        'throughput': d.throughput,
+                        'orders_done': d.orders_done,
+                        'orders_failed': d.orders_failed,
+                        'utilization': min(1.0, d.busy_seconds / lifetime),
+                    }
+                    for d in self._devices.values()
+                },
+            )
@@ -0,0 +1,551 @@
+"""
+Local multiplexing sidecar for the TechAura API.
+
+Every worker process on a station host normally opens its own connections,
+polls on its own and counts separately against the server's per-IP rate
+limit. The sidecar is a small server on a Unix socket that all
+``TechAuraClient`` instances of the host use as their transport
+(``TechAuraClient(..., session=SidecarTransport(path))``). It:
+
+- holds the host's single upstream connection pool;
+- coalesces identical GETs in flight (single-flight), and serves the
+  pending-order feed from one upstream poll per ``feed_ttl``;
+- spreads that feed across workers: an order handed to one worker is
+  leased to it and hidden from the others until the lease expires or the
+  order's burn is completed or reported as failed (cached pages fetched
+  before that no longer list the order);
+- merges the status transitions (start/complete/report-error) of all
+  workers into batches sent to ``POST /orders/transitions``.
+
+Upstream request count therefore stays flat as local workers are added.
+
+The wire protocol is one JSON object per line in each direction over a
+persistent connection.
+"""
+
+import json
+import logging
+import os
+import re
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from techaura_station.client import _load_requests, make_session
+
+logger = logging.getLogger(__name__)
+
+_TRANSITION_PATH = re.compile(
+    r'^(?P<base>.+)/orders/(?P<order_id>[^/]+)/(?P<action>start-burning|complete-burning|report-error|burning-failed)$')
+_FEED_PATH = re.compile(r'/(orders/pending|pending-orders)$')
+
+# Client action -> action name of the transitions endpoint
+_BATCH_ACTIONS = {'report-error': 'burning-failed'}
+# Transitions that end a worker's lease on an order
+_RELEASING_ACTIONS = {'complete-burning', 'report-error', 'burning-failed'}
+
+
+class SidecarUpstreamError(Exception):
+    """Upstream request failed before an HTTP response ('timeout' or 'connection')."""
+    pass
+
+
+@dataclass
+class _Reply:
+    status: int
+    body: str
+
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    reply: Optional[_Reply] = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class _Transition:
+    base: str
+    headers: Dict[str, str]
+    item: Dict[str, Any]
+    done: threading.Event = field(default_factory=threading.Event)
+    reply: Optional[_Reply] = None
+    error: Optional[Exception] = None
+
+
+def _encode_line(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+def _decode_line(line: bytes) -> Dict[str, Any]:
+    return json.loads(line)
+
+
+def _order_id(order: Dict[str, Any]) -> Optional[str]:
+    value = order.get('order_id', order.get('orderId'))
+    return None if value is None else str(value)
+
+
+# =============================================================================
+# Sidecar Server
+# =============================================================================
+
+class Sidecar:
+    """Shares one upstream connection pool among the workers of a host."""
+
+    def __init__(self, socket_path: str, session: Optional[Any] = None,
+                 pool_size: int = 8, feed_ttl: float = 2.0,
+                 lease_seconds: float = 300.0, batch_window: float = 0.05,
+                 max_batch: int = 100):
+        """
+        Initialize the sidecar.
+
+        Args:
+            socket_path: Unix socket path (replaced if it exists)
+            session: Upstream ``requests.Session`` (a pooled one if None)
+            pool_size: Connections of the default session
+            feed_ttl: Seconds a pending-order page is served from memory
+            lease_seconds: Seconds an order handed to a worker stays hidden
+                from the other workers
+            batch_window: Seconds transitions are collected before a batch
+                is sent
+            max_batch: Maximum transitions per batch (server limit:
+                ``MAX_TRANSITIONS_PER_BATCH``)
+        """
+        self.socket_path = socket_path
+        self.session = session if session is not None else make_session(pool_size)
+        self.feed_ttl = feed_ttl
+        self.lease_seconds = lease_seconds
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.upstream_requests = 0
+        self.local_requests = 0
+        self._flights: Dict[Tuple, _Flight] = {}
+        self._feed: Dict[Tuple, Tuple[float, float, _Reply]] = {}  # key -> (cached at, fetch start, page)
+        self._leases: Dict[str, Tuple[str, float]] = {}  # order id -> (worker, expiry)
+        self._released: Dict[str, float] = {}  # order id -> time its burn ended upstream
+        self._pending: List[_Transition] = []
+        self._batch_supported = True
+        self._lock = threading.Lock()
+        self._batch_cond = threading.Condition(self._lock)
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._closing = False
+
+    # -- Lifecycle ---------------------------------------------------------------
+
+    def start(self) -> None:
+        """Listen on the socket and serve in background threads."""
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        sidecar = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                sidecar._serve_connection(self.rfile, self.wfile)
+
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        self._server = server
+        threading.Thread(target=server.serve_forever, daemon=True, name='sidecar').start()
+        threading.Thread(target=self._run_batches, daemon=True, name='sidecar-batcher').start()
+        logger.info('Sidecar listening on %s', self.socket_path)
+
+    def close(self) -> None:
+        """Flush pending transitions and stop serving."""
+        with self._batch_cond:
+            self._closing = True
+            self._batch_cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """Local and upstream request counts."""
+        with self._lock:
+            return {'local_requests': self.local_requests,
+                    'upstream_requests': self.upstream_requests,
+                    'leased_orders': len(self._leases)}
+
+    # -- Connections ---------------------------------------------------------------
+
+    def _serve_connection(self, rfile, wfile) -> None:
+        for line in rfile:
+            try:
+                request = json.loads(line)
+                reply = self.handle(request)
+                message = {'status': reply.status, 'body': reply.body}
+            except SidecarUpstreamError as e:
+                message = {'error': str(e)}
+            except Exception as e:
+                logger.exception('Sidecar request failed')
+                message = {'error': 'connection', 'detail': str(e)}
+            try:
+                wfile.write(_encode_line(message))
+                wfile.flush()
+            except OSError:
+                return
+
+    def handle(self, request: Dict[str, Any]) -> _Reply:
+        """
+        Answer one worker request.
+
+        Args:
+            request: ``method``, ``url``, ``headers``, ``json``, ``params``,
+                ``timeout`` and ``worker`` (worker id)
+
+        Returns:
+            Upstream (or batched, or cached) status and body
+
+        Raises:
+            SidecarUpstreamError: If the upstream request timed out or the
+                server could not be reached
+        """
+        with self._lock:
+            self.local_requests += 1
+        method = request['method'].upper()
+        url = request['url']
+        headers = request.get('headers') or {}
+        params = request.get('params')
+        timeout = request.get('timeout') or 30
+
+        if method == 'POST':
+            match = _TRANSITION_PATH.match(url)
+            if match:
+                return self._transition(match, headers, request.get('json') or {},
+                                        request.get('worker', ''), timeout)
+            return self._upstream('POST', url, headers, request.get('json'), params, timeout)
+        if method != 'GET':
+            return self._upstream(method, url, headers, request.get('json'), params, timeout)
+
+        key = (url, json.dumps(params, sort_keys=True), headers.get('Authorization'))
+        if _FEED_PATH.search(url):
+            return self._feed_for(key, request.get('worker', ''), headers, timeout)
+        return self._single_flight(key, lambda: self._upstream('GET', url, headers, None, params, timeout))
+
+    # -- Upstream ------------------------------------------------------------------
+
+    def _upstream(self, method: str, url: str, headers: Dict[str, str],
+                  data: Any, params: Any, timeout: float) -> _Reply:
+        requests = _load_requests()
+        with self._lock:
+            self.upstream_requests += 1
+        try:
+            response = self.session.request(method=method, url=url, headers=headers,
+                                            json=data, params=params, timeout=timeout)
+        except requests.exceptions.Timeout:
+            raise SidecarUpstreamError('timeout')
+        except requests.exceptions.ConnectionError:
+            raise SidecarUpstreamError('connection')
+        return _Reply(response.status_code, response.text)
+
+    def _single_flight(self, key: Tuple, fetch) -> Any:
+        """Run ``fetch`` once for all concurrent callers with the same key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if leader:
+            try:
+                flight.reply = fetch()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.reply
+
+    # -- Order feed ------------------------------------------------------------------
+
+    def _feed_for(self, key: Tuple, worker: str, headers: Dict[str, str],
+                  timeout: float) -> _Reply:
+        url, params_json, _auth = key
+
+        def fetch() -> Tuple[float, _Reply]:
+            started = time.monotonic()
+            return started, self._upstream('GET', url, headers, None, json.loads(params_json), timeout)
+
+        with self._lock:
+            cached = self._feed.get(key)
+        if cached is None or time.monotonic() - cached[0] > self.feed_ttl:
+            started, reply = self._single_flight(key, fetch)
+            with self._lock:
+                self._feed[key] = (time.monotonic(), started, reply)
+        else:
+            _cached_at, started, reply = cached
+        return self._lease(reply, worker, started)
+
+    def _lease(self, reply: _Reply, worker: str, fetched_at: float) -> _Reply:
+        """
+        Filter a feed page to the orders not leased to other workers.
+
+        Orders whose burn ended after the page was fetched are dropped too:
+        the page predates their completion or failure.
+        """
+        if reply.status != 200:
+            return reply
+        try:
+            payload = json.loads(reply.body)
+            orders = payload['data']['orders']
+        except (ValueError, KeyError, TypeError):
+            return reply
+        now = time.monotonic()
+        mine = []
+        with self._lock:
+            for order in orders:
+                order_id = _order_id(order)
+                if order_id is None:
+                    mine.append(order)
+                    continue
+                if self._released.get(order_id, fetched_at) > fetched_at:
+                    continue
+                lease = self._leases.get(order_id)
+                if lease is not None and lease[0] != worker and lease[1] > now:
+                    continue
+                self._leases[order_id] = (worker, now + self.lease_seconds)
+                mine.append(order)
+            for order_id, (_worker, expiry) in list(self._leases.items()):
+                if expiry <= now:
+                    del self._leases[order_id]
+            for order_id, released_at in list(self._released.items()):
+                if released_at + self.lease_seconds <= now:
+                    del self._released[order_id]
+        payload['data']['orders'] = mine
+        return _Reply(reply.status, json.dumps(payload))
+
+    # -- Transition batching -----------------------------------------------------
+
+    def _transition(self, match: 're.Match', headers: Dict[str, str],
+                    body: Dict[str, Any], worker: str, timeout: float) -> _Reply:
+        action = match.group('action')
+        order_id = match.group('order_id')
+        if action in _RELEASING_ACTIONS:
+            with self._lock:
+                self._leases.pop(order_id, None)
+        item = {'orderId': order_id, 'action': _BATCH_ACTIONS.get(action, action)}
+        for source, target in (('notes', 'notes'), ('error_message', 'errorMessage'),
+                               ('error_code', 'errorCode'), ('retryable', 'retryable')):
+            if source in body:
+                item[target] = body[source]
+        transition = _Transition(match.group('base'), headers, item)
+        with self._batch_cond:
+            self._pending.append(transition)
+            self._batch_cond.notify_all()
+        if not transition.done.wait(timeout + self.batch_window):
+            raise SidecarUpstreamError('timeout')
+        if transition.error is not None:
+            raise transition.error
+        if action in _RELEASING_ACTIONS:
+            # Hide the order from feed pages fetched before this point
+            with self._lock:
+                self._released[order_id] = time.monotonic()
+        return transition.reply
+
+    def _run_batches(self) -> None:
+        while True:
+            with self._batch_cond:
+                self._batch_cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return
+                # Let concurrent workers join the batch
+                self._batch_cond.wait_for(lambda: len(self._pending) >= self.max_batch or self._closing,
+                                          self.batch_window)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            groups: Dict[Tuple, List[_Transition]] = {}
+            for transition in batch:
+                groups.setdefault((transition.base, transition.headers.get('Authorization')),
+                                  []).append(transition)
+            for group in groups.values():
+                self._send_batch(group)
+
+    def _send_batch(self, group: List[_Transition]) -> None:
+        first = group[0]
+        try:
+            if self._batch_supported:
+                reply = self._upstream('POST', f'{first.base}/orders/transitions', first.headers,
+                                       {'transitions': [t.item for t in group]}, None, 30)
+                if reply.status in (404, 405):
+                    logger.warning('Server has no transitions endpoint; sending transitions one by one')
+                    self._batch_supported = False
+                else:
+                    self._resolve_batch(group, reply)
+                    return
+            for transition in group:
+                self._send_single(transition)
+        except Exception as e:
+            for transition in group:
+                if not transition.done.is_set():
+                    transition.error = e
+                    transition.done.set()
+
+    def _resolve_batch(self, group: List[_Transition], reply: _Reply) -> None:
+        results = None
+        if reply.status == 200:
+            try:
+                results = json.loads(reply.body)['data']['results']
+            except (ValueError, KeyError, TypeError):
+                pass
+        for index, transition in enumerate(group):
+            if results is None or index >= len(results):
+                transition.reply = reply  # Whole batch rejected: same answer for each
+            else:
+                result = results[index]
+                body = {key: result[key] for key in ('success', 'message', 'error', 'data') if key in result}
+                transition.reply = _Reply(int(result.get('statusCode', 200)), json.dumps(body))
+            transition.done.set()
+
+    def _send_single(self, transition: _Transition) -> None:
+        item = dict(transition.item)
+        order_id, action = item.pop('orderId'), item.pop('action')
+        if action == 'burning-failed':
+            # Client path and field names, as the worker would have sent them
+            action = 'report-error'
+            item = {source: item[target] for source, target in
+                    (('error_message', 'errorMessage'), ('error_code', 'errorCode'),
+                     ('retryable', 'retryable')) if target in item}
+        url = f'{transition.base}/orders/{order_id}/{action}'
+        try:
+            transition.reply = self._upstream('POST', url, transition.headers, item or None, None, 30)
+        except Exception as e:
+            transition.error = e
+        transition.done.set()
+
+
+# =============================================================================
+# Client Transport
+# =============================================================================
+
+class SidecarResponse:
+    """The subset of ``requests.Response`` used by ``TechAuraClient``."""
+
+    def __init__(self, status_code: int, body: str):
+        self.status_code = status_code
+        self.text = body
+        self.content = body.encode('utf-8')
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size: int = 1) -> Iterator[bytes]:
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+
+class SidecarTransport:
+    """
+    Session-like transport sending ``TechAuraClient`` requests to a sidecar.
+
+    Each thread keeps its own persistent connection to the socket.
+    """
+
+    def __init__(self, socket_path: str, worker_id: Optional[str] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            socket_path: Sidecar socket path
+            worker_id: Identity used for order leases (defaults to the pid)
+        """
+        self.socket_path = socket_path
+        self.worker_id = worker_id or str(os.getpid())
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            conn = self._local.conn = (sock, sock.makefile('rwb'))
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+            except OSError:
+                # Flushing what was buffered for a dead connection
+                pass
+            conn[0].close()
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                json: Any = None, params: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None, stream: bool = False) -> SidecarResponse:
+        """
+        Send a request through the sidecar.
+
+        Replies arrive whole over the socket, so ``stream`` is accepted for
+        compatibility with ``requests`` but changes nothing. A request is
+        resent only if it could not be written to a reused connection;
+        once written it is never sent again, since the sidecar may already
+        have applied it.
+
+        Raises:
+            requests.exceptions.Timeout: If the upstream request timed out
+                or the sidecar did not answer in time
+            requests.exceptions.ConnectionError: If the sidecar or the
+                server could not be reached
+        """
+        requests = _load_requests()
+        message = _encode_line({'method': method, 'url': url, 'headers': headers, 'json': json,
+                                'params': params, 'timeout': timeout, 'worker': self.worker_id})
+        for attempt in range(2):
+            reused = getattr(self._local, 'conn', None) is not None
+            try:
+                sock, sock_file = self._connection()
+                sock.settimeout(None if timeout is None else timeout + 5)
+                sock_file.write(message)
+                sock_file.flush()
+                break
+            except socket.timeout:
+                self._drop_connection()
+                raise requests.exceptions.Timeout('Sidecar did not accept the request in time')
+            except OSError as e:
+                # Nothing reached the sidecar: a stale connection (sidecar
+                # restarted) is retried once on a fresh one
+                self._drop_connection()
+                if attempt or not reused:
+                    raise requests.exceptions.ConnectionError(f'Sidecar unreachable: {e}')
+        # The request was sent: never resend it, it may already be applied
+        try:
+            line = sock_file.readline()
+        except socket.timeout:
+            self._drop_connection()
+            raise requests.exceptions.Timeout('Sidecar did not answer in time')
+        except OSError as e:
+            self._drop_connection()
+            raise requests.exceptions.ConnectionError(f'Sidecar connection lost: {e}')
+        if not line:
+            self._drop_connection()
+            raise requests.exceptions.ConnectionError('Sidecar closed the connection')
+        reply = _decode_line(line)
+        if 'error' in reply:
+            if reply['error'] == 'timeout':
+                raise requests.exceptions.Timeout('Upstream request timed out')
+            raise requests.exceptions.ConnectionError(reply.get('detail') or 'Upstream unreachable')
+        return SidecarResponse(reply['status'], reply['body'])
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        self._drop_connection()
+
@@ -0,0 +1,425 @@
+"""
+Discrete-event simulator for station capacity planning.
+
+Replays a real or synthetic order mix against modeled USB ports (write
+speed, failure rate, stick swap time), server latency and the server's
+per-minute rate limit, driving the station's own ``BurnScheduler`` with a
+virtual clock. Hours of burning are simulated in seconds of CPU, so "where
+does throughput saturate?" can be answered before buying more hubs and
+sticks::
+
+    for ports in (2, 4, 8, 16):
+        report = Simulation(synthetic_orders(500, random.Random(1)),
+                            [SimPort(f'p{i}', 20e6) for i in range(ports)]).run()
+        print(ports, report.orders_per_hour)
+
+The model follows the station's flow: the pending-order feed is polled
+every ``poll_interval``; new orders are queued with their size; free ports
+are filled by the scheduler; each burn costs a start and a complete (or
+report-error) request; a failed burn goes back to the server's pending
+list and is picked up again on a later poll. After a burn the operator
+swaps the stick, during which the port is unavailable.
+"""
+
+import heapq
+import itertools
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from techaura_station.matching import ContentIndex
+from techaura_station.plan import build_copy_plan, parse_capacity
+from techaura_station.scheduler import BurnScheduler
+
+DEFAULT_GENRES = ('salsa', 'reggaeton', 'vallenato', 'bachata', 'merengue',
+                  'rock', 'pop', 'baladas', 'rancheras', 'electronica')
+DEFAULT_PRODUCT_MIX = {'music': 0.7, 'videos': 0.2, 'movies': 0.1}
+DEFAULT_CAPACITY_MIX = {'8GB': 0.2, '16GB': 0.3, '32GB': 0.3, '64GB': 0.15, '128GB': 0.05}
+
+# Simulated time after which a run stops even if orders remain (e.g. when
+# polling alone exhausts the rate limit and the station never catches up)
+MAX_SIMULATED_SECONDS = 30 * 24 * 3600.0
+
+
+# =============================================================================
+# Model
+# =============================================================================
+
+@dataclass
+class SimPort:
+    """A modeled USB port and the sticks plugged into it."""
+    name: str
+    write_speed: float  # Sustained bytes/s
+    failure_rate: float = 0.0  # Probability that a burn fails
+    capacity: int = 128 * 10 ** 9  # Largest stick the port is used with
+    swap_seconds: float = 30.0  # Operator time to replace a finished stick
+
+
+@dataclass
+class SimOrder:
+    """An order of the replayed mix."""
+    order_id: str
+    arrival: float  # Seconds from the start of the simulation
+    size: int  # Bytes to write
+    required_capacity: int
+    product_type: str = 'music'
+
+
+@dataclass
+class SimulationReport:
+    """Outcome of a simulation run."""
+    simulated_seconds: float
+    cpu_seconds: float
+    orders_completed: int
+    orders_pending: int
+    failed_burns: int
+    orders_per_hour: float
+    bytes_per_second: float
+    port_utilization: Dict[str, float]  # Share of time spent writing
+    queue_latency: Dict[str, float]  # Seconds from arrival to burn start
+    api_requests: int
+    throttled_requests: int
+
+    def format(self) -> str:
+        """Render the report as text."""
+        lines = [
+            f'Simulated {self.simulated_seconds / 3600:.1f} h in {self.cpu_seconds:.2f} s of CPU',
+            f'Orders completed: {self.orders_completed} ({self.orders_pending} still pending, '
+            f'{self.failed_burns} failed burns)',
+            f'Throughput: {self.orders_per_hour:.1f} orders/h, {self.bytes_per_second / 1e6:.1f} MB/s',
+            'Queue latency: ' + ', '.join(f'{k} {v / 60:.1f} min' for k, v in self.queue_latency.items()),
+            f'API requests: {self.api_requests} ({self.throttled_requests} rate limited)',
+            'Port utilization:',
+        ]
+        lines += [f'  {name}: {share:.0%}' for name, share in self.port_utilization.items()]
+        return '\n'.join(lines)
+
+
+# =============================================================================
+# Order Mixes
+# =============================================================================
+
+class OrderSizer:
+    """Estimates the bytes an order writes."""
+
+    def __init__(self, index: Optional[ContentIndex] = None,
+                 rng: Optional[random.Random] = None,
+                 fill: Tuple[float, float] = (0.6, 0.95)):
+        """
+        Initialize the sizer.
+
+        Args:
+            index: Library index; when given, orders are sized by resolving
+                their content like a real burn (capped at their capacity)
+            rng: Random source for the fill ratio without an index
+            fill: Range of the share of the capacity filled without an index
+        """
+        self.index = index
+        self.rng = rng or random.Random()
+        self.fill = fill
+        self._sizes: Dict[Tuple, int] = {}
+
+    def size(self, order: Dict[str, Any]) -> int:
+        capacity = parse_capacity(order.get('capacity')) or 0
+        if self.index is None:
+            return int(capacity * self.rng.uniform(*self.fill))
+        key = tuple(tuple(order.get(k) or ()) for k in ('genres', 'artists', 'videos', 'movies'))
+        if key not in self._sizes:
+            self._sizes[key] = build_copy_plan(order, self.index).total_bytes
+        size = self._sizes[key]
+        return min(size, capacity) if capacity else size
+
+
+def _weighted(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def synthetic_orders(count: int, rng: random.Random,
+                     arrival_rate: float = 0.0,
+                     sizer: Optional[OrderSizer] = None,
+                     product_mix: Optional[Dict[str, float]] = None,
+                     capacity_mix: Optional[Dict[str, float]] = None,
+                     genres: Sequence[str] = DEFAULT_GENRES) -> List[SimOrder]:
+    """
+    Generate a synthetic order mix.
+
+    Args:
+        count: Number of orders
+        rng: Random source (seed it for reproducible runs)
+        arrival_rate: Orders per hour (Poisson arrivals); 0 puts every
+            order in the queue at the start (a backlog)
+        sizer: Order sizer (capacity fill ratios if None)
+        product_mix: Weights of the product types
+        capacity_mix: Weights of the capacities
+        genres: Genres (or video topics / movie titles) picked from
+
+    Returns:
+        Orders sorted by arrival
+    """
+    sizer = sizer or OrderSizer(rng=rng)
+    product_mix = product_mix or DEFAULT_PRODUCT_MIX
+    capacity_mix = capacity_mix or DEFAULT_CAPACITY_MIX
+    orders = []
+    arrival = 0.0
+    for number in range(count):
+        if arrival_rate > 0:
+            arrival += rng.expovariate(arrival_rate / 3600)
+        product_type = _weighted(rng, product_mix)
+        picks = rng.sample(list(genres), min(len(genres), rng.randint(1, 4)))
+        order = {'order_id': f'sim-{number}', 'product_type': product_type,
+                 'capacity': _weighted(rng, capacity_mix),
+                 'genres': picks if product_type == 'music' else [],
+                 'videos': picks if product_type == 'videos' else None,
+                 'movies': picks if product_type == 'movies' else None}
+        orders.append(SimOrder(order['order_id'], arrival, sizer.size(order),
+                               parse_capacity(order['capacity']) or 0, product_type))
+    return orders
+
+
+def replay_orders(orders: Iterable[Dict[str, Any]], sizer: OrderSizer) -> List[SimOrder]:
+    """
+    Turn real orders (as returned by ``get_pending_orders``) into a mix.
+
+    Arrivals follow the orders' ``created_at`` timestamps, relative to the
+    earliest one; orders without a timestamp arrive at the start.
+    """
+    orders = list(orders)
+    stamps = []
+    for order in orders:
+        created = order.get('created_at') or order.get('createdAt')
+        try:
+            stamps.append(datetime.fromisoformat(str(created).replace('Z', '+00:00')).timestamp())
+        except ValueError:
+            stamps.append(None)
+    start = min((s for s in stamps if s is not None), default=0.0)
+    mix = []
+    for order, stamp in zip(orders, stamps):
+        order_id = str(order.get('order_id', order.get('orderId')))
+        mix.append(SimOrder(order_id, 0.0 if stamp is None else stamp - start, sizer.size(order),
+                            parse_capacity(order.get('capacity')) or 0,
+                            order.get('product_type', order.get('productType', 'music'))))
+    return sorted(mix, key=lambda o: o.arrival)
+
+
+def load_orders(path: str) -> List[Dict[str, Any]]:
+    """Load orders from a JSON array, a ``{"orders": [...]}`` page or JSON lines."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = (data.get('data') or data).get('orders', [])
+    return data
+
+
+# =============================================================================
+# Simulation
+# =============================================================================
+
+class _RateLimit:
+    """Fixed one-minute window per client, like the server's middleware."""
+
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self.reset_at = -math.inf
+        self.count = 0
+
+    def admit(self, now: float) -> Optional[float]:
+        """Count a request; returns None if allowed, else when the window resets."""
+        if now >= self.reset_at:
+            self.reset_at = now + self.window
+            self.count = 0
+        self.count += 1  # Rejected requests count too
+        return None if self.count <= self.limit else self.reset_at
+
+
+class Simulation:
+    """Runs an order mix against modeled ports in virtual time."""
+
+    def __init__(self, orders: Sequence[SimOrder], ports: Sequence[SimPort],
+                 latency: float = 0.2, rate_limit: int = 100,
+                 poll_interval: float = 10.0, page_size: int = 20,
+                 max_retries: int = 3, retry_delay: float = 1.0,
+                 speed_jitter: float = 0.1, seed: int = 0,
+                 scheduler_factory: Optional[Callable[[Callable[[], float]], BurnScheduler]] = None):
+        """
+        Initialize the simulation.
+
+        Args:
+            orders: Order mix
+            ports: Modeled ports
+            latency: Seconds per API request
+            rate_limit: Requests per minute allowed by the server
+            poll_interval: Seconds between pending-order polls
+            page_size: Orders returned per poll
+            max_retries: Client attempts per rate-limited request
+            retry_delay: Client backoff base in seconds
+            speed_jitter: Relative spread of the actual write speed per burn
+            seed: Seed of the failure and jitter draws
+            scheduler_factory: Builds the scheduler from the virtual clock
+                (a default ``BurnScheduler`` if None)
+        """
+        self.orders = sorted(orders, key=lambda o: o.arrival)
+        self.ports = {port.name: port for port in ports}
+        self.latency = latency
+        self.poll_interval = poll_interval
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.speed_jitter = speed_jitter
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        factory = scheduler_factory or (lambda clock: BurnScheduler(clock=clock))
+        self.scheduler = factory(lambda: self.now)
+        self._rate = _RateLimit(rate_limit)
+        self._events: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self.api_requests = 0
+        self.throttled = 0
+
+    def _at(self, when: float, action: Callable[[], None]) -> None:
+        heapq.heappush(self._events, (when, next(self._seq), action))
+
+    def _request(self, then: Callable[[], None], give_up: bool = False, attempt: int = 0) -> None:
+        """
+        Issue an API request now; ``then`` runs when it has been answered.
+
+        A rate-limited request is retried like ``TechAuraClient`` does
+        (exponential backoff, ``max_retries`` attempts). With ``give_up``
+        the request is then abandoned, as a failed poll is; otherwise it
+        keeps waiting for the next window, as a status transition must
+        eventually reach the server.
+        """
+        self.api_requests += 1
+        reset_at = self._rate.admit(self.now)
+        if reset_at is None:
+            self._at(self.now + self.latency, then)
+            return
+        self.throttled += 1
+        if attempt < self.max_retries - 1:
+            retry_at = self.now + self.latency + self.retry_delay * (2 ** attempt)
+        elif give_up:
+            return
+        else:
+            retry_at = reset_at
+        self._at(retry_at, lambda: self._request(then, give_up, attempt + 1))
+
+    def run(self, horizon: Optional[float] = None) -> SimulationReport:
+        """
+        Run until every order is burned (or the horizon is reached).
+
+        Args:
+            horizon: Maximum simulated seconds (``MAX_SIMULATED_SECONDS``
+                if None)
+
+        Returns:
+            The report
+        """
+        cpu_start = time.process_time()
+        if horizon is None:
+            horizon = MAX_SIMULATED_SECONDS
+        by_id = {order.order_id: order for order in self.orders}
+        arrivals = list(self.orders)
+        server_pending: List[SimOrder] = []  # Visible on the next poll
+        known = set()  # Queued locally or burning
+        done: Dict[str, float] = {}  # order id -> burn start of the successful attempt
+        busy = {name: 0.0 for name in self.ports}
+        written_total = 0
+        failed_burns = 0
+        last_completion = 0.0
+
+        for port in self.ports.values():
+            self.scheduler.add_device(port.name, port.capacity, port.write_speed)
+
+        def poll() -> None:
+            while arrivals and arrivals[0].arrival <= self.now:
+                server_pending.append(arrivals.pop(0))
+
+            def answered() -> None:
+                page = [o for o in server_pending if o.order_id not in known][:self.page_size]
+                for order in page:
+                    known.add(order.order_id)
+                    self.scheduler.submit(order.order_id, order.size, order.required_capacity)
+                dispatch()
+            self._request(answered, give_up=True)
+            if len(done) < len(self.orders):
+                self._at(self.now + self.poll_interval, poll)
+
+        def dispatch() -> None:
+            for assignment in self.scheduler.schedule():
+                order = by_id[assignment.order_id]
+                port = self.ports[assignment.device]
+                self._request(lambda order=order, port=port: burn(order, port))
+
+        def burn(order: SimOrder, port: SimPort) -> None:
+            started = self.now
+            speed = port.write_speed * self.rng.uniform(1 - self.speed_jitter, 1 + self.speed_jitter)
+            seconds = order.size / speed
+            fails = self.rng.random() < port.failure_rate
+            if fails:
+                seconds *= self.rng.random()
+
+            def finished() -> None:
+                nonlocal written_total, failed_burns, last_completion
+                busy[port.name] += seconds
+                written = int(seconds * speed)
+                written_total += written
+                if fails:
+                    failed_burns += 1
+                    known.discard(order.order_id)  # Back to the server's pending list
+                    self._request(lambda: None)  # report-error
+                else:
+                    server_pending.remove(order)
+                    done[order.order_id] = started
+                    last_completion = self.now
+                    self._request(lambda: None)  # complete-burning
+
+                def swapped() -> None:
+                    self.scheduler.complete(port.name, written, seconds, ok=not fails)
+                    dispatch()
+                self._at(self.now + port.swap_seconds, swapped)
+            self._at(self.now + seconds, finished)
+
+        self._at(0.0, poll)
+        while self._events and len(done) < len(self.orders):
+            when, _seq, action = heapq.heappop(self._events)
+            if when > horizon:
+                self.now = horizon
+                break
+            self.now = when
+            action()
+
+        elapsed = last_completion if len(done) == len(self.orders) else self.now
+        latencies = sorted(done[o.order_id] - o.arrival for o in self.orders if o.order_id in done)
+        return SimulationReport(
+            simulated_seconds=elapsed,
+            cpu_seconds=time.process_time() - cpu_start,
+            orders_completed=len(done),
+            orders_pending=len(self.orders) - len(done),
+            failed_burns=failed_burns,
+            orders_per_hour=len(done) / (elapsed / 3600) if elapsed > 0 else 0.0,
+            bytes_per_second=written_total / elapsed if elapsed > 0 else 0.0,
+            port_utilization={name: (busy[name] / elapsed if elapsed > 0 else 0.0) for name in self.ports},
+            queue_latency=_summarize(latencies),
+            api_requests=self.api_requests,
+            throttled_requests=self.throttled,
+        )
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    """Mean, median, p95 and max of sorted values."""
+    if not values:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+    def percentile(share: float) -> float:
+        return values[min(len(values) - 1, int(share * len(values)))]
+
+    return {'mean': sum(values) / len(values), 'p50': percentile(0.5),
+            'p95': percentile(0.95), 'max': values[-1]}
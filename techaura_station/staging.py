@@ -0,0 +1,240 @@
+"""
+Readahead staging of the next order's content.
+
+While one order is being written to a USB stick the library disk sits idle,
+and the next order then starts with cold random reads of scattered small
+files. The stager warms the next order's sources in the background, within
+a fixed byte budget:
+
+- Without a staging directory, sources are read ahead into the page cache
+  with ``posix_fadvise(POSIX_FADV_WILLNEED)``.
+- With a staging directory (tmpfs or SSD), sources are copied into it and the
+  burn reads the staged copies instead.
+
+Small files are staged first: they are the seek-bound part of a burn, while
+large files stream sequentially at full speed anyway. A source shared by
+several orders is staged (and charged to the budget) once and held by each
+of them; evicting an order (cancelled, or burned) deletes the staged copies
+or drops the cached pages that no other order still holds.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from techaura_station.plan import CopyPlan
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StagedSource:
+    """One staged source, shared by every order holding it."""
+    size: int  # Bytes charged to the budget
+    path: Optional[str] = None  # Staged copy, once complete (copying mode only)
+    holders: Set[str] = field(default_factory=set)  # Order ids
+
+
+@dataclass
+class StagedOrder:
+    """Staging state of one order."""
+    order_id: str
+    sources: Set[str] = field(default_factory=set)  # Sources held by the order
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    future: Optional[Future] = None
+    finished: bool = False
+
+
+def _fadvise(path: str, advice: int) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    finally:
+        os.close(fd)
+
+
+class Stager:
+    """Stages order sources ahead of their burn within a byte budget."""
+
+    def __init__(self, budget_bytes: int, staging_dir: Optional[str] = None):
+        """
+        Initialize the stager.
+
+        Args:
+            budget_bytes: Maximum bytes staged (or read ahead) at any time
+            staging_dir: Directory receiving staged copies; None reads
+                ahead into the page cache instead
+        """
+        self.budget_bytes = budget_bytes
+        self.staging_dir = staging_dir
+        self._orders: Dict[str, StagedOrder] = {}
+        self._sources: Dict[str, StagedSource] = {}
+        self._used = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stager')
+        if staging_dir:
+            os.makedirs(staging_dir, exist_ok=True)
+
+    @property
+    def used_bytes(self) -> int:
+        """Bytes currently charged to the budget."""
+        with self._lock:
+            return self._used
+
+    def stage(self, plan: CopyPlan) -> Future:
+        """
+        Start staging a plan in the background.
+
+        Args:
+            plan: Copy plan of the next order
+
+        Returns:
+            Future resolving to the number of bytes staged for the order
+        """
+        with self._lock:
+            staged = self._orders.get(plan.order_id)
+            if staged is None:
+                staged = self._orders[plan.order_id] = StagedOrder(plan.order_id)
+            elif staged.future is not None and not staged.future.done():
+                return staged.future
+            staged.finished = False
+            staged.future = self._executor.submit(self._stage, staged, plan)
+            return staged.future
+
+    def _stage(self, staged: StagedOrder, plan: CopyPlan) -> int:
+        for item in sorted(plan.items, key=lambda i: i.size):
+            if staged.cancelled.is_set():
+                break
+            with self._lock:
+                if item.source in staged.sources:
+                    continue
+                shared = self._sources.get(item.source)
+                if shared is not None:
+                    # Staged for another order: hold it, without charging it again
+                    shared.holders.add(staged.order_id)
+                    staged.sources.add(item.source)
+                    continue
+                if self._used + item.size > self.budget_bytes:
+                    # Sorted by size: nothing further fits either
+                    break
+                self._used += item.size
+                shared = self._sources[item.source] = StagedSource(item.size, holders={staged.order_id})
+                staged.sources.add(item.source)
+            try:
+                path = self._stage_file(item.source)
+            except OSError as e:
+                logger.warning('Could not stage %s: %s', item.source, e)
+                with self._lock:
+                    # Only this (single) staging thread adds holders to a new source
+                    for holder in shared.holders:
+                        order = self._orders.get(holder)
+                        if order is not None:
+                            order.sources.discard(item.source)
+                    staged.sources.discard(item.source)
+                    del self._sources[item.source]
+                    self._used -= shared.size
+                continue
+            with self._lock:
+                shared.path = path
+        with self._lock:
+            staged.finished = True
+            staged_bytes = sum(self._sources[source].size for source in staged.sources)
+            cancelled = staged.cancelled.is_set()
+        if cancelled:
+            self._release(staged)
+        return staged_bytes
+
+    def _stage_file(self, source: str) -> Optional[str]:
+        """Warm one source; returns the staged copy path, if any."""
+        if not self.staging_dir:
+            if hasattr(os, 'posix_fadvise'):
+                _fadvise(source, os.POSIX_FADV_WILLNEED)
+            else:
+                with open(source, 'rb') as f:
+                    while f.read(1024 * 1024):
+                        pass
+            return None
+
+        name = hashlib.blake2b(source.encode(), digest_size=12).hexdigest()
+        path = os.path.join(self.staging_dir, name + os.path.splitext(source)[1])
+        partial = path + '.part'
+        shutil.copyfile(source, partial)
+        os.replace(partial, path)
+        return path
+
+    def source_for(self, order_id: str, source: str) -> str:
+        """
+        Get the path an order should read a source from.
+
+        The staged copy is only returned to orders holding it, so it cannot
+        be deleted by another order's eviction while being read.
+        """
+        with self._lock:
+            shared = self._sources.get(source)
+            if shared is None or shared.path is None or order_id not in shared.holders:
+                return source
+            return shared.path
+
+    def wait(self, order_id: str, timeout: Optional[float] = None) -> int:
+        """Wait for an order's staging to finish; returns its staged bytes."""
+        with self._lock:
+            staged = self._orders.get(order_id)
+        if staged is None or staged.future is None:
+            return 0
+        return staged.future.result(timeout)
+
+    def evict(self, order_id: str) -> None:
+        """
+        Drop everything staged for an order.
+
+        Called when the order is cancelled or burned. Staging still in
+        progress for the order stops at the next file.
+        """
+        with self._lock:
+            staged = self._orders.pop(order_id, None)
+            if staged is None:
+                return
+            staged.cancelled.set()
+            # A running staging thread releases the order when it stops
+            release_now = staged.finished or staged.future is None
+        if release_now:
+            self._release(staged)
+
+    def _release(self, staged: StagedOrder) -> None:
+        """Drop an order's holds; sources no other order holds are freed."""
+        freed: List[Tuple[str, StagedSource]] = []
+        with self._lock:
+            sources, staged.sources = staged.sources, set()
+            for source in sources:
+                shared = self._sources.get(source)
+                if shared is None:
+                    continue
+                shared.holders.discard(staged.order_id)
+                if not shared.holders:
+                    del self._sources[source]
+                    self._used -= shared.size
+                    freed.append((source, shared))
+        for source, shared in freed:
+            if shared.path is not None:
+                try:
+                    os.remove(shared.path)
+                except OSError:
+                    pass
+            elif not self.staging_dir and hasattr(os, 'posix_fadvise'):
+                try:
+                    _fadvise(source, os.POSIX_FADV_DONTNEED)
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        """Evict every order and stop the staging thread."""
+        with self._lock:
+            order_ids = list(self._orders)
+        for order_id in order_ids:
+            self.evict(order_id)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,180 @@
+"""
+Per-order burn telemetry.
+
+The worker records an ``OrderTimeline`` for every burn: wall time of each
+stage (claim, resolve, verify, copy, playlist, report), bytes written, burn
+mode, device and content type. The timings come from the profiler's stage
+hook (``Profiler.observe``), mapped onto the timeline stages by
+``TIMELINE_STAGES``. ``TelemetryUploader`` buffers the timelines
+and sends them in compact batches to ``POST /telemetry/burns``, where the
+server aggregates them by station, device and content type. Uploads run in
+a background thread, so burns never wait on telemetry, and one request
+carries up to ``batch_size`` orders.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from techaura_station.client import TechAuraClientError
+
+logger = logging.getLogger(__name__)
+
+# Profiler stage -> timeline stage; other profiler stages are not reported
+TIMELINE_STAGES = {
+    'api.start_burning': 'claim',
+    'journal': 'resolve',
+    'resolve': 'resolve',
+    'fit': 'resolve',
+    'verify': 'verify',
+    'image.build': 'build',
+    'copy': 'copy',
+    'image.stream': 'copy',
+    'fanout': 'copy',
+    'playlist': 'playlist',
+    'api.complete_burning': 'report',
+    'api.report_error': 'report',
+}
+
+
+@dataclass
+class OrderTimeline:
+    """Stage timings and outcome of one burned order."""
+    order_id: str
+    device: Optional[str] = None
+    content_type: Optional[str] = None
+    mode: str = 'files'
+    started_at: float = field(default_factory=time.time)
+    stages: Dict[str, float] = field(default_factory=dict)  # Stage -> seconds
+    bytes_written: int = 0
+    success: bool = False
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Add the wall time of profiler stage ``name`` (repeated stages add up).
+
+        Signature of a ``Profiler.observe`` callback.
+        """
+        timeline_stage = TIMELINE_STAGES.get(name)
+        if timeline_stage is not None:
+            self.stages[timeline_stage] = self.stages.get(timeline_stage, 0.0) + seconds
+
+    def to_entry(self) -> Dict[str, Any]:
+        """Render the compact wire form (milliseconds, short keys)."""
+        entry: Dict[str, Any] = {
+            'o': self.order_id,
+            'm': self.mode,
+            't': int(self.started_at),
+            'b': self.bytes_written,
+            'ok': self.success,
+            's': {name: round(seconds * 1000) for name, seconds in self.stages.items()},
+        }
+        if self.device:
+            entry['d'] = self.device
+        if self.content_type:
+            entry['c'] = self.content_type
+        return entry
+
+
+class TelemetryUploader:
+    """Buffers order timelines and uploads them in batches."""
+
+    def __init__(self, client: Any, station_id: str, batch_size: int = 100,
+                 flush_interval: float = 30.0, max_buffered: int = 5000):
+        """
+        Initialize the uploader.
+
+        Args:
+            client: TechAura API client (``send_burn_telemetry``)
+            station_id: Identifier of this station in the aggregates
+            batch_size: Entries per upload request
+            flush_interval: Seconds between background uploads
+            max_buffered: Entries kept while the server is unreachable
+                (oldest are dropped first)
+        """
+        self.client = client
+        self.station_id = station_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffered)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def record(self, timeline: OrderTimeline) -> None:
+        """Queue a timeline for upload."""
+        with self._lock:
+            self._buffer.append(timeline.to_entry())
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Upload the buffered entries.
+
+        Retryable and unexpected failures keep the batch for the next flush;
+        a rejected batch (e.g. a server without the telemetry endpoint) is
+        dropped.
+
+        Returns:
+            Number of entries uploaded
+        """
+        sent = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch: List[Dict[str, Any]] = [self._buffer.popleft() for _ in
+                                                   range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    return sent
+                try:
+                    self.client.send_burn_telemetry(self.station_id, batch)
+                except TechAuraClientError as e:
+                    if e.retryable:
+                        with self._lock:
+                            self._buffer.extendleft(reversed(batch))
+                        logger.warning('Telemetry upload failed, will retry: %s', e)
+                    else:
+                        logger.warning('Telemetry batch of %d entries rejected: %s', len(batch), e)
+                    return sent
+                except Exception as e:
+                    # Unexpected failure (e.g. a transport bug): keep the batch too
+                    with self._lock:
+                        self._buffer.extendleft(reversed(batch))
+                    logger.warning('Telemetry upload failed, will retry: %s', e)
+                    return sent
+                sent += len(batch)
+
+    def start(self) -> None:
+        """Upload in a background thread every ``flush_interval`` seconds."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='telemetry')
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and upload what is left."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning('Telemetry upload failed: %s', e)
@@ -0,0 +1,372 @@
+"""
+Batch transcoding with a local ffmpeg.
+
+Produces bitrate-normalized variants and demo clips of library files across
+all cores. Outputs are cached by (content hash, profile settings), so a file
+is never transcoded twice with the same settings, even if it is renamed or
+moved inside the library.
+
+The burn worker uses the variants to fit an order onto its USB capacity:
+instead of dropping songs when the originals do not fit, it steps down the
+profile ladder (e.g. 192k -> 128k -> 96k) until the whole plan fits.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from techaura_station.matching import VALID_EXTENSIONS
+from techaura_station.plan import CopyItem, CopyPlan
+
+logger = logging.getLogger(__name__)
+
+
+class TranscodeError(Exception):
+    """Raised when transcoding is needed but ffmpeg is not available."""
+    pass
+
+
+# =============================================================================
+# Profiles
+# =============================================================================
+
+@dataclass(frozen=True)
+class TranscodeProfile:
+    """ffmpeg settings for one output variant."""
+    name: str
+    extension: str
+    audio_codec: str = 'libmp3lame'
+    audio_bitrate: Optional[str] = None
+    sample_rate: Optional[int] = None
+    video_codec: Optional[str] = None  # None drops the video stream
+    video_crf: Optional[int] = None
+    max_height: Optional[int] = None
+    clip_start: Optional[float] = None
+    clip_duration: Optional[float] = None
+
+    def ffmpeg_args(self) -> List[str]:
+        """Get the ffmpeg output arguments of this profile."""
+        args: List[str] = []
+        if self.clip_start is not None:
+            args += ['-ss', str(self.clip_start)]
+        if self.clip_duration is not None:
+            args += ['-t', str(self.clip_duration)]
+        if self.video_codec:
+            args += ['-c:v', self.video_codec]
+            if self.video_crf is not None:
+                args += ['-crf', str(self.video_crf)]
+            if self.max_height is not None:
+                args += ['-vf', f'scale=-2:min({self.max_height}\\,ih)']
+        else:
+            args += ['-vn']
+        args += ['-c:a', self.audio_codec]
+        if self.audio_bitrate:
+            args += ['-b:a', self.audio_bitrate]
+        if self.sample_rate:
+            args += ['-ar', str(self.sample_rate)]
+        return args
+
+    @property
+    def settings_hash(self) -> str:
+        """Short hash identifying the output settings (not the name)."""
+        settings = ' '.join([self.extension, *self.ffmpeg_args()])
+        return hashlib.blake2b(settings.encode(), digest_size=6).hexdigest()
+
+
+PROFILES: Dict[str, TranscodeProfile] = {
+    'mp3-192': TranscodeProfile('mp3-192', '.mp3', audio_bitrate='192k', sample_rate=44100),
+    'mp3-128': TranscodeProfile('mp3-128', '.mp3', audio_bitrate='128k', sample_rate=44100),
+    'mp3-96': TranscodeProfile('mp3-96', '.mp3', audio_bitrate='96k', sample_rate=44100),
+    'demo-mp3': TranscodeProfile('demo-mp3', '.mp3', audio_bitrate='128k', sample_rate=44100,
+                                 clip_start=30, clip_duration=60),
+    'demo-mp4': TranscodeProfile('demo-mp4', '.mp4', audio_codec='aac', audio_bitrate='128k',
+                                 video_codec='libx264', video_crf=28, max_height=480,
+                                 clip_start=0, clip_duration=60),
+    'video-720p': TranscodeProfile('video-720p', '.mp4', audio_codec='aac', audio_bitrate='128k',
+                                   video_codec='libx264', video_crf=23, max_height=720),
+}
+
+# Audio variants from best to smallest, used to fit music orders
+AUDIO_LADDER: Tuple[str, ...] = ('mp3-192', 'mp3-128', 'mp3-96')
+
+
+# =============================================================================
+# Pool Jobs
+# =============================================================================
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the content hash of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_job(path: str) -> Tuple[str, Optional[str]]:
+    try:
+        return path, hash_file(path)
+    except OSError as e:
+        logger.warning('Could not hash %s: %s', path, e)
+        return path, None
+
+
+def _transcode_job(job: Tuple[str, str, str, List[str]]) -> Tuple[str, str, Optional[str]]:
+    """
+    Run one ffmpeg transcode.
+
+    Writes to a temporary file first so that an interrupted job never leaves
+    a truncated output that would later be mistaken for a cached result.
+
+    Returns:
+        (source, output, error message or None)
+    """
+    ffmpeg, source, output, args = job
+    partial = f'{output}.part{os.getpid()}'
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    # The partial file has no usable extension, so the muxer is explicit
+    muxer = os.path.splitext(output)[1].lstrip('.')
+    command = [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+               '-i', source, *args, '-f', muxer, partial]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return source, output, completed.stderr.strip()[-500:] or f'exit {completed.returncode}'
+        os.replace(partial, output)
+        return source, output, None
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+# =============================================================================
+# Pipeline
+# =============================================================================
+
+@dataclass
+class TranscodeResult:
+    """Summary of a pipeline run."""
+    outputs: Dict[Tuple[str, str], str] = field(default_factory=dict)  # (source, profile) -> path
+    transcoded: int = 0
+    cached: int = 0
+    failed: Dict[Tuple[str, str], str] = field(default_factory=dict)
+
+
+class TranscodePipeline:
+    """
+    Content-addressed transcoding cache driven by a process pool.
+
+    Outputs live in ``<cache_dir>/<profile>/<hh>/<content hash>-<settings hash><ext>``.
+    Content hashes are memoized in ``<cache_dir>/hashes.db`` by
+    (path, mtime, size), so unchanged sources are not re-read.
+    """
+
+    def __init__(self, cache_dir: str, ffmpeg_path: Optional[str] = None,
+                 workers: Optional[int] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            cache_dir: Directory holding transcoded outputs
+            ffmpeg_path: ffmpeg executable (defaults to ``ffmpeg`` on PATH)
+            workers: Size of the process pool (defaults to the CPU count)
+        """
+        self.cache_dir = cache_dir
+        self.ffmpeg_path = ffmpeg_path or shutil.which('ffmpeg')
+        self.workers = workers
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'hashes.db'),
+                                     check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS content_hashes ('
+                ' path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL,'
+                ' size INTEGER NOT NULL, digest TEXT NOT NULL)'
+            )
+
+    def close(self) -> None:
+        """Close the hash memo database."""
+        self._conn.close()
+
+    def output_path(self, digest: str, profile: TranscodeProfile) -> str:
+        """Get the cache path of a (content hash, profile) pair."""
+        return os.path.join(self.cache_dir, profile.name, digest[:2],
+                            f'{digest}-{profile.settings_hash}{profile.extension}')
+
+    def content_hashes(self, sources: Iterable[str]) -> Dict[str, str]:
+        """
+        Get content hashes, hashing new or modified files in the pool.
+
+        Returns:
+            Mapping of source path to content hash (unreadable files omitted)
+        """
+        digests: Dict[str, str] = {}
+        stamps: Dict[str, Tuple[int, int]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for source in dict.fromkeys(sources):
+                try:
+                    st = os.stat(source)
+                except OSError:
+                    continue
+                stamps[source] = (st.st_mtime_ns, st.st_size)
+                row = self._conn.execute(
+                    'SELECT digest FROM content_hashes WHERE path = ? AND mtime_ns = ? AND size = ?',
+                    (source, st.st_mtime_ns, st.st_size)
+                ).fetchone()
+                if row:
+                    digests[source] = row[0]
+                else:
+                    missing.append(source)
+
+        if missing:
+            hashed = self._map(_hash_job, missing)
+            rows = []
+            for source, digest in hashed:
+                if digest is not None:
+                    digests[source] = digest
+                    rows.append((source, *stamps[source], digest))
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO content_hashes (path, mtime_ns, size, digest) '
+                    'VALUES (?, ?, ?, ?)', rows
+                )
+        return digests
+
+    def _map(self, fn, items: Sequence) -> List:
+        if self.workers == 1 or len(items) == 1:
+            return [fn(item) for item in items]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(fn, items, chunksize=max(1, len(items) // 64)))
+
+    def cached_variants(self, sources: Iterable[str],
+                        profile: TranscodeProfile) -> Dict[str, str]:
+        """
+        Get already transcoded variants without running ffmpeg.
+
+        Returns:
+            Mapping of source path to output path for cached variants only
+        """
+        return {source: output for source, digest in self.content_hashes(sources).items()
+                if os.path.exists(output := self.output_path(digest, profile))}
+
+    def run(self, sources: Iterable[str],
+            profiles: Sequence[TranscodeProfile]) -> TranscodeResult:
+        """
+        Transcode sources into every profile, skipping cached outputs.
+
+        Args:
+            sources: Source media files
+            profiles: Output profiles
+
+        Returns:
+            Outputs per (source, profile name), plus counts and failures
+
+        Raises:
+            TranscodeError: If work is needed but ffmpeg is not available
+        """
+        result = TranscodeResult()
+        jobs = []
+        job_profiles: Dict[str, str] = {}
+        for source, digest in self.content_hashes(sources).items():
+            for profile in profiles:
+                output = self.output_path(digest, profile)
+                if os.path.exists(output):
+                    result.outputs[(source, profile.name)] = output
+                    result.cached += 1
+                else:
+                    jobs.append((self.ffmpeg_path, source, output, profile.ffmpeg_args()))
+                    job_profiles[output] = profile.name
+
+        if not jobs:
+            return result
+        if not self.ffmpeg_path:
+            raise TranscodeError('ffmpeg executable not found')
+
+        for source, output, error in self._map(_transcode_job, jobs):
+            key = (source, job_profiles[output])
+            if error:
+                logger.warning('Transcode failed for %s (%s): %s', source, key[1], error)
+                result.failed[key] = error
+            else:
+                result.outputs[key] = output
+                result.transcoded += 1
+        return result
+
+
+# =============================================================================
+# Capacity Fitting
+# =============================================================================
+
+def fit_plan_to_capacity(plan: CopyPlan, capacity_bytes: int,
+                         pipeline: Optional[TranscodePipeline] = None,
+                         ladder: Sequence[str] = AUDIO_LADDER,
+                         transcode_missing: bool = False) -> CopyPlan:
+    """
+    Make a copy plan fit a device.
+
+    Music files are swapped for smaller variants one ladder step at a time
+    until the plan fits. Only if the smallest variant still does not fit are
+    files dropped from the end of the plan (listed in ``plan.dropped``).
+
+    Args:
+        plan: Copy plan built from the original library files
+        capacity_bytes: Usable bytes on the device
+        pipeline: Transcoding pipeline holding the variants
+        ladder: Profile names from best to smallest
+        transcode_missing: Transcode variants that are not cached yet
+            instead of only using cached ones
+
+    Returns:
+        A plan whose total size fits the capacity
+    """
+    if plan.total_bytes <= capacity_bytes:
+        return plan
+
+    fitted = plan
+    audio_sources = [item.source for item in plan
+                     if os.path.splitext(item.source)[1].lower() in VALID_EXTENSIONS['music']]
+    if pipeline is not None and audio_sources:
+        for name in ladder:
+            profile = PROFILES[name]
+            if transcode_missing:
+                outputs = pipeline.run(audio_sources, [profile]).outputs
+                variants = {source: path for (source, _), path in outputs.items()}
+            else:
+                variants = pipeline.cached_variants(audio_sources, profile)
+            fitted = _swap_variants(plan, variants, profile)
+            if fitted.total_bytes <= capacity_bytes:
+                return fitted
+
+    # Still too big: drop files from the end, keeping the plan order
+    items = list(fitted.items)
+    total = fitted.total_bytes
+    dropped: List[str] = []
+    while items and total > capacity_bytes:
+        item = items.pop()
+        total -= item.size
+        dropped.append(item.destination)
+    return replace(fitted, items=items, dropped=fitted.dropped + dropped[::-1])
+
+
+def _swap_variants(plan: CopyPlan, variants: Dict[str, str],
+                   profile: TranscodeProfile) -> CopyPlan:
+    """Replace plan items with their variants when smaller."""
+    items = []
+    for item in plan:
+        variant = variants.get(item.source)
+        if variant is not None:
+            size = os.path.getsize(variant)
+            if size < item.size:
+                destination = os.path.splitext(item.destination)[0] + profile.extension
+                item = CopyItem(variant, destination, size)
+        items.append(item)
+    return replace(plan, items=items)
@@ -0,0 +1,536 @@
+"""
+Burn worker.
+
+Drives a single order through the USB Integration API workflow:
+start burning -> resolve content -> copy to the device -> complete burning,
+reporting an error instead of completing when anything fails.
+
+One worker (and therefore one content index) is shared by every order a
+station processes, so content lookups stay warm across orders. With a
+``TelemetryUploader``, the stage timeline of every burn is sent to the
+server in batches.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import stat as stat_module
+import struct
+import subprocess
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, List, Optional, Sequence, Set, Tuple
+
+from techaura_station.devices import USBDevice
+from techaura_station.fanout import FanoutResult, fanout_copy
+from techaura_station.image import build_fat32_image, choose_burn_mode, plan_image_files, stream_image
+from techaura_station.journal import CopyJournal, copy_with_checksum, verified_items, volume_id
+from techaura_station.matching import ContentIndex
+from techaura_station.metadata import MetadataCache
+from techaura_station.plan import CopyPlan, build_copy_plan, parse_capacity
+from techaura_station.profiling import PROFILER, stage
+from techaura_station.staging import Stager
+from techaura_station.telemetry import OrderTimeline, TelemetryUploader
+from techaura_station.transcode import TranscodePipeline, fit_plan_to_capacity
+
+logger = logging.getLogger(__name__)
+
+
+# ioctl returning the size in bytes of a block device (linux/fs.h)
+BLKGETSIZE64 = 0x80081272
+
+
+def _unmount(mount_point: str) -> None:
+    """Unmount a device before writing its raw partition."""
+    subprocess.run(['umount', mount_point], check=True, capture_output=True)
+
+
+def _partition_size(device_path: str) -> int:
+    """Get the size in bytes of a partition, loop device or image file."""
+    fd = os.open(device_path, os.O_RDONLY)
+    try:
+        info = os.fstat(fd)
+        if stat_module.S_ISBLK(info.st_mode):
+            return struct.unpack('Q', fcntl.ioctl(fd, BLKGETSIZE64, bytes(8)))[0]
+        return info.st_size
+    finally:
+        os.close(fd)
+
+
+@dataclass
+class _Prepared:
+    """A plan resolved ahead of its burn."""
+    plan: CopyPlan
+    stages: List[Tuple[str, float]]  # Profiler stages it took, credited to the burn's timeline
+
+
+class BurnWorker:
+    """
+    Processes claimed orders against a shared content index.
+
+    The client is any object exposing the ``TechAuraClient`` methods
+    ``start_burning``, ``complete_burning`` and ``report_error``.
+    """
+
+    def __init__(self, client: Any, index: ContentIndex,
+                 limit_per_term: Optional[int] = None,
+                 metadata: Optional[MetadataCache] = None,
+                 transcoder: Optional[TranscodePipeline] = None,
+                 journal_dir: Optional[str] = None,
+                 stager: Optional[Stager] = None,
+                 image_dir: Optional[str] = None,
+                 telemetry: Optional[TelemetryUploader] = None):
+        """
+        Initialize the worker.
+
+        Args:
+            client: TechAura API client
+            index: Content index of the station library
+            limit_per_term: Maximum number of files per requested term
+            metadata: Audio metadata cache used to enrich playlists
+            transcoder: Transcoding pipeline providing smaller variants
+                when an order does not fit its USB capacity
+            journal_dir: Directory for per-order copy journals; when set,
+                failed burns resume from the last verified file
+            stager: Stager warming the sources of prepared orders
+            image_dir: Local directory (SSD or tmpfs) for filesystem images;
+                when set, orders of many small files are burned in image mode
+            telemetry: Uploader receiving the stage timeline of every burn
+        """
+        self.client = client
+        self.index = index
+        self.limit_per_term = limit_per_term
+        self.metadata = metadata
+        self.transcoder = transcoder
+        self.journal_dir = journal_dir
+        self.stager = stager
+        self.image_dir = image_dir
+        self.telemetry = telemetry
+        self._prepared: Dict[str, _Prepared] = {}
+
+    def _api(self, method: str, *args, **kwargs) -> Any:
+        """Call the API client, timed as stage ``api.<method>``."""
+        with stage(f'api.{method}'):
+            return getattr(self.client, method)(*args, **kwargs)
+
+    def plan(self, order: Dict[str, Any]) -> CopyPlan:
+        """Resolve the copy plan of an order, fitted to its USB capacity."""
+        with stage('resolve'):
+            plan = build_copy_plan(order, self.index, self.limit_per_term)
+        capacity = parse_capacity(order.get('capacity'))
+        if capacity is not None:
+            with stage('fit'):
+                plan = fit_plan_to_capacity(plan, capacity, self.transcoder)
+        return plan
+
+    def prepare(self, order: Dict[str, Any]) -> CopyPlan:
+        """
+        Resolve the plan of an upcoming order and start staging its sources.
+
+        Meant to be called for the next claimed order while the current one
+        is still being written, so its burn starts with warm data.
+        """
+        plan = self._plan_ahead(order).plan
+        if self.stager is not None:
+            self.stager.stage(plan)
+        return plan
+
+    def _plan_ahead(self, order: Dict[str, Any]) -> _Prepared:
+        """Resolve an order's plan for a later burn, recording its stages."""
+        stages: List[Tuple[str, float]] = []
+        with PROFILER.observe(lambda name, seconds: stages.append((name, seconds))):
+            plan = self.plan(order)
+        prepared = self._prepared[plan.order_id] = _Prepared(plan, stages)
+        return prepared
+
+    def _take_plan(self, order: Dict[str, Any], timeline: OrderTimeline) -> CopyPlan:
+        prepared = self._prepared.pop(str(order['order_id']), None)
+        if prepared is None:
+            return self.plan(order)  # Timed by the burn's observer
+        for name, seconds in prepared.stages:
+            timeline.add(name, seconds)
+        return prepared.plan
+
+    def _timeline(self, order: Dict[str, Any], mode: str,
+                  device: Optional[str] = None) -> OrderTimeline:
+        return OrderTimeline(str(order['order_id']), device=device,
+                             content_type=order.get('product_type'), mode=mode)
+
+    def _record(self, timeline: OrderTimeline) -> None:
+        if self.telemetry is not None:
+            self.telemetry.record(timeline)
+
+    def cancel(self, order_id: str) -> None:
+        """Forget a prepared order and evict its staged content."""
+        self._prepared.pop(str(order_id), None)
+        if self.stager is not None:
+            self.stager.evict(str(order_id))
+
+    def copy_plan(self, plan: CopyPlan, mount_point: str,
+                  journal: Optional[CopyJournal] = None,
+                  skip: Collection[str] = ()) -> int:
+        """
+        Copy every file of a plan to a mounted device.
+
+        Args:
+            plan: The order's copy plan
+            mount_point: Mount point of the destination device
+            journal: Journal recording each verified file
+            skip: Destinations already on the device
+
+        Returns:
+            Number of bytes written
+        """
+        written = 0
+        with stage('copy'):
+            for item in plan:
+                if item.destination in skip:
+                    continue
+                destination = os.path.join(mount_point, item.destination)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                source = self.stager.source_for(plan.order_id, item.source) if self.stager else item.source
+                if journal is None:
+                    shutil.copyfile(source, destination)
+                else:
+                    journal.record(item, copy_with_checksum(source, destination))
+                written += item.size
+        return written
+
+    def playlist_json(self, plan: CopyPlan) -> str:
+        """
+        Render the ``playlist.json`` of a plan.
+
+        Each entry has the file name and destination path, plus the cached
+        artist, title, album, duration and bitrate when available.
+        """
+        known = self.metadata.get_many(item.source for item in plan) if self.metadata else {}
+        playlist: List[Dict[str, Any]] = []
+        for item in plan:
+            entry: Dict[str, Any] = {
+                'name': os.path.splitext(os.path.basename(item.destination))[0],
+                'file': item.destination.replace(os.sep, '/'),
+            }
+            meta = known.get(item.source)
+            if meta is not None:
+                entry.update({k: v for k, v in meta.to_dict().items() if k != 'path'})
+            playlist.append(entry)
+        return json.dumps(playlist, ensure_ascii=False, indent=2)
+
+    def write_playlist(self, plan: CopyPlan, mount_point: str) -> str:
+        """
+        Write ``playlist.json`` at the device root.
+
+        Returns:
+            Path of the written playlist
+        """
+        playlist_path = os.path.join(mount_point, 'playlist.json')
+        with stage('playlist'), open(playlist_path, 'w', encoding='utf-8') as f:
+            f.write(self.playlist_json(plan))
+        return playlist_path
+
+    def burn(self, order: Dict[str, Any], mount_point: str,
+             device: Optional[str] = None) -> CopyPlan:
+        """
+        Burn an order onto a mounted device.
+
+        Args:
+            order: Order dictionary as returned by ``get_pending_orders``
+            mount_point: Mount point of the destination device
+            device: Device name reported in the burn telemetry
+
+        Returns:
+            The executed copy plan
+
+        Raises:
+            Exception: Whatever made the burn fail after the order was
+                claimed (the error is reported to the API first), including
+                a failed ``complete_burning`` after a successful copy; the
+                journal is then kept, so the retry only verifies the stick
+        """
+        timeline = self._timeline(order, 'files', device)
+        try:
+            with PROFILER.order(str(order['order_id'])), PROFILER.observe(timeline.add):
+                return self._burn(order, mount_point, timeline)
+        finally:
+            # Spent whatever happened (a resumed burn never takes the prepared plan)
+            self.cancel(order['order_id'])
+
+    def _burn(self, order: Dict[str, Any], mount_point: str,
+              timeline: OrderTimeline) -> CopyPlan:
+        order_id = order['order_id']
+        self._api('start_burning', order_id)
+
+        journal = None
+        resumed: Collection[str] = ()
+        try:
+            if self.journal_dir:
+                journal = CopyJournal.for_order(self.journal_dir, order_id)
+                journal.volume = volume_id(mount_point)
+                with stage('journal'):
+                    state = journal.load()
+                if state is not None:
+                    plan = state.plan
+                    with stage('verify'):
+                        resumed = verified_items(state, mount_point, journal.volume)
+                    logger.info('Resuming order %s: %d of %d files already copied',
+                                order_id, len(resumed), len(plan))
+                else:
+                    plan = self._take_plan(order, timeline)
+                    journal.begin(plan)
+            else:
+                plan = self._take_plan(order, timeline)
+            written = self.copy_plan(plan, mount_point, journal, resumed)
+            self.write_playlist(plan, mount_point)
+        except Exception as e:
+            # The order is claimed: whatever went wrong, release it
+            logger.error('Burn failed for order %s: %s', order_id, e)
+            if journal is not None:
+                journal.close()
+            self._api('report_error', order_id, str(e), error_code='COPY_FAILED',
+                      retryable=True)
+            self._record(timeline)
+            raise
+
+        notes = self._completion_notes(plan, written)
+        if resumed:
+            notes += f'. Reanudado: {len(resumed)} archivos ya copiados'
+        timeline.bytes_written = written
+        try:
+            self._api('complete_burning', order_id, notes=notes)
+        except Exception as e:
+            # The stick is written: keep the journal so the retry only verifies it
+            logger.error('Could not complete order %s after copying it: %s', order_id, e)
+            if journal is not None:
+                journal.close()
+            try:
+                self._api('report_error', order_id, f'Completion failed: {e}',
+                          error_code='COMPLETE_FAILED', retryable=True)
+            except Exception as report_error:
+                logger.error('Could not release order %s: %s', order_id, report_error)
+            self._record(timeline)
+            raise
+        timeline.success = True
+        self._record(timeline)
+        if journal is not None:
+            journal.discard()
+        return plan
+
+    def burn_device(self, order: Dict[str, Any], device: USBDevice) -> CopyPlan:
+        """
+        Burn an order onto a device, picking file or image mode.
+
+        Image mode is used when ``image_dir`` is set and the plan has many
+        small files (see ``choose_burn_mode``); the device is unmounted
+        first and the image is sized to its partition. Everything else goes
+        through ``burn``.
+
+        Args:
+            order: Order dictionary as returned by ``get_pending_orders``
+            device: Destination device
+
+        Returns:
+            The executed copy plan
+
+        Raises:
+            OSError: If the device cannot be unmounted or sized, or is not
+                mounted for a file-mode burn. The order is not claimed yet,
+                so it is only released locally and stays pending on the
+                server for the next poll.
+        """
+        prepared = self._prepared.get(str(order['order_id'])) or self._plan_ahead(order)
+        plan = prepared.plan
+        if self.image_dir and choose_burn_mode(plan) == 'image':
+            try:
+                if device.mount_point:
+                    _unmount(device.mount_point)
+                partition_size = _partition_size(device.device_path)
+            except (OSError, subprocess.CalledProcessError) as e:
+                error = OSError(f'Could not prepare {device.device_path} for image mode: {e}')
+                self._release_unclaimed(order, error)
+                raise error from e
+            return self.burn_image(order, device.device_path, partition_size, device.name)
+        if not device.mount_point:
+            error = OSError(f'{device.device_path} is not mounted')
+            self._release_unclaimed(order, error)
+            raise error
+        return self.burn(order, device.mount_point, device.name)
+
+    def _release_unclaimed(self, order: Dict[str, Any], error: Exception) -> None:
+        # Not claimed: reporting an error would fail a burn that never started
+        logger.error('Device not usable for order %s: %s', order['order_id'], error)
+        self.cancel(order['order_id'])
+
+    def burn_image(self, order: Dict[str, Any], device_path: str,
+                   device_size: int, device: Optional[str] = None) -> CopyPlan:
+        """
+        Burn an order by streaming a prebuilt FAT32 image to a raw device.
+
+        Args:
+            order: Order dictionary as returned by ``get_pending_orders``
+            device_path: Unmounted partition, loop device or image file
+            device_size: Size of the partition in bytes
+            device: Device name reported in the burn telemetry
+
+        Returns:
+            The executed copy plan
+
+        Raises:
+            OSError: If the image cannot be built or written
+            ImageError: If the content does not fit or verification fails
+            Exception: Any other failure after the order was claimed (all
+                are reported to the API first)
+        """
+        timeline = self._timeline(order, 'image', device)
+        try:
+            with PROFILER.order(str(order['order_id'])), PROFILER.observe(timeline.add):
+                return self._burn_image(order, device_path, device_size, timeline)
+        finally:
+            self.cancel(order['order_id'])
+
+    def _burn_image(self, order: Dict[str, Any], device_path: str,
+                    device_size: int, timeline: OrderTimeline) -> CopyPlan:
+        order_id = order['order_id']
+        self._api('start_burning', order_id)
+
+        image_path = os.path.join(self.image_dir, re.sub(r'[^A-Za-z0-9._-]', '_', str(order_id)) + '.img')
+        phone = str(order.get('customer_phone') or '')
+        label = f'USB_{phone[-4:]}' if phone else 'TECHAURA'
+        try:
+            plan = self._take_plan(order, timeline)
+            os.makedirs(self.image_dir, exist_ok=True)
+            files = plan_image_files(plan, {'playlist.json': self.playlist_json(plan).encode('utf-8')})
+            with stage('image.build'), open(image_path, 'wb') as image:
+                layout = build_fat32_image(files, device_size, image, label=label)
+            # Includes the read-back verification
+            with stage('image.stream'):
+                stream_image(image_path, device_path, layout.used_bytes)
+        except Exception as e:
+            # The order is claimed: whatever went wrong, release it
+            logger.error('Image burn failed for order %s: %s', order_id, e)
+            self._api('report_error', order_id, str(e), error_code='COPY_FAILED',
+                      retryable=True)
+            self._record(timeline)
+            raise
+        finally:
+            try:
+                os.remove(image_path)
+            except OSError:
+                pass
+
+        notes = self._completion_notes(plan, plan.total_bytes) + '. Modo imagen'
+        self._api('complete_burning', order_id, notes=notes)
+        timeline.bytes_written = layout.used_bytes
+        timeline.success = True
+        self._record(timeline)
+        return plan
+
+    def burn_many(self, jobs: Sequence[Tuple[Dict[str, Any], str]]) -> FanoutResult:
+        """
+        Burn several sticks at once, reading shared content only once.
+
+        The same order may appear with several mount points (identical
+        sticks); it is completed only if every one of its sticks succeeded.
+        Unlike ``burn``, failures of single sticks are reported to the API
+        but not raised, so one bad stick does not abort the others. Any
+        other failure (claiming, planning, the API) releases every order
+        claimed so far and is raised.
+
+        Not used by the daemon, which burns one order per stick through
+        ``burn_device``; meant for bench duplication of identical sticks.
+
+        Args:
+            jobs: (order, mount point) pairs
+
+        Returns:
+            The fan-out copy result
+
+        Raises:
+            Exception: Whatever failed outside the sticks' own copies (the
+                claimed orders are reported to the API first)
+        """
+        plans: Dict[str, CopyPlan] = {}
+        orders: Dict[str, Dict[str, Any]] = {}  # Claimed
+        timelines: Dict[str, OrderTimeline] = {}
+        reported: Set[str] = set()  # Completed or reported as failed
+        try:
+            for order, _mount_point in jobs:
+                order_id = str(order['order_id'])
+                if order_id not in timelines:
+                    timeline = timelines[order_id] = self._timeline(order, 'fanout')
+                    with PROFILER.observe(timeline.add):
+                        self._api('start_burning', order['order_id'])
+                        orders[order_id] = order
+                        plans[order_id] = self._take_plan(order, timeline)
+
+            # The copy is shared: every order of the fan-out waited for all of it
+            def add_to_all(name: str, seconds: float) -> None:
+                for timeline in timelines.values():
+                    timeline.add(name, seconds)
+
+            with PROFILER.observe(add_to_all), stage('fanout'):
+                result = fanout_copy([(plans[str(order['order_id'])], mount_point)
+                                      for order, mount_point in jobs])
+
+            failed: Dict[str, OSError] = {}
+            copies: Dict[str, int] = {}
+            for order, mount_point in jobs:
+                order_id = str(order['order_id'])
+                error = result.errors.get(mount_point)
+                if error is None:
+                    try:
+                        with PROFILER.observe(timelines[order_id].add):
+                            self.write_playlist(plans[order_id], mount_point)
+                    except OSError as e:
+                        error = e
+                if error is not None:
+                    failed.setdefault(order_id, error)
+                copies[order_id] = copies.get(order_id, 0) + 1
+
+            for order_id, plan in plans.items():
+                api_order_id = orders[order_id]['order_id']
+                timeline = timelines[order_id]
+                if order_id in failed:
+                    logger.error('Burn failed for order %s: %s', order_id, failed[order_id])
+                    with PROFILER.observe(timeline.add):
+                        self._api('report_error', api_order_id, str(failed[order_id]),
+                                  error_code='COPY_FAILED', retryable=True)
+                    reported.add(order_id)
+                    self._record(timeline)
+                    continue
+                notes = self._completion_notes(plan, plan.total_bytes)
+                if copies[order_id] > 1:
+                    notes += f'. Copias: {copies[order_id]}'
+                with PROFILER.observe(timeline.add):
+                    self._api('complete_burning', api_order_id, notes=notes)
+                reported.add(order_id)
+                timeline.bytes_written = plan.total_bytes * copies[order_id]
+                timeline.success = True
+                self._record(timeline)
+            return result
+        except Exception as e:
+            # Claimed orders must not stay burning: release the ones not reported yet
+            for order_id, order in orders.items():
+                if order_id in reported:
+                    continue
+                logger.error('Fan-out burn failed for order %s: %s', order_id, e)
+                try:
+                    self._api('report_error', order['order_id'], str(e), error_code='COPY_FAILED',
+                              retryable=True)
+                except Exception as report_error:
+                    logger.error('Could not release order %s: %s', order_id, report_error)
+                self._record(timelines[order_id])
+            raise
+        finally:
+            for order_id in timelines:
+                self.cancel(order_id)
+
+    @staticmethod
+    def _completion_notes(plan: CopyPlan, written: int) -> str:
+        notes = f'{len(plan)} archivos, {written} bytes'
+        if plan.dropped:
+            notes += f'. Omitidos por capacidad: {len(plan.dropped)}'
+        if plan.unmatched:
+            notes += f". Sin coincidencias: {', '.join(plan.unmatched)}"
+        return notes
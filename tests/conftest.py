@@ -79,272 +79,16 @@ class APIResponse:
 
 
 # =============================================================================
-# TechAura Client Implementation for Testing
+# TechAura Client
 # =============================================================================
 
-class TechAuraClientError(Exception):
-    """Base exception for TechAura client errors."""
-    def __init__(self, message: str, status_code: Optional[int] = None, 
-                 error_code: Optional[str] = None, retryable: bool = False):
-        super().__init__(message)
-        self.status_code = status_code
-        self.error_code = error_code
-        self.retryable = retryable
-
-
-class TechAuraAuthenticationError(TechAuraClientError):
-    """Raised when authentication fails."""
-    pass
-
-
-class TechAuraConnectionError(TechAuraClientError):
-    """Raised when connection fails."""
-    pass
-
-
-class TechAuraClient:
-    """
-    Client for interacting with the TechAura USB burning service API.
-    
-    This client provides methods for:
-    - Retrieving pending USB orders
-    - Starting/completing burning processes
-    - Reporting errors
-    """
-
-    def __init__(self, base_url: str, api_key: str, timeout: int = 30,
-                 max_retries: int = 3, retry_delay: float = 1.0):
-        """
-        Initialize the TechAura client.
-        
-        Args:
-            base_url: The base URL of the TechAura API
-            api_key: API key for authentication
-            timeout: Request timeout in seconds
-            max_retries: Maximum number of retry attempts
-            retry_delay: Base delay between retries in seconds
-        """
-        if not api_key:
-            raise TechAuraAuthenticationError("API key is required", 
-                                              error_code="MISSING_API_KEY")
-        
-        self.base_url = base_url.rstrip('/')
-        self.api_key = api_key
-        self.timeout = timeout
-        self.max_retries = max_retries
-        self.retry_delay = retry_delay
-        self._session = None
-
-    def _get_headers(self) -> Dict[str, str]:
-        """Get headers for API requests."""
-        return {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
-
-    def _make_request(self, method: str, endpoint: str, 
-                      data: Optional[Dict] = None,
-                      params: Optional[Dict] = None) -> Dict[str, Any]:
-        """
-        Make an HTTP request with retry logic.
-        
-        This method is designed to be mocked in tests.
-        """
-        import requests
-        from requests.exceptions import Timeout, ConnectionError as RequestsConnectionError
-        
-        url = f"{self.base_url}{endpoint}"
-        last_error = None
-        
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.request(
-                    method=method,
-                    url=url,
-                    headers=self._get_headers(),
-                    json=data,
-                    params=params,
-                    timeout=self.timeout
-                )
-                
-                # Handle different status codes
-                if response.status_code == 401:
-                    raise TechAuraAuthenticationError(
-                        "Invalid API key",
-                        status_code=401,
-                        error_code="INVALID_API_KEY"
-                    )
-                elif response.status_code == 429:
-                    raise TechAuraClientError(
-                        "Rate limit exceeded",
-                        status_code=429,
-                        error_code="RATE_LIMITED",
-                        retryable=True
-                    )
-                elif response.status_code == 500:
-                    raise TechAuraClientError(
-                        "Internal server error",
-                        status_code=500,
-                        error_code="SERVER_ERROR",
-                        retryable=True
-                    )
-                elif response.status_code == 503:
-                    raise TechAuraClientError(
-                        "Service unavailable",
-                        status_code=503,
-                        error_code="SERVICE_UNAVAILABLE",
-                        retryable=True
-                    )
-                elif response.status_code >= 400:
-                    error_data = response.json() if response.content else {}
-                    raise TechAuraClientError(
-                        error_data.get('error', f'HTTP {response.status_code}'),
-                        status_code=response.status_code,
-                        error_code=error_data.get('code')
-                    )
-                
-                return response.json()
-                
-            except Timeout:
-                last_error = TechAuraConnectionError(
-                    "Connection timed out",
-                    error_code="TIMEOUT",
-                    retryable=True
-                )
-            except RequestsConnectionError:
-                last_error = TechAuraConnectionError(
-                    "Could not connect to server",
-                    error_code="CONNECTION_ERROR",
-                    retryable=True
-                )
-            except TechAuraClientError as e:
-                if not e.retryable or attempt >= self.max_retries - 1:
-                    raise
-                last_error = e
-            
-            # Exponential backoff for retries
-            if attempt < self.max_retries - 1:
-                import time
-                time.sleep(self.retry_delay * (2 ** attempt))
-        
-        if last_error:
-            raise last_error
-        raise TechAuraClientError("Request failed after all retries")
-
-    def connect(self) -> bool:
-        """
-        Test connection to the API.
-        
-        Returns:
-            True if connection is successful
-            
-        Raises:
-            TechAuraConnectionError: If connection fails
-            TechAuraAuthenticationError: If authentication fails
-        """
-        response = self._make_request('GET', '/health')
-        return response.get('success', False)
-
-    def get_pending_orders(self, page: int = 1, 
-                           per_page: int = 20) -> List[Dict[str, Any]]:
-        """
-        Get list of pending USB orders.
-        
-        Args:
-            page: Page number for pagination
-            per_page: Number of results per page
-            
-        Returns:
-            List of pending order dictionaries
-        """
-        response = self._make_request(
-            'GET', 
-            '/orders/pending',
-            params={'page': page, 'per_page': per_page}
-        )
-        
-        if not response.get('success'):
-            return []
-        
-        data = response.get('data')
-        if data is None:
-            return []
-        
-        return data.get('orders', [])
-
-    def start_burning(self, order_id: str) -> bool:
-        """
-        Mark an order as burning started.
-        
-        Args:
-            order_id: The ID of the order to start burning
-            
-        Returns:
-            True if successfully started
-        """
-        response = self._make_request(
-            'POST',
-            f'/orders/{order_id}/start-burning'
-        )
-        return response.get('success', False)
-
-    def complete_burning(self, order_id: str, 
-                         notes: Optional[str] = None) -> bool:
-        """
-        Mark an order as burning completed.
-        
-        Args:
-            order_id: The ID of the order to complete
-            notes: Optional notes about the completed order
-            
-        Returns:
-            True if successfully completed
-        """
-        data = None
-        if notes:
-            data = {'notes': notes}
-            
-        response = self._make_request(
-            'POST',
-            f'/orders/{order_id}/complete-burning',
-            data=data
-        )
-        return response.get('success', False)
-
-    def report_error(self, order_id: str, error_message: str,
-                     error_code: Optional[str] = None,
-                     retryable: bool = False) -> bool:
-        """
-        Report an error for an order.
-        
-        Args:
-            order_id: The ID of the order
-            error_message: Description of the error
-            error_code: Optional error code
-            retryable: Whether the operation can be retried
-            
-        Returns:
-            True if error was reported successfully
-        """
-        # Truncate very long error messages
-        max_length = 10000
-        if len(error_message) > max_length:
-            error_message = error_message[:max_length] + '...[truncated]'
-        
-        data = {
-            'error_message': error_message,
-            'retryable': retryable
-        }
-        if error_code:
-            data['error_code'] = error_code
-            
-        response = self._make_request(
-            'POST',
-            f'/orders/{order_id}/report-error',
-            data=data
-        )
-        return response.get('success', False)
+# Re-exported so tests can keep importing the client from here
+from techaura_station.client import (  # noqa: E402,F401
+    TechAuraAuthenticationError,
+    TechAuraClient,
+    TechAuraClientError,
+    TechAuraConnectionError,
+)
 
 
 # =============================================================================
@@ -522,3 +266,32 @@ def mock_paginated_response(sample_orders):
         }
         return response
     return _create_response
+
+
+@pytest.fixture
+def media_library(tmp_path):
+    """
+    Create a small media library tree mirroring the station layout.
+
+    Returns:
+        Mapping of content kind to its root directory
+    """
+    files = {
+        'music/Salsa/recortado_Joe Arroyo - La Rebelion.mp3': b'A' * 2048,
+        'music/Salsa/recortado_Luis Vázquez - Peligro de Amor (Oficial).mp3': b'B' * 1024,
+        'music/Norteñas/recortado_Los Tigres Del Norte - Jefe De Jefes.mp3': b'C' * 4096,
+        'music/Vallenato/joe_arroyo_en_vivo.mp3': b'D' * 512,
+        'music/Rock/recortado_Back in Black - AC DC.mp3': b'E' * 3072,
+        'music/Rock/cover.jpg': b'F' * 128,
+        'videos/Reggaeton/Daddy Yankee - Gasolina.mp4': b'G' * 8192,
+        'movies/Accion/Duro de Matar (1988).mkv': b'H' * 16384,
+    }
+    for relative, content in files.items():
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return {
+        'music': str(tmp_path / 'music'),
+        'videos': str(tmp_path / 'videos'),
+        'movies': str(tmp_path / 'movies'),
+    }
@@ -0,0 +1,126 @@
+"""
+Tests for the techaura-station command line.
+"""
+
+import subprocess
+import sys
+from unittest.mock import patch
+
+from techaura_station import cli
+
+
+class TestLazyStartup:
+    """Tests for the CLI import footprint."""
+
+    def test_cli_import_does_not_load_heavy_modules(self):
+        """Test that importing the CLI leaves requests, sqlite3 and pools unloaded."""
+        # Arrange
+        code = ('import sys, techaura_station.cli; '
+                "print(','.join(m for m in ('requests', 'sqlite3', 'concurrent.futures', "
+                "'techaura_station.worker') if m in sys.modules))")
+
+        # Act
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True)
+
+        # Assert
+        assert result.stdout.strip() == ''
+
+    def test_package_exports_resolve_lazily(self):
+        """Test that package attributes import their submodule on first use."""
+        # Arrange
+        code = ('import sys, techaura_station as t; before = "techaura_station.scheduler" in sys.modules; '
+                't.BurnScheduler; print(before, "techaura_station.scheduler" in sys.modules)')
+
+        # Act
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True)
+
+        # Assert
+        assert result.stdout.split() == ['False', 'True']
+
+    def test_measure_import_time_reports_cli(self):
+        """Test that the import time of the CLI module is measured."""
+        # Act
+        elapsed = cli.measure_import_time()
+
+        # Assert
+        assert elapsed > 0
+
+    def test_startup_time_fails_over_budget(self, capsys):
+        """Test that startup-time exits non-zero when the budget is exceeded."""
+        # Arrange
+        with patch.object(cli, 'measure_import_time', return_value=80.0):
+            # Act
+            code = cli.main(['startup-time', '--budget', '50'])
+
+        # Assert
+        assert code == 1
+        assert '80.0 ms' in capsys.readouterr().out
+
+
+class TestCheckCommand:
+    """Tests for the check command."""
+
+    def test_check_succeeds_when_api_reachable(self, base_url, api_key):
+        """Test that check exits 0 when the health endpoint answers."""
+        # Arrange
+        with patch('techaura_station.client.TechAuraClient.connect', return_value=True):
+            # Act
+            code = cli.main(['check', '--api-url', base_url, '--api-key', api_key])
+
+        # Assert
+        assert code == 0
+
+    def test_check_requires_api_key(self, base_url, monkeypatch):
+        """Test that a missing API key is rejected before any request."""
+        # Arrange
+        monkeypatch.delenv('TECHAURA_API_KEY', raising=False)
+
+        # Act
+        code = cli.main(['check', '--api-url', base_url])
+
+        # Assert
+        assert code == 2
+
+
+class TestLibraryCommand:
+    """Tests for the library command."""
+
+    def test_sync_from_mirror_directory(self, media_library, tmp_path, capsys):
+        """Test that library sync copies a mirror directory into the roots."""
+        # Arrange
+        mirror = str(tmp_path)  # media_library roots are its music/videos/movies subdirs
+        station = tmp_path.parent / f'{tmp_path.name}-station'
+
+        # Act
+        code = cli.main(['library', 'sync', mirror, '--music', str(station / 'music'),
+                         '--movies', str(station / 'movies')])
+
+        # Assert
+        assert code == 0
+        assert '7 added' in capsys.readouterr().out
+        assert (station / 'movies' / 'Accion' / 'Duro de Matar (1988).mkv').read_bytes() == b'H' * 16384
+
+
+class TestHistoryCommand:
+    """Tests for the history command."""
+
+    def test_export_resumes_from_cursor_file(self, base_url, api_key, tmp_path):
+        """Test that records are appended and the last cursor is saved."""
+        # Arrange
+        cursor_file = tmp_path / 'cursor'
+        cursor_file.write_text('7')
+        output = tmp_path / 'history.jsonl'
+        records = [{'cursor': 8, 'outcome': 'completed'}, {'cursor': 11, 'outcome': 'failed'}]
+        with patch('techaura_station.client.TechAuraClient.iter_burn_history',
+                   return_value=iter(records)) as iter_burn_history:
+            # Act
+            code = cli.main(['history', '--api-url', base_url, '--api-key', api_key,
+                             '--cursor-file', str(cursor_file), '--output', str(output)])
+
+        # Assert
+        assert code == 0
+        assert iter_burn_history.call_args[1]['since'] == 7
+        assert len(output.read_text().splitlines()) == 2
+        assert cursor_file.read_text() == '11'
@@ -0,0 +1,333 @@
+"""
+Tests for the packaged client beyond the API workflow covered in
+test_techaura_client_comprehensive.py: keep-alive sessions, stage timings and
+streamed order pages.
+"""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from techaura_station.client import (
+    TechAuraClient, TechAuraClientError, TechAuraConnectionError, iter_json_array, iter_ndjson,
+    make_session)
+from techaura_station.profiling import PROFILER
+
+
+def make_response(payload):
+    response = Mock()
+    response.status_code = 200
+    response.content = b'{}'
+    response.json.return_value = payload
+    return response
+
+
+class TestSessions:
+    """Tests for pooled sessions."""
+
+    def test_requests_go_through_session(self, base_url, api_key, mock_requests):
+        """Test that a client with a session never calls requests.request."""
+        # Arrange
+        session = Mock()
+        session.request.return_value = make_response({'success': True})
+        client = TechAuraClient(base_url, api_key, session=session)
+
+        # Act
+        result = client.connect()
+
+        # Assert
+        assert result is True
+        session.request.assert_called_once()
+        assert session.request.call_args[1]['url'] == f'{base_url}/health'
+        mock_requests.assert_not_called()
+
+    def test_close_closes_session(self, base_url, api_key):
+        """Test that closing the client releases the pooled connections."""
+        # Arrange
+        session = Mock()
+        client = TechAuraClient(base_url, api_key, session=session)
+
+        # Act
+        client.close()
+
+        # Assert
+        session.close.assert_called_once()
+
+    def test_make_session_sizes_pool(self):
+        """Test that the session mounts pooled adapters for both schemes."""
+        # Act
+        session = make_session(pool_size=4)
+
+        # Assert
+        adapter = session.get_adapter('https://api.techaura.com')
+        assert adapter._pool_maxsize == 4
+        session.close()
+
+
+class TestStationIdentity:
+    """Tests for the station identity header."""
+
+    def test_station_id_is_sent(self, base_url, api_key):
+        """Test that a client with a station id sends X-Station-Id."""
+        # Arrange
+        session = Mock()
+        session.request.return_value = make_response({'success': True})
+        client = TechAuraClient(base_url, api_key, session=session, station_id='bodega-1')
+
+        # Act
+        client.connect()
+
+        # Assert
+        assert session.request.call_args[1]['headers']['X-Station-Id'] == 'bodega-1'
+
+    def test_no_header_without_station_id(self, base_url, api_key):
+        """Test that the header is omitted when no station id is set."""
+        # Arrange
+        session = Mock()
+        session.request.return_value = make_response({'success': True})
+        client = TechAuraClient(base_url, api_key, session=session)
+
+        # Act
+        client.connect()
+
+        # Assert
+        assert 'X-Station-Id' not in session.request.call_args[1]['headers']
+
+
+class TestStageTimings:
+    """Tests for the HTTP/JSON stage hooks."""
+
+    def test_records_http_and_json_stages(self, client, mock_requests):
+        """Test that requests are timed as http and json stages when enabled."""
+        # Arrange
+        PROFILER.handle_command('reset')
+        PROFILER.stages_enabled = True
+        try:
+            # Act
+            client.get_pending_orders()
+        finally:
+            PROFILER.stages_enabled = False
+
+        # Assert
+        report = PROFILER.stage_report()
+        assert report['http']['count'] == 1
+        assert report['json']['count'] == 1
+
+
+class TestOrderQueries:
+    """Tests for single-order and delta queries."""
+
+    def test_get_order_changes_sends_since(self, client, mock_requests):
+        """Test that the change version is passed as the since parameter."""
+        # Arrange
+        mock_requests.return_value.json.return_value = {
+            'success': True,
+            'data': {'version': 9, 'full': False, 'items': [], 'removed': ['o1']},
+        }
+
+        # Act
+        changes = client.get_order_changes(since=7)
+
+        # Assert
+        assert changes['removed'] == ['o1']
+        kwargs = mock_requests.call_args[1]
+        assert kwargs['url'].endswith('/orders/changes')
+        assert kwargs['params'] == {'since': 7}
+
+    def test_get_order_returns_data(self, client, mock_requests):
+        """Test that a single order is returned from the data field."""
+        # Arrange
+        mock_requests.return_value.json.return_value = {
+            'success': True, 'data': {'orderId': 'o1', 'status': 'burning'}}
+
+        # Act
+        order = client.get_order('o1')
+
+        # Assert
+        assert order == {'orderId': 'o1', 'status': 'burning'}
+
+
+class TestTelemetry:
+    """Tests for the burn telemetry upload."""
+
+    def test_send_burn_telemetry_posts_batch(self, client, mock_requests):
+        """Test that a batch is posted with the station id."""
+        # Arrange
+        mock_requests.return_value.json.return_value = {'success': True, 'data': {'accepted': 1}}
+        entries = [{'o': 'o1', 'b': 10, 'ok': True, 's': {'copy': 5}}]
+
+        # Act
+        result = client.send_burn_telemetry('station-1', entries)
+
+        # Assert
+        assert result is True
+        kwargs = mock_requests.call_args[1]
+        assert kwargs['url'].endswith('/telemetry/burns')
+        assert kwargs['json'] == {'stationId': 'station-1', 'entries': entries}
+
+
+def split_bytes(payload, size):
+    raw = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestStreamingDecode:
+    """Tests for incremental decoding of order pages."""
+
+    @pytest.mark.parametrize('chunk_size', [1, 5, 64, 1 << 20])
+    def test_decodes_across_chunk_boundaries(self, chunk_size):
+        """Test that items split anywhere (even inside UTF-8 characters) decode intact."""
+        # Arrange
+        orders = [{'order_id': f'o{i}', 'customer_name': 'Muñoz' * i, 'total': 12345.75}
+                  for i in range(20)]
+        payload = {'success': True, 'data': {'orders': orders, 'total': 20}, 'timestamp': 'now'}
+
+        # Act
+        decoded = list(iter_json_array(split_bytes(payload, chunk_size), ('data', 'orders')))
+
+        # Assert
+        assert decoded == orders
+
+    def test_yields_before_body_is_complete(self):
+        """Test that the first order is available before later chunks are read."""
+        # Arrange
+        body = split_bytes({'success': True, 'data': {
+            'orders': [{'order_id': 'first'}, {'order_id': 'second'}]}}, 8)
+        read = []
+
+        def chunks():
+            for chunk in body:
+                read.append(chunk)
+                yield chunk
+
+        # Act
+        first = next(iter_json_array(chunks(), ('data', 'orders')))
+
+        # Assert
+        assert first == {'order_id': 'first'}
+        assert len(read) < len(body)
+
+    @pytest.mark.parametrize('payload', [
+        {'success': False, 'data': {'orders': [{'order_id': 'x'}]}},
+        {'success': True, 'data': None},
+        {'success': True},
+    ])
+    def test_unsuccessful_or_empty_pages_yield_nothing(self, payload):
+        """Test the same empty results as get_pending_orders."""
+        assert list(iter_json_array(split_bytes(payload, 4), ('data', 'orders'))) == []
+
+    def test_truncated_body_raises(self):
+        """Test that a body cut mid-array is a decode error, not a short page."""
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array([b'{"success": true, "data": {"orders": [{"a": 1}, '], ('data', 'orders')))
+
+
+class TestIterPendingOrders:
+    """Tests for TechAuraClient.iter_pending_orders."""
+
+    def test_streams_orders_from_response(self, client, mock_requests):
+        """Test that the response is requested streamed and closed after use."""
+        # Arrange
+        response = mock_requests.return_value
+        response.iter_content.return_value = split_bytes(
+            {'success': True, 'data': {'orders': [{'order_id': 'a'}, {'order_id': 'b'}]}}, 3)
+
+        # Act
+        orders = list(client.iter_pending_orders(per_page=500))
+
+        # Assert
+        assert [o['order_id'] for o in orders] == ['a', 'b']
+        kwargs = mock_requests.call_args[1]
+        assert kwargs['stream'] is True
+        assert kwargs['params'] == {'page': 1, 'per_page': 500}
+        response.close.assert_called_once()
+
+    def test_error_status_raises_like_get_pending_orders(self, client, mock_requests):
+        """Test that non-200 bodies keep the regular error handling."""
+        # Arrange
+        mock_requests.return_value.status_code = 403
+        mock_requests.return_value.json.return_value = {'error': 'Forbidden', 'code': 'FORBIDDEN'}
+
+        # Act & Assert
+        with pytest.raises(TechAuraClientError) as excinfo:
+            list(client.iter_pending_orders())
+        assert excinfo.value.error_code == 'FORBIDDEN'
+
+    def test_broken_body_is_a_connection_error(self, client, mock_requests):
+        """Test that a connection lost mid-body surfaces as a client error."""
+        # Arrange
+        def chunks(_size):
+            yield b'{"success": true, "data": {"orders": [{"order_id": "a"}, '
+            raise requests.exceptions.ChunkedEncodingError('connection reset')
+
+        mock_requests.return_value.iter_content.side_effect = chunks
+
+        # Act
+        orders = client.iter_pending_orders()
+        first = next(orders)
+
+        # Assert
+        assert first == {'order_id': 'a'}
+        with pytest.raises(TechAuraConnectionError):
+            next(orders)
+
+
+def ndjson_chunks(records, size):
+    raw = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestBurnHistory:
+    """Tests for TechAuraClient.iter_burn_history."""
+
+    def test_ndjson_lines_split_across_chunks(self):
+        """Test that lines split anywhere decode intact."""
+        # Arrange
+        records = [{'cursor': i, 'notes': 'Muñoz ' * i} for i in range(10)]
+
+        # Act
+        decoded = list(iter_ndjson(ndjson_chunks(records, 7)))
+
+        # Assert
+        assert decoded == records
+
+    def test_follows_pages_until_no_more(self, client, mock_requests):
+        """Test that the next page starts at the trailer cursor."""
+        # Arrange
+        pages = [
+            [{'cursor': 3, 'outcome': 'completed'}, {'cursor': 5, 'outcome': 'failed'},
+             {'end': True, 'cursor': 5, 'count': 2, 'more': True}],
+            [{'cursor': 9, 'outcome': 'completed'}, {'end': True, 'cursor': 9, 'count': 1, 'more': False}],
+        ]
+        responses = []
+        for page in pages:
+            response = Mock(status_code=200)
+            response.iter_content.return_value = ndjson_chunks(page, 16)
+            responses.append(response)
+        mock_requests.side_effect = responses
+
+        # Act
+        records = list(client.iter_burn_history(since=1, page_size=2))
+
+        # Assert
+        assert [r['cursor'] for r in records] == [3, 5, 9]
+        assert [c[1]['params'] for c in mock_requests.call_args_list] == [
+            {'since': 1, 'limit': 2}, {'since': 5, 'limit': 2}]
+        assert all(c[1]['stream'] is True for c in mock_requests.call_args_list)
+        assert all(r.close.called for r in responses)
+
+    def test_missing_trailer_raises(self, client, mock_requests):
+        """Test that an export cut between records is not taken as complete."""
+        # Arrange
+        mock_requests.return_value.iter_content.return_value = ndjson_chunks([{'cursor': 1}], 4)
+
+        # Act
+        records = client.iter_burn_history()
+        first = next(records)
+
+        # Assert
+        assert first == {'cursor': 1}
+        with pytest.raises(TechAuraConnectionError):
+            next(records)
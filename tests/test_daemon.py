@@ -0,0 +1,344 @@
+"""
+Tests for the station daemon.
+
+Uses a mocked API client and a mocked worker; burns are simulated by the
+worker mock so no device is written. The telemetry test runs a real worker
+against a temporary directory standing in for the stick.
+"""
+
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from techaura_station.daemon import StationDaemon
+from techaura_station.devices import USBDevice
+from techaura_station.matching import ContentIndex
+from techaura_station.plan import CopyItem, CopyPlan
+from techaura_station.scheduler import BurnScheduler
+from techaura_station.worker import BurnWorker
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+
+
+def make_device(name, free=8 * GB, empty=True, mount_point='/media/usb'):
+    return USBDevice(name, f'/dev/{name}1', 'USB', free, free, 0, 'vfat',
+                     mount_point, empty)
+
+
+def make_order(order_id, capacity='8GB'):
+    return {'order_id': order_id, 'capacity': capacity}
+
+
+def make_plan(order):
+    return CopyPlan(order['order_id'], [CopyItem('/library/song.mp3', 'song.mp3', GB)])
+
+
+@pytest.fixture
+def api_client():
+    """Provide a mocked TechAura client with no pending orders."""
+    client = Mock()
+    client.iter_pending_orders.return_value = []
+    return client
+
+
+@pytest.fixture
+def worker():
+    """Provide a mocked worker whose burns write 1 GB."""
+    worker = Mock()
+    worker.prepare.side_effect = make_plan
+    worker.burn_device.side_effect = lambda order, device: make_plan(order)
+    return worker
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not met in time'
+        time.sleep(0.01)
+
+
+class TestPolling:
+    """Tests for StationDaemon.poll."""
+
+    def test_queues_new_orders_once(self, api_client, worker):
+        """Test that orders seen on consecutive polls are prepared once."""
+        # Arrange
+        api_client.iter_pending_orders.return_value = [make_order('a'), make_order('b')]
+        daemon = StationDaemon(api_client, worker)
+
+        # Act
+        first = daemon.poll()
+        second = daemon.poll()
+
+        # Assert
+        assert (first, second) == (2, 0)
+        assert worker.prepare.call_count == 2
+        assert len(daemon.queue) == 2
+
+    def test_skips_orders_that_cannot_be_prepared(self, api_client, worker):
+        """Test that a failing order does not block the others."""
+        # Arrange
+        api_client.iter_pending_orders.return_value = [make_order('bad'), make_order('good')]
+        worker.prepare.side_effect = [ValueError('boom'), make_plan(make_order('good'))]
+        daemon = StationDaemon(api_client, worker)
+
+        # Act
+        queued = daemon.poll()
+
+        # Assert
+        assert queued == 1
+        assert len(daemon.queue) == 1
+
+    def test_draining_daemon_does_not_poll(self, api_client, worker):
+        """Test that no orders are claimed once draining."""
+        # Arrange
+        daemon = StationDaemon(api_client, worker)
+        daemon.drain()
+
+        # Act
+        queued = daemon.poll()
+
+        # Assert
+        assert queued == 0
+        api_client.iter_pending_orders.assert_not_called()
+
+
+class TestDispatch:
+    """Tests for device handling and dispatch."""
+
+    def test_burns_queued_order_on_ready_device(self, api_client, worker):
+        """Test that a queued order is burned on a free stick, which is then retired."""
+        # Arrange
+        api_client.iter_pending_orders.return_value = [make_order('a')]
+        daemon = StationDaemon(api_client, worker, BurnScheduler())
+        device = make_device('sdb')
+        daemon.device_ready(device)
+        daemon.poll()
+
+        # Act
+        started = daemon.dispatch()
+        daemon.run(once=True)  # Drains, waiting for the burn
+
+        # Assert
+        assert started == 1
+        worker.burn_device.assert_called_once_with(make_order('a'), device)
+        assert 'sdb' not in daemon.scheduler.devices
+
+    def test_ignores_non_empty_or_unmounted_devices(self, api_client, worker):
+        """Test that only mounted, empty sticks are offered to the scheduler."""
+        # Arrange
+        daemon = StationDaemon(api_client, worker)
+
+        # Act
+        daemon.device_ready(make_device('sdb', empty=False))
+        daemon.device_ready(make_device('sdc', mount_point=None))
+
+        # Assert
+        assert daemon.scheduler.devices == {}
+
+    def test_respects_required_capacity(self, api_client, worker):
+        """Test that an order is not placed on a stick smaller than its capacity."""
+        # Arrange
+        api_client.iter_pending_orders.return_value = [make_order('a', capacity='32GB')]
+        daemon = StationDaemon(api_client, worker)
+        daemon.device_ready(make_device('sdb', free=8 * GB))
+        daemon.poll()
+
+        # Act
+        started = daemon.dispatch()
+
+        # Assert
+        assert started == 0
+        worker.burn_device.assert_not_called()
+
+    def test_probed_speed_is_kept_across_stick_swaps(self, api_client, worker):
+        """Test that each stick is probed and its port keeps the speed learned from burns."""
+        # Arrange
+        probe = Mock(return_value=40 * MB)
+        api_client.iter_pending_orders.return_value = [make_order('a')]
+        daemon = StationDaemon(api_client, worker, probe=probe)
+        daemon.device_ready(make_device('sdb'))
+        probed = daemon.scheduler.devices['sdb'].throughput
+        daemon.poll()
+        daemon.dispatch()
+        wait_for(lambda: not daemon._burning)
+
+        # Act
+        daemon.device_ready(make_device('sdb'))  # The replacement stick
+
+        # Assert
+        probe.assert_called_with('/media/usb')
+        assert probed == 40 * MB
+        # The near-instant mocked burn raised the learned speed; the new probe is averaged in
+        assert daemon.scheduler.devices['sdb'].throughput > 40 * MB
+
+    def test_stick_removed_mid_burn_is_not_completed(self, api_client, worker):
+        """Test that a stick unplugged while burning is not recorded as a finished burn."""
+        # Arrange
+        release = threading.Event()
+        burning = threading.Event()
+
+        def slow_burn(order, device):
+            burning.set()
+            release.wait(5)
+            raise OSError('No such device')
+
+        worker.burn_device.side_effect = slow_burn
+        api_client.iter_pending_orders.return_value = [make_order('a')]
+        scheduler = BurnScheduler()
+        scheduler.complete = Mock(wraps=scheduler.complete)
+        device = make_device('sdb')
+        daemon = StationDaemon(api_client, worker, scheduler, probe=None)
+        daemon.device_ready(device)
+        daemon.poll()
+        daemon.dispatch()
+        assert burning.wait(2)
+
+        # Act
+        daemon.device_removed(device)
+        release.set()
+        wait_for(lambda: not daemon._burning)
+
+        # Assert
+        scheduler.complete.assert_not_called()
+        assert scheduler.stats().failures_per_hour == 0
+
+
+class TestDrain:
+    """Tests for graceful drain."""
+
+    def test_drain_waits_for_burn_and_releases_queue(self, api_client, worker):
+        """Test that draining finishes in-flight burns and releases queued orders."""
+        # Arrange
+        release = threading.Event()
+        burning = threading.Event()
+
+        def slow_burn(order, device):
+            burning.set()
+            release.wait(5)
+            return make_plan(order)
+
+        worker.burn_device.side_effect = slow_burn
+        api_client.iter_pending_orders.return_value = [make_order('a'), make_order('b')]
+        daemon = StationDaemon(api_client, worker, poll_interval=0.05)
+        daemon.device_ready(make_device('sdb'))
+        runner = threading.Thread(target=daemon.run)
+        runner.start()
+        assert burning.wait(2)
+
+        # Act
+        daemon.drain()
+        time.sleep(0.1)
+        still_running = runner.is_alive()
+        release.set()
+        runner.join(2)
+
+        # Assert
+        assert still_running
+        assert not runner.is_alive()
+        assert worker.burn_device.call_count == 1
+        burned = worker.burn_device.call_args[0][0]['order_id']
+        queued = 'b' if burned == 'a' else 'a'
+        worker.cancel.assert_called_once_with(queued)
+        assert len(daemon.scheduler) == 0
+        assert len(daemon.queue) == 0
+
+    def test_failed_burn_frees_order(self, api_client, worker):
+        """Test that a failed burn is forgotten so the order can be polled again."""
+        # Arrange
+        worker.burn_device.side_effect = OSError('device gone')
+        api_client.iter_pending_orders.return_value = [make_order('a')]
+        daemon = StationDaemon(api_client, worker)
+        daemon.device_ready(make_device('sdb'))
+        daemon.poll()
+        daemon.dispatch()
+
+        # Act
+        wait_for(lambda: worker.burn_device.called and not daemon._burning)
+        requeued = daemon.poll()
+
+        # Assert
+        assert requeued == 1
+
+    def test_urgent_order_overtakes_backlog(self, api_client, worker):
+        """Test that a high-priority order is burned before older normal ones."""
+        # Arrange
+        api_client.iter_pending_orders.return_value = [
+            make_order('old-1'), make_order('old-2'), dict(make_order('express'), priority='high')]
+        daemon = StationDaemon(api_client, worker)
+        daemon.poll()
+        daemon.device_ready(make_device('sdb'))
+
+        # Act
+        daemon.dispatch()
+        wait_for(lambda: worker.burn_device.called)
+
+        # Assert
+        assert worker.burn_device.call_args[0][0]['order_id'] == 'express'
+        assert len(daemon.queue) == 1
+
+
+class TestMirror:
+    """Tests for dropping stale orders through the order mirror."""
+
+    def test_drops_queued_orders_burning_elsewhere(self, api_client, worker):
+        """Test that a queued order taken by another station leaves the local queue."""
+        # Arrange
+        mirror = Mock()
+        mirror.status.side_effect = lambda order_id: 'burning' if order_id == 'a' else 'queued'
+        api_client.iter_pending_orders.return_value = [make_order('a'), make_order('b')]
+        daemon = StationDaemon(api_client, worker, mirror=mirror)
+        daemon.poll()
+        api_client.iter_pending_orders.return_value = []
+
+        # Act
+        daemon.poll()
+
+        # Assert
+        worker.cancel.assert_called_once_with('a')
+        assert len(daemon.queue) == 1
+
+    def test_looks_up_feed_entries_by_order_number(self, api_client, worker):
+        """Test that the mirror is consulted with the queue's order-number key."""
+        # Arrange
+        mirror = Mock()
+        mirror.status.side_effect = lambda key: 'completed' if key == 'ORD-1' else None
+        order = dict(make_order('uuid-1'), order_number='ORD-1')
+        api_client.iter_pending_orders.return_value = [order]
+        daemon = StationDaemon(api_client, worker, mirror=mirror)
+        daemon.poll()
+        api_client.iter_pending_orders.return_value = []
+
+        # Act
+        daemon.poll()
+
+        # Assert
+        worker.cancel.assert_called_once_with('uuid-1')
+        assert len(daemon.queue) == 0
+
+
+class TestBurnTelemetry:
+    """Tests for the timelines of burns run by the daemon."""
+
+    def test_timeline_includes_stages_resolved_while_polling(self, api_client, media_library,
+                                                             sample_order, tmp_path):
+        """Test that an order prepared at poll time still reports its resolve stage."""
+        # Arrange
+        telemetry = Mock()
+        worker = BurnWorker(api_client, ContentIndex.build(media_library), telemetry=telemetry)
+        api_client.iter_pending_orders.return_value = [sample_order.to_dict()]
+        daemon = StationDaemon(api_client, worker, probe=None)
+        (tmp_path / 'usb').mkdir()
+        daemon.device_ready(make_device('sdb', free=32 * GB, mount_point=str(tmp_path / 'usb')))
+        daemon.poll()
+
+        # Act
+        daemon.run(once=True)  # Burns the prepared order, then drains
+
+        # Assert
+        timeline = telemetry.record.call_args[0][0]
+        assert timeline.success
+        assert {'claim', 'resolve', 'copy', 'report'} <= set(timeline.stages)
@@ -0,0 +1,177 @@
+"""
+Tests for USB device detection against a fake sysfs tree.
+
+The fake tree mimics ``/sys/block/<disk>`` symlinks into a USB device path,
+a regular file stands in for ``/proc/mounts`` and temporary directories act
+as mount points.
+"""
+
+import os
+import threading
+
+import pytest
+
+from techaura_station.devices import DeviceMonitor, read_mounts, scan_usb_devices
+
+
+class FakeSysfs:
+    """Builds and mutates a fake sysfs/mounts tree."""
+
+    def __init__(self, root):
+        self.root = root
+        self.sys_root = str(root / 'sys')
+        self.mounts_path = str(root / 'mounts')
+        (root / 'sys' / 'block').mkdir(parents=True)
+        (root / 'sys' / 'devices').mkdir()
+        self.mounts = ['/dev/vda1 / ext4 rw 0 0']
+        self._write_mounts()
+
+    def _write_mounts(self):
+        with open(self.mounts_path, 'w') as f:
+            f.write('\n'.join(self.mounts) + '\n')
+
+    def plug(self, name, sectors=31_250_000, usb=True, partitions=1):
+        bus = 'usb1/1-1/1-1:1.0/host6/target6:0:0/6:0:0:0' if usb else 'pci0000:00/ata1/host0'
+        device_dir = self.root / 'sys' / 'devices' / 'pci0000:00' / bus / 'block' / name
+        device_dir.mkdir(parents=True)
+        (device_dir / 'size').write_text(f'{sectors}\n')
+        (device_dir / 'removable').write_text('1\n' if usb else '0\n')
+        for i in range(1, partitions + 1):
+            part = device_dir / f'{name}{i}'
+            part.mkdir()
+            (part / 'partition').write_text(f'{i}\n')
+        os.symlink(device_dir, self.root / 'sys' / 'block' / name)
+
+    def unplug(self, name):
+        os.remove(self.root / 'sys' / 'block' / name)
+
+    def mount(self, node, label, fstype='vfat'):
+        mount_point = self.root / 'media' / label
+        mount_point.mkdir(parents=True, exist_ok=True)
+        self.mounts.append(f'{node} {str(mount_point).replace(" ", chr(92) + "040")} {fstype} rw 0 0')
+        self._write_mounts()
+        return str(mount_point)
+
+    def unmount(self, node):
+        self.mounts = [line for line in self.mounts if not line.startswith(node + ' ')]
+        self._write_mounts()
+
+
+@pytest.fixture
+def fake_sysfs(tmp_path):
+    """Provide an empty fake sysfs tree."""
+    return FakeSysfs(tmp_path)
+
+
+# =============================================================================
+# 1. Snapshot Tests
+# =============================================================================
+
+class TestScanUsbDevices:
+    """Tests for scan_usb_devices and read_mounts."""
+
+    def test_ignores_non_usb_disks(self, fake_sysfs):
+        """Test that only disks on the USB bus are reported."""
+        fake_sysfs.plug('sda', usb=False)
+        fake_sysfs.plug('sdb')
+
+        devices = scan_usb_devices(fake_sysfs.sys_root, fake_sysfs.mounts_path)
+
+        assert list(devices) == ['sdb']
+
+    def test_unmounted_device_is_not_ready(self, fake_sysfs):
+        """Test that a plugged but unmounted stick reports its raw size."""
+        fake_sysfs.plug('sdb', sectors=2048)
+
+        device = scan_usb_devices(fake_sysfs.sys_root, fake_sysfs.mounts_path)['sdb']
+
+        assert device.device_path == '/dev/sdb1'
+        assert device.size == 2048 * 512
+        assert device.is_ready is False
+
+    def test_mounted_device_uses_statvfs(self, fake_sysfs):
+        """Test that mounted devices report statvfs capacity and emptiness."""
+        fake_sysfs.plug('sdb')
+        mount_point = fake_sysfs.mount('/dev/sdb1', 'MY USB')
+
+        device = scan_usb_devices(fake_sysfs.sys_root, fake_sysfs.mounts_path)['sdb']
+
+        st = os.statvfs(mount_point)
+        assert device.mount_point == mount_point
+        assert device.label == 'MY USB'
+        assert device.file_system == 'vfat'
+        assert device.size == st.f_blocks * st.f_frsize
+        assert device.is_empty is True
+
+    def test_read_mounts_decodes_escapes(self, fake_sysfs):
+        """Test that octal escapes in mount points are decoded."""
+        fake_sysfs.mount('/dev/sdc1', 'A B')
+
+        assert read_mounts(fake_sysfs.mounts_path)['/dev/sdc1'][0].endswith('A B')
+
+
+# =============================================================================
+# 2. Monitor Tests
+# =============================================================================
+
+class TestDeviceMonitor:
+    """Tests for DeviceMonitor events."""
+
+    def test_rescan_reports_added_changed_removed(self, fake_sysfs):
+        """Test that rescans diff device snapshots into callbacks."""
+        events = []
+        monitor = DeviceMonitor(
+            on_added=lambda d: events.append(('added', d.name)),
+            on_changed=lambda d: events.append(('changed', d.is_ready)),
+            on_removed=lambda d: events.append(('removed', d.name)),
+            sys_root=fake_sysfs.sys_root, mounts_path=fake_sysfs.mounts_path,
+        )
+
+        fake_sysfs.plug('sdb')
+        monitor.rescan()
+        fake_sysfs.mount('/dev/sdb1', 'USB')
+        monitor.rescan()
+        monitor.rescan()  # No change, no event
+        fake_sysfs.unmount('/dev/sdb1')
+        fake_sysfs.unplug('sdb')
+        monitor.rescan()
+
+        assert events == [('added', 'sdb'), ('changed', True), ('removed', 'sdb')]
+
+    def test_hotplug_events_arrive_without_polling(self, fake_sysfs):
+        """Test that plug and mount events are delivered by inotify, not the fallback timer."""
+        added = threading.Event()
+        ready = threading.Event()
+        monitor = DeviceMonitor(
+            on_added=lambda d: added.set(),
+            on_changed=lambda d: d.is_ready and ready.set(),
+            sys_root=fake_sysfs.sys_root, mounts_path=fake_sysfs.mounts_path,
+            fallback_interval=60,
+        )
+        monitor.start()
+        try:
+            fake_sysfs.plug('sdb')
+            assert added.wait(2)
+
+            fake_sysfs.mount('/dev/sdb1', 'USB')
+            assert ready.wait(2)
+            assert monitor.devices['sdb'].is_ready
+        finally:
+            monitor.stop()
+
+    def test_callback_errors_do_not_stop_monitor(self, fake_sysfs):
+        """Test that a failing callback does not break later events."""
+        seen = []
+
+        def flaky(device):
+            seen.append(device.name)
+            raise RuntimeError('boom')
+
+        monitor = DeviceMonitor(on_added=flaky, sys_root=fake_sysfs.sys_root,
+                                mounts_path=fake_sysfs.mounts_path)
+        fake_sysfs.plug('sdb')
+        monitor.rescan()
+        fake_sysfs.plug('sdc')
+        monitor.rescan()
+
+        assert seen == ['sdb', 'sdc']
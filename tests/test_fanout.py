@@ -0,0 +1,112 @@
+"""
+Tests for read-once fan-out copying.
+"""
+
+import os
+import time
+
+import pytest
+
+from techaura_station import fanout
+from techaura_station.fanout import fanout_copy
+from techaura_station.plan import CopyItem, CopyPlan
+
+
+@pytest.fixture
+def library(tmp_path):
+    """Provide four distinct source files of 10 KB."""
+    root = tmp_path / 'library'
+    root.mkdir()
+    paths = []
+    for i in range(4):
+        path = root / f'song{i}.mp3'
+        path.write_bytes(os.urandom(10 * 1024))
+        paths.append(str(path))
+    return paths
+
+
+def _plan(order_id, sources):
+    return CopyPlan(order_id, [CopyItem(s, os.path.join('MUSICA', os.path.basename(s)), os.path.getsize(s))
+                               for s in sources])
+
+
+def _mounts(tmp_path, count):
+    mounts = []
+    for i in range(count):
+        mount = tmp_path / f'usb{i}'
+        mount.mkdir()
+        mounts.append(str(mount))
+    return mounts
+
+
+def _assert_copied(plan, mount_point):
+    for item in plan:
+        with open(item.source, 'rb') as src, open(os.path.join(mount_point, item.destination), 'rb') as dst:
+            assert dst.read() == src.read()
+
+
+class TestFanoutCopy:
+    """Tests for fanout_copy."""
+
+    def test_identical_sticks_read_sources_once(self, library, tmp_path):
+        """Test that three copies of one order read each source once."""
+        # Arrange
+        plan = _plan('order-1', library)
+        mounts = _mounts(tmp_path, 3)
+
+        # Act
+        result = fanout_copy([(plan, m) for m in mounts], chunk_size=4096)
+
+        # Assert
+        assert result.source_bytes_read == plan.total_bytes
+        assert result.errors == {}
+        for mount in mounts:
+            assert result.written[mount] == plan.total_bytes
+            _assert_copied(plan, mount)
+
+    def test_overlapping_orders_share_reads(self, library, tmp_path):
+        """Test that content shared by different orders is read once."""
+        first, second = _plan('a', library[:3]), _plan('b', library[1:])
+        mounts = _mounts(tmp_path, 2)
+
+        result = fanout_copy([(first, mounts[0]), (second, mounts[1])], chunk_size=4096)
+
+        assert result.source_bytes_read == 4 * 10 * 1024
+        _assert_copied(first, mounts[0])
+        _assert_copied(second, mounts[1])
+
+    def test_slow_stick_falls_back_to_own_reads(self, library, tmp_path, monkeypatch):
+        """Test that a lagging stick is detached instead of stalling the others."""
+        # Arrange
+        plan = _plan('order-1', library)
+        fast, slow = _mounts(tmp_path, 2)
+        handle = fanout._DeviceWriter._handle
+
+        def slow_handle(writer, kind, message):
+            if writer.mount_point == slow and kind == 'chunk':
+                time.sleep(0.05)
+            return handle(writer, kind, message)
+
+        monkeypatch.setattr(fanout._DeviceWriter, '_handle', slow_handle)
+
+        # Act
+        result = fanout_copy([(plan, fast), (plan, slow)], chunk_size=1024,
+                             max_pending=2048, max_stall=0.01)
+
+        # Assert
+        assert result.errors == {}
+        assert result.source_bytes_read > plan.total_bytes
+        _assert_copied(plan, fast)
+        _assert_copied(plan, slow)
+
+    def test_failed_stick_does_not_stop_others(self, library, tmp_path):
+        """Test that a write error is isolated to its device."""
+        plan = _plan('order-1', library)
+        good = _mounts(tmp_path, 1)[0]
+        bad = tmp_path / 'not-a-dir'
+        bad.write_text('')
+
+        result = fanout_copy([(plan, good), (plan, str(bad))], chunk_size=4096)
+
+        assert list(result.errors) == [str(bad)]
+        _assert_copied(plan, good)
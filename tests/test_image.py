@@ -0,0 +1,193 @@
+"""
+Tests for image-mode burning.
+
+Images are read back with a minimal FAT32 reader so the tests do not depend
+on dosfstools or mtools.
+"""
+
+import os
+import struct
+
+import pytest
+
+from techaura_station.image import (
+    ImageError,
+    ImageFile,
+    build_fat32_image,
+    choose_burn_mode,
+    compute_layout,
+    stream_image,
+)
+from techaura_station.plan import CopyItem, CopyPlan
+
+
+MB = 1024 * 1024
+
+
+class Fat32Reader:
+    """Reads files back from a FAT32 image."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        (self.bytes_per_sector, self.spc, reserved, fats) = struct.unpack_from('<HBHB', self.data, 11)
+        self.fat_sectors, = struct.unpack_from('<I', self.data, 36)
+        self.root_cluster, = struct.unpack_from('<I', self.data, 44)
+        self.label = self.data[71:82].decode().rstrip()
+        self.fat_offset = reserved * self.bytes_per_sector
+        self.data_offset = (reserved + fats * self.fat_sectors) * self.bytes_per_sector
+        self.cluster_size = self.spc * self.bytes_per_sector
+
+    def _chain(self, cluster):
+        while cluster < 0x0FFFFFF8:
+            yield cluster
+            cluster, = struct.unpack_from('<I', self.data, self.fat_offset + 4 * cluster)
+
+    def _read_chain(self, cluster):
+        return b''.join(self.data[self.data_offset + (c - 2) * self.cluster_size:
+                                  self.data_offset + (c - 1) * self.cluster_size]
+                        for c in self._chain(cluster))
+
+    def listdir(self, cluster=None):
+        """Map long names to (attr, first cluster, size)."""
+        raw = self._read_chain(cluster or self.root_cluster)
+        entries, long_parts = {}, []
+        for offset in range(0, len(raw), 32):
+            entry = raw[offset:offset + 32]
+            if entry[0] == 0:
+                break
+            attr = entry[11]
+            if attr == 0x0F:
+                units = entry[1:11] + entry[14:26] + entry[28:32]
+                long_parts.insert(0, units.decode('utf-16-le').split('\0')[0].replace('￿', ''))
+                continue
+            if attr & 0x08:
+                continue
+            name = ''.join(long_parts) if long_parts else self._short(entry[:11])
+            long_parts = []
+            hi, lo, size = struct.unpack_from('<H', entry, 20)[0], struct.unpack_from('<H', entry, 26)[0], \
+                struct.unpack_from('<I', entry, 28)[0]
+            entries[name] = (attr, (hi << 16) | lo, size)
+        return entries
+
+    @staticmethod
+    def _short(raw):
+        base, ext = raw[:8].decode().rstrip(), raw[8:].decode().rstrip()
+        return f'{base}.{ext}' if ext else base
+
+    def read(self, path):
+        """Read a file by '/' separated path."""
+        cluster = None
+        *dirs, name = path.split('/')
+        for part in dirs:
+            cluster = self.listdir(cluster)[part][1]
+        attr, first, size = self.listdir(cluster)[name]
+        return self._read_chain(first)[:size] if first else b''
+
+
+@pytest.fixture
+def image_files(tmp_path):
+    """Provide a nested set of files with long and short names."""
+    library = tmp_path / 'library'
+    library.mkdir()
+    files = []
+    for i, name in enumerate(['recortado_Joe Arroyo - La Rebelión.mp3', 'SONG.MP3', 'Ñandú (Versión Extendida Larga Para Probar Nombres).mp3']):
+        path = library / name
+        path.write_bytes(os.urandom(3000 + i * 5000))
+        files.append(ImageFile(f'MUSICA/SALSA/{name}', path.stat().st_size, source=str(path)))
+    files.append(ImageFile('playlist.json', 2, data=b'[]'))
+    return files
+
+
+class TestFat32Image:
+    """Tests for build_fat32_image."""
+
+    def test_files_read_back(self, image_files, tmp_path):
+        """Test that every file and directory is readable from the image."""
+        # Arrange
+        image_path = tmp_path / 'order.img'
+
+        # Act
+        with open(image_path, 'wb') as out:
+            layout = build_fat32_image(image_files, 64 * MB, out, label='USB_4567')
+            out.truncate(64 * MB)
+
+        # Assert
+        reader = Fat32Reader(image_path)
+        assert reader.label == 'USB_4567'
+        assert reader.listdir()['MUSICA'][0] & 0x10
+        for f in image_files:
+            expected = f.data if f.data is not None else open(f.source, 'rb').read()
+            assert reader.read(f.destination) == expected
+        assert layout.used_bytes <= os.path.getsize(image_path)
+
+    def test_subdirectories_link_to_parents(self, image_files, tmp_path):
+        """Test that dot entries point at the directory and its parent."""
+        image_path = tmp_path / 'order.img'
+        with open(image_path, 'wb') as out:
+            build_fat32_image(image_files, 64 * MB, out)
+
+        reader = Fat32Reader(image_path)
+        musica = reader.listdir()['MUSICA'][1]
+        salsa = reader.listdir(musica)['SALSA'][1]
+        entries = reader.listdir(salsa)
+
+        assert entries['.'][1] == salsa
+        assert entries['..'][1] == musica
+
+    def test_files_are_contiguous(self, image_files, tmp_path):
+        """Test that every file occupies consecutive clusters."""
+        image_path = tmp_path / 'order.img'
+        with open(image_path, 'wb') as out:
+            build_fat32_image(image_files, 64 * MB, out)
+
+        reader = Fat32Reader(image_path)
+        salsa = reader.listdir(reader.listdir()['MUSICA'][1])['SALSA'][1]
+        for name, (_attr, first, _size) in reader.listdir(salsa).items():
+            if name not in ('.', '..'):
+                chain = list(reader._chain(first))
+                assert chain == list(range(first, first + len(chain)))
+
+    def test_rejects_content_that_does_not_fit(self, tmp_path):
+        """Test that oversized content raises ImageError."""
+        files = [ImageFile('big.bin', 40 * MB, data=b'\0' * (40 * MB))]
+
+        with pytest.raises(ImageError):
+            with open(tmp_path / 'x.img', 'wb') as out:
+                build_fat32_image(files, 36 * MB, out)
+
+    def test_rejects_tiny_volumes(self):
+        """Test that volumes below the FAT32 minimum are refused."""
+        with pytest.raises(ImageError):
+            compute_layout(16 * MB)
+
+
+class TestStreamImage:
+    """Tests for stream_image and choose_burn_mode."""
+
+    def test_streams_used_prefix_and_verifies(self, image_files, tmp_path):
+        """Test that the used part of the image is written to the device."""
+        # Arrange
+        image_path = tmp_path / 'order.img'
+        with open(image_path, 'wb') as out:
+            layout = build_fat32_image(image_files, 64 * MB, out)
+            out.truncate(64 * MB)
+        device = tmp_path / 'device'
+        device.write_bytes(b'\xAA' * (64 * MB))
+
+        # Act
+        stream_image(str(image_path), str(device), layout.used_bytes, block_size=MB)
+
+        # Assert
+        reader = Fat32Reader(device)
+        assert reader.read('playlist.json') == b'[]'
+
+    def test_choose_burn_mode(self):
+        """Test that many small files use image mode and movies use file mode."""
+        songs = CopyPlan('a', [CopyItem(f's{i}', f'MUSICA/s{i}.mp3', 4 * MB) for i in range(500)])
+        movies = CopyPlan('b', [CopyItem(f'm{i}', f'PELICULAS/m{i}.mkv', 2000 * MB) for i in range(500)])
+        few = CopyPlan('c', [CopyItem('s', 'MUSICA/s.mp3', MB)])
+
+        assert choose_burn_mode(songs) == 'image'
+        assert choose_burn_mode(movies) == 'files'
+        assert choose_burn_mode(few) == 'files'
@@ -0,0 +1,155 @@
+"""
+Tests for the per-order copy journal.
+"""
+
+import os
+
+from techaura_station.journal import CopyJournal, copy_with_checksum, verified_items, volume_id
+from techaura_station.plan import CopyItem, CopyPlan
+from techaura_station.transcode import hash_file
+
+
+def _plan(tmp_path):
+    items = []
+    for i in range(3):
+        source = tmp_path / f'song{i}.mp3'
+        source.write_bytes(bytes([i]) * (100 + i))
+        items.append(CopyItem(str(source), os.path.join('MUSICA', 'SALSA', source.name), 100 + i))
+    return CopyPlan('order-1', items, unmatched=['Pop'])
+
+
+class TestCopyJournal:
+    """Tests for CopyJournal replay and verification."""
+
+    def test_replays_plan_and_done_records(self, tmp_path):
+        """Test that a reloaded journal returns the plan and copied files."""
+        # Arrange
+        plan = _plan(tmp_path)
+        journal = CopyJournal.for_order(str(tmp_path / 'journals'), 'order/1')
+        journal.begin(plan)
+        journal.record(plan.items[0], 'abc')
+        journal.close()
+
+        # Act
+        state = CopyJournal(journal.path).load()
+
+        # Assert
+        assert os.path.basename(journal.path) == 'order_1.journal'
+        assert state.plan.items == plan.items
+        assert state.plan.unmatched == ['Pop']
+        assert state.done == {plan.items[0].destination: (100, 'abc')}
+
+    def test_ignores_torn_last_record(self, tmp_path):
+        """Test that a partially written record does not break replay."""
+        plan = _plan(tmp_path)
+        journal = CopyJournal(str(tmp_path / 'order.journal'))
+        journal.begin(plan)
+        journal.record(plan.items[0], 'abc')
+        journal.close()
+        with open(journal.path, 'a') as f:
+            f.write('{"done": "MUSICA/SAL')
+
+        state = journal.load()
+
+        assert list(state.done) == [plan.items[0].destination]
+
+    def test_missing_journal_loads_as_none(self, tmp_path):
+        """Test that orders without a journal start from scratch."""
+        assert CopyJournal(str(tmp_path / 'none.journal')).load() is None
+
+    def test_unreadable_records_load_as_none(self, tmp_path):
+        """Test that a journal with malformed records is treated as absent."""
+        path = tmp_path / 'order.journal'
+        for content in ('{"plan": {"items": []}}\n',
+                        '{"plan": {"order_id": "o", "items": [[1]]}}\n',
+                        '[1, 2]\n'):
+            path.write_text(content)
+
+            assert CopyJournal(str(path)).load() is None
+
+    def test_verified_items_checks_device(self, tmp_path):
+        """Test that only journaled files present with the right size are skipped."""
+        # Arrange
+        plan = _plan(tmp_path)
+        mount_point = tmp_path / 'usb'
+        journal = CopyJournal(str(tmp_path / 'order.journal'))
+        journal.begin(plan)
+        for item in plan.items[:2]:
+            destination = mount_point / item.destination
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            journal.record(item, copy_with_checksum(item.source, str(destination)))
+        journal.close()
+        (mount_point / plan.items[1].destination).write_bytes(b'short')
+
+        # Act
+        verified = verified_items(journal.load(), str(mount_point))
+
+        # Assert
+        assert verified == {plan.items[0].destination: hash_file(plan.items[0].source)}
+
+    def test_other_volume_files_are_rehashed(self, tmp_path):
+        """Test that same-size files journaled on another stick must match their hash."""
+        # Arrange
+        plan = _plan(tmp_path)
+        mount_point = tmp_path / 'usb'
+        journal = CopyJournal(str(tmp_path / 'order.journal'))
+        journal.volume = 'AAAA-0001'
+        journal.begin(plan)
+        for item in plan.items:
+            destination = mount_point / item.destination
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            journal.record(item, copy_with_checksum(item.source, str(destination)))
+        journal.close()
+        # Same size, different content
+        (mount_point / plan.items[0].destination).write_bytes(b'x' * plan.items[0].size)
+        state = journal.load()
+
+        # Act
+        same_stick = verified_items(state, str(mount_point), 'AAAA-0001')
+        other_stick = verified_items(state, str(mount_point), 'BBBB-0002')
+
+        # Assert
+        assert set(same_stick) == {item.destination for item in plan.items}
+        assert set(other_stick) == {item.destination for item in plan.items[1:]}
+
+    def test_last_journaled_file_is_rehashed(self, tmp_path):
+        """Test that the last journaled file is checked even on the same stick."""
+        # Arrange
+        plan = _plan(tmp_path)
+        mount_point = tmp_path / 'usb'
+        journal = CopyJournal(str(tmp_path / 'order.journal'))
+        journal.volume = 'AAAA-0001'
+        journal.begin(plan)
+        for item in plan.items:
+            destination = mount_point / item.destination
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            journal.record(item, copy_with_checksum(item.source, str(destination)))
+        journal.close()
+        (mount_point / plan.items[2].destination).write_bytes(b'x' * plan.items[2].size)
+
+        # Act
+        verified = verified_items(journal.load(), str(mount_point), 'AAAA-0001')
+
+        # Assert
+        assert set(verified) == {item.destination for item in plan.items[:2]}
+
+
+class TestVolumeId:
+    """Tests for identifying the mounted volume."""
+
+    def test_resolves_uuid_of_mounted_node(self, tmp_path):
+        """Test that the UUID symlink pointing at the mounted node is found."""
+        # Arrange
+        node = tmp_path / 'sdb1'
+        node.touch()
+        by_uuid = tmp_path / 'by-uuid'
+        by_uuid.mkdir()
+        (by_uuid / '1234-ABCD').symlink_to(node)
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+        mounts = tmp_path / 'mounts'
+        mounts.write_text(f'/dev/sda1 / ext4 rw 0 0\n/dev/../{node} {mount_point} vfat rw 0 0\n')
+
+        # Act / Assert
+        assert volume_id(str(mount_point), str(mounts), str(by_uuid)) == '1234-ABCD'
+        assert volume_id(str(tmp_path), str(mounts), str(by_uuid)) is None
@@ -0,0 +1,267 @@
+"""
+Tests for manifest-based library sync.
+
+Uses small chunk sizes so a few kilobytes of files span several chunks.
+"""
+
+import os
+
+import pytest
+
+from techaura_station.library_sync import (
+    DirectorySource, HTTPSource, LibraryManifest, LibraryServer, LibrarySyncError,
+    build_manifest, diff_manifests, hash_chunks, sync_library)
+from techaura_station.matching import ContentIndex
+
+CHUNK = 1024
+
+
+class CountingSource(DirectorySource):
+    """Directory source that counts fetched chunks."""
+
+    def __init__(self, roots, corrupt=()):
+        super().__init__(roots)
+        self.reads = []
+        self.corrupt = set(corrupt)
+
+    def manifest(self, chunk_size=CHUNK):
+        return super().manifest(chunk_size)
+
+    def read(self, kind, path, offset, length):
+        self.reads.append((f'{kind}/{path}', offset))
+        data = super().read(kind, path, offset, length)
+        if f'{kind}/{path}' in self.corrupt:
+            data = b'X' * len(data)
+        return data
+
+
+@pytest.fixture
+def station(tmp_path):
+    """Empty library roots for the station being synced."""
+    roots = {kind: str(tmp_path / 'station' / kind) for kind in ('music', 'videos', 'movies')}
+    for root in roots.values():
+        os.makedirs(root)
+    return roots
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class TestManifest:
+    """Tests for building and comparing manifests."""
+
+    def test_lists_every_file_with_chunk_hashes(self, media_library):
+        """Test that all kinds are listed with one hash per chunk."""
+        # Act
+        manifest = build_manifest(media_library, chunk_size=CHUNK)
+
+        # Assert
+        entry = manifest.files['movies/Accion/Duro de Matar (1988).mkv']
+        assert entry.size == 16384
+        assert len(entry.chunks) == 16
+        assert 'music/Rock/cover.jpg' in manifest.files
+        assert len(manifest.files) == 8
+
+    def test_unchanged_files_keep_their_hashes(self, media_library, monkeypatch):
+        """Test that files with the same size and mtime are not hashed again."""
+        # Arrange
+        previous = build_manifest(media_library, chunk_size=CHUNK)
+        hashed = []
+        monkeypatch.setattr('techaura_station.library_sync.hash_chunks',
+                            lambda path, size: hashed.append(path) or hash_chunks(path, size))
+        write(os.path.join(media_library['music'], 'Salsa', 'nueva.mp3'), b'N' * 10)
+
+        # Act
+        manifest = build_manifest(media_library, chunk_size=CHUNK, previous=previous)
+
+        # Assert
+        assert [os.path.basename(path) for path in hashed] == ['nueva.mp3']
+        assert len(manifest.files) == 9
+
+    def test_save_and_load_round_trip(self, media_library, tmp_path):
+        """Test that a saved manifest loads back equal."""
+        # Arrange
+        manifest = build_manifest(media_library, chunk_size=CHUNK)
+        path = str(tmp_path / 'manifest.json')
+
+        # Act
+        manifest.save(path)
+
+        # Assert
+        assert LibraryManifest.load(path) == manifest
+        assert LibraryManifest.load(str(tmp_path / 'missing.json')) is None
+
+    def test_diff_lists_only_differing_chunks(self, media_library, tmp_path):
+        """Test that a one-chunk edit reports only that chunk."""
+        # Arrange
+        local = build_manifest(media_library, chunk_size=CHUNK)
+        movie = os.path.join(media_library['movies'], 'Accion', 'Duro de Matar (1988).mkv')
+        write(movie, b'H' * 5000 + b'Z' * 10 + b'H' * (16384 - 5010))
+        os.remove(os.path.join(media_library['music'], 'Rock', 'cover.jpg'))
+        write(os.path.join(media_library['music'], 'Bachata', 'nueva.mp3'), b'N' * 10)
+
+        # Act
+        delta = diff_manifests(local, build_manifest(media_library, chunk_size=CHUNK))
+
+        # Assert
+        assert [entry.key for entry in delta.added] == ['music/Bachata/nueva.mp3']
+        assert [(change.entry.key, change.chunks) for change in delta.changed] == [
+            ('movies/Accion/Duro de Matar (1988).mkv', [4])]
+        assert [entry.key for entry in delta.removed] == ['music/Rock/cover.jpg']
+
+
+class TestSync:
+    """Tests for sync_library."""
+
+    def test_initial_sync_copies_library(self, media_library, station):
+        """Test that an empty station receives every file."""
+        # Arrange
+        source = CountingSource(media_library)
+
+        # Act
+        result = sync_library(station, source)
+
+        # Assert
+        assert result.added == 8
+        assert result.failed == []
+        assert read(os.path.join(station['videos'], 'Reggaeton', 'Daddy Yankee - Gasolina.mp4')) == b'G' * 8192
+        assert diff_manifests(build_manifest(station, CHUNK), source.manifest()).added == []
+
+    def test_only_changed_chunks_are_fetched(self, media_library, station, tmp_path):
+        """Test that a second sync reuses unchanged chunks from the local copy."""
+        # Arrange
+        manifest_path = str(tmp_path / 'manifest.json')
+        source = CountingSource(media_library)
+        sync_library(station, source, manifest_path=manifest_path)
+        movie = os.path.join(media_library['movies'], 'Accion', 'Duro de Matar (1988).mkv')
+        write(movie, b'H' * 2048 + b'Z' * CHUNK + b'H' * (16384 - 2048 - CHUNK))
+        source.reads.clear()
+
+        # Act
+        result = sync_library(station, source, manifest_path=manifest_path)
+
+        # Assert
+        assert source.reads == [('movies/Accion/Duro de Matar (1988).mkv', 2048)]
+        assert (result.changed, result.bytes_fetched, result.bytes_reused) == (1, CHUNK, 16384 - CHUNK)
+        assert read(os.path.join(station['movies'], 'Accion', 'Duro de Matar (1988).mkv')) == read(movie)
+
+    def test_new_genre_is_indexed_incrementally(self, media_library, station):
+        """Test that synced and removed files update the search index."""
+        # Arrange
+        source = CountingSource(media_library)
+        sync_library(station, source)
+        index = ContentIndex.build({'music': [station['music']]})
+        write(os.path.join(media_library['music'], 'Bachata', 'Romeo Santos - Propuesta Indecente.mp3'),
+              b'R' * 100)
+        os.remove(os.path.join(media_library['music'], 'Rock', 'recortado_Back in Black - AC DC.mp3'))
+
+        # Act
+        result = sync_library(station, source, index=index)
+
+        # Assert
+        assert (result.added, result.removed) == (1, 1)
+        assert index.search('bachata', kind='music')
+        assert not index.search('back in black', kind='music')
+        assert len(index) == 5
+
+    def test_corrupt_chunk_leaves_target_untouched(self, media_library, station):
+        """Test that a chunk failing its hash does not replace the local file."""
+        # Arrange
+        source = CountingSource(media_library, corrupt={'videos/Reggaeton/Daddy Yankee - Gasolina.mp4'})
+
+        # Act
+        result = sync_library(station, source)
+
+        # Assert
+        assert result.failed == ['videos/Reggaeton/Daddy Yankee - Gasolina.mp4']
+        assert result.added == 7
+        assert os.listdir(os.path.join(station['videos'], 'Reggaeton')) == []
+
+    def test_missing_kind_in_reference_keeps_local_files(self, media_library, station):
+        """Test that a reference without movies does not wipe the local movies."""
+        # Arrange
+        write(os.path.join(station['movies'], 'Drama', 'local.mkv'), b'L' * 10)
+        source = CountingSource({'music': media_library['music']})
+
+        # Act
+        result = sync_library(station, source)
+
+        # Assert
+        assert result.removed == 0
+        assert os.path.exists(os.path.join(station['movies'], 'Drama', 'local.mkv'))
+
+
+class TestHTTP:
+    """Tests for serving a library to other stations."""
+
+    def test_sync_from_reference_station(self, media_library, station):
+        """Test a sync over HTTP with range requests."""
+        # Arrange
+        server = LibraryServer(media_library, host='127.0.0.1', port=0, chunk_size=CHUNK)
+        server.start()
+        host, port = server.address
+        source = HTTPSource(f'http://{host}:{port}')
+
+        # Act
+        try:
+            result = sync_library(station, source)
+        finally:
+            server.stop()
+
+        # Assert
+        assert result.added == 8
+        assert result.failed == []
+        assert read(os.path.join(station['movies'], 'Accion', 'Duro de Matar (1988).mkv')) == b'H' * 16384
+
+    def test_token_is_required_when_set(self, media_library, station):
+        """Test that a server with a token rejects clients without it."""
+        # Arrange
+        server = LibraryServer(media_library, port=0, chunk_size=CHUNK, token='s3cret')
+        server.start()
+        host, port = server.address
+
+        # Act
+        try:
+            with pytest.raises(LibrarySyncError, match='401'):
+                HTTPSource(f'http://{host}:{port}').manifest()
+            result = sync_library(station, HTTPSource(f'http://{host}:{port}', token='s3cret'))
+        finally:
+            server.stop()
+
+        # Assert
+        assert host == '127.0.0.1'
+        assert result.added == 8
+
+    def test_manifest_is_cached_for_ttl(self, media_library, monkeypatch):
+        """Test that manifest requests within the TTL do not walk the library."""
+        # Arrange
+        now = [0.0]
+        server = LibraryServer(media_library, port=0, chunk_size=CHUNK, manifest_ttl=30.0,
+                               clock=lambda: now[0])
+        builds = []
+        real_manifest = server.source.manifest
+        monkeypatch.setattr(server.source, 'manifest',
+                            lambda chunk_size: builds.append(chunk_size) or real_manifest(chunk_size))
+        server.start()
+
+        # Act
+        try:
+            first = server._manifest_bytes()
+            now[0] = 10.0
+            second = server._manifest_bytes()
+            now[0] = 31.0
+            server._manifest_bytes()
+        finally:
+            server.stop()
+
+        # Assert
+        assert first == second
+        assert len(builds) == 2
@@ -0,0 +1,144 @@
+"""
+Tests for content matching and copy plans.
+
+Covers text folding, the inverted token/trigram index and the copy plan
+layout built from it.
+"""
+
+import os
+
+import pytest
+
+from techaura_station.matching import ContentIndex, fold_text, tokenize
+from techaura_station.plan import build_copy_plan
+
+
+# =============================================================================
+# 1. Text Folding Tests
+# =============================================================================
+
+class TestFoldText:
+    """Tests for accent and punctuation folding."""
+
+    def test_strips_accents_and_case(self):
+        """Test that accents and case are removed."""
+        assert fold_text('Norteñas') == 'nortenas'
+        assert fold_text('Vicente FERNÁNDEZ') == 'vicente fernandez'
+
+    def test_replaces_punctuation_and_underscores(self):
+        """Test that separators collapse into single spaces."""
+        assert fold_text('joe_arroyo - (En Vivo)') == 'joe arroyo en vivo'
+
+    def test_folds_ligatures(self):
+        """Test that letters without a combining decomposition are folded."""
+        assert fold_text('TOOL - Ænema') == 'tool aenema'
+
+    def test_tokenize_empty_text(self):
+        """Test that punctuation-only text has no tokens."""
+        assert tokenize(' -_- ') == []
+
+
+# =============================================================================
+# 2. Content Index Tests
+# =============================================================================
+
+class TestContentIndex:
+    """Tests for ContentIndex search."""
+
+    @pytest.fixture
+    def index(self, media_library):
+        return ContentIndex.build(media_library)
+
+    def test_build_skips_invalid_extensions(self, index):
+        """Test that only media files are indexed."""
+        assert len(index) == 7
+        assert not any(path.endswith('.jpg') for path in index._paths)
+
+    def test_matches_underscored_file_names(self, index):
+        """Test that 'Joe Arroyo' matches both spaced and underscored names."""
+        names = {os.path.basename(m.path) for m in index.search('Joe Arroyo')}
+
+        assert names == {'recortado_Joe Arroyo - La Rebelion.mp3',
+                         'joe_arroyo_en_vivo.mp3'}
+
+    def test_matches_genre_folder_regardless_of_accents(self, index):
+        """Test that genre folders match with or without accents."""
+        with_accent = index.search('Norteñas')
+        without_accent = index.search('nortenas')
+
+        assert len(with_accent) == 1
+        assert with_accent == without_accent
+
+    def test_fuzzy_match_ranks_below_exact(self, index):
+        """Test that near-miss spellings match but rank lower."""
+        exact = index.search('Vallenato')
+        fuzzy = index.search('Vallenatos')
+
+        assert [m.path for m in fuzzy] == [m.path for m in exact]
+        assert exact[0].score == 1.0
+        assert 0 < fuzzy[0].score < 1.0
+
+    def test_all_tokens_must_match(self, index):
+        """Test that multi-token terms require every token."""
+        assert index.search('Joe Cocker') == []
+
+    def test_filters_by_kind(self, index):
+        """Test that results can be restricted to one content kind."""
+        assert index.search('Gasolina', kind='music') == []
+        assert len(index.search('Gasolina', kind='videos')) == 1
+
+    def test_results_are_memoized_and_invalidated(self, index, media_library):
+        """Test that repeated lookups are cached until the index changes."""
+        first = index.search('salsa')
+        assert index.search('salsa') is first
+
+        index.add('/extra/new.mp3', 'music', 'Salsa/new')
+        assert len(index.search('salsa')) == len(first) + 1
+
+    def test_extra_fields_are_searchable(self, index):
+        """Test that tag text added to an existing file is searchable."""
+        path = index.search('Back in Black')[0].path
+        index.add(path, 'music', '', extra=['AC/DC', 'Highway to Hell'])
+
+        assert [m.path for m in index.search('Highway to Hell')] == [path]
+
+    def test_resolve_returns_matches_per_term(self, index):
+        """Test that resolve maps every term to its matches."""
+        resolved = index.resolve(['Salsa', 'Cumbia'], kind='music')
+
+        assert len(resolved['Salsa']) == 2
+        assert resolved['Cumbia'] == []
+
+
+# =============================================================================
+# 3. Copy Plan Tests
+# =============================================================================
+
+class TestBuildCopyPlan:
+    """Tests for copy plan construction."""
+
+    def test_mirrors_usb_layout(self, media_library, sample_order):
+        """Test that destinations follow the MUSICA/<GENRE> layout."""
+        index = ContentIndex.build(media_library)
+        order = sample_order.to_dict()
+        order['artists'] = ['Joe Arroyo']
+
+        plan = build_copy_plan(order, index)
+        destinations = {item.destination for item in plan}
+
+        assert os.path.join('MUSICA', 'ROCK', 'recortado_Back in Black - AC DC.mp3') in destinations
+        assert os.path.join('MUSICA', 'ARTISTAS', 'JOE ARROYO', 'joe_arroyo_en_vivo.mp3') in destinations
+        assert plan.unmatched == ['Pop']
+
+    def test_does_not_duplicate_files_across_terms(self, media_library, sample_order):
+        """Test that a file matching a genre and an artist is copied once."""
+        index = ContentIndex.build(media_library)
+        order = sample_order.to_dict()
+        order['genres'] = ['Salsa']
+        order['artists'] = ['Joe Arroyo']
+
+        plan = build_copy_plan(order, index)
+        sources = [item.source for item in plan]
+
+        assert len(sources) == len(set(sources)) == 3
+        assert plan.total_bytes == 2048 + 1024 + 512
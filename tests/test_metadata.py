@@ -0,0 +1,152 @@
+"""
+Tests for audio metadata extraction and the metadata cache.
+
+The fixtures build minimal MP3 and FLAC files byte by byte, so the tests
+exercise the built-in readers even when mutagen is not installed.
+"""
+
+import os
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from techaura_station.matching import ContentIndex
+from techaura_station.metadata import MetadataCache, read_metadata
+
+
+def _id3_frame(frame_id: str, text: str) -> bytes:
+    payload = b'\x03' + text.encode('utf-8')
+    return frame_id.encode('latin-1') + struct.pack('>I', len(payload)) + b'\x00\x00' + payload
+
+
+def _syncsafe_bytes(value: int) -> bytes:
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def make_mp3(path, artist: str, title: str, audio_bytes: int = 16000) -> None:
+    """Write an ID3v2.3-tagged, 128kbps/44.1kHz CBR MP3 stub."""
+    frames = _id3_frame('TPE1', artist) + _id3_frame('TIT2', title)
+    tag = b'ID3\x03\x00\x00' + _syncsafe_bytes(len(frames)) + frames
+    mpeg_header = bytes([0xFF, 0xFB, 0x90, 0x00])  # MPEG-1 L3, 128kbps, 44.1kHz
+    path.write_bytes(tag + mpeg_header + b'\x00' * (audio_bytes - 4))
+
+
+def make_flac(path, artist: str, title: str) -> None:
+    """Write a FLAC stub with STREAMINFO (10s @ 44.1kHz) and Vorbis comments."""
+    streaminfo = bytearray(34)
+    streaminfo[10:18] = ((44100 << 44) | (2 << 41) | (15 << 36) | 441000).to_bytes(8, 'big')
+    comments = [f'ARTIST={artist}'.encode(), f'TITLE={title}'.encode()]
+    vorbis = struct.pack('<I', 3) + b'abc' + struct.pack('<I', len(comments))
+    for comment in comments:
+        vorbis += struct.pack('<I', len(comment)) + comment
+    data = b'fLaC'
+    data += bytes([0x00]) + len(streaminfo).to_bytes(3, 'big') + bytes(streaminfo)
+    data += bytes([0x84]) + len(vorbis).to_bytes(3, 'big') + vorbis
+    path.write_bytes(data + b'\x00' * 1000)
+
+
+@pytest.fixture(autouse=True)
+def no_mutagen():
+    """Force the built-in readers regardless of the environment."""
+    with patch('techaura_station.metadata._read_with_mutagen', return_value=False):
+        yield
+
+
+@pytest.fixture
+def tagged_library(tmp_path):
+    """Provide a library root with tagged audio files."""
+    root = tmp_path / 'music'
+    (root / 'Salsa').mkdir(parents=True)
+    make_mp3(root / 'Salsa' / 'track01.mp3', 'Joe Arroyo', 'La Rebelión')
+    make_mp3(root / 'Salsa' / 'track02.mp3', 'Grupo Niche', 'Cali Pachanguero')
+    make_flac(root / 'Salsa' / 'track03.flac', 'Héctor Lavoe', 'El Cantante')
+    return root
+
+
+# =============================================================================
+# 1. Tag Reader Tests
+# =============================================================================
+
+class TestReadMetadata:
+    """Tests for the built-in tag readers."""
+
+    def test_reads_id3v2_and_mpeg_header(self, tagged_library):
+        """Test that MP3 tags, bitrate and duration are read."""
+        meta = read_metadata(str(tagged_library / 'Salsa' / 'track01.mp3'))
+
+        assert meta.artist == 'Joe Arroyo'
+        assert meta.title == 'La Rebelión'
+        assert meta.bitrate == 128
+        assert meta.duration == pytest.approx(1.0, rel=0.01)
+
+    def test_reads_flac_vorbis_comments(self, tagged_library):
+        """Test that FLAC Vorbis comments and STREAMINFO are read."""
+        meta = read_metadata(str(tagged_library / 'Salsa' / 'track03.flac'))
+
+        assert meta.artist == 'Héctor Lavoe'
+        assert meta.title == 'El Cantante'
+        assert meta.duration == pytest.approx(10.0)
+
+    def test_untagged_file_returns_empty_metadata(self, tmp_path):
+        """Test that files without tags yield None fields instead of failing."""
+        path = tmp_path / 'noise.mp3'
+        path.write_bytes(b'\x00' * 256)
+
+        meta = read_metadata(str(path))
+
+        assert meta.artist is None
+        assert meta.to_dict() == {'path': str(path)}
+
+
+# =============================================================================
+# 2. Metadata Cache Tests
+# =============================================================================
+
+class TestMetadataCache:
+    """Tests for incremental cache refreshes."""
+
+    def test_refresh_parses_only_changed_files(self, tagged_library):
+        """Test that unchanged files are not parsed again."""
+        cache = MetadataCache()
+
+        first = cache.refresh(str(tagged_library), workers=1)
+        second = cache.refresh(str(tagged_library), workers=1)
+
+        assert (first.total, first.parsed) == (3, 3)
+        assert (second.total, second.parsed) == (3, 0)
+
+    def test_refresh_detects_modified_and_removed_files(self, tagged_library):
+        """Test that size changes are reparsed and deleted files dropped."""
+        cache = MetadataCache()
+        cache.refresh(str(tagged_library), workers=1)
+
+        make_mp3(tagged_library / 'Salsa' / 'track02.mp3', 'Grupo Niche', 'Una Aventura',
+                 audio_bytes=32000)
+        os.remove(tagged_library / 'Salsa' / 'track03.flac')
+        result = cache.refresh(str(tagged_library), workers=1)
+
+        assert (result.parsed, result.removed) == (1, 1)
+        assert cache.get(str(tagged_library / 'Salsa' / 'track02.mp3')).title == 'Una Aventura'
+        assert len(cache) == 2
+
+    def test_refresh_with_process_pool(self, tagged_library, tmp_path):
+        """Test that a pooled refresh stores the same results."""
+        cache = MetadataCache(str(tmp_path / 'meta.db'))
+
+        result = cache.refresh(str(tagged_library), workers=2, chunksize=1)
+
+        assert result.parsed == 3
+        assert cache.get(str(tagged_library / 'Salsa' / 'track01.mp3')).artist == 'Joe Arroyo'
+
+    def test_apply_to_index_makes_tags_searchable(self, tagged_library):
+        """Test that artists only present in tags become searchable."""
+        cache = MetadataCache()
+        cache.refresh(str(tagged_library), workers=1)
+        index = ContentIndex.build({'music': str(tagged_library)})
+        assert index.search('Hector Lavoe') == []
+
+        cache.apply_to_index(index)
+
+        matches = index.search('Hector Lavoe')
+        assert [os.path.basename(m.path) for m in matches] == ['track03.flac']
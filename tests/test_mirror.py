@@ -0,0 +1,223 @@
+"""
+Tests for the order-state mirror.
+
+Uses a fake client serving a burning queue with change versions, and a fake
+clock for TTL expiry.
+"""
+
+import threading
+import time
+
+import pytest
+
+from techaura_station.mirror import OrderMirror
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeQueueClient:
+    """
+    Serves get_order_changes/get_order from an in-memory queue.
+
+    Like the server, the feed is keyed by order number with queue statuses,
+    while ``get_order`` returns the order record: a database ``orderId``
+    distinct from the number, and an order status.
+    """
+
+    def __init__(self, fetch_delay=0.0):
+        self.version = 0
+        self.items = {}
+        self.removals = {}
+        self.change_requests = []
+        self.order_requests = []
+        self.fetch_delay = fetch_delay
+
+    def put(self, order_number, status):
+        self.version += 1
+        self.items[order_number] = {'orderId': order_number, 'status': status,
+                                    'changeVersion': self.version}
+        self.removals.pop(order_number, None)
+
+    def remove(self, order_id):
+        self.version += 1
+        del self.items[order_id]
+        self.removals[order_id] = self.version
+
+    def get_order_changes(self, since=0):
+        self.change_requests.append(since)
+        full = since == 0
+        return {
+            'version': self.version,
+            'full': full,
+            'items': [dict(i) for i in self.items.values() if full or i['changeVersion'] > since],
+            'removed': [] if full else [o for o, v in self.removals.items() if v > since],
+        }
+
+    def get_order(self, order_number):
+        self.order_requests.append(order_number)
+        time.sleep(self.fetch_delay)
+        return {'orderId': f'db-{order_number}', 'orderNumber': order_number, 'status': 'confirmed'}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def queue_client():
+    client = FakeQueueClient()
+    client.put('a', 'queued')
+    client.put('b', 'pending')
+    return client
+
+
+class TestDeltaSync:
+    """Tests for OrderMirror.sync."""
+
+    def test_first_sync_loads_snapshot(self, queue_client, clock):
+        """Test that the first sync mirrors the whole queue."""
+        # Arrange
+        mirror = OrderMirror(queue_client, clock=clock)
+
+        # Act
+        mirror.sync()
+
+        # Assert
+        assert mirror.status('a') == 'queued'
+        assert mirror.status('b') == 'pending'
+        assert mirror.version == 2
+
+    def test_next_sync_applies_only_changes(self, queue_client, clock):
+        """Test that later syncs request and apply only the delta."""
+        # Arrange
+        mirror = OrderMirror(queue_client, clock=clock)
+        mirror.sync()
+        queue_client.put('a', 'burning')
+        queue_client.remove('b')
+
+        # Act
+        changed = mirror.sync()
+
+        # Assert
+        assert changed == 2
+        assert queue_client.change_requests == [0, 2]
+        assert mirror.status('a') == 'burning'
+        assert mirror.status('b') is None
+
+    def test_status_reads_make_no_requests(self, queue_client, clock):
+        """Test that status checks of mirrored orders are memory reads."""
+        # Arrange
+        mirror = OrderMirror(queue_client, clock=clock)
+        mirror.sync()
+
+        # Act
+        for _ in range(100):
+            mirror.get_order('a')
+
+        # Assert
+        assert queue_client.order_requests == []
+        assert len(queue_client.change_requests) == 1
+
+
+class TestBulkAndMisses:
+    """Tests for get_orders and single-flight misses."""
+
+    def test_get_orders_syncs_once_then_fetches_remaining(self, queue_client, clock):
+        """Test that misses are served by one sync before single fetches."""
+        # Arrange
+        mirror = OrderMirror(queue_client, clock=clock)
+
+        # Act
+        orders = mirror.get_orders(['a', 'b', 'zz'])
+
+        # Assert
+        assert set(orders) == {'a', 'b', 'zz'}
+        assert queue_client.change_requests == [0]
+        assert queue_client.order_requests == ['zz']
+
+    def test_fetched_order_is_keyed_by_number_with_queue_status(self, queue_client, clock):
+        """Test that a one-off fetch is stored under its number in the feed's vocabulary."""
+        # Arrange
+        mirror = OrderMirror(queue_client, clock=clock)
+
+        # Act
+        order = mirror.get_order('zz')
+
+        # Assert
+        assert order['orderId'] == 'db-zz'
+        assert mirror.status('zz') == 'queued'  # 'confirmed' on the order record
+        assert mirror.status('db-zz') is None
+
+    def test_concurrent_misses_share_one_request(self, clock):
+        """Test that concurrent misses for one order fetch it once."""
+        # Arrange
+        client = FakeQueueClient(fetch_delay=0.2)
+        mirror = OrderMirror(client, clock=clock)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(mirror.get_order('x')))
+                   for _ in range(5)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        # Assert
+        assert len(results) == 5
+        assert client.order_requests == ['x']
+
+
+class TestEviction:
+    """Tests for TTL and LRU eviction."""
+
+    def test_unsynced_entries_expire_after_ttl(self, clock):
+        """Test that individually fetched orders are refetched after the TTL."""
+        # Arrange
+        client = FakeQueueClient()
+        mirror = OrderMirror(client, ttl=10, clock=clock)
+        mirror.get_order('x')
+
+        # Act
+        clock.now = 11
+        mirror.get_order('x')
+
+        # Assert
+        assert client.order_requests == ['x', 'x']
+
+    def test_sync_keeps_mirrored_entries_valid(self, queue_client, clock):
+        """Test that a recent sync revalidates unchanged mirrored orders."""
+        # Arrange
+        mirror = OrderMirror(queue_client, ttl=10, clock=clock)
+        mirror.sync()
+        clock.now = 8
+        mirror.sync()  # Nothing changed
+
+        # Act
+        clock.now = 15
+        status = mirror.status('a')
+
+        # Assert
+        assert status == 'queued'
+
+    def test_least_recently_used_entry_is_evicted(self, queue_client, clock):
+        """Test that the LRU entry goes first when the mirror is full."""
+        # Arrange
+        mirror = OrderMirror(queue_client, max_entries=2, clock=clock)
+        mirror.sync()
+        mirror.get_order('a')  # 'b' is now least recently used
+
+        # Act
+        mirror.get_order('c')
+
+        # Assert
+        assert len(mirror) == 2
+        assert mirror.status('b') is None
+        assert mirror.status('a') == 'queued'
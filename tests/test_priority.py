@@ -0,0 +1,175 @@
+"""
+Tests for the priority and SLA-aware order queue.
+
+Uses a fake clock so arrival times, deadlines and waits are deterministic.
+"""
+
+import pytest
+
+from techaura_station.priority import OrderQueue, order_deadline, order_priority
+
+GB = 10 ** 9
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def drain(queue):
+    order_ids = []
+    while (queued := queue.pop()) is not None:
+        order_ids.append(queued.order_id)
+    return order_ids
+
+
+class TestRanking:
+    """Tests for the order in which orders leave the queue."""
+
+    def test_normal_orders_leave_oldest_first(self, clock):
+        """Test FIFO order among equal orders."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        for order_id in ('a', 'b', 'c'):
+            queue.push(order_id, {'order_id': order_id}, GB)
+            clock.now += 60
+
+        # Act & Assert
+        assert drain(queue) == ['a', 'b', 'c']
+
+    def test_high_priority_overtakes_backlog(self, clock):
+        """Test that an express order jumps ahead of older normal orders."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        queue.push('movie', {'capacity': '128GB'}, 100 * GB)
+        queue.push('music', {}, GB)
+        clock.now += 600
+        queue.push('express', {'priority': 'high'}, GB)
+
+        # Act & Assert
+        assert drain(queue)[0] == 'express'
+
+    def test_deadline_and_burn_time_set_latest_start(self, clock):
+        """Test that a near deadline and a long burn both move an order up."""
+        # Arrange
+        queue = OrderQueue(throughput=10 ** 7, clock=clock)
+        queue.push('later', {}, GB)
+        queue.push('due-soon', {'deadline': clock.now + 3600}, GB)
+        queue.push('huge', {}, 2000 * GB)  # 200 000 s of writing
+
+        # Act & Assert
+        assert drain(queue) == ['huge', 'due-soon', 'later']
+
+    def test_old_normal_order_eventually_beats_new_high(self, clock):
+        """Test that aging lets a starved order through."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        queue.push('old', {}, GB)
+        clock.now += 23 * 3600
+        queue.push('new-high', {'priority': 'high'}, GB)
+
+        # Act & Assert
+        assert drain(queue) == ['old', 'new-high']
+
+
+class TestUpdates:
+    """Tests for reprioritization and cancellation."""
+
+    def test_reprioritize_keeps_arrival(self, clock):
+        """Test that an upgraded order moves up without losing its age."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        queue.push('a', {}, GB)
+        queue.push('b', {}, GB)
+        clock.now += 60
+
+        # Act
+        moved = queue.reprioritize('b', 'high')
+
+        # Assert
+        assert moved is True
+        assert drain(queue) == ['b', 'a']
+
+    def test_cancel_skips_dead_entries(self, clock):
+        """Test that cancelled and superseded entries are never popped."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        for order_id in ('a', 'b', 'c'):
+            queue.push(order_id, {}, GB)
+        queue.reprioritize('c', 'high')
+
+        # Act
+        cancelled = queue.cancel('a')
+
+        # Assert
+        assert cancelled is True
+        assert queue.cancel('a') is False
+        assert len(queue) == 2
+        assert 'a' not in queue
+        assert drain(queue) == ['c', 'b']
+
+    def test_heap_is_compacted(self, clock):
+        """Test that dead entries do not accumulate without bound."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        queue.push('keep', {}, GB)
+
+        # Act
+        for i in range(1000):
+            queue.push(f'o{i}', {}, GB)
+            queue.cancel(f'o{i}')
+
+        # Assert
+        assert len(queue._heap) < 100
+        assert queue.peek().order_id == 'keep'
+
+
+class TestWaits:
+    """Tests for per-priority wait percentiles."""
+
+    def test_reports_waits_per_class(self, clock):
+        """Test that waits are split by priority class."""
+        # Arrange
+        queue = OrderQueue(clock=clock)
+        for i in range(10):
+            queue.push(f'n{i}', {}, GB)
+        queue.push('h', {'priority': 'high'}, GB)
+        clock.now += 100
+
+        # Act
+        drain(queue)
+        waits = queue.wait_percentiles()
+
+        # Assert
+        assert waits['normal']['count'] == 10
+        assert waits['high'] == {'count': 1, 'p50': 100, 'p95': 100, 'p99': 100, 'max': 100}
+        assert 'low' not in waits
+
+
+class TestOrderFields:
+    """Tests for reading priority and deadline from orders."""
+
+    @pytest.mark.parametrize('order, expected', [
+        ({}, 'normal'),
+        ({'priority': 'HIGH'}, 'high'),
+        ({'priority': 'low'}, 'low'),
+        ({'express': True}, 'high'),
+        ({'priority': 'bogus'}, 'normal'),
+    ])
+    def test_order_priority(self, order, expected):
+        """Test priority normalization."""
+        assert order_priority(order) == expected
+
+    def test_order_deadline_reads_delivery_date(self):
+        """Test that the server's delivery date is used as deadline."""
+        assert order_deadline({'deliveryDate': '1970-01-01T01:00:00Z'}) == 3600
+        assert order_deadline({'delivery_date': 'soon'}) is None
+        assert order_deadline({}) is None
@@ -0,0 +1,185 @@
+"""
+Tests for the station profiler.
+"""
+
+import json
+import os
+import pstats
+import signal
+import socket
+import threading
+import time
+
+import pytest
+
+from techaura_station.profiling import Profiler
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    """Provide a profiler dumping into a temporary directory."""
+    profiler = Profiler(output_dir=str(tmp_path / 'profiles'), interval=0.001)
+    yield profiler
+    profiler.close()
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def _send(path, command):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(command.encode() + b'\n')
+        return client.makefile().read().strip()
+
+
+class TestStageTimings:
+    """Tests for stage timings."""
+
+    def test_disabled_stages_record_nothing(self, profiler):
+        """Test that stages are free when disabled."""
+        with profiler.stage('copy'):
+            pass
+
+        assert profiler.stage_report() == {}
+        assert profiler.stage('copy') is profiler.stage('resolve')
+
+    def test_enabled_stages_record_wall_and_cpu(self, profiler):
+        """Test that enabled stages accumulate wall and CPU time."""
+        # Arrange
+        profiler.stages_enabled = True
+
+        # Act
+        for _ in range(2):
+            with profiler.stage('resolve'):
+                sum(range(100000))
+        with profiler.stage('copy'):
+            time.sleep(0.02)
+
+        # Assert
+        report = profiler.stage_report()
+        assert list(report) == ['copy', 'resolve']
+        assert report['resolve']['count'] == 2
+        assert report['resolve']['cpu'] > 0
+        assert report['copy']['wall'] >= 0.02
+        assert report['copy']['cpu'] < report['copy']['wall']
+
+    def test_observer_sees_stages_of_its_thread(self, profiler):
+        """Test that an observer gets this thread's stages without enabling timings."""
+        # Arrange
+        seen = []
+
+        def other_thread():
+            with profiler.stage('http'):
+                pass
+
+        # Act
+        with profiler.observe(lambda name, wall: seen.append((name, wall))):
+            with profiler.stage('copy'):
+                time.sleep(0.01)
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+        with profiler.stage('playlist'):
+            pass
+
+        # Assert
+        assert [name for name, _ in seen] == ['copy']
+        assert seen[0][1] >= 0.01
+        assert profiler.stage_report() == {}
+
+
+class TestSampling:
+    """Tests for the sampling profiler and dumps."""
+
+    def test_samples_collapse_to_flamegraph_format(self, profiler):
+        """Test that samples of a busy thread are dumped as collapsed stacks."""
+        # Arrange
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop,), name='burner')
+        worker.start()
+
+        # Act
+        profiler.sampler.start()
+        time.sleep(0.1)
+        profiler.sampler.stop()
+        stop.set()
+        worker.join()
+        paths = profiler.dump()
+
+        # Assert
+        with open(paths[0]) as f:
+            lines = f.read().splitlines()
+        busy = [line for line in lines if line.startswith('burner;') and 'test_profiling.py:_busy_loop' in line]
+        assert busy
+        stack, count = busy[0].rsplit(' ', 1)
+        assert int(count) > 0
+
+    def test_per_order_cprofile(self, profiler):
+        """Test that orders run under cProfile when enabled."""
+        profiler.cprofile_orders = True
+
+        with profiler.order('order/1'):
+            sum(range(1000))
+
+        stats = pstats.Stats(os.path.join(profiler.output_dir, 'order_1.pstats'))
+        assert stats.total_calls > 0
+
+
+class TestControl:
+    """Tests for runtime control."""
+
+    def test_admin_socket_commands(self, profiler, tmp_path):
+        """Test that the admin socket switches features and reports state."""
+        # Arrange
+        path = str(tmp_path / 'profile.sock')
+        profiler.serve(path)
+
+        # Act
+        replies = [_send(path, 'stages on'), _send(path, 'cprofile on'), _send(path, 'bogus')]
+        with profiler.stage('copy'):
+            pass
+        stats = json.loads(_send(path, 'stats'))
+
+        # Assert
+        assert replies[:2] == ['stages on', 'cprofile on']
+        assert replies[2].startswith('unknown command')
+        assert stats['stages'] is True and stats['cprofile'] is True
+        assert stats['timings']['copy']['count'] == 1
+
+    def test_admin_socket_survives_invalid_utf8(self, profiler, tmp_path):
+        """Test that a garbled command does not stop the admin socket."""
+        # Arrange
+        path = str(tmp_path / 'profile.sock')
+        profiler.serve(path)
+
+        # Act
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            client.sendall(b'\xff\xfe\n')
+            client.recv(1024)
+        reply = _send(path, 'stages on')
+
+        # Assert
+        assert reply == 'stages on'
+
+    def test_signal_toggles_sampler(self, profiler):
+        """Test that SIGUSR2 starts and then stops and dumps the sampler."""
+        previous = signal.getsignal(signal.SIGUSR2)
+        profiler.install_signal_handler()
+        try:
+            os.kill(os.getpid(), signal.SIGUSR2)
+            deadline = time.monotonic() + 2
+            while not profiler.sampler.running and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert profiler.sampler.running and profiler.stages_enabled
+
+            os.kill(os.getpid(), signal.SIGUSR2)
+            deadline = time.monotonic() + 2
+            while profiler.sampler.running and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert not profiler.sampler.running and not profiler.stages_enabled
+        finally:
+            signal.signal(signal.SIGUSR2, previous)
@@ -0,0 +1,224 @@
+"""
+Tests for the throughput-aware burn scheduler.
+
+A fake clock drives the scheduler so waits and rates are deterministic.
+"""
+
+import pytest
+
+from techaura_station.scheduler import BurnScheduler, probe_write_speed
+
+
+MB = 1000 * 1000
+GB = 1000 * MB
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Provide a fake clock starting at zero."""
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    """Provide a scheduler with no aging and no deferral."""
+    return BurnScheduler(aging_factor=0.0, defer_margin=float('inf'), clock=clock)
+
+
+# =============================================================================
+# 1. Assignment Tests
+# =============================================================================
+
+class TestAssignment:
+    """Tests for BurnScheduler.assign."""
+
+    def test_picks_shortest_expected_burn(self, scheduler):
+        """Test that a free device takes the quickest queued order."""
+        # Arrange
+        scheduler.add_device('sdb', capacity=64 * GB, throughput=20 * MB)
+        scheduler.submit('big', size=40 * GB)
+        scheduler.submit('small', size=4 * GB)
+
+        # Act
+        assignment = scheduler.assign('sdb')
+
+        # Assert
+        assert assignment.order_id == 'small'
+        assert assignment.expected_seconds == pytest.approx(200)
+        assert len(scheduler) == 1
+
+    def test_skips_orders_that_do_not_fit(self, scheduler):
+        """Test that orders are only given to sticks with enough capacity."""
+        scheduler.add_device('sdb', capacity=8 * GB)
+        scheduler.submit('o-64', size=2 * GB, required_capacity=58 * GB)
+
+        assert scheduler.assign('sdb') is None
+
+        scheduler.add_device('sdc', capacity=64 * GB)
+        assert scheduler.assign('sdc').order_id == 'o-64'
+
+    def test_busy_device_gets_nothing(self, scheduler):
+        """Test that a device burning an order is not assigned another."""
+        scheduler.add_device('sdb', capacity=64 * GB)
+        scheduler.submit('a', size=GB)
+        scheduler.submit('b', size=GB)
+
+        scheduler.assign('sdb')
+
+        assert scheduler.assign('sdb') is None
+
+    def test_aging_prevents_starvation(self, clock):
+        """Test that a long-waiting large order overtakes fresh small ones."""
+        # Arrange
+        scheduler = BurnScheduler(aging_factor=1.0, defer_margin=float('inf'), clock=clock)
+        scheduler.add_device('sdb', capacity=64 * GB, throughput=10 * MB)
+        scheduler.submit('big', size=10 * GB)  # 1000s on this device
+        clock.advance(1200)
+        scheduler.submit('small', size=GB)  # 100s
+
+        # Act
+        assignment = scheduler.assign('sdb')
+
+        # Assert
+        assert assignment.order_id == 'big'
+        assert assignment.waited_seconds == 1200
+
+    def test_defers_to_clearly_faster_device(self, clock):
+        """Test that a slow stick leaves an order for a much faster busy one."""
+        # Arrange
+        scheduler = BurnScheduler(aging_factor=0.0, clock=clock)
+        scheduler.add_device('fast', capacity=64 * GB, throughput=100 * MB)
+        scheduler.add_device('slow', capacity=64 * GB, throughput=5 * MB)
+        scheduler.submit('warmup', size=GB)
+        assert scheduler.assign('fast').order_id == 'warmup'  # Busy for 10s
+        scheduler.submit('order', size=10 * GB)
+
+        # Act / Assert: 2000s on the slow stick vs 110s on the fast one
+        assert scheduler.assign('slow') is None
+        scheduler.complete('fast', GB, 10)
+        assert scheduler.assign('fast').order_id == 'order'
+
+    def test_deferral_is_bounded(self, clock):
+        """Test that an order stops being deferred after max_deferral."""
+        scheduler = BurnScheduler(aging_factor=0.0, max_deferral=300, clock=clock)
+        scheduler.add_device('fast', capacity=64 * GB, throughput=100 * MB)
+        scheduler.add_device('slow', capacity=64 * GB, throughput=5 * MB)
+        scheduler.submit('order', size=10 * GB)
+
+        assert scheduler.assign('slow') is None
+        clock.advance(300)
+        assert scheduler.assign('slow').order_id == 'order'
+
+    def test_schedule_fills_fastest_devices_first(self, clock):
+        """Test that schedule hands out orders to idle devices by speed."""
+        scheduler = BurnScheduler(aging_factor=0.0, defer_margin=float('inf'), clock=clock)
+        scheduler.add_device('slow', capacity=64 * GB, throughput=5 * MB)
+        scheduler.add_device('fast', capacity=64 * GB, throughput=50 * MB)
+        scheduler.submit('a', size=GB)
+
+        assignments = scheduler.schedule()
+
+        assert [(a.device, a.order_id) for a in assignments] == [('fast', 'a')]
+
+    def test_remove_device_returns_current_order(self, scheduler):
+        """Test that unplugging a busy stick reports its order for requeueing."""
+        scheduler.add_device('sdb', capacity=64 * GB)
+        scheduler.submit('a', size=GB)
+        scheduler.assign('sdb')
+
+        assert scheduler.remove_device('sdb') == 'a'
+        assert scheduler.remove_device('sdb') is None
+
+    def test_port_keeps_learned_throughput_across_swaps(self):
+        """Test that a re-added device averages its probe into the speed it had."""
+        scheduler = BurnScheduler(smoothing=0.5)
+        scheduler.add_device('sdb', capacity=64 * GB, throughput=20 * MB)
+        scheduler.remove_device('sdb')
+
+        scheduler.add_device('sdb', capacity=32 * GB, throughput=10 * MB)
+
+        assert scheduler.devices['sdb'].throughput == pytest.approx(15 * MB)
+        assert scheduler.devices['sdb'].capacity == 32 * GB
+
+
+# =============================================================================
+# 2. Throughput Tests
+# =============================================================================
+
+class TestThroughput:
+    """Tests for throughput tracking and fleet statistics."""
+
+    def test_complete_updates_running_average(self, clock):
+        """Test that completed burns move the device throughput estimate."""
+        scheduler = BurnScheduler(smoothing=0.5, clock=clock)
+        scheduler.add_device('sdb', capacity=64 * GB, throughput=10 * MB)
+        scheduler.submit('a', size=GB)
+        scheduler.assign('sdb')
+
+        scheduler.complete('sdb', bytes_written=GB, seconds=50)  # 20 MB/s
+
+        assert scheduler.devices['sdb'].throughput == pytest.approx(15 * MB)
+        assert scheduler.devices['sdb'].is_idle
+
+    def test_stats_reports_orders_per_hour(self, scheduler, clock):
+        """Test that the fleet rate is computed over the elapsed window."""
+        # Arrange
+        scheduler.add_device('sdb', capacity=64 * GB)
+        for i in range(3):
+            scheduler.submit(f'o{i}', size=GB)
+
+        # Act
+        for _ in range(3):
+            scheduler.assign('sdb')
+            clock.advance(600)
+            scheduler.complete('sdb', GB, 600)
+        stats = scheduler.stats()
+
+        # Assert
+        assert stats.orders_per_hour == pytest.approx(6.0)  # 3 orders in 30 minutes
+        assert stats.queued == 0
+        assert stats.devices['sdb']['orders_done'] == 3
+        assert stats.devices['sdb']['utilization'] == pytest.approx(1.0)
+
+    def test_failed_burns_are_not_completed_orders(self, scheduler, clock):
+        """Test that failures are counted apart and do not move the throughput."""
+        # Arrange
+        scheduler.add_device('sdb', capacity=64 * GB, throughput=10 * MB)
+        scheduler.submit('a', size=GB)
+        scheduler.submit('b', size=GB)
+
+        # Act
+        scheduler.assign('sdb')
+        clock.advance(900)
+        scheduler.complete('sdb', 0, 900, ok=False)
+        scheduler.assign('sdb')
+        clock.advance(900)
+        scheduler.complete('sdb', GB, 900)
+        stats = scheduler.stats()
+
+        # Assert
+        assert stats.orders_per_hour == pytest.approx(2.0)  # 1 order in 30 minutes
+        assert stats.failures_per_hour == pytest.approx(2.0)
+        assert stats.devices['sdb']['orders_done'] == 1
+        assert stats.devices['sdb']['orders_failed'] == 1
+        assert scheduler.devices['sdb'].is_idle
+
+    def test_probe_write_speed(self, tmp_path):
+        """Test that the write probe measures and cleans up."""
+        speed = probe_write_speed(str(tmp_path), size=256 * 1024, block_size=64 * 1024)
+
+        assert speed > 0
+        assert list(tmp_path.iterdir()) == []
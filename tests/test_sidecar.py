@@ -0,0 +1,338 @@
+"""
+Tests for the local multiplexing sidecar.
+
+Runs a real sidecar on a temporary Unix socket in front of a fake upstream
+session, with several TechAura clients (one per simulated worker) using it
+as their transport.
+"""
+
+import json
+import socket
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from techaura_station.client import TechAuraClient, TechAuraClientError, TechAuraConnectionError
+from techaura_station.sidecar import Sidecar, SidecarTransport
+
+
+class FakeUpstream:
+    """Upstream session recording requests and answering from a handler."""
+
+    def __init__(self, handler, delay=0.0):
+        self.handler = handler
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        body = kwargs.get('json')
+        with self._lock:
+            self.calls.append((method, url, body, kwargs.get('params')))
+        time.sleep(self.delay)
+        status, payload = self.handler(method, url, body)
+        response = Mock()
+        response.status_code = status
+        response.text = json.dumps(payload)
+        return response
+
+
+def pending_page(order_ids):
+    return {'success': True, 'data': {'orders': [{'order_id': oid} for oid in order_ids]}}
+
+
+def batch_handler(method, url, body):
+    """Answer the transitions endpoint with one success per transition."""
+    if url.endswith('/orders/transitions'):
+        results = [{'orderId': t['orderId'], 'success': True, 'statusCode': 200,
+                    'data': {'newStatus': t['action']}} for t in body['transitions']]
+        return 200, {'success': True, 'data': {'results': results}}
+    return 200, pending_page(['o1', 'o2', 'o3', 'o4'])
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'sidecar.sock')
+
+
+def start_sidecar(socket_path, upstream, **kwargs):
+    sidecar = Sidecar(socket_path, session=upstream, **kwargs)
+    sidecar.start()
+    return sidecar
+
+
+def make_client(base_url, api_key, socket_path, worker_id):
+    return TechAuraClient(base_url, api_key, retry_delay=0.01,
+                          session=SidecarTransport(socket_path, worker_id))
+
+
+def run_concurrently(functions):
+    results = [None] * len(functions)
+    errors = []
+
+    def run(index, function):
+        try:
+            results[index] = function()
+        except Exception as e:  # pragma: no cover - surfaced by the assert below
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i, f)) for i, f in enumerate(functions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not errors
+    return results
+
+
+class TestSingleFlight:
+    """Tests for coalesced GETs."""
+
+    def test_concurrent_identical_gets_share_one_upstream_request(self, socket_path, base_url, api_key):
+        """Test that identical GETs in flight reach the server once."""
+        # Arrange
+        upstream = FakeUpstream(lambda *_: (200, {'success': True}), delay=0.2)
+        sidecar = start_sidecar(socket_path, upstream)
+        clients = [make_client(base_url, api_key, socket_path, f'w{i}') for i in range(6)]
+
+        try:
+            # Act
+            results = run_concurrently([client.connect for client in clients])
+        finally:
+            sidecar.close()
+
+        # Assert
+        assert results == [True] * 6
+        assert len(upstream.calls) == 1
+        assert sidecar.stats()['local_requests'] == 6
+
+
+class TestOrderFeed:
+    """Tests for the shared pending-order feed."""
+
+    def test_feed_is_polled_once_and_split_between_workers(self, socket_path, base_url, api_key):
+        """Test that workers get disjoint orders from a single upstream poll."""
+        # Arrange
+        upstream = FakeUpstream(batch_handler)
+        sidecar = start_sidecar(socket_path, upstream, feed_ttl=60)
+        first = make_client(base_url, api_key, socket_path, 'w1')
+        second = make_client(base_url, api_key, socket_path, 'w2')
+
+        try:
+            # Act
+            first_orders = [o['order_id'] for o in first.get_pending_orders()]
+            second_orders = [o['order_id'] for o in second.get_pending_orders()]
+            first_again = [o['order_id'] for o in first.get_pending_orders()]
+        finally:
+            sidecar.close()
+
+        # Assert
+        assert first_orders == ['o1', 'o2', 'o3', 'o4']
+        assert second_orders == []
+        assert first_again == first_orders
+        assert len(upstream.calls) == 1
+
+    def test_completed_order_leaves_cached_feed(self, socket_path, base_url, api_key):
+        """Test that a completed order is not served again from a page fetched before."""
+        # Arrange
+        upstream = FakeUpstream(batch_handler)
+        sidecar = start_sidecar(socket_path, upstream, feed_ttl=60)
+        first = make_client(base_url, api_key, socket_path, 'w1')
+
+        try:
+            first.get_pending_orders()
+
+            # Act
+            first.complete_burning('o1', notes='ok')
+            first_again = [o['order_id'] for o in first.get_pending_orders()]
+        finally:
+            sidecar.close()
+
+        # Assert
+        assert first_again == ['o2', 'o3', 'o4']
+        assert [call[0] for call in upstream.calls] == ['GET', 'POST']
+
+    def test_failed_order_lease_is_released(self, socket_path, base_url, api_key):
+        """Test that an order reported as failed is offered to other workers again."""
+        # Arrange
+        upstream = FakeUpstream(batch_handler)
+        sidecar = start_sidecar(socket_path, upstream, feed_ttl=0)
+        first = make_client(base_url, api_key, socket_path, 'w1')
+        second = make_client(base_url, api_key, socket_path, 'w2')
+
+        try:
+            first.get_pending_orders()
+
+            # Act
+            first.report_error('o1', 'stick removed', retryable=True)
+            second_orders = [o['order_id'] for o in second.get_pending_orders()]
+        finally:
+            sidecar.close()
+
+        # Assert
+        assert second_orders == ['o1']
+
+
+class TestTransitionBatching:
+    """Tests for batched status transitions."""
+
+    def test_concurrent_transitions_are_sent_as_one_batch(self, socket_path, base_url, api_key):
+        """Test that transitions from several workers share one upstream request."""
+        # Arrange
+        upstream = FakeUpstream(batch_handler)
+        sidecar = start_sidecar(socket_path, upstream, batch_window=0.2)
+        clients = [make_client(base_url, api_key, socket_path, f'w{i}') for i in range(4)]
+
+        try:
+            # Act
+            results = run_concurrently([
+                lambda: clients[0].start_burning('o1'),
+                lambda: clients[1].complete_burning('o2', notes='12 archivos'),
+                lambda: clients[2].report_error('o3', 'disk full', error_code='COPY_FAILED', retryable=True),
+                lambda: clients[3].start_burning('o4'),
+            ])
+        finally:
+            sidecar.close()
+
+        # Assert
+        assert results == [True] * 4
+        assert len(upstream.calls) == 1
+        method, url, body, _params = upstream.calls[0]
+        assert url == f'{base_url}/orders/transitions'
+        by_order = {t['orderId']: t for t in body['transitions']}
+        assert by_order['o2'] == {'orderId': 'o2', 'action': 'complete-burning', 'notes': '12 archivos'}
+        assert by_order['o3']['action'] == 'burning-failed'
+        assert by_order['o3']['errorCode'] == 'COPY_FAILED'
+        assert by_order['o3']['retryable'] is True
+
+    def test_per_transition_errors_reach_their_worker(self, socket_path, base_url, api_key):
+        """Test that a rejected transition raises only for the worker that sent it."""
+        # Arrange
+        def handler(method, url, body):
+            results = [{'orderId': t['orderId'], 'success': t['orderId'] != 'bad',
+                        'statusCode': 200 if t['orderId'] != 'bad' else 400,
+                        'error': None if t['orderId'] != 'bad' else 'Estado no válido'}
+                       for t in body['transitions']]
+            return 200, {'success': True, 'data': {'results': results}}
+
+        upstream = FakeUpstream(handler)
+        sidecar = start_sidecar(socket_path, upstream)
+        client = make_client(base_url, api_key, socket_path, 'w1')
+
+        try:
+            # Act & Assert
+            with pytest.raises(TechAuraClientError) as excinfo:
+                client.start_burning('bad')
+            assert 'Estado no válido' in str(excinfo.value)
+            assert client.start_burning('good') is True
+        finally:
+            sidecar.close()
+
+    def test_falls_back_to_single_requests_without_batch_endpoint(self, socket_path, base_url, api_key):
+        """Test that transitions still go through against a server without batching."""
+        # Arrange
+        def handler(method, url, body):
+            if url.endswith('/orders/transitions'):
+                return 404, {'success': False, 'error': 'Not found'}
+            return 200, {'success': True}
+
+        upstream = FakeUpstream(handler)
+        sidecar = start_sidecar(socket_path, upstream)
+        client = make_client(base_url, api_key, socket_path, 'w1')
+
+        try:
+            # Act
+            result = client.report_error('o1', 'disk full', error_code='COPY_FAILED')
+        finally:
+            sidecar.close()
+
+        # Assert
+        assert result is True
+        method, url, body, _params = upstream.calls[-1]
+        assert url == f'{base_url}/orders/o1/report-error'
+        assert body == {'error_message': 'disk full', 'error_code': 'COPY_FAILED', 'retryable': False}
+
+
+class TestTransport:
+    """Tests for SidecarTransport error mapping."""
+
+    def test_unreachable_sidecar_is_a_connection_error(self, socket_path, base_url, api_key):
+        """Test that a missing sidecar maps to the client's connection error."""
+        # Arrange
+        client = TechAuraClient(base_url, api_key, max_retries=1,
+                                session=SidecarTransport(socket_path))
+
+        # Act & Assert
+        with pytest.raises(TechAuraConnectionError):
+            client.connect()
+
+    def test_upstream_timeout_is_propagated(self, socket_path):
+        """Test that an upstream timeout surfaces as requests' Timeout."""
+        # Arrange
+        upstream = Mock()
+        upstream.request.side_effect = requests.exceptions.Timeout()
+        sidecar = start_sidecar(socket_path, upstream)
+        transport = SidecarTransport(socket_path)
+
+        try:
+            # Act & Assert
+            with pytest.raises(requests.exceptions.Timeout):
+                transport.request('GET', 'https://api.techaura.com/v1/health', timeout=1)
+        finally:
+            transport.close()
+            sidecar.close()
+
+    def test_stale_connection_is_retried_before_sending(self, socket_path):
+        """Test that a connection closed by a restarted sidecar is replaced once."""
+        # Arrange
+        upstream = FakeUpstream(batch_handler)
+        sidecar = start_sidecar(socket_path, upstream)
+        transport = SidecarTransport(socket_path)
+        stale, peer = socket.socketpair()
+        peer.close()
+        transport._local.conn = (stale, stale.makefile('rwb'))
+
+        try:
+            # Act
+            response = transport.request('GET', 'https://api.techaura.com/v1/health', timeout=1)
+        finally:
+            transport.close()
+            sidecar.close()
+
+        # Assert
+        assert response.status_code == 200
+        assert len(upstream.calls) == 1
+
+    def test_request_is_not_resent_after_it_was_written(self, socket_path):
+        """Test that a connection lost while waiting for the reply is not retried."""
+        # Arrange
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen()
+        received = []
+
+        def read_and_hang_up():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return
+                with conn, conn.makefile('rb') as f:
+                    received.append(f.readline())
+
+        threading.Thread(target=read_and_hang_up, daemon=True).start()
+        transport = SidecarTransport(socket_path)
+
+        try:
+            # Act & Assert
+            with pytest.raises(requests.exceptions.ConnectionError):
+                transport.request('POST', 'https://api.techaura.com/v1/orders/o1/start-burning',
+                                  timeout=1)
+        finally:
+            transport.close()
+            server.close()
+
+        assert len(received) == 1
@@ -0,0 +1,147 @@
+"""
+Tests for the capacity-planning simulator.
+
+Runs small seeded simulations; every run takes milliseconds of CPU.
+"""
+
+import json
+import random
+
+import pytest
+
+from techaura_station.simulator import (
+    OrderSizer, SimOrder, SimPort, Simulation, load_orders, replay_orders, synthetic_orders)
+
+GB = 10 ** 9
+
+
+def backlog(count, size=GB, capacity=8 * GB):
+    return [SimOrder(f'o{i}', 0.0, size, capacity) for i in range(count)]
+
+
+class TestSimulation:
+    """Tests for Simulation.run."""
+
+    def test_burns_every_order(self):
+        """Test that a backlog is fully burned and counted."""
+        # Arrange
+        simulation = Simulation(backlog(10), [SimPort('p0', 10 ** 8), SimPort('p1', 10 ** 8)])
+
+        # Act
+        report = simulation.run()
+
+        # Assert
+        assert report.orders_completed == 10
+        assert report.orders_pending == 0
+        assert report.orders_per_hour > 0
+        assert set(report.port_utilization) == {'p0', 'p1'}
+
+    def test_more_ports_raise_throughput(self):
+        """Test that doubling the ports roughly doubles orders per hour."""
+        # Arrange
+        few = Simulation(backlog(40), [SimPort(f'p{i}', 10 ** 8) for i in range(2)])
+        many = Simulation(backlog(40), [SimPort(f'p{i}', 10 ** 8) for i in range(4)])
+
+        # Act
+        few_report = few.run()
+        many_report = many.run()
+
+        # Assert
+        assert many_report.orders_per_hour > 1.7 * few_report.orders_per_hour
+        assert many_report.queue_latency['p95'] < few_report.queue_latency['p95']
+
+    def test_failed_burns_are_retried(self):
+        """Test that failed orders return to the queue and finish later."""
+        # Arrange
+        ports = [SimPort('p0', 10 ** 8, failure_rate=0.3)]
+        simulation = Simulation(backlog(20), ports, seed=3)
+
+        # Act
+        report = simulation.run()
+
+        # Assert
+        assert report.failed_burns > 0
+        assert report.orders_completed == 20
+
+    def test_rate_limit_throttles_requests(self):
+        """Test that requests over the per-minute limit wait for the next window."""
+        # Arrange
+        ports = [SimPort(f'p{i}', 10 ** 9, swap_seconds=0.0) for i in range(8)]
+        simulation = Simulation(backlog(100, size=10 ** 8), ports, rate_limit=20)
+
+        # Act
+        report = simulation.run()
+
+        # Assert
+        assert report.orders_completed == 100
+        assert report.throttled_requests > 0
+
+    def test_horizon_stops_early(self):
+        """Test that a horizon leaves unfinished orders pending."""
+        # Arrange
+        simulation = Simulation(backlog(50), [SimPort('p0', 10 ** 7)])
+
+        # Act
+        report = simulation.run(horizon=3600)
+
+        # Assert
+        assert report.simulated_seconds == 3600
+        assert 0 < report.orders_completed < 50
+        assert report.orders_pending == 50 - report.orders_completed
+
+    def test_capacity_is_respected(self):
+        """Test that orders only go to ports whose sticks are large enough."""
+        # Arrange
+        orders = [SimOrder('big', 0.0, 30 * GB, 64 * GB)]
+        ports = [SimPort('small', 10 ** 9, capacity=32 * GB), SimPort('large', 10 ** 7, capacity=128 * GB)]
+
+        # Act
+        report = Simulation(orders, ports).run()
+
+        # Assert
+        assert report.port_utilization['small'] == 0
+        assert report.port_utilization['large'] > 0.9
+
+
+class TestOrderMixes:
+    """Tests for synthetic and replayed order mixes."""
+
+    def test_synthetic_orders_are_reproducible(self):
+        """Test that the same seed produces the same mix."""
+        # Act
+        first = synthetic_orders(20, random.Random(7), arrival_rate=60)
+        second = synthetic_orders(20, random.Random(7), arrival_rate=60)
+
+        # Assert
+        assert first == second
+        assert [o.arrival for o in first] == sorted(o.arrival for o in first)
+        assert all(0 < o.size <= o.required_capacity for o in first)
+
+    def test_sizer_uses_library_index(self, media_library):
+        """Test that orders are sized by resolving their content."""
+        # Arrange
+        from techaura_station.matching import ContentIndex
+        index = ContentIndex.build({'music': [media_library['music']]})
+        sizer = OrderSizer(index)
+
+        # Act
+        size = sizer.size({'capacity': '8GB', 'genres': ['salsa']})
+
+        # Assert
+        assert 0 < size < GB
+
+    def test_replay_uses_created_at_offsets(self, tmp_path):
+        """Test that replayed orders arrive relative to the first one."""
+        # Arrange
+        path = tmp_path / 'orders.jsonl'
+        path.write_text('\n'.join(json.dumps(o) for o in [
+            {'order_id': 'b', 'capacity': '16GB', 'created_at': '2024-01-01T10:30:00Z'},
+            {'order_id': 'a', 'capacity': '8GB', 'created_at': '2024-01-01T10:00:00Z'},
+        ]))
+
+        # Act
+        orders = replay_orders(load_orders(str(path)), OrderSizer(rng=random.Random(0)))
+
+        # Assert
+        assert [o.order_id for o in orders] == ['a', 'b']
+        assert orders[1].arrival == pytest.approx(1800)
@@ -0,0 +1,107 @@
+"""
+Tests for readahead staging.
+"""
+
+import os
+
+import pytest
+
+from techaura_station.plan import CopyItem, CopyPlan
+from techaura_station.staging import Stager
+
+
+def _plan(tmp_path, order_id='order-1', sizes=(300, 100, 200)):
+    library = tmp_path / 'library'
+    library.mkdir(exist_ok=True)
+    items = []
+    for i, size in enumerate(sizes):
+        source = library / f'{order_id}-{i}.mp3'
+        source.write_bytes(b'x' * size)
+        items.append(CopyItem(str(source), f'MUSICA/{source.name}', size))
+    return CopyPlan(order_id, items)
+
+
+@pytest.fixture
+def stager(tmp_path):
+    """Provide a copying stager with a 350 byte budget."""
+    stager = Stager(350, staging_dir=str(tmp_path / 'staging'))
+    yield stager
+    stager.close()
+
+
+class TestStager:
+    """Tests for Stager budgets, lookups and eviction."""
+
+    def test_stages_smallest_files_within_budget(self, stager, tmp_path):
+        """Test that small files are staged first and the budget is respected."""
+        # Arrange
+        plan = _plan(tmp_path)
+
+        # Act
+        staged = stager.stage(plan).result(5)
+
+        # Assert
+        assert staged == 300  # 100 + 200; the 300 byte file does not fit
+        assert stager.used_bytes == 300
+        small = plan.items[1].source
+        assert stager.source_for('order-1', small) != small
+        with open(stager.source_for('order-1', small), 'rb') as f:
+            assert f.read() == b'x' * 100
+        assert stager.source_for('order-1', plan.items[0].source) == plan.items[0].source
+
+    def test_evict_frees_budget_and_files(self, stager, tmp_path):
+        """Test that evicting a cancelled order deletes its staged copies."""
+        plan = _plan(tmp_path)
+        stager.stage(plan).result(5)
+        staged_path = stager.source_for('order-1', plan.items[1].source)
+
+        stager.evict('order-1')
+
+        assert stager.used_bytes == 0
+        assert not os.path.exists(staged_path)
+        assert stager.source_for('order-1', plan.items[1].source) == plan.items[1].source
+
+    def test_budget_is_shared_across_orders(self, stager, tmp_path):
+        """Test that a second order only gets what the first left over."""
+        stager.stage(_plan(tmp_path)).result(5)
+
+        staged = stager.stage(_plan(tmp_path, 'order-2', sizes=(40, 60))).result(5)
+
+        assert staged == 40
+        assert stager.used_bytes == 340
+
+    def test_shared_source_is_kept_until_last_holder_is_evicted(self, stager, tmp_path):
+        """Test that a source shared by two orders is staged once and outlives one eviction."""
+        # Arrange
+        first = _plan(tmp_path, sizes=(100,))
+        second = CopyPlan('order-2', list(first.items))
+        other = _plan(tmp_path, 'order-3', sizes=(50,))
+        stager.stage(first).result(5)
+        stager.stage(second).result(5)
+        shared = first.items[0].source
+        staged_path = stager.source_for('order-1', shared)
+
+        # Act
+        stager.evict('order-2')
+
+        # Assert
+        assert stager.used_bytes == 100
+        assert os.path.exists(staged_path)
+        assert stager.source_for('order-1', shared) == staged_path
+        assert stager.source_for('order-3', shared) == shared  # Not held by order-3
+        stager.stage(other).result(5)
+        stager.evict('order-1')
+        assert not os.path.exists(staged_path)
+        assert stager.used_bytes == 50
+
+    def test_readahead_mode_keeps_sources(self, tmp_path):
+        """Test that page-cache staging charges the budget without copies."""
+        stager = Stager(1000)
+        plan = _plan(tmp_path)
+        try:
+            assert stager.stage(plan).result(5) == 600
+            assert all(stager.source_for('order-1', item.source) == item.source for item in plan)
+            stager.evict('order-1')
+            assert stager.used_bytes == 0
+        finally:
+            stager.close()
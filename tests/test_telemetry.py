@@ -0,0 +1,141 @@
+"""
+Tests for per-order burn telemetry.
+
+Uses a mocked API client to check batching, retries and the wire format.
+"""
+
+from unittest.mock import Mock
+
+from techaura_station.client import TechAuraClientError
+from techaura_station.telemetry import OrderTimeline, TelemetryUploader
+
+
+def make_timeline(order_id='o1', **kwargs):
+    timeline = OrderTimeline(order_id, started_at=1700000000.5, **kwargs)
+    timeline.stages = {'claim': 0.0123, 'copy': 4.5}
+    return timeline
+
+
+class TestOrderTimeline:
+    """Tests for OrderTimeline."""
+
+    def test_profiler_stages_map_to_timeline_stages(self):
+        """Test that profiler stages add up under their timeline stage."""
+        # Arrange
+        timeline = OrderTimeline('o1')
+
+        # Act
+        timeline.add('resolve', 0.25)
+        timeline.add('fit', 0.5)
+        timeline.add('image.stream', 2.0)
+        timeline.add('http', 1.0)
+
+        # Assert
+        assert timeline.stages == {'resolve': 0.75, 'copy': 2.0}
+
+    def test_entry_is_compact(self):
+        """Test the short-key wire form with milliseconds."""
+        # Arrange
+        timeline = make_timeline(device='sdb', content_type='music', bytes_written=2048, success=True)
+
+        # Act
+        entry = timeline.to_entry()
+
+        # Assert
+        assert entry == {'o': 'o1', 'd': 'sdb', 'c': 'music', 'm': 'files', 't': 1700000000,
+                         'b': 2048, 'ok': True, 's': {'claim': 12, 'copy': 4500}}
+
+
+class TestTelemetryUploader:
+    """Tests for TelemetryUploader."""
+
+    def test_flush_sends_batches(self):
+        """Test that buffered entries go out in batch_size chunks."""
+        # Arrange
+        client = Mock()
+        uploader = TelemetryUploader(client, 'station-1', batch_size=2)
+        for i in range(5):
+            uploader.record(make_timeline(f'o{i}'))
+
+        # Act
+        sent = uploader.flush()
+
+        # Assert
+        assert sent == 5
+        assert [len(call.args[1]) for call in client.send_burn_telemetry.call_args_list] == [2, 2, 1]
+        assert client.send_burn_telemetry.call_args.args[0] == 'station-1'
+        assert len(uploader) == 0
+
+    def test_retryable_failure_keeps_entries(self):
+        """Test that a batch is kept, in order, when the upload can be retried."""
+        # Arrange
+        client = Mock()
+        client.send_burn_telemetry.side_effect = [TechAuraClientError('timeout', retryable=True), True]
+        uploader = TelemetryUploader(client, 'station-1')
+        uploader.record(make_timeline('o1'))
+        uploader.record(make_timeline('o2'))
+
+        # Act
+        first = uploader.flush()
+        second = uploader.flush()
+
+        # Assert
+        assert (first, second) == (0, 2)
+        assert [e['o'] for e in client.send_burn_telemetry.call_args.args[1]] == ['o1', 'o2']
+
+    def test_unexpected_failure_keeps_entries(self):
+        """Test that a batch is not lost when the client fails unexpectedly."""
+        # Arrange
+        client = Mock()
+        client.send_burn_telemetry.side_effect = [ValueError('bad payload'), True]
+        uploader = TelemetryUploader(client, 'station-1')
+        uploader.record(make_timeline('o1'))
+
+        # Act
+        first = uploader.flush()
+        second = uploader.flush()
+
+        # Assert
+        assert (first, second) == (0, 1)
+        assert len(uploader) == 0
+
+    def test_rejected_batch_is_dropped(self):
+        """Test that a non-retryable rejection does not block later uploads."""
+        # Arrange
+        client = Mock()
+        client.send_burn_telemetry.side_effect = TechAuraClientError('Not found', status_code=404)
+        uploader = TelemetryUploader(client, 'station-1')
+        uploader.record(make_timeline())
+
+        # Act
+        uploader.flush()
+
+        # Assert
+        assert len(uploader) == 0
+
+    def test_buffer_is_bounded(self):
+        """Test that the oldest entries are dropped past max_buffered."""
+        # Arrange
+        uploader = TelemetryUploader(Mock(), 'station-1', max_buffered=3)
+
+        # Act
+        for i in range(5):
+            uploader.record(make_timeline(f'o{i}'))
+
+        # Assert
+        assert len(uploader) == 3
+
+    def test_stop_uploads_remaining_entries(self):
+        """Test that stopping the background thread flushes the buffer."""
+        # Arrange
+        client = Mock()
+        uploader = TelemetryUploader(client, 'station-1', flush_interval=60)
+        uploader.start()
+        uploader.record(make_timeline())
+
+        # Act
+        uploader.stop()
+
+        # Assert
+        client.send_burn_telemetry.assert_called_once()
+        assert len(uploader) == 0
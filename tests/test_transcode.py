@@ -0,0 +1,199 @@
+"""
+Tests for the transcoding pipeline and capacity fitting.
+
+A fake ffmpeg script stands in for the real binary: it writes an output
+whose size scales with the requested audio bitrate.
+"""
+
+import os
+import stat
+import sys
+import textwrap
+
+import pytest
+
+from techaura_station.plan import CopyItem, CopyPlan, parse_capacity
+from techaura_station.transcode import (
+    PROFILES,
+    TranscodeError,
+    TranscodePipeline,
+    TranscodeProfile,
+    fit_plan_to_capacity,
+)
+
+
+FAKE_FFMPEG = textwrap.dedent('''\
+    import os, sys
+    args = sys.argv[1:]
+    source = args[args.index('-i') + 1]
+    if 'corrupt' in source:
+        sys.stderr.write('Invalid data found when processing input')
+        sys.exit(1)
+    kbps = int(args[args.index('-b:a') + 1].rstrip('k')) if '-b:a' in args else 320
+    size = os.path.getsize(source) * kbps // 320
+    with open(args[-1], 'wb') as f:
+        f.write(b'T' * size)
+''')
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Provide an executable fake ffmpeg."""
+    script = tmp_path / 'ffmpeg'
+    script.write_text(f'#!{sys.executable}\n' + FAKE_FFMPEG)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Provide three 320kbps-sized source files."""
+    root = tmp_path / 'library'
+    root.mkdir()
+    paths = []
+    for i in range(3):
+        path = root / f'song{i}.mp3'
+        path.write_bytes(bytes([i]) * 3200)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def pipeline(tmp_path, fake_ffmpeg):
+    """Provide a pipeline using the fake ffmpeg in-process."""
+    return TranscodePipeline(str(tmp_path / 'cache'), ffmpeg_path=fake_ffmpeg, workers=1)
+
+
+# =============================================================================
+# 1. Profile Tests
+# =============================================================================
+
+class TestTranscodeProfile:
+    """Tests for profile arguments and settings hashes."""
+
+    def test_demo_profile_clips(self):
+        """Test that demo profiles trim the input."""
+        args = PROFILES['demo-mp3'].ffmpeg_args()
+
+        assert args[:4] == ['-ss', '30', '-t', '60']
+        assert '-vn' in args
+
+    def test_settings_hash_ignores_name(self):
+        """Test that the cache key depends on settings only."""
+        a = TranscodeProfile('a', '.mp3', audio_bitrate='128k')
+        b = TranscodeProfile('b', '.mp3', audio_bitrate='128k')
+        c = TranscodeProfile('a', '.mp3', audio_bitrate='96k')
+
+        assert a.settings_hash == b.settings_hash
+        assert a.settings_hash != c.settings_hash
+
+
+# =============================================================================
+# 2. Pipeline Tests
+# =============================================================================
+
+class TestTranscodePipeline:
+    """Tests for TranscodePipeline.run."""
+
+    def test_second_run_is_fully_cached(self, pipeline, sources):
+        """Test that completed outputs are not transcoded again."""
+        profiles = [PROFILES['mp3-128'], PROFILES['mp3-96']]
+
+        first = pipeline.run(sources, profiles)
+        second = pipeline.run(sources, profiles)
+
+        assert (first.transcoded, first.cached) == (6, 0)
+        assert (second.transcoded, second.cached) == (0, 6)
+        assert second.outputs == first.outputs
+        assert os.path.getsize(first.outputs[(sources[0], 'mp3-128')]) == 1280
+
+    def test_cache_is_keyed_by_content(self, pipeline, sources, tmp_path):
+        """Test that a renamed source reuses its cached output."""
+        pipeline.run(sources[:1], [PROFILES['mp3-128']])
+        renamed = str(tmp_path / 'renamed.mp3')
+        os.rename(sources[0], renamed)
+
+        result = pipeline.run([renamed], [PROFILES['mp3-128']])
+
+        assert (result.transcoded, result.cached) == (0, 1)
+
+    def test_failures_are_reported_not_cached(self, pipeline, sources, tmp_path):
+        """Test that ffmpeg failures leave no output behind."""
+        corrupt = tmp_path / 'corrupt.mp3'
+        corrupt.write_bytes(b'x' * 10)
+
+        result = pipeline.run([str(corrupt)], [PROFILES['mp3-128']])
+
+        assert 'Invalid data' in result.failed[(str(corrupt), 'mp3-128')]
+        assert result.outputs == {}
+        assert pipeline.cached_variants([str(corrupt)], PROFILES['mp3-128']) == {}
+
+    def test_process_pool_run(self, tmp_path, fake_ffmpeg, sources):
+        """Test that a pooled run produces every output."""
+        pipeline = TranscodePipeline(str(tmp_path / 'pool-cache'), ffmpeg_path=fake_ffmpeg, workers=2)
+
+        result = pipeline.run(sources, [PROFILES['mp3-128']])
+
+        assert result.transcoded == 3
+        assert all(os.path.exists(path) for path in result.outputs.values())
+
+    def test_missing_ffmpeg_raises(self, tmp_path, sources):
+        """Test that uncached work without ffmpeg raises TranscodeError."""
+        pipeline = TranscodePipeline(str(tmp_path / 'cache'), workers=1)
+        pipeline.ffmpeg_path = None
+
+        with pytest.raises(TranscodeError):
+            pipeline.run(sources, [PROFILES['mp3-128']])
+
+
+# =============================================================================
+# 3. Capacity Fitting Tests
+# =============================================================================
+
+class TestCapacityFitting:
+    """Tests for parse_capacity and fit_plan_to_capacity."""
+
+    def _plan(self, sources):
+        return CopyPlan('order-1', [CopyItem(s, os.path.join('MUSICA', 'SALSA', os.path.basename(s)), 3200)
+                                    for s in sources])
+
+    def test_parse_capacity(self):
+        """Test that capacities are parsed into usable bytes."""
+        assert parse_capacity('16GB') == int(16e9 * 0.92)
+        assert parse_capacity('512 mb') == int(512e6 * 0.92)
+        assert parse_capacity('unknown') is None
+
+    def test_plan_that_fits_is_unchanged(self, pipeline, sources):
+        """Test that fitting plans are returned as is."""
+        plan = self._plan(sources)
+
+        assert fit_plan_to_capacity(plan, 10_000, pipeline) is plan
+
+    def test_steps_down_ladder_until_plan_fits(self, pipeline, sources):
+        """Test that the best variant that fits is chosen over dropping files."""
+        plan = self._plan(sources)
+
+        # 192k variants: 3 * 1920 = 5760 bytes; 128k: 3 * 1280 = 3840 bytes
+        fitted = fit_plan_to_capacity(plan, 4000, pipeline, transcode_missing=True)
+
+        assert len(fitted) == 3
+        assert fitted.dropped == []
+        assert fitted.total_bytes == 3840
+        assert all(item.destination.startswith(os.path.join('MUSICA', 'SALSA')) for item in fitted)
+
+    def test_drops_files_when_smallest_variant_does_not_fit(self, pipeline, sources):
+        """Test that files are dropped from the end as a last resort."""
+        plan = self._plan(sources)
+
+        fitted = fit_plan_to_capacity(plan, 2000, pipeline, transcode_missing=True)
+
+        assert len(fitted) == 2
+        assert fitted.dropped == [plan.items[2].destination]
+
+    def test_uses_only_cached_variants_by_default(self, pipeline, sources):
+        """Test that burns do not transcode unless asked to."""
+        plan = self._plan(sources)
+
+        fitted = fit_plan_to_capacity(plan, 4000, pipeline)
+
+        assert len(fitted) == 1
@@ -0,0 +1,463 @@
+"""
+Tests for the burn worker.
+
+Uses a mocked API client and a temporary directory as the USB mount point.
+"""
+
+import json
+import os
+import subprocess
+from unittest.mock import Mock, patch
+
+import pytest
+
+from techaura_station.devices import USBDevice
+from techaura_station.image import ImageError
+from techaura_station.matching import ContentIndex
+from techaura_station.metadata import AudioMetadata, MetadataCache, ScanResult
+from techaura_station.profiling import PROFILER
+from techaura_station.staging import Stager
+from techaura_station import worker as worker_module
+from techaura_station.worker import BurnWorker
+
+
+@pytest.fixture
+def api_client():
+    """Provide a mocked TechAura client."""
+    client = Mock()
+    client.start_burning.return_value = True
+    client.complete_burning.return_value = True
+    client.report_error.return_value = True
+    return client
+
+
+class TestBurnWorker:
+    """Tests for BurnWorker.burn."""
+
+    def test_copies_plan_and_completes(self, api_client, media_library, sample_order, tmp_path):
+        """Test that a successful burn copies files and completes the order."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+
+        # Act
+        plan = worker.burn(sample_order.to_dict(), str(mount_point))
+
+        # Assert
+        api_client.start_burning.assert_called_once_with('order-123')
+        for item in plan:
+            assert os.path.getsize(mount_point / item.destination) == item.size
+        notes = api_client.complete_burning.call_args[1]['notes']
+        assert 'Sin coincidencias: Pop' in notes
+
+    def test_reports_error_when_copy_fails(self, api_client, media_library, sample_order, tmp_path):
+        """Test that copy failures are reported as retryable errors."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+        missing_mount = tmp_path / 'not-a-dir'
+        missing_mount.write_text('')
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            worker.burn(sample_order.to_dict(), str(missing_mount))
+
+        api_client.complete_burning.assert_not_called()
+        kwargs = api_client.report_error.call_args[1]
+        assert kwargs['error_code'] == 'COPY_FAILED'
+        assert kwargs['retryable'] is True
+
+    def test_reports_any_error_after_claim(self, api_client, media_library, sample_order, tmp_path):
+        """Test that a non-I/O failure after start_burning still releases the order."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+
+        # Act & Assert
+        with patch.object(worker, 'write_playlist', side_effect=ValueError('bad metadata')):
+            with pytest.raises(ValueError):
+                worker.burn(sample_order.to_dict(), str(tmp_path))
+
+        api_client.complete_burning.assert_not_called()
+        assert api_client.report_error.call_args[0] == ('order-123', 'bad metadata')
+
+    def test_playlist_includes_cached_metadata(self, api_client, media_library, sample_order, tmp_path):
+        """Test that playlist entries carry metadata from the cache."""
+        # Arrange
+        metadata = MetadataCache()
+        index = ContentIndex.build(media_library)
+        worker = BurnWorker(api_client, index, metadata=metadata)
+        plan = worker.plan(sample_order.to_dict())
+        first = plan.items[0]
+        metadata._store([(first.source, AudioMetadata(first.source, artist='AC/DC', duration=255.0), None)],
+                        {first.source: (0, first.size)}, ScanResult())
+
+        # Act
+        playlist_path = worker.write_playlist(plan, str(tmp_path))
+
+        # Assert
+        with open(playlist_path, encoding='utf-8') as f:
+            playlist = json.load(f)
+        assert len(playlist) == len(plan)
+        assert playlist[0]['artist'] == 'AC/DC'
+        assert playlist[0]['duration'] == 255.0
+        assert 'artist' not in playlist[1]
+
+
+class TestResumableBurn:
+    """Tests for journaled, resumable burns."""
+
+    def test_failed_burn_resumes_from_last_verified_file(self, api_client, media_library,
+                                                         sample_order, tmp_path):
+        """Test that a second attempt only copies the files the first one missed."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            journal_dir=str(tmp_path / 'journals'))
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+        real_copy = worker_module.copy_with_checksum
+        calls = []
+
+        def unplug_after_two(source, destination):
+            calls.append(source)
+            if len(calls) == 3:
+                raise OSError('No such device')
+            return real_copy(source, destination)
+
+        with patch.object(worker_module, 'copy_with_checksum', side_effect=unplug_after_two):
+            with pytest.raises(OSError):
+                worker.burn(sample_order.to_dict(), str(mount_point))
+
+        # Act
+        with patch.object(worker_module, 'copy_with_checksum', wraps=real_copy) as copy:
+            plan = worker.burn(sample_order.to_dict(), str(mount_point))
+
+        # Assert
+        assert copy.call_count == len(plan) - 2
+        assert [c.args[0] for c in copy.call_args_list] == [item.source for item in plan.items[2:]]
+        for item in plan:
+            assert os.path.getsize(mount_point / item.destination) == item.size
+        assert 'Reanudado: 2 archivos' in api_client.complete_burning.call_args[1]['notes']
+        assert os.listdir(tmp_path / 'journals') == []
+
+    def test_replacement_stick_copies_everything(self, api_client, media_library,
+                                                 sample_order, tmp_path):
+        """Test that journaled files missing from a new stick are copied again."""
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            journal_dir=str(tmp_path / 'journals'))
+        first = tmp_path / 'usb1'
+        first.mkdir()
+        plan = worker.plan(sample_order.to_dict())
+        journal = worker_module.CopyJournal.for_order(worker.journal_dir, 'order-123')
+        journal.begin(plan)
+        worker.copy_plan(plan, str(first), journal)
+        journal.close()
+        second = tmp_path / 'usb2'
+        second.mkdir()
+
+        worker.burn(sample_order.to_dict(), str(second))
+
+        for item in plan:
+            assert os.path.getsize(second / item.destination) == item.size
+        assert 'Reanudado' not in api_client.complete_burning.call_args[1]['notes']
+
+    def test_failed_completion_keeps_journal(self, api_client, media_library, sample_order, tmp_path):
+        """Test that a completion error is reported and the retry copies nothing."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            journal_dir=str(tmp_path / 'journals'))
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+        api_client.complete_burning.side_effect = [ConnectionError('reset'), True]
+        worker.prepare(sample_order.to_dict())
+
+        # Act
+        with pytest.raises(ConnectionError):
+            worker.burn(sample_order.to_dict(), str(mount_point))
+        with patch.object(worker_module, 'copy_with_checksum') as copy:
+            worker.burn(sample_order.to_dict(), str(mount_point))
+
+        # Assert
+        assert api_client.report_error.call_args[1]['error_code'] == 'COMPLETE_FAILED'
+        copy.assert_not_called()
+        assert worker._prepared == {}
+        assert os.listdir(tmp_path / 'journals') == []
+
+
+class TestPreparedOrders:
+    """Tests for preparing and staging the next order."""
+
+    def test_burn_reads_staged_copies(self, api_client, media_library, sample_order, tmp_path):
+        """Test that a prepared order is burned from its staged sources and then evicted."""
+        # Arrange
+        stager = Stager(1024 * 1024, staging_dir=str(tmp_path / 'staging'))
+        worker = BurnWorker(api_client, ContentIndex.build(media_library), stager=stager)
+        prepared = worker.prepare(sample_order.to_dict())
+        stager.wait('order-123', timeout=5)
+        for item in prepared:
+            os.remove(item.source)  # Only the staged copies remain
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+
+        # Act
+        plan = worker.burn(sample_order.to_dict(), str(mount_point))
+
+        # Assert
+        assert plan is prepared
+        for item in plan:
+            assert os.path.getsize(mount_point / item.destination) == item.size
+        assert stager.used_bytes == 0
+        stager.close()
+
+    def test_cancel_evicts_prepared_order(self, api_client, media_library, sample_order, tmp_path):
+        """Test that cancelling a prepared order frees its staging budget."""
+        stager = Stager(1024 * 1024, staging_dir=str(tmp_path / 'staging'))
+        worker = BurnWorker(api_client, ContentIndex.build(media_library), stager=stager)
+        worker.prepare(sample_order.to_dict())
+        stager.wait('order-123', timeout=5)
+
+        worker.cancel('order-123')
+
+        assert stager.used_bytes == 0
+        assert 'order-123' not in worker._prepared
+        stager.close()
+
+
+class TestBurnMany:
+    """Tests for fan-out burns of several sticks."""
+
+    def test_duplicate_sticks_complete_order_once(self, api_client, media_library, sample_order, tmp_path):
+        """Test that identical sticks of one order are burned together."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+        mounts = []
+        for name in ('usb1', 'usb2'):
+            (tmp_path / name).mkdir()
+            mounts.append(str(tmp_path / name))
+        order = sample_order.to_dict()
+
+        # Act
+        result = worker.burn_many([(order, m) for m in mounts])
+
+        # Assert
+        plan = worker.plan(order)
+        assert result.source_bytes_read == plan.total_bytes
+        for mount in mounts:
+            assert os.path.exists(os.path.join(mount, 'playlist.json'))
+        api_client.start_burning.assert_called_once_with('order-123')
+        assert 'Copias: 2' in api_client.complete_burning.call_args[1]['notes']
+
+    def test_failed_stick_reports_its_order(self, api_client, media_library, sample_order,
+                                            sample_orders, tmp_path):
+        """Test that only the order of a failed stick is reported as an error."""
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+        good = tmp_path / 'usb'
+        good.mkdir()
+        bad = tmp_path / 'not-a-dir'
+        bad.write_text('')
+
+        worker.burn_many([(sample_order.to_dict(), str(good)),
+                          (sample_orders[0].to_dict(), str(bad))])
+
+        api_client.complete_burning.assert_called_once()
+        assert api_client.complete_burning.call_args[0][0] == 'order-123'
+        assert api_client.report_error.call_args[0][0] == 'order-001'
+
+
+    def test_planning_failure_releases_claimed_orders(self, api_client, media_library, sample_order,
+                                                      sample_orders, tmp_path):
+        """Test that orders claimed before a failure are reported, and the failure raised."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+        real_plan = worker.plan
+        worker.plan = Mock(side_effect=[real_plan(sample_order.to_dict()), ValueError('bad capacity')])
+
+        # Act
+        with pytest.raises(ValueError):
+            worker.burn_many([(sample_order.to_dict(), str(mount_point)),
+                              (sample_orders[0].to_dict(), str(mount_point))])
+
+        # Assert
+        assert [c.args[0] for c in api_client.report_error.call_args_list] == ['order-123', 'order-001']
+        api_client.complete_burning.assert_not_called()
+
+
+class TestImageMode:
+    """Tests for image-mode burns."""
+
+    def test_burn_device_streams_image(self, api_client, media_library, sample_order,
+                                       tmp_path, monkeypatch):
+        """Test that image mode unmounts the stick and writes a FAT32 image to it."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            image_dir=str(tmp_path / 'images'))
+        device_file = tmp_path / 'sdb1'
+        device_file.write_bytes(bytes(64 * 1024 * 1024))
+        device = USBDevice('sdb', str(device_file), 'USB', 64 * 1024 * 1024, 64 * 1024 * 1024, 0,
+                           'vfat', '/media/USB', True)
+        unmounted = []
+        monkeypatch.setattr(worker_module, 'choose_burn_mode', lambda plan: 'image')
+        monkeypatch.setattr(worker_module, '_unmount', unmounted.append)
+
+        # Act
+        plan = worker.burn_device(sample_order.to_dict(), device)
+
+        # Assert
+        data = device_file.read_bytes()
+        assert unmounted == ['/media/USB']
+        assert data[82:90] == b'FAT32   '
+        assert data[71:82] == b'USB_4567   '
+        for item in plan:
+            with open(item.source, 'rb') as f:
+                assert f.read() in data
+        assert 'Modo imagen' in api_client.complete_burning.call_args[1]['notes']
+        assert os.listdir(tmp_path / 'images') == []
+
+    def test_burn_device_uses_files_for_small_orders(self, api_client, media_library,
+                                                     sample_order, tmp_path):
+        """Test that orders below the image thresholds are copied file by file."""
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            image_dir=str(tmp_path / 'images'))
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+        device = USBDevice('sdb', '/dev/sdb1', 'USB', 0, 0, 0, 'vfat', str(mount_point), True)
+
+        worker.burn_device(sample_order.to_dict(), device)
+
+        assert os.path.exists(mount_point / 'playlist.json')
+        assert 'Modo imagen' not in api_client.complete_burning.call_args[1]['notes']
+
+    def test_image_is_sized_to_the_partition(self, api_client, media_library, sample_order,
+                                             tmp_path, monkeypatch):
+        """Test that the image is built for the partition, not the whole disk."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            image_dir=str(tmp_path / 'images'))
+        device_file = tmp_path / 'sdb1'
+        device_file.write_bytes(bytes(64 * 1024 * 1024))
+        device = USBDevice('sdb', str(device_file), 'USB', 128 * 1024 * 1024, 0, 0,
+                           'vfat', None, True)
+        monkeypatch.setattr(worker_module, 'choose_burn_mode', lambda plan: 'image')
+
+        # Act
+        with patch.object(worker, 'burn_image', return_value=None) as burn_image:
+            worker.burn_device(sample_order.to_dict(), device)
+
+        # Assert
+        assert burn_image.call_args[0][2] == 64 * 1024 * 1024
+
+    def test_unmount_failure_releases_order_locally(self, api_client, media_library, sample_order,
+                                                    tmp_path, monkeypatch):
+        """Test that a stick that cannot be unmounted raises without touching the unclaimed order."""
+        # Arrange
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            image_dir=str(tmp_path / 'images'))
+        device = USBDevice('sdb', str(tmp_path / 'sdb1'), 'USB', 0, 0, 0, 'vfat', '/media/USB', True)
+        monkeypatch.setattr(worker_module, 'choose_burn_mode', lambda plan: 'image')
+
+        def busy(mount_point):
+            raise subprocess.CalledProcessError(32, ['umount', mount_point])
+
+        monkeypatch.setattr(worker_module, '_unmount', busy)
+
+        # Act & Assert
+        with pytest.raises(OSError):
+            worker.burn_device(sample_order.to_dict(), device)
+
+        api_client.start_burning.assert_not_called()
+        api_client.report_error.assert_not_called()
+        assert worker._prepared == {}
+
+    def test_unmounted_device_in_file_mode_is_not_claimed(self, api_client, media_library, sample_order):
+        """Test that a file-mode burn needs a mount point."""
+        worker = BurnWorker(api_client, ContentIndex.build(media_library))
+        device = USBDevice('sdb', '/dev/sdb1', 'USB', 0, 0, 0, 'vfat', None, True)
+        worker.prepare(sample_order.to_dict())
+
+        with pytest.raises(OSError):
+            worker.burn_device(sample_order.to_dict(), device)
+
+        api_client.start_burning.assert_not_called()
+        api_client.report_error.assert_not_called()
+        assert worker._prepared == {}
+
+    def test_planning_failure_is_reported(self, api_client, media_library, sample_order, tmp_path):
+        """Test that an image burn failing before the image is built still releases the order."""
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            image_dir=str(tmp_path / 'images'))
+
+        with patch.object(worker, 'playlist_json', side_effect=ValueError('bad metadata')):
+            with pytest.raises(ValueError):
+                worker.burn_image(sample_order.to_dict(), str(tmp_path / 'sdb1'), 64 * 1024 * 1024)
+
+        assert api_client.report_error.call_args[0] == ('order-123', 'bad metadata')
+        api_client.complete_burning.assert_not_called()
+
+    def test_image_that_does_not_fit_is_reported(self, api_client, media_library,
+                                                 sample_order, tmp_path):
+        """Test that image errors are reported to the API."""
+        worker = BurnWorker(api_client, ContentIndex.build(media_library),
+                            image_dir=str(tmp_path / 'images'))
+
+        with pytest.raises(ImageError):
+            worker.burn_image(sample_order.to_dict(), str(tmp_path / 'sdb1'), 1024 * 1024)
+
+        assert api_client.report_error.call_args[1]['error_code'] == 'COPY_FAILED'
+        api_client.complete_burning.assert_not_called()
+
+
+class TestProfilingHooks:
+    """Tests for the worker's profiling stages."""
+
+    def test_burn_reports_stages(self, api_client, media_library, sample_order, tmp_path, monkeypatch):
+        """Test that a burn records its resolve, copy, playlist and API stages."""
+        monkeypatch.setattr(PROFILER, 'stages_enabled', True)
+        monkeypatch.setattr(PROFILER, '_stages', {})
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+
+        BurnWorker(api_client, ContentIndex.build(media_library)).burn(sample_order.to_dict(), str(mount_point))
+
+        assert {'resolve', 'copy', 'playlist', 'api.start_burning',
+                'api.complete_burning'} <= set(PROFILER.stage_report())
+
+
+class TestBurnTelemetry:
+    """Tests for the per-order stage timeline."""
+
+    def test_successful_burn_records_timeline(self, api_client, media_library, sample_order, tmp_path):
+        """Test that a burn records its stages, bytes and device."""
+        # Arrange
+        telemetry = Mock()
+        worker = BurnWorker(api_client, ContentIndex.build(media_library), telemetry=telemetry)
+        mount_point = tmp_path / 'usb'
+        mount_point.mkdir()
+
+        # Act
+        plan = worker.burn(sample_order.to_dict(), str(mount_point), device='sdb')
+
+        # Assert
+        timeline = telemetry.record.call_args[0][0]
+        assert timeline.success is True
+        assert timeline.device == 'sdb'
+        assert timeline.content_type == sample_order.product_type
+        assert timeline.bytes_written == plan.total_bytes
+        assert {'claim', 'resolve', 'copy', 'playlist', 'report'} <= set(timeline.stages)
+
+    def test_failed_burn_records_failure(self, api_client, media_library, sample_order, tmp_path):
+        """Test that a failed burn still uploads its timeline."""
+        # Arrange
+        telemetry = Mock()
+        worker = BurnWorker(api_client, ContentIndex.build(media_library), telemetry=telemetry)
+        missing_mount = tmp_path / 'not-a-dir'
+        missing_mount.write_text('')
+
+        # Act
+        with pytest.raises(OSError):
+            worker.burn(sample_order.to_dict(), str(missing_mount))
+
+        # Assert
+        timeline = telemetry.record.call_args[0][0]
+        assert timeline.success is False
+        assert 'report' in timeline.stages